@@ -9,3 +9,6 @@ class CoreConfig(AppConfig):
     def ready(self):
         """Importa signals quando o app estiver pronto."""
         import core.audit_signals  # noqa
+        import core.webhooks  # noqa
+        import core.navigation  # noqa
+        import core.renditions  # noqa
@@ -0,0 +1,380 @@
+"""
+Benchmark dos caminhos críticos do estoque (``manage.py benchmark``).
+
+Casos medidos:
+
+- ``movement.single``: ``InventoryMovement.save`` uma a uma;
+- ``movement.bulk``: POST em ``/api/v1/movements/bulk_create/``;
+- ``movement.concurrent``: escritores em threads, cada um com sua conexão;
+- páginas (dashboard, listas, busca, relatórios, API) e
+  ``chart_data.<período>`` via test client autenticado, com cache quente
+  (``<caso>``) e frio (``<caso>.cold``, caches limpos a cada iteração);
+- ``pdf.<relatório>``: exportações em PDF (puladas sem WeasyPrint).
+
+Cada caso registra iterações, erros, latência (média, p50, p95, máx.) e
+vazão; páginas registram também as queries da primeira requisição. O
+resultado é um dict serializável em JSON; ``compare_results`` aponta as
+regressões de p50 contra um resultado anterior.
+"""
+import fnmatch
+import platform
+import statistics
+import subprocess
+import threading
+import time
+from decimal import Decimal
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, connection, transaction
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from .profiling import QueryProfile
+
+
+PAGES = [
+    ('dashboard', 'dashboard:index', {}),
+    ('product_list', 'produtos:list', {}),
+    ('movement_list', 'movimentacoes:list', {}),
+    ('search', 'search:search', {'query': 'Produto sintético'}),
+    ('report.estoque', 'relatorios:estoque', {}),
+    ('report.movimentacoes', 'relatorios:movimentacoes', {}),
+    ('report.vencimentos', 'relatorios:vencimentos', {}),
+    ('report.financeiro', 'relatorios:financeiro', {}),
+    ('report.abc_xyz', 'relatorios:abc_xyz', {}),
+    ('api.products', 'api-v1:product-list', {}),
+    ('api.movements', 'api-v1:movement-list', {}),
+]
+CHART_PERIODS = ('7d', '1m', '3m', '6m', '1y', 'este_ano', 'ultimos_2anos')
+PDF_EXPORTS = [
+    ('pdf.estoque', 'relatorios:download_estoque_pdf'),
+    ('pdf.movimentacoes', 'relatorios:download_movimentacoes_pdf'),
+    ('pdf.vencimentos', 'relatorios:download_vencimentos_pdf'),
+    ('pdf.financeiro', 'relatorios:download_financeiro_pdf'),
+    ('pdf.abc_xyz', 'relatorios:download_abc_xyz_pdf'),
+]
+
+BENCH_USERNAME = 'benchmark'
+BULK_BATCH_SIZE = 50
+
+
+def percentile(values, fraction):
+    """Percentil (interpolação linear) de uma lista já ordenada."""
+    if not values:
+        return 0.0
+    position = (len(values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def summarize(samples, elapsed=None, errors=0, operations=None):
+    """
+    Estatísticas de um caso.
+
+    Args:
+        samples: Latências (segundos) de cada iteração
+        elapsed: Tempo total de parede (padrão: soma das latências)
+        errors: Iterações com falha
+        operations: Operações realizadas (padrão: len(samples))
+    """
+    ordered = sorted(samples)
+    elapsed = sum(ordered) if elapsed is None else elapsed
+    operations = len(ordered) if operations is None else operations
+    to_ms = lambda value: round(value * 1000, 3)  # noqa: E731
+    return {
+        'iterations': len(ordered),
+        'errors': errors,
+        'mean_ms': to_ms(statistics.fmean(ordered)) if ordered else 0.0,
+        'p50_ms': to_ms(percentile(ordered, 0.50)),
+        'p95_ms': to_ms(percentile(ordered, 0.95)),
+        'max_ms': to_ms(ordered[-1]) if ordered else 0.0,
+        'ops_per_sec': round(operations / elapsed, 2) if elapsed else 0.0,
+    }
+
+
+def git_commit():
+    """Commit atual (ou None fora de um repositório git)."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_results(baseline, current, threshold=0.2):
+    """
+    Compara o p50 de cada caso presente nos dois resultados.
+
+    Returns:
+        list[dict]: case, baseline_ms, current_ms, change (fração) e
+        regression (piora acima de ``threshold``), em ordem de caso.
+    """
+    rows = []
+    for case, result in sorted(current['results'].items()):
+        before = baseline.get('results', {}).get(case)
+        if not before or 'p50_ms' not in before or 'p50_ms' not in result:
+            continue
+        change = (result['p50_ms'] - before['p50_ms']) / before['p50_ms'] if before['p50_ms'] else 0.0
+        rows.append({
+            'case': case,
+            'baseline_ms': before['p50_ms'],
+            'current_ms': result['p50_ms'],
+            'change': round(change, 4),
+            'regression': change > threshold,
+        })
+    return rows
+
+
+class BenchmarkSuite:
+    """
+    Executa os casos contra o banco corrente (já populado).
+
+    Args:
+        products: Produtos usados pelas escritas
+        iterations: Repetições por página / operações por escrita
+        writers: Threads do caso concorrente
+        rng: ``random.Random`` (escolha de produtos)
+        only: Padrões fnmatch de casos a executar (ex: ['report.*'])
+        log: Função chamada com uma linha de progresso por caso
+    """
+
+    def __init__(self, products, iterations=20, writers=4, rng=None, only=None, log=None):
+        import random
+
+        self.products = products
+        self.iterations = iterations
+        self.writers = writers
+        self.rng = rng or random.Random(0)
+        self.only = only
+        self.log = log or (lambda line: None)
+        self.results = {}
+        self.user = self._user()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def _user(self):
+        User = get_user_model()
+        user, created = User.objects.get_or_create(
+            username=BENCH_USERNAME, defaults={'is_staff': True, 'is_superuser': True},
+        )
+        if created:
+            user.set_unusable_password()
+            user.save(update_fields=['password'])
+        return user
+
+    def selected(self, case):
+        return not self.only or any(fnmatch.fnmatch(case, pattern) for pattern in self.only)
+
+    def record(self, case, result):
+        self.results[case] = result
+        if 'skipped' in result:
+            self.log(f"{case:<28} pulado: {result['skipped']}")
+        else:
+            self.log(
+                f"{case:<28} p50 {result['p50_ms']:>9.2f} ms  p95 {result['p95_ms']:>9.2f} ms  "
+                f"{result['ops_per_sec']:>9.1f} ops/s  erros {result['errors']}"
+            )
+
+    def run(self):
+        """Executa os casos selecionados. Returns: dict caso -> estatísticas."""
+        self.bench_single_movements()
+        self.bench_bulk_movements()
+        self.bench_concurrent_movements()
+        for case, url_name, params in PAGES:
+            self.bench_get(case, reverse(url_name), params)
+        for period in CHART_PERIODS:
+            self.bench_get(f'chart_data.{period}', reverse('dashboard:chart_data'), {'period': period})
+        self.bench_pdfs()
+        return self.results
+
+    # Páginas -------------------------------------------------------------
+
+    def bench_get(self, case, url, params=None, iterations=None):
+        """
+        Mede a página com cache frio (``<caso>.cold``) e quente (``<caso>``).
+
+        Dashboard (``cache_page``), relatórios (versão dos dados) e o
+        cache de referência respondem do cache a partir da segunda
+        requisição; no caso frio os caches são limpos antes de cada
+        iteração, fora do tempo medido.
+        """
+        iterations = iterations or self.iterations
+        if self.selected(f'{case}.cold'):
+            self._bench_get(f'{case}.cold', url, params, iterations, cold=True)
+        if self.selected(case):
+            self._bench_get(case, url, params, iterations, cold=False)
+
+    def _clear_caches(self):
+        from django.core.cache import cache
+        from .tiered_cache import reference_cache
+
+        cache.clear()
+        reference_cache().clear_local()
+        # Com sessões no cache (Redis) a limpeza também derruba o login
+        self.client.force_login(self.user)
+
+    def _bench_get(self, case, url, params, iterations, cold):
+        profile = QueryProfile()
+        if cold:
+            self._clear_caches()
+        with connection.execute_wrapper(profile):
+            response = self.client.get(url, params)  # aquecimento
+        samples, errors = [], 0 if response.status_code == 200 else 1
+        for _ in range(iterations):
+            if cold:
+                self._clear_caches()
+            start = time.perf_counter()
+            response = self.client.get(url, params)
+            samples.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+        result = summarize(samples, errors=errors)
+        result['queries'] = profile.count
+        result['status'] = response.status_code
+        self.record(case, result)
+
+    def bench_pdfs(self):
+        from relatorios.pdf_generator import WEASYPRINT_AVAILABLE
+
+        for case, url_name in PDF_EXPORTS:
+            if not self.selected(case):
+                continue
+            if not WEASYPRINT_AVAILABLE:
+                self.record(case, {'skipped': 'WeasyPrint indisponível'})
+                continue
+            # PDFs são lentos: poucas repetições bastam
+            self.bench_get(case, reverse(url_name), iterations=max(1, self.iterations // 5))
+
+    # Escritas ------------------------------------------------------------
+
+    def _movement_kwargs(self):
+        from movimentacoes.models import InventoryMovement
+
+        return {
+            'product': self.rng.choice(self.products),
+            'type': InventoryMovement.ENTRADA,
+            'quantity': Decimal('1'),
+            'user': self.user,
+            'document': 'BENCH',
+        }
+
+    def bench_single_movements(self):
+        from movimentacoes.models import InventoryMovement
+
+        if not self.selected('movement.single'):
+            return
+        samples, errors = [], 0
+        for _ in range(self.iterations * 5):
+            start = time.perf_counter()
+            try:
+                InventoryMovement.objects.create(**self._movement_kwargs())
+            except (DatabaseError, ValidationError):
+                errors += 1
+            samples.append(time.perf_counter() - start)
+        self.record('movement.single', summarize(samples, errors=errors))
+
+    def bench_bulk_movements(self):
+        if not self.selected('movement.bulk'):
+            return
+        url = reverse('api-v1:movement-bulk-create')
+        samples, errors = [], 0
+        for _ in range(self.iterations):
+            body = {'movements': [
+                {'product_id': self.rng.choice(self.products).pk, 'type': 'ENTRADA',
+                 'quantity': '1', 'document': 'BENCH'}
+                for _ in range(BULK_BATCH_SIZE)
+            ]}
+            start = time.perf_counter()
+            response = self.client.post(url, body, content_type='application/json')
+            samples.append(time.perf_counter() - start)
+            if response.status_code != 201:
+                errors += 1
+        result = summarize(samples, errors=errors, operations=len(samples) * BULK_BATCH_SIZE)
+        result['batch_size'] = BULK_BATCH_SIZE
+        self.record('movement.bulk', result)
+
+    def bench_concurrent_movements(self):
+        """
+        Escritores paralelos em produtos aleatórios.
+
+        Exige dados commitados (cada thread abre sua conexão); em SQLite as
+        escritas são serializadas e aparecem como espera/erros de lock.
+        """
+        from movimentacoes.models import InventoryMovement
+
+        if not self.selected('movement.concurrent'):
+            return
+        if connection.in_atomic_block:
+            self.record('movement.concurrent', {'skipped': 'transação aberta (dados não visíveis às threads)'})
+            return
+
+        per_writer = self.iterations * 5
+        samples, lock = [], threading.Lock()
+        counters = {'errors': 0}
+        barrier = threading.Barrier(self.writers + 1)
+        product_ids = [product.pk for product in self.products]
+        seeds = [self.rng.random() for _ in range(self.writers)]
+
+        def worker(seed):
+            import random
+
+            rng = random.Random(seed)
+            local, errors = [], 0
+            try:
+                barrier.wait()
+                for _ in range(per_writer):
+                    start = time.perf_counter()
+                    try:
+                        with transaction.atomic():
+                            InventoryMovement.objects.create(
+                                product_id=rng.choice(product_ids), type=InventoryMovement.ENTRADA,
+                                quantity=Decimal('1'), user=self.user, document='BENCH',
+                            )
+                    except (DatabaseError, ValidationError):
+                        errors += 1
+                    local.append(time.perf_counter() - start)
+            finally:
+                with lock:
+                    samples.extend(local)
+                    counters['errors'] += errors
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in seeds]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        result = summarize(
+            samples, elapsed=elapsed, errors=counters['errors'],
+            operations=len(samples) - counters['errors'],
+        )
+        result['writers'] = self.writers
+        self.record('movement.concurrent', result)
+
+
+def environment_info(options):
+    """Metadados do resultado (commit, banco, versões e parâmetros)."""
+    return {
+        'commit': git_commit(),
+        'created_at': timezone.now().isoformat(),
+        'database': connection.vendor,
+        'database_version': '.'.join(map(str, connection.Database.sqlite_version_info))
+        if connection.vendor == 'sqlite' else getattr(connection, 'pg_version', None),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'settings': settings.SETTINGS_MODULE,
+        'debug': settings.DEBUG,
+        'sql_profiling': settings.SQL_PROFILING_ENABLED,
+        'options': options,
+    }
@@ -0,0 +1,121 @@
+"""
+Atualizações em lote auditadas.
+
+``QuerySet.update()`` não dispara signals, então alterações em massa ficam
+fora do log de auditoria; salvar linha a linha, por outro lado, é lento.
+Aqui a alteração é feita com um UPDATE por conjunto, os valores anteriores
+são lidos uma única vez (com lock) e o AuditLog é gravado com um único
+``bulk_create``.
+"""
+import uuid
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models.expressions import Combinable
+from django.utils import timezone
+
+from .models import AuditLog, NivelSeveridade, TipoAcaoAuditoria
+
+
+# Tamanho dos lotes de UPDATE por pk e de INSERT no AuditLog
+BULK_AUDIT_BATCH_SIZE = 1000
+
+
+def audited_bulk_update(queryset, values, user=None, request=None, description='',
+                        describe=None, describe_fields=(), severity=NivelSeveridade.MEDIUM,
+                        on_update=None):
+    """
+    Aplica ``values`` a todas as linhas do queryset e registra uma entrada de
+    auditoria por linha efetivamente alterada.
+
+    Args:
+        queryset: Linhas a alterar.
+        values: Dict campo -> novo valor (literal ou expressão, ex: F('x') * 1.1).
+        user: Usuário responsável.
+        request: Request HTTP (opcional, para IP e User-Agent).
+        description: Descrição da operação (repetida em cada entrada).
+        describe: Função ``row -> str`` para object_repr; recebe o dict de
+            valores anteriores da linha.
+        describe_fields: Campos extras lidos para ``describe`` (ex: sku, name).
+        severity: Severidade das entradas.
+        on_update: Função chamada com cada lote de pks alterados, logo após o
+            UPDATE e na mesma transação (ex: status derivado, eventos de
+            webhook).
+
+    Returns:
+        int: Quantidade de linhas alteradas.
+    """
+    model = queryset.model
+    fields = list(values)
+    has_expressions = any(isinstance(v, Combinable) for v in values.values())
+    operation_id = uuid.uuid4().hex
+
+    with transaction.atomic():
+        before = {
+            row['pk']: row
+            for row in queryset.select_for_update().values('pk', *fields, *describe_fields)
+        }
+        if has_expressions:
+            changed = list(before)
+        else:
+            changed = [
+                pk for pk, row in before.items()
+                if any(row[f] != values[f] for f in fields)
+            ]
+        if not changed:
+            return 0
+
+        update_values = dict(values)
+        if any(f.name == 'updated_at' for f in model._meta.concrete_fields):
+            update_values.setdefault('updated_at', timezone.now())
+
+        for start in range(0, len(changed), BULK_AUDIT_BATCH_SIZE):
+            batch = changed[start:start + BULK_AUDIT_BATCH_SIZE]
+            model._default_manager.filter(pk__in=batch).update(**update_values)
+            if on_update is not None:
+                on_update(batch)
+
+        if has_expressions:
+            after = {
+                row['pk']: row
+                for start in range(0, len(changed), BULK_AUDIT_BATCH_SIZE)
+                for row in model._default_manager.filter(
+                    pk__in=changed[start:start + BULK_AUDIT_BATCH_SIZE]
+                ).values('pk', *fields)
+            }
+        else:
+            after = {pk: values for pk in changed}
+
+        content_type = ContentType.objects.get_for_model(model)
+        ip_address = AuditLog.get_client_ip(request) if request else None
+        user_agent = request.META.get('HTTP_USER_AGENT', '')[:500] if request else ''
+        metadata = {
+            'bulk_operation': operation_id,
+            'fields': fields,
+            'count': len(changed),
+        }
+
+        logs = []
+        for pk in changed:
+            old, new = before[pk], after[pk]
+            changes = {
+                f: {'old': str(old[f]), 'new': str(new[f])}
+                for f in fields if old[f] != new[f]
+            }
+            logs.append(AuditLog(
+                user=user,
+                action=TipoAcaoAuditoria.UPDATE,
+                severity=severity,
+                description=description,
+                content_type=content_type,
+                object_id=pk,
+                object_repr=(describe(old) if describe else f'{model._meta.verbose_name} #{pk}')[:500],
+                metadata=metadata,
+                changes=changes,
+                ip_address=ip_address,
+                user_agent=user_agent,
+            ))
+        AuditLog.objects.bulk_create(logs, batch_size=BULK_AUDIT_BATCH_SIZE)
+
+    return len(changed)
+
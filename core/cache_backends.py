@@ -0,0 +1,45 @@
+"""
+Backends de cache com contagem de acertos/faltas (ver core/metrics.py).
+
+São os backends de sempre (LocMem e django-redis) com ``get``/``get_many``
+medidos; configure-os em CACHES['default'].
+"""
+from django.core.cache.backends.locmem import LocMemCache
+
+from .metrics import record_cache_access
+
+try:
+    from django_redis.cache import RedisCache
+except ImportError:
+    # django-redis só é necessário quando REDIS_URL está configurado
+    RedisCache = None
+
+
+_MISSING = object()
+
+
+class MeteredCacheMixin:
+    """Conta hit/miss nas leituras; escritas não são afetadas."""
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version=version)
+        if value is _MISSING:
+            record_cache_access(0, 1)
+            return default
+        record_cache_access(1)
+        return value
+
+
+class MeteredLocMemCache(MeteredCacheMixin, LocMemCache):
+    """LocMemCache medido (get_many da base já passa por ``get``)."""
+
+
+if RedisCache is not None:
+    class MeteredRedisCache(MeteredCacheMixin, RedisCache):
+        """RedisCache medido; get_many é um único MGET, contado aqui."""
+
+        def get_many(self, keys, version=None, client=None):
+            keys = list(keys)
+            found = super().get_many(keys, version=version, client=client)
+            record_cache_access(len(found), len(keys) - len(found))
+            return found
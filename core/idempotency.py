@@ -0,0 +1,142 @@
+"""
+Suporte a ``Idempotency-Key`` nas ações de escrita da API.
+
+O cliente envia um identificador único por operação no cabeçalho
+``Idempotency-Key``. A primeira requisição insere a chave em
+``IdempotencyKey`` (restrição única por usuário, escopo e chave), executa
+a ação e grava a resposta (status e corpo) na mesma linha, tudo numa única
+transação: se o processo morrer no meio, a reserva some junto com as
+escritas da ação e a repetição executa de novo.
+
+- Repetição com a mesma chave e o mesmo corpo: devolve a resposta gravada,
+  sem executar a ação de novo (cabeçalho ``Idempotent-Replayed: true``).
+- Duplicata concorrente: a inserção espera a transação do original no
+  índice único e, após o commit, devolve a resposta gravada. Reservas sem
+  resposta (não deveriam ficar visíveis) dão 409, com ``Retry-After``.
+- Mesma chave com outro corpo: 422.
+- Erros 5xx/exceções desfazem a transação e liberam a chave para uma nova
+  tentativa.
+
+As chaves expiram após IDEMPOTENCY_KEY_TTL_HOURS (removidas por
+``manage.py purge_idempotency_keys`` ou ao serem reutilizadas).
+
+Uso::
+
+    class MinhaViewSet(viewsets.ModelViewSet):
+        @idempotent
+        def create(self, request, *args, **kwargs):
+            return super().create(request, *args, **kwargs)
+"""
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+
+
+def request_fingerprint(request):
+    """Hash do método, caminho e corpo (para detectar reuso da chave)."""
+    body = json.dumps(request.data, sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(f"{request.method} {request.path}\n{body}".encode()).hexdigest()
+
+
+def _claim(user, scope, key, fingerprint):
+    """
+    Reserva a chave com um único INSERT.
+
+    Returns:
+        tuple[IdempotencyKey, IdempotencyKey | None]: (reserva criada, None)
+        ou (None, registro existente).
+    """
+    now = timezone.now()
+    expires_at = now + timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                record = IdempotencyKey.objects.create(
+                    user=user, scope=scope, key=key,
+                    request_hash=fingerprint, expires_at=expires_at,
+                )
+            return record, None
+        except IntegrityError:
+            existing = IdempotencyKey.objects.filter(user=user, scope=scope, key=key).first()
+            if existing is not None and existing.expires_at > now:
+                return None, existing
+            # Expirada (ou liberada entre o INSERT e a leitura): tenta de novo
+            IdempotencyKey.objects.filter(user=user, scope=scope, key=key, expires_at__lte=now).delete()
+    return None, IdempotencyKey.objects.filter(user=user, scope=scope, key=key).first()
+
+
+def _existing_response(existing, fingerprint):
+    if existing is None or existing.status_code is None:
+        response = Response(
+            {'detail': 'Uma requisição com esta Idempotency-Key ainda está em processamento.'},
+            status=status.HTTP_409_CONFLICT,
+        )
+        response['Retry-After'] = '1'
+        return response
+    if existing.request_hash != fingerprint:
+        return Response(
+            {'detail': 'Idempotency-Key já utilizada com outro conteúdo de requisição.'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    response = Response(existing.response_body, status=existing.status_code)
+    response[REPLAYED_HEADER] = 'true'
+    return response
+
+
+def idempotent(view_method):
+    """
+    Decorator para ações de viewsets DRF que aceitam ``Idempotency-Key``.
+
+    Sem o cabeçalho a ação executa normalmente. O escopo da chave é
+    ``<basename>.<action>`` da viewset.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {'detail': f'{HEADER} deve ter no máximo {MAX_KEY_LENGTH} caracteres.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        scope = f"{self.basename}.{self.action}"
+        fingerprint = request_fingerprint(request)
+        with transaction.atomic():
+            record, existing = _claim(request.user, scope, key, fingerprint)
+            if record is None:
+                return _existing_response(existing, fingerprint)
+
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code >= 500:
+                transaction.set_rollback(True)
+                return response
+
+            record.status_code = response.status_code
+            record.response_body = json.loads(json.dumps(response.data, cls=DjangoJSONEncoder))
+            record.save(update_fields=['status_code', 'response_body'])
+        return response
+
+    return wrapper
+
+
+def purge_expired_keys(now=None):
+    """Remove as chaves expiradas. Retorna a quantidade removida."""
+    deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=now or timezone.now()).delete()
+    return deleted
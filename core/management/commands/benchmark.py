@@ -0,0 +1,118 @@
+"""
+Benchmark reprodutível dos caminhos críticos (ver core/benchmarks.py).
+
+Roda num banco de teste descartável (como o test runner): um arquivo
+SQLite temporário ou ``test_<nome>`` no PostgreSQL de DATABASE_URL,
+populado com um catálogo sintético de tamanho configurável.
+
+Uso: python manage.py benchmark [--products 500] [--movements 2000] [--iterations 20]
+     [--writers 4] [--seed 42] [--only 'report.*'] [--keepdb] [--output arquivo.json]
+     [--compare anterior.json] [--threshold 0.2] [--fail-on-regression]
+"""
+import json
+import os
+import random
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import (
+    setup_databases, setup_test_environment, teardown_databases, teardown_test_environment,
+)
+
+from core.benchmarks import BenchmarkSuite, compare_results, environment_info
+
+
+class Command(BaseCommand):
+    help = 'Mede latência e vazão dos caminhos críticos e grava o resultado em JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=500, help='Produtos no catálogo sintético (padrão: 500)')
+        parser.add_argument('--categories', type=int, default=10, help='Categorias sintéticas (padrão: 10)')
+        parser.add_argument('--movements', type=int, default=2000, help='Movimentações históricas (padrão: 2000)')
+        parser.add_argument('--days', type=int, default=365, help='Período das movimentações em dias (padrão: 365)')
+        parser.add_argument('--iterations', type=int, default=20, help='Repetições por caso (padrão: 20)')
+        parser.add_argument('--writers', type=int, default=4, help='Threads no caso concorrente (padrão: 4)')
+        parser.add_argument('--seed', type=int, default=42, help='Semente dos dados sintéticos (padrão: 42)')
+        parser.add_argument('--only', action='append', help="Executa só os casos do padrão (ex: 'report.*'); repetível")
+        parser.add_argument('--keepdb', action='store_true', help='Mantém o banco de benchmark entre execuções')
+        parser.add_argument('--output', help='Arquivo JSON de saída (padrão: benchmark-results/<commit>-<banco>.json)')
+        parser.add_argument('--compare', help='Resultado anterior (JSON) para comparar o p50')
+        parser.add_argument('--threshold', type=float, default=0.2, help='Piora de p50 considerada regressão (padrão: 0.2)')
+        parser.add_argument('--fail-on-regression', action='store_true', help='Sai com erro se houver regressão')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as handle:
+                baseline = json.load(handle)
+
+        if connection.vendor == 'sqlite' and not connection.settings_dict['TEST'].get('NAME'):
+            # Arquivo, não memória: as threads do caso concorrente precisam
+            # enxergar o mesmo banco, como em produção
+            connection.settings_dict['TEST']['NAME'] = os.path.join(
+                tempfile.gettempdir(), 'ares_benchmark.sqlite3'
+            )
+
+        # Mantém o DEBUG das settings (com DEBUG=False o manifest de estáticos
+        # precisa existir: rode collectstatic antes)
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False, keepdb=options['keepdb'])
+        try:
+            data = self.run_suite(options)
+        finally:
+            teardown_databases(old_config, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        output = options['output'] or os.path.join(
+            'benchmark-results', f"{data['meta']['commit'] or 'local'}-{data['meta']['database']}.json"
+        )
+        os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+        with open(output, 'w', encoding='utf-8') as handle:
+            json.dump(data, handle, indent=2, ensure_ascii=False)
+        self.stdout.write(self.style.SUCCESS(f"Resultado gravado em {output}"))
+
+        if baseline is not None:
+            self.report_comparison(baseline, data, options)
+
+    def run_suite(self, options):
+        from movimentacoes.models import InventoryMovement
+        from movimentacoes.synthetic import seed_catalog, seed_movements
+
+        rng = random.Random(options['seed'])
+        meta = environment_info({
+            key: options[key]
+            for key in ('products', 'categories', 'movements', 'days', 'iterations', 'writers', 'seed', 'only')
+        })
+        self.stdout.write(f"Banco: {meta['database']} | commit {meta['commit']}")
+
+        products = seed_catalog(options['products'], options['categories'], rng)
+        User = get_user_model()
+        users = list(User.objects.all()[:10]) or [User.objects.create(username='benchmark-seed')]
+        missing = options['movements'] - InventoryMovement.objects.count()
+        if missing > 0:
+            self.stdout.write(f"Populando {missing} movimentações...")
+            with transaction.atomic():
+                seed_movements(products, users, missing, options['days'], rng)
+
+        suite = BenchmarkSuite(
+            products, iterations=options['iterations'], writers=options['writers'],
+            rng=rng, only=options['only'], log=self.stdout.write,
+        )
+        return {'meta': meta, 'results': suite.run()}
+
+    def report_comparison(self, baseline, data, options):
+        rows = compare_results(baseline, data, options['threshold'])
+        self.stdout.write(
+            f"\nComparação com {baseline['meta'].get('commit')} (p50, regressão > {options['threshold']:.0%}):"
+        )
+        for row in rows:
+            line = (
+                f"{row['case']:<28}{row['baseline_ms']:>10.2f}{row['current_ms']:>10.2f} ms"
+                f"{row['change']:>+9.1%}"
+            )
+            self.stdout.write(self.style.ERROR(line) if row['regression'] else line)
+        regressions = [row['case'] for row in rows if row['regression']]
+        if regressions and options['fail_on_regression']:
+            raise CommandError(f"Regressões: {', '.join(regressions)}")
@@ -0,0 +1,63 @@
+"""
+Entrega os eventos pendentes da fila de webhooks (ver core/webhooks.py).
+Uso: python manage.py deliver_webhooks [--loop] [--interval 5] [--workers 4] [--batch-size 100] [--requeue-dead]
+
+Sem --loop esvazia a fila uma vez (cron); com --loop roda como worker.
+O destino e o token vêm de Configurações de API no admin do Wagtail.
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.webhooks import deliver_pending, requeue_dead_letters
+
+
+class Command(BaseCommand):
+    help = 'Entrega os eventos pendentes de webhook em lotes assinados'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Roda continuamente (worker)'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Segundos entre execuções com --loop (padrão: 5)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.WEBHOOK_WORKERS,
+            help=f'Workers paralelos (padrão: {settings.WEBHOOK_WORKERS})'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.WEBHOOK_BATCH_SIZE,
+            help=f'Eventos por requisição (padrão: {settings.WEBHOOK_BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--requeue-dead',
+            action='store_true',
+            help='Devolve os eventos que falharam definitivamente à fila antes de entregar'
+        )
+
+    def handle(self, *args, **options):
+        if options['requeue_dead']:
+            count = requeue_dead_letters()
+            self.stdout.write(f"{count} evento(s) devolvido(s) à fila.")
+
+        while True:
+            counts = deliver_pending(workers=options['workers'], batch_size=options['batch_size'])
+            if counts['batches'] or counts['failed'] or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(
+                    f"{counts['delivered']} evento(s) entregue(s) em {counts['batches']} lote(s)"
+                    + (f", {counts['failed']} com falha." if counts['failed'] else ".")
+                ))
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,64 @@
+"""
+Gera as imagens pendentes da fila de renditions (ver core/renditions.py).
+Uso: python manage.py generate_renditions [--loop] [--interval 5] [--workers 4] [--batch-size 20] [--all-images]
+
+Sem --loop esvazia a fila uma vez (cron); com --loop roda como worker.
+--all-images agenda toda a biblioteca (carga inicial ou nova especificação
+em IMAGE_RENDITIONS) antes de processar.
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.renditions import enqueue_all_images, generate_pending
+
+
+class Command(BaseCommand):
+    help = 'Gera renditions e variantes de imagens enviadas num pool de processos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Roda continuamente (worker)'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Segundos entre execuções com --loop (padrão: 5)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.RENDITION_WORKERS,
+            help=f'Processos paralelos (padrão: {settings.RENDITION_WORKERS})'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.RENDITION_BATCH_SIZE,
+            help=f'Tarefas reservadas por vez (padrão: {settings.RENDITION_BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--all-images',
+            action='store_true',
+            help='Agenda todas as imagens da biblioteca antes de processar'
+        )
+
+    def handle(self, *args, **options):
+        if options['all_images']:
+            count = enqueue_all_images()
+            self.stdout.write(f"{count} imagem(ns) agendada(s).")
+
+        while True:
+            counts = generate_pending(workers=options['workers'], batch_size=options['batch_size'])
+            if counts['done'] or counts['failed'] or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(
+                    f"{counts['done']} tarefa(s) concluída(s)"
+                    + (f", {counts['failed']} com falha." if counts['failed'] else ".")
+                ))
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,15 @@
+"""
+Remove as chaves Idempotency-Key expiradas (ver core/idempotency.py).
+Uso: python manage.py purge_idempotency_keys
+"""
+from django.core.management.base import BaseCommand
+
+from core.idempotency import purge_expired_keys
+
+
+class Command(BaseCommand):
+    help = 'Remove as chaves de idempotência expiradas'
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_keys()
+        self.stdout.write(self.style.SUCCESS(f"{deleted} chave(s) expirada(s) removida(s)."))
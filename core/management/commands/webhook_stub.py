@@ -0,0 +1,79 @@
+"""
+Receptor HTTP local para testar os webhooks de saída.
+Uso: python manage.py webhook_stub [--port 8765] [--token TOKEN] [--fail-status 503]
+
+Configure a URL da API externa como http://127.0.0.1:8765/ e rode
+deliver_webhooks: cada lote recebido é exibido com o resultado da
+verificação da assinatura HMAC. --fail-status responde sempre com o código
+informado, para exercitar backoff e dead letter.
+"""
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+from core.webhooks import SIGNATURE_HEADER, TIMESTAMP_HEADER, verify_signature
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Recebe lotes de eventos; ``server.token``/``server.fail_status`` configuram."""
+
+    protocol_version = 'HTTP/1.1'  # keep-alive, como o pool do worker
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        valid = verify_signature(
+            self.server.token,
+            self.headers.get(TIMESTAMP_HEADER),
+            body,
+            self.headers.get(SIGNATURE_HEADER),
+        ) if self.server.token else None
+        self.server.received.append({'body': json.loads(body or b'{}'), 'valid_signature': valid})
+        if self.server.on_receive:
+            self.server.on_receive(self.server.received[-1])
+
+        status = self.server.fail_status or (401 if valid is False else 204)
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(port=0, token='', fail_status=None, on_receive=None):
+    """Cria o receptor (porta 0 = livre); ``server.received`` guarda os lotes."""
+    server = ThreadingHTTPServer(('127.0.0.1', port), StubHandler)
+    server.token = token
+    server.fail_status = fail_status
+    server.on_receive = on_receive
+    server.received = []
+    return server
+
+
+class Command(BaseCommand):
+    help = 'Sobe um receptor HTTP local para testar os webhooks de saída'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=8765, help='Porta (padrão: 8765)')
+        parser.add_argument('--token', default='', help='Token para verificar a assinatura HMAC')
+        parser.add_argument('--fail-status', type=int, help='Responde sempre com este código HTTP')
+
+    def handle(self, *args, **options):
+        def show(batch):
+            events = batch['body'].get('events', [])
+            signature = {True: 'válida', False: 'INVÁLIDA', None: 'não verificada'}[batch['valid_signature']]
+            self.stdout.write(f"Lote com {len(events)} evento(s), assinatura {signature}")
+            for event in events:
+                self.stdout.write(f"  #{event['id']} {event['type']}: {json.dumps(event['data'])}")
+
+        server = make_server(options['port'], options['token'], options['fail_status'], show)
+        self.stdout.write(self.style.SUCCESS(
+            f"Recebendo webhooks em http://127.0.0.1:{server.server_port}/ (Ctrl+C para sair)"
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
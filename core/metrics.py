@@ -0,0 +1,183 @@
+"""
+Métricas no formato Prometheus (``GET /metrics``).
+
+Publicadas:
+
+- ``ares_http_request_duration_seconds{view,method}``: latência por nome de
+  URL (``resolver_match.view_name``; rotas não resolvidas como
+  ``<unresolved>``, para não explodir a cardinalidade);
+- ``ares_http_request_db_queries{view}``: queries por requisição;
+- ``ares_cache_requests_total{result}``: acertos/faltas em
+  ``CACHES['default']`` (razão de acerto = hit / (hit + miss)), contados
+  pelos backends de ``core/cache_backends.py``;
+- ``ares_pdf_render_seconds{template}``: renderização no ``PDFGenerator``;
+- ``ares_movement_save_seconds{type}`` e
+  ``ares_movement_lock_wait_seconds{lock}``: gravação de movimentações e
+  espera pelos locks de linha em ``InventoryMovement.save``;
+- ``ares_queue_depth{queue}``: filas assíncronas (webhooks pendentes e
+  em dead letter, alertas de estoque a enviar), lidas do banco na coleta.
+
+Multiprocesso: com ``PROMETHEUS_MULTIPROC_DIR`` definido (ver
+etc/uwsgi.ini) cada worker grava suas séries em arquivos nesse diretório e
+a coleta soma todos os processos, então qualquer worker responde pelo
+conjunto. Sem a variável, as métricas são as do próprio processo.
+
+Acesso: ``Authorization: Bearer <METRICS_TOKEN>`` (scraper) ou sessão de
+usuário staff.
+"""
+import hmac
+import os
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest,
+)
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.multiprocess import MultiProcessCollector
+
+
+UNRESOLVED = '<unresolved>'
+
+REQUEST_LATENCY = Histogram(
+    'ares_http_request_duration_seconds',
+    'Latência das requisições por nome de URL.',
+    ['view', 'method'],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUEST_QUERIES = Histogram(
+    'ares_http_request_db_queries',
+    'Queries SQL por requisição.',
+    ['view'],
+    buckets=(0, 1, 2, 5, 10, 15, 20, 30, 50, 100, 200),
+)
+CACHE_REQUESTS = Counter(
+    'ares_cache_requests',
+    "Leituras em CACHES['default'] por resultado (hit/miss).",
+    ['result'],
+)
+PDF_RENDER = Histogram(
+    'ares_pdf_render_seconds',
+    'Tempo de renderização de PDFs (PDFGenerator).',
+    ['template'],
+    buckets=(0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60),
+)
+MOVEMENT_SAVE = Histogram(
+    'ares_movement_save_seconds',
+    'Tempo de InventoryMovement.save (transação completa).',
+    ['type'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+MOVEMENT_LOCK_WAIT = Histogram(
+    'ares_movement_lock_wait_seconds',
+    'Espera pelo lock de linha (produto ou saldo do depósito) ao gravar movimentações.',
+    ['lock'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+
+
+def record_cache_access(hits, misses=0):
+    """Contabiliza leituras de cache (usado pelos backends medidos)."""
+    if hits:
+        CACHE_REQUESTS.labels('hit').inc(hits)
+    if misses:
+        CACHE_REQUESTS.labels('miss').inc(misses)
+
+
+class QueueDepthCollector:
+    """Profundidade das filas assíncronas, consultada a cada coleta."""
+
+    def collect(self):
+        from core.models import StatusWebhook, WebhookEvent
+        from movimentacoes.models import StockAlert
+
+        gauge = GaugeMetricFamily(
+            'ares_queue_depth', 'Itens aguardando processamento por fila.', labels=['queue'],
+        )
+        gauge.add_metric(
+            ['webhooks'], WebhookEvent.objects.filter(status=StatusWebhook.PENDENTE).count()
+        )
+        gauge.add_metric(
+            ['webhooks_dead'], WebhookEvent.objects.filter(status=StatusWebhook.FALHOU).count()
+        )
+        gauge.add_metric(
+            ['stock_alerts'], StockAlert.objects.filter(dispatched_at__isnull=True).count()
+        )
+        yield gauge
+
+
+class _ProcessCollector:
+    """Repassa o registro global (modo de processo único)."""
+
+    def collect(self):
+        return REGISTRY.collect()
+
+
+def build_registry():
+    """Registro da coleta: todos os workers (multiprocesso) + filas."""
+    registry = CollectorRegistry()
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        MultiProcessCollector(registry)
+    else:
+        registry.register(_ProcessCollector())
+    registry.register(QueueDepthCollector())
+    return registry
+
+
+def _authorized(request):
+    token = settings.METRICS_TOKEN
+    if token:
+        header = request.headers.get('Authorization', '')
+        if hmac.compare_digest(header, f'Bearer {token}'):
+            return True
+    user = getattr(request, 'user', None)
+    return bool(user and user.is_active and user.is_staff)
+
+
+def metrics_view(request):
+    """Exposição no formato texto do Prometheus."""
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    if not _authorized(request):
+        return HttpResponseForbidden()
+    return HttpResponse(generate_latest(build_registry()), content_type=CONTENT_TYPE_LATEST)
+
+
+class _QueryCounter:
+    """execute_wrapper que apenas conta as queries da requisição."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    """
+    Latência e queries por requisição, rotuladas pelo nome da URL.
+
+    Desabilitado (METRICS_ENABLED=False), sai da cadeia na inicialização.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = _QueryCounter()
+        start = time.perf_counter()
+        with connections['default'].execute_wrapper(counter):
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name if match else None) or UNRESOLVED
+        REQUEST_LATENCY.labels(view, request.method).observe(elapsed)
+        REQUEST_QUERIES.labels(view).observe(counter.count)
+        return response
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:02
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_rename_core_auditl_timesta_328bf1_idx_audit_log_time_user_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(max_length=50, verbose_name='Tipo de Evento')),
+                ('payload', models.JSONField(verbose_name='Dados')),
+                ('status', models.CharField(choices=[('PENDENTE', 'Pendente'), ('ENTREGUE', 'Entregue'), ('FALHOU', 'Falhou (dead letter)')], default='PENDENTE', max_length=10, verbose_name='Situação')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Tentativas')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Próxima Tentativa')),
+                ('last_error', models.TextField(blank=True, verbose_name='Último Erro')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('delivered_at', models.DateTimeField(blank=True, null=True, verbose_name='Entregue em')),
+            ],
+            options={
+                'verbose_name': 'Evento de Webhook',
+                'verbose_name_plural': 'Eventos de Webhook',
+                'ordering': ['id'],
+                'indexes': [models.Index(condition=models.Q(('status', 'PENDENTE')), fields=['next_attempt_at', 'id'], name='webhook_event_due_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:51
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_idempotency_key'),
+        ('wagtailimages', '0027_image_description'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RenditionJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(blank=True, help_text='Caminho no storage (uploads fora da biblioteca de imagens)', max_length=255, verbose_name='Arquivo')),
+                ('max_dimension', models.PositiveIntegerField(blank=True, null=True, verbose_name='Dimensão Máxima')),
+                ('status', models.CharField(choices=[('PENDENTE', 'Pendente'), ('CONCLUIDA', 'Concluída'), ('FALHOU', 'Falhou')], default='PENDENTE', max_length=10, verbose_name='Situação')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Tentativas')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Próxima Tentativa')),
+                ('last_error', models.TextField(blank=True, verbose_name='Último Erro')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Concluído em')),
+                ('image', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='wagtailimages.image', verbose_name='Imagem')),
+            ],
+            options={
+                'verbose_name': 'Tarefa de Rendition',
+                'verbose_name_plural': 'Tarefas de Rendition',
+                'ordering': ['id'],
+                'indexes': [models.Index(condition=models.Q(('status', 'PENDENTE')), fields=['next_attempt_at', 'id'], name='rendition_job_due_idx')],
+            },
+        ),
+    ]
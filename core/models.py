@@ -6,6 +6,7 @@ Este módulo contém modelos base e configurações compartilhadas.
 from django.db import models
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from wagtail.admin.panels import FieldPanel, MultiFieldPanel
 from wagtail.contrib.settings.models import BaseSiteSetting, register_setting
 
@@ -578,6 +579,212 @@ class AuditLog(models.Model):
         return badges.get(self.severity, 'bg-secondary')
 
 
+class StatusWebhook(models.TextChoices):
+    """Situação de um evento na fila de webhooks."""
+    PENDENTE = 'PENDENTE', 'Pendente'
+    ENTREGUE = 'ENTREGUE', 'Entregue'
+    FALHOU = 'FALHOU', 'Falhou (dead letter)'
+
+
+class WebhookEvent(models.Model):
+    """
+    Evento da fila de saída (outbox) de webhooks.
+    
+    Gravado na mesma transação da alteração que o gerou e entregue depois
+    pelo worker (manage.py deliver_webhooks); ver core/webhooks.py.
+    """
+    event_type = models.CharField(
+        max_length=50,
+        verbose_name="Tipo de Evento"
+    )
+    payload = models.JSONField(
+        verbose_name="Dados"
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=StatusWebhook.choices,
+        default=StatusWebhook.PENDENTE,
+        verbose_name="Situação"
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name="Tentativas"
+    )
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name="Próxima Tentativa"
+    )
+    last_error = models.TextField(
+        blank=True,
+        verbose_name="Último Erro"
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Criado em"
+    )
+    delivered_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Entregue em"
+    )
+
+    class Meta:
+        verbose_name = "Evento de Webhook"
+        verbose_name_plural = "Eventos de Webhook"
+        ordering = ['id']
+        indexes = [
+            # Fila do worker: pendentes vencidos, em ordem de criação
+            models.Index(
+                fields=['next_attempt_at', 'id'],
+                condition=models.Q(status='PENDENTE'),
+                name='webhook_event_due_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} #{self.pk} ({self.get_status_display()})"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Chave ``Idempotency-Key`` de uma requisição de escrita da API.
+    
+    A inserção (única por usuário, escopo e chave) reserva a execução;
+    a resposta fica gravada para repetições até ``expires_at``.
+    Ver core/idempotency.py.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='idempotency_keys',
+        verbose_name="Usuário"
+    )
+    scope = models.CharField(
+        max_length=100,
+        verbose_name="Escopo"
+    )
+    key = models.CharField(
+        max_length=255,
+        verbose_name="Chave"
+    )
+    request_hash = models.CharField(
+        max_length=64,
+        verbose_name="Hash da Requisição"
+    )
+    # Vazio enquanto a requisição original está em execução
+    status_code = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        verbose_name="Status da Resposta"
+    )
+    response_body = models.JSONField(
+        null=True,
+        blank=True,
+        verbose_name="Resposta"
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Criado em"
+    )
+    expires_at = models.DateTimeField(
+        db_index=True,
+        verbose_name="Expira em"
+    )
+
+    class Meta:
+        verbose_name = "Chave de Idempotência"
+        verbose_name_plural = "Chaves de Idempotência"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'scope', 'key'],
+                name='idempotency_key_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.scope}: {self.key}"
+
+
+class StatusRendition(models.TextChoices):
+    """Situação de uma tarefa na fila de renditions."""
+    PENDENTE = 'PENDENTE', 'Pendente'
+    CONCLUIDA = 'CONCLUIDA', 'Concluída'
+    FALHOU = 'FALHOU', 'Falhou'
+
+
+class RenditionJob(models.Model):
+    """
+    Tarefa da fila de geração de imagens.
+    
+    Gravada no upload (imagem do Wagtail ou arquivo enviado pelas views de
+    upload) e processada depois pelo worker (manage.py generate_renditions);
+    ver core/renditions.py.
+    """
+    image = models.ForeignKey(
+        'wagtailimages.Image',
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name="Imagem"
+    )
+    path = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name="Arquivo",
+        help_text="Caminho no storage (uploads fora da biblioteca de imagens)"
+    )
+    max_dimension = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name="Dimensão Máxima"
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=StatusRendition.choices,
+        default=StatusRendition.PENDENTE,
+        verbose_name="Situação"
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name="Tentativas"
+    )
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name="Próxima Tentativa"
+    )
+    last_error = models.TextField(
+        blank=True,
+        verbose_name="Último Erro"
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Criado em"
+    )
+    finished_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Concluído em"
+    )
+
+    class Meta:
+        verbose_name = "Tarefa de Rendition"
+        verbose_name_plural = "Tarefas de Rendition"
+        ordering = ['id']
+        indexes = [
+            # Fila do worker: pendentes vencidas, em ordem de criação
+            models.Index(
+                fields=['next_attempt_at', 'id'],
+                condition=models.Q(status='PENDENTE'),
+                name='rendition_job_due_idx',
+            ),
+        ]
+
+    def __str__(self):
+        alvo = f"imagem {self.image_id}" if self.image_id else self.path
+        return f"{alvo} #{self.pk} ({self.get_status_display()})"
+
+
 # Exportar modelos base para uso em outros apps
 __all__ = [
     'TimeStampedModel', 
@@ -590,4 +797,9 @@ __all__ = [
     'TipoAcaoAuditoria',
     'NivelSeveridade',
     'AuditLog',
+    'StatusWebhook',
+    'WebhookEvent',
+    'IdempotencyKey',
+    'StatusRendition',
+    'RenditionJob',
 ]
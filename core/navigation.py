@@ -0,0 +1,116 @@
+"""
+Menu de navegação montado em memória e em cache (tag ``top_menu``).
+
+A subárvore do menu (páginas publicadas com "mostrar nos menus", até
+``max_levels`` níveis abaixo da raiz) vem de uma única query ordenada por
+``path``; a árvore é montada em memória, na ordem de título de cada nível.
+
+A estrutura (dicts com título, URL e filhos) fica no cache de referência
+(core/tiered_cache.py) por site, idioma, raiz e níveis. Publicar,
+despublicar, mover ou excluir páginas e salvar SiteSettings trocam a
+geração das chaves, invalidando todos os menus de uma vez. O estado
+"ativo" depende da página atual e é aplicado a cada requisição, numa cópia.
+"""
+import time
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import translation
+from wagtail.models import Page
+from wagtail.signals import page_published, page_unpublished, post_page_move
+
+from .models import SiteSettings
+from .tiered_cache import reference_cache
+
+
+GENERATION_KEY = 'navigation:generation'
+
+
+def _generation():
+    return reference_cache().get_or_set(GENERATION_KEY, time.time_ns)
+
+
+def build_menu(parent, max_levels=None, request=None):
+    """
+    Árvore do menu abaixo de ``parent`` com uma única query.
+
+    Um item só entra se todos os ancestrais até ``parent`` também estão no
+    menu (como na navegação recursiva).
+
+    Returns:
+        list[dict]: title, url, url_path, index (itens de nível 2, a partir
+        de 1 em cada pai) e children
+    """
+    pages = Page.objects.descendant_of(parent).live().in_menu()
+    if max_levels is not None:
+        pages = pages.filter(depth__lte=parent.depth + max_levels)
+
+    root = {'children': []}
+    nodes = {parent.path: root}
+    for page in pages.order_by('path'):
+        container = nodes.get(page.path[:-Page.steplen])
+        if container is None:
+            continue  # ancestral fora do menu
+        node = {
+            'title': page.title,
+            'url': page.get_url(request=request),
+            'url_path': page.url_path,
+            'level': page.depth - parent.depth,
+            'children': [],
+        }
+        container['children'].append(node)
+        nodes[page.path] = node
+
+    for node in nodes.values():
+        node['children'].sort(key=lambda child: child['title'])
+        if node.get('level') == 1:
+            for index, child in enumerate(node['children'], 1):
+                child['index'] = index
+    return root['children']
+
+
+def get_menu(parent, max_levels=None, request=None, site=None):
+    """``build_menu`` em cache por site, idioma, raiz e níveis."""
+    key = 'navigation:{generation}:{site}:{language}:{parent}:{levels}'.format(
+        generation=_generation(),
+        site=site.pk if site is not None else '-',
+        language=translation.get_language() or '-',
+        parent=parent.pk,
+        levels=max_levels,
+    )
+    return reference_cache().get_or_set(key, lambda: build_menu(parent, max_levels, request))
+
+
+def mark_active(items, calling_page):
+    """Cópia dos itens com ``active`` para a página atual (o cache não é alterado)."""
+    url_path = getattr(calling_page, 'url_path', None)
+    return [
+        {
+            **item,
+            'active': bool(url_path) and url_path.startswith(item['url_path']),
+            'children': mark_active(item['children'], calling_page),
+        }
+        for item in items
+    ]
+
+
+def invalidate_menus():
+    reference_cache().invalidate(GENERATION_KEY)
+
+
+@receiver(page_published)
+@receiver(page_unpublished)
+@receiver(post_page_move)
+def page_tree_changed(**kwargs):
+    invalidate_menus()
+
+
+@receiver(post_delete, sender=Page)
+def page_deleted(**kwargs):
+    invalidate_menus()
+
+
+@receiver(post_save, sender=SiteSettings)
+def site_settings_changed(**kwargs):
+    # menu_max_levels muda a profundidade do menu
+    invalidate_menus()
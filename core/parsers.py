@@ -0,0 +1,35 @@
+"""
+Parsers adicionais para a API REST.
+"""
+import gzip
+import io
+import zlib
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+
+class CompressedJSONParser(JSONParser):
+    """
+    JSON aceitando corpo comprimido (``Content-Encoding: gzip`` ou ``deflate``).
+
+    O tamanho descomprimido é limitado por API_MAX_DECOMPRESSED_BODY.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = (parser_context or {}).get('request')
+        encoding = request.META.get('HTTP_CONTENT_ENCODING', '').lower() if request else ''
+        if stream is not None and encoding in ('gzip', 'deflate'):
+            limit = settings.API_MAX_DECOMPRESSED_BODY
+            try:
+                if encoding == 'gzip':
+                    data = gzip.GzipFile(fileobj=stream).read(limit + 1)
+                else:
+                    data = zlib.decompressobj().decompress(stream.read(), limit + 1)
+            except (OSError, EOFError, zlib.error) as exc:
+                raise ParseError(f'Corpo comprimido inválido: {exc}')
+            if len(data) > limit:
+                raise ParseError('Corpo descomprimido excede o tamanho máximo permitido.')
+            stream = io.BytesIO(data)
+        return super().parse(stream, media_type, parser_context)
@@ -0,0 +1,172 @@
+"""
+Perfil de SQL por requisição e orçamento de queries por view.
+
+Com SQL_PROFILING_ENABLED, ``SQLProfilingMiddleware`` instala um
+``execute_wrapper`` em cada conexão durante a requisição e registra:
+
+- quantidade de queries e tempo total de SQL;
+- queries duplicadas (mesmo SQL e parâmetros) e repetidas (mesmo SQL com
+  parâmetros diferentes, típico de N+1);
+- as SQL_PROFILING_SLOWEST queries mais lentas.
+
+O resumo vai no cabeçalho ``Server-Timing`` (visível no DevTools) e numa
+linha JSON no logger ``siteares.sql``. Desabilitado, o middleware se
+remove da cadeia na inicialização (MiddlewareNotUsed): custo zero.
+
+Orçamento: views declaram o máximo de queries com ``@query_budget(n)``
+(funções, classes de view ou viewsets). Acima do orçamento a requisição é
+registrada como WARNING e, com SQL_QUERY_BUDGET_STRICT (testes), levanta
+``QueryBudgetExceeded``, falhando o teste que fez a requisição.
+"""
+import heapq
+import json
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+
+logger = logging.getLogger('siteares.sql')
+
+# Savepoints (transaction.atomic aninhado, e toda transação nos testes) não
+# entram na contagem: o orçamento é o mesmo em produção e nos testes.
+SAVEPOINT_PREFIXES = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A view executou mais queries que o orçamento declarado."""
+
+
+def query_budget(max_queries):
+    """
+    Declara o máximo de queries de uma view (função, CBV ou viewset).
+
+    Example:
+        @query_budget(8)
+        def relatorio(request): ...
+    """
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+    return decorator
+
+
+def view_budget(view_func):
+    """Orçamento declarado para a view resolvida (ou None)."""
+    budget = getattr(view_func, 'query_budget', None)
+    if budget is None:
+        # CBVs (as_view) e viewsets DRF guardam a classe na função
+        view_class = getattr(view_func, 'view_class', None) or getattr(view_func, 'cls', None)
+        budget = getattr(view_class, 'query_budget', None)
+    return budget
+
+
+class QueryProfile:
+    """Coletor de queries (usado como execute_wrapper das conexões)."""
+
+    def __init__(self, slowest=None):
+        self.slowest_limit = slowest or settings.SQL_PROFILING_SLOWEST
+        self.count = 0
+        self.total = 0.0
+        self.exact = Counter()
+        self.similar = Counter()
+        self._slowest = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if sql.startswith(SAVEPOINT_PREFIXES):
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.count += 1
+            self.total += duration
+            self.similar[sql] += 1
+            try:
+                self.exact[(sql, repr(params))] += 1
+            except Exception:  # pragma: no cover - parâmetros sem repr
+                pass
+            entry = (duration, self.count, sql)
+            if len(self._slowest) < self.slowest_limit:
+                heapq.heappush(self._slowest, entry)
+            else:
+                heapq.heappushpop(self._slowest, entry)
+
+    @property
+    def duplicates(self):
+        """Execuções repetidas com o mesmo SQL e os mesmos parâmetros."""
+        return sum(n - 1 for n in self.exact.values() if n > 1)
+
+    def summary(self):
+        repeated = [
+            {'sql': sql[:300], 'count': n}
+            for sql, n in self.similar.most_common(3) if n > 1
+        ]
+        return {
+            'queries': self.count,
+            'sql_ms': round(self.total * 1000, 2),
+            'duplicates': self.duplicates,
+            'repeated': repeated,
+            'slowest': [
+                {'ms': round(duration * 1000, 2), 'sql': sql[:300]}
+                for duration, _, sql in sorted(self._slowest, reverse=True)
+            ],
+        }
+
+
+class SQLProfilingMiddleware:
+    """
+    Mede o SQL de cada requisição (ver docstring do módulo).
+
+    Deve ficar no início de MIDDLEWARE para incluir sessão e autenticação.
+    """
+
+    def __init__(self, get_response):
+        if not settings.SQL_PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile = QueryProfile()
+        request._query_budget = None
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(profile))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        summary = profile.summary()
+        response['Server-Timing'] = ', '.join([
+            f'sql;dur={summary["sql_ms"]};desc="{profile.count} queries"',
+            f'sqldup;desc="{profile.duplicates} duplicadas"',
+            f'app;dur={round(elapsed * 1000, 2)}',
+        ])
+
+        budget = request._query_budget
+        over_budget = budget is not None and profile.count > budget
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(elapsed * 1000, 2),
+            'budget': budget,
+            **summary,
+        }
+        logger.log(logging.WARNING if over_budget else logging.INFO, json.dumps(record))
+
+        if over_budget and settings.SQL_QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded(
+                f"{request.method} {request.path}: {profile.count} queries "
+                f"(orçamento {budget}). Mais repetidas: {summary['repeated']}"
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._query_budget = view_budget(view_func)
+        return None
@@ -0,0 +1,269 @@
+"""
+Geração de imagens em segundo plano (renditions e variantes de upload).
+
+Upload: o signal ``post_save`` das imagens do Wagtail e as views de upload
+(core/upload_views.py) só gravam uma ``RenditionJob``; a requisição não
+abre nem reprocessa a imagem.
+
+Worker: ``generate_pending`` (manage.py generate_renditions) reserva lotes
+de tarefas e as processa num pool de processos (decodificar, redimensionar
+e codificar AVIF/WebP é trabalho de CPU). Para imagens do Wagtail gera todas
+as renditions de IMAGE_RENDITIONS, as mesmas especificações dos templates,
+então a primeira visualização já as encontra prontas. Para arquivos
+enviados, reduz o original a ``max_dimension`` e grava as variantes de
+IMAGE_UPLOAD_VARIANTS no formato original e em IMAGE_UPLOAD_FORMATS.
+Em falha, a tarefa volta à fila com espera crescente e, após
+RENDITION_MAX_ATTEMPTS tentativas, fica como FALHOU.
+"""
+import io
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from PIL import Image, features
+from wagtail.images import get_image_model
+from wagtail.images.models import Filter
+
+from .models import RenditionJob, StatusRendition
+
+
+logger = logging.getLogger(__name__)
+
+# Campos cuja alteração muda as renditions
+IMAGE_SOURCE_FIELDS = {
+    'file', 'focal_point_x', 'focal_point_y', 'focal_point_width', 'focal_point_height',
+}
+
+
+def format_supported(fmt):
+    """AVIF e WebP dependem de como o Pillow foi compilado."""
+    return fmt not in ('avif', 'webp') or features.check(fmt)
+
+
+def rendition_filters():
+    """
+    Especificações de IMAGE_RENDITIONS expandidas (``format-{avif,webp}``).
+
+    Formatos sem suporte no Pillow instalado são omitidos.
+    """
+    specs = []
+    for pattern in settings.IMAGE_RENDITIONS.values():
+        for spec in Filter.expand_spec(pattern):
+            formats = [op[len('format-'):] for op in spec.split('|') if op.startswith('format-')]
+            if all(format_supported(fmt) for fmt in formats):
+                specs.append(spec)
+    return list(dict.fromkeys(specs))
+
+
+def variant_paths(path, max_dimension=None):
+    """
+    Caminhos das variantes de um arquivo enviado.
+
+    Variantes maiores que ``max_dimension`` não são geradas.
+
+    Returns:
+        dict: nome -> {formato: caminho no storage}
+    """
+    base, ext = os.path.splitext(path)
+    original = ext.lstrip('.').lower()
+    formats = [fmt for fmt in settings.IMAGE_UPLOAD_FORMATS if fmt != original and format_supported(fmt)]
+    return {
+        name: {
+            original: f"{base}_{name}{ext}",
+            **{fmt: f"{base}_{name}.{fmt}" for fmt in formats},
+        }
+        for name, size in settings.IMAGE_UPLOAD_VARIANTS.items()
+        if max_dimension is None or size <= max_dimension
+    }
+
+
+def enqueue_image(image):
+    """Agenda as renditions de uma imagem do Wagtail (uma tarefa pendente por imagem)."""
+    if RenditionJob.objects.filter(image=image, status=StatusRendition.PENDENTE).exists():
+        return None
+    return RenditionJob.objects.create(image=image)
+
+
+def enqueue_upload(path, max_dimension):
+    """Agenda a otimização e as variantes de um arquivo enviado."""
+    return RenditionJob.objects.create(path=path, max_dimension=max_dimension)
+
+
+@receiver(post_save, sender=get_image_model())
+def image_saved(instance, created, update_fields=None, **kwargs):
+    if created or update_fields is None or IMAGE_SOURCE_FIELDS & set(update_fields):
+        enqueue_image(instance)
+
+
+def _flatten(image):
+    """Converte imagens com transparência/paleta para RGB (fundo branco)."""
+    if image.mode not in ('RGBA', 'LA', 'P'):
+        return image
+    if image.mode != 'RGBA':
+        image = image.convert('RGBA')
+    background = Image.new('RGB', image.size, (255, 255, 255))
+    background.paste(image, mask=image.split()[-1])
+    return background
+
+
+def _save(image, path):
+    """Grava a imagem no storage, no formato da extensão, substituindo a anterior."""
+    buffer = io.BytesIO()
+    image_format = Image.registered_extensions()[os.path.splitext(path)[1].lower()]
+    image.save(buffer, format=image_format, optimize=True, quality=85)
+    if default_storage.exists(path):
+        default_storage.delete(path)
+    default_storage.save(path, ContentFile(buffer.getvalue()))
+
+
+def process_upload(path, max_dimension):
+    """Reduz o arquivo enviado a ``max_dimension`` e grava as variantes."""
+    with default_storage.open(path) as source:
+        image = Image.open(source)
+        image.load()
+    image = _flatten(image)
+
+    if max_dimension and max(image.size) > max_dimension:
+        image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+    _save(image, path)
+
+    for name, formats in variant_paths(path, max_dimension).items():
+        size = settings.IMAGE_UPLOAD_VARIANTS[name]
+        variant = image.copy()
+        variant.thumbnail((size, size), Image.Resampling.LANCZOS)
+        for variant_path in formats.values():
+            _save(variant, variant_path)
+
+
+def process_image(image_id):
+    """Gera as renditions configuradas que ainda não existem."""
+    image = get_image_model().objects.filter(pk=image_id).first()
+    if image is not None:  # excluída depois do upload: nada a fazer
+        image.get_renditions(*rendition_filters())
+
+
+def run_job(job_id):
+    """
+    Processa uma tarefa (no processo do pool).
+
+    Returns:
+        tuple: (job_id, mensagem de erro ou None)
+    """
+    job = RenditionJob.objects.get(pk=job_id)
+    try:
+        if job.image_id:
+            process_image(job.image_id)
+        else:
+            process_upload(job.path, job.max_dimension)
+    except Exception as exc:
+        logger.exception("Falha ao gerar imagens da tarefa %s", job_id)
+        return job_id, f"{type(exc).__name__}: {exc}"
+    return job_id, None
+
+
+def claim_jobs(batch_size, now=None):
+    """
+    Reserva um lote de tarefas vencidas.
+
+    A reserva adia ``next_attempt_at`` por RENDITION_LEASE_SECONDS: se o
+    worker morrer no meio, as tarefas voltam à fila depois disso.
+
+    Returns:
+        list[int]: ids das tarefas
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        job_ids = list(
+            RenditionJob.objects.select_for_update(skip_locked=True)
+            .filter(status=StatusRendition.PENDENTE, next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if job_ids:
+            RenditionJob.objects.filter(pk__in=job_ids).update(
+                next_attempt_at=now + timedelta(seconds=settings.RENDITION_LEASE_SECONDS)
+            )
+    return job_ids
+
+
+def record_results(results, now=None):
+    """Marca as tarefas concluídas e agenda nova tentativa (ou FALHOU) para as demais."""
+    now = now or timezone.now()
+    errors = {job_id: error for job_id, error in results if error is not None}
+    done = [job_id for job_id, error in results if error is None]
+    if done:
+        RenditionJob.objects.filter(pk__in=done).update(
+            status=StatusRendition.CONCLUIDA, finished_at=now, last_error=''
+        )
+    if not errors:
+        return
+    jobs = list(RenditionJob.objects.filter(pk__in=errors))
+    for job in jobs:
+        job.attempts += 1
+        job.last_error = errors[job.pk]
+        if job.attempts >= settings.RENDITION_MAX_ATTEMPTS:
+            job.status = StatusRendition.FALHOU
+        else:
+            job.next_attempt_at = now + timedelta(
+                seconds=settings.RENDITION_RETRY_SECONDS * 2 ** (job.attempts - 1)
+            )
+    RenditionJob.objects.bulk_update(jobs, ['attempts', 'last_error', 'status', 'next_attempt_at'])
+
+
+def generate_pending(workers=None, batch_size=None):
+    """
+    Esvazia a fila de tarefas vencidas.
+
+    Com mais de um worker, as tarefas rodam num pool de processos (fork);
+    as conexões do banco são fechadas antes, para cada processo abrir as suas.
+
+    Returns:
+        dict: {'done': tarefas concluídas, 'failed': tarefas com falha}
+    """
+    workers = workers or settings.RENDITION_WORKERS
+    batch_size = batch_size or settings.RENDITION_BATCH_SIZE
+    counts = {'done': 0, 'failed': 0}
+    pool = None
+    try:
+        while True:
+            job_ids = claim_jobs(batch_size)
+            if not job_ids:
+                return counts
+            if workers > 1:
+                if pool is None:
+                    connections.close_all()
+                    pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('fork'))
+                results = list(pool.map(run_job, job_ids))
+            else:
+                results = [run_job(job_id) for job_id in job_ids]
+            record_results(results)
+            failed = sum(1 for _, error in results if error is not None)
+            counts['failed'] += failed
+            counts['done'] += len(results) - failed
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+
+def enqueue_all_images():
+    """Agenda todas as imagens da biblioteca (carga inicial ou nova especificação)."""
+    pending = set(
+        RenditionJob.objects.filter(status=StatusRendition.PENDENTE, image__isnull=False)
+        .values_list('image_id', flat=True)
+    )
+    jobs = [
+        RenditionJob(image_id=image_id)
+        for image_id in get_image_model().objects.values_list('pk', flat=True).iterator()
+        if image_id not in pending
+    ]
+    RenditionJob.objects.bulk_create(jobs, batch_size=500)
+    return len(jobs)
@@ -10,6 +10,65 @@ from .models import AuditLog, PerfilUsuario
 User = get_user_model()
 
 
+# ============================================================================
+# SPARSE FIELDSETS (?fields= / ?expand=)
+# ============================================================================
+
+def parse_fieldset_param(request, name):
+    """
+    Lê um parâmetro de lista separada por vírgulas (ex: ``?fields=sku,name``).
+
+    Returns:
+        set | None: Conjunto de nomes, ou None se o parâmetro não foi enviado.
+    """
+    if request is None or name not in request.query_params:
+        return None
+    raw = request.query_params.get(name, '')
+    return {item.strip() for item in raw.split(',') if item.strip()}
+
+
+class SparseFieldsetMixin:
+    """
+    Mixin para serializers que aceitam ``?fields=`` e ``?expand=``.
+
+    - ``fields``: mantém apenas os campos de primeiro nível informados.
+    - ``expand``: quando enviado, apenas os campos de ``Meta.expandable_fields``
+      listados são embutidos; os demais são serializados como chave primária.
+      Sem o parâmetro, o comportamento padrão (objetos aninhados) é mantido.
+
+    ``Meta.sparse_field_sources`` mapeia campos calculados (SerializerMethodField)
+    para os caminhos ORM de que dependem, permitindo que o viewset monte o
+    ``only()`` correspondente.
+    """
+
+    def _is_top_level(self):
+        parent = self.parent
+        if parent is None:
+            return True
+        return isinstance(parent, serializers.ListSerializer) and parent.parent is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self._is_top_level():
+            return fields
+
+        request = self.context.get('request')
+        requested = parse_fieldset_param(request, 'fields')
+        expand = parse_fieldset_param(request, 'expand')
+
+        if requested is not None:
+            for name in list(fields):
+                if name not in requested and not fields[name].write_only:
+                    fields.pop(name)
+
+        if expand is not None:
+            for name in getattr(self.Meta, 'expandable_fields', []):
+                if name in fields and name not in expand:
+                    fields[name] = serializers.PrimaryKeyRelatedField(read_only=True)
+
+        return fields
+
+
 class UserSerializer(serializers.ModelSerializer):
     """Serializer para User (django.contrib.auth)."""
     
@@ -102,7 +161,7 @@ class PerfilUsuarioSerializer(serializers.ModelSerializer):
         }
 
 
-class AuditLogSerializer(serializers.ModelSerializer):
+class AuditLogSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer para AuditLog."""
     
     user_name = serializers.CharField(source='user.get_full_name', read_only=True)
@@ -127,6 +186,7 @@ class AuditLogSerializer(serializers.ModelSerializer):
             'timestamp',
         ]
         read_only_fields = ['id', 'timestamp']
+        sparse_field_sources = {'content_type_name': ('content_type__model',)}
     
     def get_content_type_name(self, obj):
         """Retorna nome legível do content_type."""
@@ -187,3 +187,584 @@ class PermissionTests(TestCase):
         response = self.client.get(reverse('dashboard:index'))
         self.assertEqual(response.status_code, 200)
 
+
+
+class WeightedThrottleTests(TestCase):
+    """Testes para o throttling de janela deslizante com custo por action."""
+    
+    def setUp(self):
+        from core import throttling
+        
+        self.store = throttling.LocalSlidingWindowStore()
+        throttling._store = self.store
+        self.addCleanup(setattr, throttling, '_store', None)
+        
+        self.user = User.objects.create_user(
+            username='throttled', password='testpass123', is_staff=True
+        )
+    
+    def _throttle(self, rate, now):
+        from core.throttling import WeightedUserRateThrottle
+        
+        throttle = WeightedUserRateThrottle()
+        throttle.rate = rate
+        throttle.num_requests, throttle.duration = throttle.parse_rate(rate)
+        throttle.timer = lambda: now
+        return throttle
+    
+    def _request(self):
+        from rest_framework.test import APIRequestFactory, force_authenticate
+        from rest_framework.request import Request
+        
+        request = APIRequestFactory().get('/api/v1/products/')
+        force_authenticate(request, user=self.user)
+        request = Request(request)
+        request.user = self.user
+        return request
+    
+    def _view(self, action):
+        view = type('View', (), {})()
+        view.action = action
+        view.headers = {}
+        return view
+    
+    def test_costly_action_consumes_more_budget(self):
+        """Testa que bulk_create consome o custo configurado."""
+        view = self._view('bulk_create')
+        throttle = self._throttle('20/min', now=600.0)
+        self.assertTrue(throttle.allow_request(self._request(), view))
+        self.assertEqual(view.headers['RateLimit-Remaining'], '10')
+        self.assertTrue(throttle.allow_request(self._request(), view))
+        self.assertFalse(throttle.allow_request(self._request(), view))
+        self.assertGreaterEqual(throttle.wait(), 1)
+    
+    def test_previous_window_decays(self):
+        """Testa que a janela anterior pesa proporcionalmente ao tempo restante."""
+        for _ in range(10):
+            self.assertTrue(self._throttle('10/min', now=600.0).allow_request(self._request(), self._view('list')))
+        # Metade da janela seguinte: a anterior ainda pesa 5 requests
+        view = self._view('list')
+        throttle = self._throttle('10/min', now=690.0)
+        self.assertTrue(throttle.allow_request(self._request(), view))
+        self.assertEqual(view.headers['RateLimit-Remaining'], '4')
+    
+    def test_api_response_has_ratelimit_headers(self):
+        """Testa que as respostas da API trazem os cabeçalhos RateLimit-*."""
+        from rest_framework.test import APIClient
+        
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        response = client.get('/api/v1/products/')
+        self.assertIn('RateLimit-Limit', response)
+        self.assertIn('RateLimit-Remaining', response)
+        self.assertIn('RateLimit-Reset', response)
+    
+    def test_local_store_drops_expired_windows(self):
+        """Testa que o store em memória descarta janelas vencidas de outros usuários."""
+        from unittest.mock import patch
+        
+        with patch('core.throttling.time.time', return_value=1000.0):
+            for ident in range(50):
+                self.store.hit(f'throttle:user:{ident}:1', f'throttle:user:{ident}:0', 10, 1, 0.5, 120)
+        self.assertEqual(len(self.store), 50)
+        
+        with patch('core.throttling.time.time', return_value=1121.0):
+            self.store.hit('throttle:user:novo:2', 'throttle:user:novo:1', 10, 1, 0.5, 120)
+        self.assertEqual(len(self.store), 1)
+
+
+class WebhookDeliveryTests(TestCase):
+    """Testes para a fila de webhooks (outbox), a entrega assinada e o backoff."""
+    
+    def setUp(self):
+        import threading
+        from wagtail.models import Site
+        from core.management.commands.webhook_stub import make_server
+        from core.models import ApiSettings
+        from core.webhooks import reset_webhook_config
+        
+        self.server = make_server(token='segredo')
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.addCleanup(reset_webhook_config)
+        
+        self.api = ApiSettings.for_site(Site.objects.get(is_default_site=True))
+        self.api.api_habilitada = True
+        self.api.api_url = f"http://127.0.0.1:{self.server.server_port}/hooks/"
+        self.api.api_token = 'segredo'
+        self.api.save()
+        
+        self.user = User.objects.create_user(username='hookuser', password='testpass123')
+        category = Category.objects.create(name='Categoria', is_active=True)
+        unit = Unit.objects.create(name='UN', description='Unidade')
+        self.product = Product.objects.create(
+            name='Produto Webhook', sku='HOOK001', category=category, unit=unit,
+            current_stock=20, min_stock=10, is_active=True
+        )
+    
+    def _move(self, movement_type, quantity):
+        from movimentacoes.models import InventoryMovement
+        return InventoryMovement.objects.create(
+            product=self.product, type=movement_type, quantity=quantity, user=self.user
+        )
+    
+    def test_events_written_in_transaction_and_delivered_in_one_signed_batch(self):
+        """Testa produto, movimentação e alerta na fila e a entrega em lote assinado."""
+        from django.core.exceptions import ValidationError
+        from core.models import StatusWebhook, WebhookEvent
+        from core.webhooks import deliver_pending
+        
+        self._move('SAIDA', 15)  # cruza o mínimo: movement.created + stock.alert
+        with self.assertRaises(ValidationError):
+            self._move('SAIDA', 100)  # rollback: nenhum evento
+        
+        types = list(WebhookEvent.objects.values_list('event_type', flat=True))
+        self.assertEqual(types, ['product.created', 'stock.alert', 'movement.created'])
+        
+        counts = deliver_pending(workers=1)
+        self.assertEqual(counts, {'delivered': 3, 'failed': 0, 'batches': 1})
+        self.assertEqual(len(self.server.received), 1)
+        batch = self.server.received[0]
+        self.assertTrue(batch['valid_signature'])
+        self.assertEqual([e['type'] for e in batch['body']['events']], types)
+        self.assertEqual(batch['body']['events'][2]['data']['stock_after'], '5.00')
+        self.assertFalse(WebhookEvent.objects.exclude(status=StatusWebhook.ENTREGUE).exists())
+    
+    @override_settings(WEBHOOK_MAX_ATTEMPTS=2)
+    def test_failures_back_off_then_dead_letter(self):
+        """Testa backoff em falha, dead letter após o limite e reenfileiramento."""
+        from core.models import StatusWebhook, WebhookEvent
+        from core.webhooks import deliver_pending, requeue_dead_letters
+        
+        self.server.fail_status = 503
+        self.assertEqual(deliver_pending(workers=1)['failed'], 1)
+        event = WebhookEvent.objects.get()
+        self.assertEqual((event.status, event.attempts), (StatusWebhook.PENDENTE, 1))
+        self.assertGreater(event.next_attempt_at, timezone.now())
+        self.assertIn('HTTP 503', event.last_error)
+        
+        # Ainda em espera: nada é reenviado
+        self.assertEqual(deliver_pending(workers=1)['failed'], 0)
+        
+        WebhookEvent.objects.update(next_attempt_at=timezone.now())
+        deliver_pending(workers=1)
+        event.refresh_from_db()
+        self.assertEqual((event.status, event.attempts), (StatusWebhook.FALHOU, 2))
+        
+        self.server.fail_status = None
+        self.assertEqual(requeue_dead_letters(), 1)
+        self.assertEqual(deliver_pending(workers=1)['delivered'], 1)
+    
+    def test_set_based_product_writes_publish_events(self):
+        """Testa eventos de produto na importação, nas ações em lote e no admin."""
+        import io
+        import json
+        from django.contrib import admin
+        from django.contrib.auth.models import Permission
+        from core.models import WebhookEvent
+        from produtos.admin import ProductAdmin
+        from produtos.importers import ProductImporter
+        
+        def events():
+            rows = [(e.event_type, e.payload['sku']) for e in WebhookEvent.objects.order_by('pk')]
+            WebhookEvent.objects.all().delete()
+            return rows
+        
+        events()
+        content = 'sku,name,category,unit\nHOOK001,Renomeado,Categoria,UN\nHOOK002,Novo,Categoria,UN\n'
+        ProductImporter().run(io.BytesIO(content.encode()), 'produtos.csv')
+        self.assertEqual(events(), [('product.updated', 'HOOK001'), ('product.created', 'HOOK002')])
+        
+        self.user.user_permissions.add(Permission.objects.get(codename='change_product'))
+        self.client.force_login(self.user)
+        new = Product.objects.get(sku='HOOK002')
+        self.client.post(reverse('produtos:bulk_action'), {
+            'action': 'update_min_stock', 'new_min_stock': '1.00',
+            'selected_products': json.dumps([self.product.pk, new.pk]),
+        })
+        rows = list(WebhookEvent.objects.order_by('pk').values_list('payload', flat=True))
+        self.assertEqual([row['min_stock'] for row in rows], ['1.00', '1.00'])
+        self.assertEqual(rows[1]['stock_status'], Product.STOCK_CRITICO)
+        events()
+        
+        ProductAdmin(Product, admin.site)._bulk_update(Product.objects.filter(pk=new.pk), is_active=False)
+        self.assertEqual(events(), [('product.updated', 'HOOK002')])
+    
+    def test_disabled_integration_writes_nothing(self):
+        """Testa que, com a integração desabilitada, nada entra na fila."""
+        from core.models import WebhookEvent
+        
+        WebhookEvent.objects.all().delete()
+        self.api.api_habilitada = False
+        self.api.save()
+        self._move('ENTRADA', 5)
+        self.assertFalse(WebhookEvent.objects.exists())
+
+
+class SQLProfilingMiddlewareTests(TestCase):
+    """Testes para o perfil de SQL por requisição e o orçamento de queries."""
+    
+    def _run(self, view):
+        from django.test import RequestFactory
+        from core.profiling import SQLProfilingMiddleware
+        
+        request = RequestFactory().get('/perfil/')
+        
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            return view(request)
+        
+        middleware = SQLProfilingMiddleware(get_response)
+        return middleware(request)
+    
+    def test_server_timing_counts_duplicates(self):
+        """Testa Server-Timing com total de queries e duplicadas."""
+        from django.http import HttpResponse
+        
+        def view(request):
+            for _ in range(3):
+                list(Category.objects.filter(pk=1))
+            return HttpResponse('ok')
+        
+        response = self._run(view)
+        self.assertIn('sql;dur=', response['Server-Timing'])
+        self.assertIn('desc="3 queries"', response['Server-Timing'])
+        self.assertIn('desc="2 duplicadas"', response['Server-Timing'])
+    
+    def test_query_budget_exceeded_fails_in_strict_mode(self):
+        """Testa que exceder @query_budget levanta no modo estrito e só avisa fora dele."""
+        from django.http import HttpResponse
+        from core.profiling import QueryBudgetExceeded, query_budget
+        
+        @query_budget(1)
+        def view(request):
+            list(Category.objects.all())
+            list(Unit.objects.all())
+            return HttpResponse('ok')
+        
+        with self.assertRaises(QueryBudgetExceeded):
+            self._run(view)
+        with override_settings(SQL_QUERY_BUDGET_STRICT=False):
+            with self.assertLogs('siteares.sql', level='WARNING'):
+                self.assertEqual(self._run(view).status_code, 200)
+    
+    @override_settings(SQL_PROFILING_ENABLED=False)
+    def test_disabled_middleware_is_removed(self):
+        """Testa que, desabilitado, o middleware sai da cadeia (custo zero)."""
+        from django.core.exceptions import MiddlewareNotUsed
+        from core.profiling import SQLProfilingMiddleware
+        
+        with self.assertRaises(MiddlewareNotUsed):
+            SQLProfilingMiddleware(lambda request: None)
+    
+    def test_view_budgets_hold(self):
+        """Testa que as views com orçamento ficam dentro dele (listagem de movimentações)."""
+        user = User.objects.create_superuser('perfil', 'perfil@example.com', 'testpass123')
+        self.client.force_login(user)
+        response = self.client.get('/movimentacoes/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Server-Timing', response)
+
+
+class MetricsEndpointTests(TestCase):
+    """Testes para o endpoint /metrics e as métricas de cache e movimentações."""
+    
+    def sample(self, name, labels):
+        from prometheus_client import REGISTRY
+        return REGISTRY.get_sample_value(name, labels) or 0
+    
+    def test_requires_token_or_staff(self):
+        """Testa que /metrics exige o token do scraper ou usuário staff."""
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        with override_settings(METRICS_TOKEN='segredo'):
+            response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer segredo')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer outro').status_code, 403
+            )
+        self.assertIn(b'ares_queue_depth{queue="webhooks"} 0.0', response.content)
+        self.assertIn(b'ares_http_request_duration_seconds_bucket', response.content)
+        
+        user = User.objects.create_user('metricas', 'metricas@example.com', 'testpass123', is_staff=True)
+        self.client.force_login(user)
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+    
+    def test_cache_hits_and_misses(self):
+        """Testa a contagem de hit/miss em CACHES['default']."""
+        from django.core.cache import cache
+        
+        hits = self.sample('ares_cache_requests_total', {'result': 'hit'})
+        misses = self.sample('ares_cache_requests_total', {'result': 'miss'})
+        cache.set('metricas-teste', None)
+        self.assertIsNone(cache.get('metricas-teste', 'padrao'))
+        self.assertEqual(cache.get('metricas-ausente', 'padrao'), 'padrao')
+        self.assertEqual(self.sample('ares_cache_requests_total', {'result': 'hit'}), hits + 1)
+        self.assertEqual(self.sample('ares_cache_requests_total', {'result': 'miss'}), misses + 1)
+    
+    def test_movement_save_and_lock_wait_are_observed(self):
+        """Testa que a gravação da movimentação registra tempo total e espera do lock."""
+        from movimentacoes.models import InventoryMovement
+        
+        category = Category.objects.create(name='Métricas')
+        unit = Unit.objects.create(name='UM', description='Unidade')
+        product = Product.objects.create(
+            name='Produto Métricas', sku='MET-001', category=category, unit=unit,
+            min_stock=Decimal('0'),
+        )
+        saves = self.sample('ares_movement_save_seconds_count', {'type': 'ENTRADA'})
+        waits = self.sample('ares_movement_lock_wait_seconds_count', {'lock': 'produto'})
+        user = User.objects.create_user('metricas', 'metricas@example.com', 'testpass123')
+        InventoryMovement.objects.create(product=product, type='ENTRADA', quantity=Decimal('5'), user=user)
+        self.assertEqual(self.sample('ares_movement_save_seconds_count', {'type': 'ENTRADA'}), saves + 1)
+        self.assertEqual(self.sample('ares_movement_lock_wait_seconds_count', {'lock': 'produto'}), waits + 1)
+
+
+class BenchmarkTests(TestCase):
+    """Testes para o harness de benchmark (core/benchmarks.py)."""
+    
+    def test_summarize_and_compare(self):
+        """Testa percentis, vazão e a detecção de regressão de p50."""
+        from core.benchmarks import compare_results, summarize
+        
+        result = summarize([0.010, 0.020, 0.030, 0.040, 0.100], errors=1)
+        self.assertEqual(result['iterations'], 5)
+        self.assertEqual(result['p50_ms'], 30.0)
+        self.assertEqual(result['max_ms'], 100.0)
+        self.assertEqual(result['ops_per_sec'], 25.0)
+        
+        baseline = {'results': {'a': {'p50_ms': 10.0}, 'b': {'p50_ms': 10.0}, 'c': {'skipped': 'x'}}}
+        current = {'results': {'a': {'p50_ms': 13.0}, 'b': {'p50_ms': 11.0}, 'c': {'skipped': 'x'}}}
+        rows = compare_results(baseline, current, threshold=0.2)
+        self.assertEqual([(row['case'], row['regression']) for row in rows], [('a', True), ('b', False)])
+    
+    def test_suite_runs_selected_cases(self):
+        """Testa a execução dos casos filtrados sobre um catálogo sintético."""
+        import random
+        from core.benchmarks import BenchmarkSuite
+        from movimentacoes.synthetic import seed_catalog
+        
+        products = seed_catalog(5, categories=2, rng=random.Random(1))
+        suite = BenchmarkSuite(
+            products, iterations=2,
+            only=['movement.single', 'movement.concurrent', 'api.products', 'dashboard*'],
+        )
+        results = suite.run()
+        self.assertEqual(set(results), {
+            'movement.single', 'movement.concurrent', 'api.products', 'dashboard', 'dashboard.cold',
+        })
+        self.assertEqual(results['movement.single']['iterations'], 10)
+        self.assertEqual(results['movement.single']['errors'], 0)
+        self.assertEqual(results['api.products']['status'], 200)
+        self.assertGreater(results['api.products']['queries'], 0)
+        # Dashboard em cache_page: no caso quente só sessão e usuário
+        self.assertLess(results['dashboard']['queries'], results['dashboard.cold']['queries'])
+        # Dentro da transação do teste as threads não enxergariam os dados
+        self.assertIn('skipped', results['movement.concurrent'])
+
+
+class TieredCacheTests(TestCase):
+    """Testes para o cache de dois níveis (core/tiered_cache.py)."""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        from core.tiered_cache import LocalInvalidationBus, TieredCache
+        
+        cache.clear()
+        # Dois "workers" com L1 próprios, o mesmo L2 e o mesmo canal
+        self.bus = LocalInvalidationBus()
+        self.worker_a = TieredCache(bus=self.bus)
+        self.worker_b = TieredCache(bus=self.bus)
+        self.loads = []
+    
+    def loader(self):
+        self.loads.append(1)
+        return [('valor', len(self.loads))]
+    
+    def test_l1_then_l2_then_loader(self):
+        """Testa que o loader roda uma vez e o segundo worker lê do L2."""
+        from django.core.cache import cache
+        
+        self.assertEqual(self.worker_a.get_or_set('ref', self.loader), [('valor', 1)])
+        self.assertEqual(self.worker_a.get_or_set('ref', self.loader), [('valor', 1)])
+        self.assertEqual(self.worker_b.get_or_set('ref', self.loader), [('valor', 1)])
+        self.assertEqual(len(self.loads), 1)
+        
+        # Com o L1 preenchido o L2 nem é consultado
+        cache.clear()
+        self.assertEqual(self.worker_b.get_or_set('ref', self.loader), [('valor', 1)])
+        self.assertEqual(len(self.loads), 1)
+    
+    def test_invalidation_is_broadcast(self):
+        """Testa que invalidar em um worker descarta o L1 dos demais."""
+        self.worker_a.get_or_set('ref', self.loader)
+        self.worker_b.get_or_set('ref', self.loader)
+        
+        self.worker_a.invalidate('ref')
+        
+        self.assertEqual(self.worker_b.get_or_set('ref', self.loader), [('valor', 2)])
+        self.assertEqual(self.worker_a.get_or_set('ref', self.loader), [('valor', 2)])
+        self.assertEqual(len(self.loads), 2)
+    
+    def test_l1_ttl_and_lru(self):
+        """Testa a expiração por TTL e o descarte da chave menos usada."""
+        from unittest import mock
+        from core.tiered_cache import LocalLRUCache
+        
+        local = LocalLRUCache(max_entries=2, timeout=60)
+        with mock.patch('core.tiered_cache.time.monotonic', return_value=1000.0):
+            local.set('a', 1)
+            local.set('b', 2)
+            local.get('a')
+            local.set('c', 3)
+            self.assertIsNone(local.get('b'))
+            self.assertEqual((local.get('a'), local.get('c')), (1, 3))
+        with mock.patch('core.tiered_cache.time.monotonic', return_value=1061.0):
+            self.assertIsNone(local.get('a'))
+        self.assertEqual(len(local), 1)
+    
+    def test_category_change_invalidates_reference_data(self):
+        """Testa que salvar uma categoria invalida a lista em cache."""
+        from produtos import reference
+        
+        Category.objects.create(name='Cache A')
+        self.assertEqual([name for _, name in reference.category_choices()], ['Cache A'])
+        with self.assertNumQueries(0):
+            reference.category_choices()
+        
+        Category.objects.create(name='Cache B', is_active=False)
+        self.assertEqual([name for _, name in reference.category_choices()], ['Cache A'])
+        self.assertEqual(len(reference.categories(active_only=False)), 2)
+
+
+class NavigationMenuTests(TestCase):
+    """Testes para o menu de navegação em cache (core/navigation.py)."""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        from wagtail.models import Page, Site
+        
+        cache.clear()
+        self.root = Site.objects.get(is_default_site=True).root_page
+        
+        def add(parent, title, in_menu=True):
+            return parent.add_child(instance=Page(title=title, slug=title.lower(), show_in_menus=in_menu))
+        
+        self.add = add
+        self.beta = add(self.root, 'Beta')
+        self.alfa = add(self.root, 'Alfa')
+        add(self.alfa, 'A2')
+        self.a1 = add(self.alfa, 'A1')
+        hidden = add(self.root, 'Oculta', in_menu=False)
+        add(hidden, 'Filha')
+        Site.get_site_root_paths()
+    
+    def test_build_menu_in_one_query(self):
+        """Testa a árvore, a ordem por título e o índice dos itens de nível 2."""
+        from core.navigation import build_menu
+        
+        with self.assertNumQueries(1):
+            menu = build_menu(self.root, max_levels=2)
+        self.assertEqual([item['title'] for item in menu], ['Alfa', 'Beta'])
+        self.assertEqual(
+            [(child['title'], child['index']) for child in menu[0]['children']], [('A1', 1), ('A2', 2)]
+        )
+        self.assertEqual(menu[0]['children'][0]['url'], self.a1.get_url())
+        self.assertEqual(build_menu(self.root, max_levels=1)[0]['children'], [])
+    
+    def test_menu_is_cached_until_publish(self):
+        """Testa o cache da estrutura e a invalidação ao publicar e despublicar."""
+        from core.navigation import get_menu, mark_active
+        
+        menu = get_menu(self.root, 2)
+        with self.assertNumQueries(0):
+            self.assertIs(get_menu(self.root, 2), menu)
+        
+        active = mark_active(menu, self.alfa)
+        self.assertEqual([item['active'] for item in active], [True, False])
+        self.assertNotIn('active', menu[0])
+        
+        gama = self.add(self.root, 'Gama')
+        gama.save_revision().publish()
+        self.assertEqual([item['title'] for item in get_menu(self.root, 2)], ['Alfa', 'Beta', 'Gama'])
+        
+        self.beta.unpublish()
+        self.assertEqual([item['title'] for item in get_menu(self.root, 2)], ['Alfa', 'Gama'])
+
+
+class RenditionPipelineTests(TestCase):
+    """Testes para a geração de imagens em segundo plano (core/renditions.py)."""
+    
+    def setUp(self):
+        import shutil
+        import tempfile
+        
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+    
+    def test_upload_only_enqueues(self):
+        """Testa o upload sem processamento e as variantes geradas pelo worker."""
+        from io import BytesIO
+        from PIL import Image as PILImage
+        from django.core.files.storage import default_storage
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from core.models import RenditionJob, StatusRendition
+        from core.renditions import generate_pending
+        
+        buffer = BytesIO()
+        PILImage.new('RGBA', (1600, 1200), (255, 0, 0, 128)).save(buffer, 'PNG')
+        upload = SimpleUploadedFile('foto.png', buffer.getvalue(), content_type='image/png')
+        
+        response = self.client.post(reverse('core:upload_product_image'), {'file': upload})
+        data = response.json()
+        path = data['files'][0]['path']
+        self.assertEqual(sorted(data['files'][0]['variants']), ['card', 'thumbnail'])  # hero > 1200px
+        self.assertEqual(RenditionJob.objects.get().path, path)
+        with default_storage.open(path) as saved:
+            self.assertEqual(PILImage.open(saved).size, (1600, 1200))
+        
+        self.assertEqual(generate_pending(workers=1), {'done': 1, 'failed': 0})
+        self.assertEqual(RenditionJob.objects.get().status, StatusRendition.CONCLUIDA)
+        with default_storage.open(path) as saved:
+            self.assertEqual(PILImage.open(saved).size, (1200, 900))
+        with default_storage.open(path[:-len('.png')] + '_card.webp') as variant:
+            self.assertEqual(PILImage.open(variant).size, (400, 300))
+    
+    def test_image_renditions_pregenerated(self):
+        """Testa as renditions da biblioteca prontas antes da primeira visualização."""
+        from django.template import Context, Template
+        from wagtail.images.models import Image
+        from wagtail.images.tests.utils import get_test_image_file
+        from core.models import RenditionJob
+        from core.renditions import generate_pending, rendition_filters
+        
+        image = Image.objects.create(title='Foto', file=get_test_image_file())
+        image.title = 'Foto editada'
+        image.save()  # não duplica a tarefa pendente
+        self.assertEqual(RenditionJob.objects.filter(image=image).count(), 1)
+        
+        generate_pending(workers=1)
+        self.assertEqual(image.renditions.count(), len(rendition_filters()))
+        
+        template = Template(
+            '{% load wagtailimages_tags %}{% picture image fill-400x300 format-{avif,webp} %}'
+        )
+        html = template.render(Context({'image': Image.objects.get(pk=image.pk)}))
+        self.assertIn('.avif', html)
+        self.assertEqual(image.renditions.count(), len(rendition_filters()))
+    
+    def test_failed_job_is_retried(self):
+        """Testa a nova tentativa agendada quando o processamento falha."""
+        from core.models import StatusRendition
+        from core.renditions import enqueue_upload, generate_pending
+        
+        job = enqueue_upload('images/inexistente.png', 1920)
+        self.assertEqual(generate_pending(workers=1), {'done': 0, 'failed': 1})
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (StatusRendition.PENDENTE, 1))
+        self.assertGreater(job.next_attempt_at, timezone.now())
+        self.assertIn('inexistente', job.last_error)
@@ -0,0 +1,244 @@
+"""
+Throttling da API REST com janela deslizante e custo por action.
+
+Substitui os throttles padrão do DRF (que fazem leitura-modificação-escrita
+de uma lista Python no cache a cada request) por um contador de janela
+deslizante atualizado atomicamente:
+
+- Redis: um script Lua lê as janelas atual e anterior e incrementa em uma
+  única ida ao servidor (sem corrida entre workers).
+- Memória local: implementação equivalente para desenvolvimento e testes.
+
+Cada request consome um custo definido por action (ex: bulk_create, stats),
+configurável em settings.API_THROTTLE_COSTS ou no atributo ``throttle_costs``
+do viewset. As respostas recebem os cabeçalhos ``RateLimit-*``.
+"""
+import logging
+import math
+import threading
+import time
+
+from django.conf import settings
+from rest_framework.throttling import SimpleRateThrottle
+
+logger = logging.getLogger(__name__)
+
+
+# KEYS[1] = janela atual, KEYS[2] = janela anterior
+# ARGV[1] = limite, ARGV[2] = custo, ARGV[3] = peso da janela anterior, ARGV[4] = TTL
+SLIDING_WINDOW_LUA = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+local used = previous * tonumber(ARGV[3]) + current
+local cost = tonumber(ARGV[2])
+if used + cost > tonumber(ARGV[1]) then
+    return {0, tostring(used), tostring(previous)}
+end
+redis.call('INCRBY', KEYS[1], cost)
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return {1, tostring(used + cost), tostring(previous)}
+"""
+
+
+class LocalSlidingWindowStore:
+    """
+    Contadores de janela deslizante em memória (por processo).
+
+    Janelas vencidas são descartadas numa varredura a cada
+    ``sweep_interval`` segundos, então o dicionário não cresce com o número
+    de usuários/escopos já vistos.
+    """
+    sweep_interval = 60
+
+    def __init__(self):
+        self._counters = {}
+        self._lock = threading.Lock()
+        self._next_sweep = 0
+
+    def hit(self, current_key, previous_key, limit, cost, previous_weight, ttl):
+        """
+        Registra o consumo se couber no limite.
+
+        Returns:
+            tuple: (permitido, consumo na janela, total da janela anterior)
+        """
+        now = time.time()
+        with self._lock:
+            if now >= self._next_sweep:
+                self._sweep(now)
+            current = self._get(current_key, now)
+            previous = self._get(previous_key, now)
+            used = previous * previous_weight + current
+            if used + cost > limit:
+                return False, used, previous
+            self._counters[current_key] = (current + cost, now + ttl)
+            return True, used + cost, previous
+
+    def _get(self, key, now):
+        value, expires = self._counters.get(key, (0, 0))
+        if expires <= now:
+            self._counters.pop(key, None)
+            return 0
+        return value
+
+    def _sweep(self, now):
+        """Remove as janelas vencidas."""
+        expired = [key for key, (_, expires) in self._counters.items() if expires <= now]
+        for key in expired:
+            del self._counters[key]
+        self._next_sweep = now + self.sweep_interval
+
+    def __len__(self):
+        return len(self._counters)
+
+    def clear(self):
+        """Remove todos os contadores (uso em testes)."""
+        with self._lock:
+            self._counters.clear()
+
+
+class RedisSlidingWindowStore:
+    """Contadores de janela deslizante no Redis via script Lua atômico."""
+
+    def __init__(self, alias='default'):
+        from django_redis import get_redis_connection
+
+        self._script = get_redis_connection(alias).register_script(SLIDING_WINDOW_LUA)
+
+    def hit(self, current_key, previous_key, limit, cost, previous_weight, ttl):
+        """Mesmo contrato de LocalSlidingWindowStore.hit."""
+        allowed, used, previous = self._script(
+            keys=[current_key, previous_key],
+            args=[limit, cost, repr(previous_weight), ttl],
+        )
+        return bool(allowed), float(used), float(previous)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_throttle_store():
+    """
+    Retorna o store configurado.
+
+    settings.API_THROTTLE_STORE aceita 'redis' ou 'memory'. Sem a
+    configuração, usa Redis quando o cache default é django_redis.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                backend = getattr(settings, 'API_THROTTLE_STORE', None)
+                if backend is None:
+                    cache_backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+                    backend = 'redis' if 'django_redis' in cache_backend else 'memory'
+                _store = RedisSlidingWindowStore() if backend == 'redis' else LocalSlidingWindowStore()
+    return _store
+
+
+class WeightedSlidingWindowThrottle(SimpleRateThrottle):
+    """
+    Throttle de janela deslizante com custo por action.
+
+    O consumo é estimado por ``anterior * (1 - fração decorrida) + atual``,
+    o que suaviza a virada da janela sem guardar o histórico de timestamps.
+    """
+    # O identificador entre chaves é hash tag: as duas janelas caem no mesmo slot
+    cache_format = 'throttle:%(scope)s:%(ident)s'
+    default_cost = 1
+
+    def get_cost(self, request, view):
+        """Custo da request: settings.API_THROTTLE_COSTS + throttle_costs do viewset."""
+        costs = dict(getattr(settings, 'API_THROTTLE_COSTS', {}))
+        costs.update(getattr(view, 'throttle_costs', {}))
+        action = getattr(view, 'action', None)
+        return max(int(costs.get(action, self.default_cost)), 1)
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        now = self.timer()
+        window_index, elapsed = divmod(now, self.duration)
+        previous_weight = 1 - elapsed / self.duration
+        self.cost = self.get_cost(request, view)
+        self.elapsed = elapsed
+
+        try:
+            allowed, used, previous = get_throttle_store().hit(
+                f'{self.key}:{int(window_index)}',
+                f'{self.key}:{int(window_index) - 1}',
+                self.num_requests,
+                self.cost,
+                previous_weight,
+                self.duration * 2,
+            )
+        except Exception:
+            # Mesma política do cache (IGNORE_EXCEPTIONS): não derrubar a API
+            logger.warning('Throttle store indisponível; request liberada.', exc_info=True)
+            return True
+
+        self.used = used
+        self.previous = previous
+        self._set_headers(view)
+        return allowed
+
+    def wait(self):
+        """Segundos até que o custo da request caiba no limite."""
+        remaining_window = self.duration - self.elapsed
+        excess = self.used + self.cost - self.num_requests
+        if self.previous > 0:
+            # A janela anterior decai linearmente ao longo da janela atual
+            decay = excess * self.duration / self.previous
+            if decay <= remaining_window:
+                return max(decay, 1)
+        return max(remaining_window, 1)
+
+    def _set_headers(self, view):
+        """Adiciona RateLimit-* à resposta, mantendo o throttle mais restritivo."""
+        headers = getattr(view, 'headers', None)
+        if headers is None:
+            return
+
+        remaining = max(int(self.num_requests - self.used), 0)
+        current = headers.get('RateLimit-Remaining')
+        if current is not None and int(current) <= remaining:
+            return
+
+        headers['RateLimit-Limit'] = str(self.num_requests)
+        headers['RateLimit-Remaining'] = str(remaining)
+        headers['RateLimit-Reset'] = str(math.ceil(self.duration - self.elapsed))
+        headers['RateLimit-Policy'] = f'{self.num_requests};w={self.duration}'
+
+
+class WeightedAnonRateThrottle(WeightedSlidingWindowThrottle):
+    """Limite para usuários anônimos, por IP."""
+    scope = 'anon'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return None
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': '{%s}' % self.get_ident(request),
+        }
+
+
+class WeightedUserRateThrottle(WeightedSlidingWindowThrottle):
+    """Limite para usuários autenticados, por ID (ou IP se anônimo)."""
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': '{%s}' % ident,
+        }
@@ -0,0 +1,258 @@
+"""
+Cache em dois níveis para dados de referência (categorias, unidades,
+opções de filtros).
+
+L1 é um LRU com TTL na memória de cada processo; L2 é o CACHES['default']
+(Redis em produção). Leituras quentes não saem do processo; uma falta no
+L1 vai ao L2 e só então ao banco (``loader``).
+
+Invalidação: ``invalidate`` apaga as chaves no L2 e publica os nomes no
+canal TIERED_CACHE_CHANNEL do Redis; cada processo assina o canal (thread
+daemon) e descarta as chaves do seu L1. Sem django-redis (desenvolvimento,
+testes) o canal é local ao processo. O TTL do L1 limita a defasagem se uma
+mensagem se perder; ao reconectar, o assinante descarta o L1 inteiro.
+
+Os valores do L1 são compartilhados entre requisições e threads: guarde
+estruturas simples (listas de tuplas/dicts) e trate-as como somente leitura.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+try:
+    from django_redis.cache import RedisCache
+except ImportError:
+    # django-redis só é necessário quando REDIS_URL está configurado
+    RedisCache = None
+
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+L2_PREFIX = 'tiered'
+
+
+class LocalLRUCache:
+    """LRU com TTL, thread-safe (L1 de um processo)."""
+
+    def __init__(self, max_entries, timeout):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires, value = item
+            if expires <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if self.max_entries <= 0 or self.timeout <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.timeout, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class LocalInvalidationBus:
+    """Canal de invalidação dentro do processo (sem Redis; usado nos testes)."""
+
+    def __init__(self):
+        self._handlers = []
+
+    def subscribe(self, handler):
+        self._handlers.append(handler)
+
+    def publish(self, keys):
+        for handler in list(self._handlers):
+            handler(keys)
+
+
+class RedisInvalidationBus:
+    """
+    Canal de invalidação via Redis pub/sub.
+
+    A assinatura roda numa thread daemon por processo, criada no primeiro
+    ``subscribe`` (com lazy-apps, já dentro do worker do uWSGI). Após uma
+    falha de conexão o handler recebe ``None`` (descartar tudo), pois
+    mensagens podem ter sido perdidas.
+    """
+
+    RETRY_SECONDS = 5
+    POLL_SECONDS = 1.0
+
+    def __init__(self, channel, alias='default'):
+        self.channel = channel
+        self.alias = alias
+        self._handlers = []
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        from django_redis import get_redis_connection
+
+        return get_redis_connection(self.alias)
+
+    def publish(self, keys):
+        try:
+            self._connection().publish(self.channel, json.dumps(list(keys)))
+        except Exception:
+            # Como no IGNORE_EXCEPTIONS do cache: Redis fora não derruba a
+            # requisição; os outros processos expiram o L1 pelo TTL
+            logger.warning("Falha ao publicar invalidação em %s", self.channel, exc_info=True)
+
+    def subscribe(self, handler):
+        with self._lock:
+            self._handlers.append(handler)
+            if self._pid != os.getpid():
+                # Threads não sobrevivem a fork: uma por processo
+                self._pid = os.getpid()
+                threading.Thread(target=self._listen, name='tiered-cache-invalidation', daemon=True).start()
+
+    def _dispatch(self, keys):
+        for handler in list(self._handlers):
+            handler(keys)
+
+    def _listen(self):
+        connected_once = False
+        while True:
+            try:
+                pubsub = self._connection().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                if connected_once:
+                    self._dispatch(None)
+                connected_once = True
+                while True:
+                    # get_message com timeout: o SOCKET_TIMEOUT do pool não
+                    # se aplica à espera
+                    message = pubsub.get_message(timeout=self.POLL_SECONDS)
+                    if message and message['type'] == 'message':
+                        self._dispatch(json.loads(message['data']))
+            except Exception:
+                logger.warning("Assinatura de %s interrompida; reconectando", self.channel, exc_info=True)
+                self._dispatch(None)
+                time.sleep(self.RETRY_SECONDS)
+
+
+def default_bus(alias='default'):
+    """Redis pub/sub quando o cache é django-redis; senão, canal local."""
+    if RedisCache is not None and isinstance(caches[alias], RedisCache):
+        return RedisInvalidationBus(settings.TIERED_CACHE_CHANNEL, alias)
+    return LocalInvalidationBus()
+
+
+class TieredCache:
+    """
+    L1 (processo) + L2 (CACHES[alias]) com invalidação por broadcast.
+
+    Args:
+        alias: Cache usado como L2
+        max_entries: Chaves no L1 (padrão: TIERED_CACHE_L1_MAX_ENTRIES)
+        local_timeout: TTL do L1 em segundos (padrão: TIERED_CACHE_L1_TIMEOUT)
+        bus: Canal de invalidação (padrão: ``default_bus``)
+    """
+
+    def __init__(self, alias='default', max_entries=None, local_timeout=None, bus=None):
+        self.alias = alias
+        self.local = LocalLRUCache(
+            settings.TIERED_CACHE_L1_MAX_ENTRIES if max_entries is None else max_entries,
+            settings.TIERED_CACHE_L1_TIMEOUT if local_timeout is None else local_timeout,
+        )
+        self.bus = bus if bus is not None else default_bus(alias)
+        self._subscribed = False
+
+    @property
+    def remote(self):
+        return caches[self.alias]
+
+    def _ensure_subscribed(self):
+        if not self._subscribed:
+            self._subscribed = True
+            self.bus.subscribe(self._on_invalidate)
+
+    def _on_invalidate(self, keys):
+        if keys is None:
+            self.local.clear()
+        else:
+            self.local.delete(keys)
+
+    def get_or_set(self, key, loader, timeout=None):
+        """
+        Valor de ``key``: L1, depois L2, depois ``loader()`` (grava nos dois).
+
+        Args:
+            timeout: TTL no L2 (padrão: TIERED_CACHE_TIMEOUT)
+        """
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        self._ensure_subscribed()
+        remote_key = f"{L2_PREFIX}:{key}"
+        value = self.remote.get(remote_key, _MISSING)
+        if value is _MISSING:
+            value = loader()
+            self.remote.set(remote_key, value, settings.TIERED_CACHE_TIMEOUT if timeout is None else timeout)
+        self.local.set(key, value)
+        return value
+
+    def invalidate(self, *keys):
+        """
+        Descarta ``keys`` no L2, no L1 deste processo e (broadcast) nos demais.
+
+        Dentro de uma transação repete a invalidação no commit: uma leitura
+        concorrente feita antes do commit pode ter regravado o valor antigo.
+        """
+        self._invalidate(keys)
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(lambda: self._invalidate(keys))
+
+    def _invalidate(self, keys):
+        self.remote.delete_many([f"{L2_PREFIX}:{key}" for key in keys])
+        self.local.delete(keys)
+        self.bus.publish(keys)
+
+    def clear_local(self):
+        """Esvazia só o L1 deste processo."""
+        self.local.clear()
+
+
+_reference_cache = None
+_reference_lock = threading.Lock()
+
+
+def reference_cache():
+    """Instância do processo (criada no primeiro uso)."""
+    global _reference_cache
+    if _reference_cache is None:
+        with _reference_lock:
+            if _reference_cache is None:
+                _reference_cache = TieredCache()
+    return _reference_cache
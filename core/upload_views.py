@@ -7,10 +7,11 @@ from django.views import View
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.core.files.storage import default_storage
-from PIL import Image
 import os
 from datetime import datetime
 
+from . import renditions
+
 
 class FileUploadView(View):
     """
@@ -46,32 +47,23 @@ class FileUploadView(View):
         return errors
     
     def optimize_image(self, uploaded_file, save_path):
-        """Otimiza imagem se necessário."""
+        """
+        Agenda a otimização e as variantes da imagem (core/renditions.py).
+        
+        O processamento fica com o worker (manage.py generate_renditions);
+        a requisição só grava a tarefa.
+        
+        Returns:
+            dict: URLs das variantes por nome e formato (disponíveis após o processamento)
+        """
         if not self.optimize_images:
-            return
+            return {}
         
-        try:
-            image = Image.open(uploaded_file)
-            
-            # Converter RGBA para RGB se necessário
-            if image.mode in ('RGBA', 'LA', 'P'):
-                background = Image.new('RGB', image.size, (255, 255, 255))
-                if image.mode == 'P':
-                    image = image.convert('RGBA')
-                background.paste(image, mask=image.split()[-1] if image.mode == 'RGBA' else None)
-                image = background
-            
-            # Redimensionar se necessário
-            if image.width > self.max_image_dimension or image.height > self.max_image_dimension:
-                image.thumbnail((self.max_image_dimension, self.max_image_dimension), Image.Resampling.LANCZOS)
-            
-            # Salvar otimizado
-            full_path = default_storage.path(save_path)
-            image.save(full_path, optimize=True, quality=85)
-            
-        except Exception as e:
-            # Se falhar, apenas log (arquivo já foi salvo normalmente)
-            print(f"Erro ao otimizar imagem {uploaded_file.name}: {e}")
+        renditions.enqueue_upload(save_path, self.max_image_dimension)
+        return {
+            name: {fmt: default_storage.url(path) for fmt, path in formats.items()}
+            for name, formats in renditions.variant_paths(save_path, self.max_image_dimension).items()
+        }
     
     @method_decorator(csrf_exempt)
     def dispatch(self, *args, **kwargs):
@@ -110,18 +102,22 @@ class FileUploadView(View):
             # Salvar arquivo
             saved_path = default_storage.save(file_path, uploaded_file)
             
-            # Otimizar se for imagem
+            # Otimizar se for imagem (em segundo plano)
+            variants = {}
             if uploaded_file.content_type and uploaded_file.content_type.startswith('image/'):
-                self.optimize_image(uploaded_file, saved_path)
+                variants = self.optimize_image(uploaded_file, saved_path)
             
             # Adicionar aos resultados
-            results.append({
+            result = {
                 'name': uploaded_file.name,
                 'path': saved_path,
                 'url': default_storage.url(saved_path),
                 'size': uploaded_file.size,
                 'type': uploaded_file.content_type,
-            })
+            }
+            if variants:
+                result['variants'] = variants
+            results.append(result)
         
         if errors and not results:
             return JsonResponse({'errors': errors}, status=400)
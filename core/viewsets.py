@@ -21,6 +21,116 @@ from .permissions import IsAdminUser as IsAdminUserPermission
 User = get_user_model()
 
 
+class SparseFieldsetViewSetMixin:
+    """
+    Mixin para viewsets cujos serializers usam ``SparseFieldsetMixin``.
+
+    Reduz o SQL ao conjunto pedido: monta ``only()`` e ``select_related``
+    a partir dos campos efetivamente serializados. Se algum campo calculado
+    não declarar suas dependências, o ``only()`` é omitido (mais seguro).
+    """
+    sparse_fieldset_actions = ('list', 'retrieve')
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        request = getattr(self, 'request', None)
+        if (
+            request is None
+            or self.action not in self.sparse_fieldset_actions
+            or not ({'fields', 'expand'} & set(request.query_params))
+        ):
+            return queryset
+
+        plan = self._build_sparse_plan(self.get_serializer(), queryset.model, prefix='')
+        if plan is None:
+            return queryset
+
+        only_paths, related_paths = plan
+        queryset = queryset.select_related(None)
+        if related_paths:
+            queryset = queryset.select_related(*sorted(related_paths))
+        return queryset.only(*sorted(only_paths))
+
+    def _build_sparse_plan(self, serializer, model, prefix):
+        """
+        Resolve os campos do serializer em caminhos ORM.
+
+        Returns:
+            tuple[set, set] | None: (caminhos para only(), caminhos para
+            select_related), ou None se não for possível restringir colunas.
+        """
+        from django.core.exceptions import FieldDoesNotExist
+        from rest_framework import serializers as drf_serializers
+
+        only_paths, related_paths = {'pk'} if not prefix else set(), set()
+        declared = getattr(getattr(serializer, 'Meta', None), 'sparse_field_sources', {})
+
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+
+            if name in declared:
+                for path in declared[name]:
+                    full = f'{prefix}{path}'
+                    only_paths.add(full)
+                    parts = full.split('__')
+                    for i in range(1, len(parts)):
+                        related_paths.add('__'.join(parts[:i]))
+                continue
+
+            current_model = model
+            parts = []
+            resolved = False
+            for attr in field.source.split('.'):
+                if attr.startswith('get_') and attr.endswith('_display'):
+                    attr = attr[4:-8]
+                try:
+                    model_field = current_model._meta.get_field(attr)
+                except FieldDoesNotExist:
+                    model_field = None
+
+                if model_field is None or model_field.many_to_many or model_field.one_to_many:
+                    if not parts:
+                        return None
+                    # Método/propriedade de um relacionado: carrega o modelo inteiro
+                    path = prefix + '__'.join(parts)
+                    only_paths.update(
+                        f'{path}__{f.name}' for f in current_model._meta.concrete_fields
+                    )
+                    resolved = True
+                    break
+
+                parts.append(attr)
+                if model_field.is_relation:
+                    path = prefix + '__'.join(parts)
+                    if isinstance(field, drf_serializers.BaseSerializer):
+                        related_paths.add(path)
+                        nested = self._build_sparse_plan(
+                            field, model_field.related_model, prefix=f'{path}__'
+                        )
+                        if nested is None:
+                            return None
+                        only_paths.update(nested[0] or {f'{path}__pk'})
+                        related_paths.update(nested[1])
+                        resolved = True
+                        break
+                    related_paths.add(path)
+                    current_model = model_field.related_model
+                    continue
+
+                only_paths.add(prefix + '__'.join(parts))
+                resolved = True
+                break
+
+            if not resolved and parts:
+                # Fonte termina em uma FK (ex: PrimaryKeyRelatedField)
+                path = prefix + '__'.join(parts)
+                related_paths.discard(path)
+                only_paths.add(path)
+
+        return only_paths, related_paths
+
+
 class UserViewSet(viewsets.ReadOnlyModelViewSet):
     """
     ViewSet para visualização de usuários.
@@ -105,10 +215,12 @@ class AuditLogFilter(FilterSet):
         fields = ['user', 'action', 'content_type']
 
 
-class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
+class AuditLogViewSet(SparseFieldsetViewSetMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet para visualização de logs de auditoria (somente leitura).
     
+    Aceita ?fields= para reduzir colunas e payload (ex: ?fields=id,action,timestamp).
+    
     list: Listar todos os logs de auditoria
     retrieve: Obter detalhes de um log
     stats: Estatísticas de auditoria
@@ -123,6 +235,7 @@ class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
     search_fields = ['object_repr', 'changes', 'user__username']
     ordering_fields = ['timestamp', 'action']
     ordering = ['-timestamp']
+    sparse_fieldset_actions = ('list', 'retrieve', 'by_user', 'by_model')
     
     @action(detail=False, methods=['get'])
     def stats(self, request):
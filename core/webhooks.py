@@ -0,0 +1,345 @@
+"""
+Webhooks de saída para eventos de estoque.
+
+Produção: ``publish`` grava o evento em ``WebhookEvent`` na transação
+corrente (movimentação, produto, alerta de estoque), apenas quando
+ApiSettings.api_habilitada está marcada no site padrão. A configuração é
+lida do banco no máximo a cada WEBHOOK_CONFIG_CACHE_TIMEOUT segundos por
+processo, então o caminho de escrita não consulta o banco nem o cache.
+Escritas em conjunto de produtos (importação, ações em lote), que não
+passam por ``save``, gravam seus eventos com ``publish_many`` (um INSERT).
+
+Entrega: ``deliver_pending`` (manage.py deliver_webhooks) roda um pool de
+workers. Cada worker reserva um lote de eventos vencidos (SKIP LOCKED,
+quando suportado), envia um único POST JSON para ApiSettings.api_url
+reutilizando a conexão HTTP (keep-alive) e marca o lote como entregue.
+Em falha, cada evento volta à fila com backoff exponencial e, após
+WEBHOOK_MAX_ATTEMPTS tentativas, fica como FALHOU (dead letter).
+
+Assinatura: ``X-Ares-Signature: sha256=<HMAC-SHA256(api_token,
+"<X-Ares-Timestamp>.<corpo>")>``; ver ``verify_signature``.
+"""
+import hashlib
+import hmac
+import http.client
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import ApiSettings, StatusWebhook, WebhookEvent
+
+
+MOVEMENT_CREATED = 'movement.created'
+PRODUCT_CREATED = 'product.created'
+PRODUCT_UPDATED = 'product.updated'
+STOCK_ALERT = 'stock.alert'
+
+SIGNATURE_HEADER = 'X-Ares-Signature'
+TIMESTAMP_HEADER = 'X-Ares-Timestamp'
+USER_AGENT = 'ARES-Webhooks/1.0'
+
+_config_lock = threading.Lock()
+_config_cache = {'value': None, 'expires': 0.0}
+
+
+def webhook_config():
+    """
+    Configuração de envio do site padrão (memorizada por processo).
+
+    Returns:
+        dict | None: {'url': ..., 'token': ...} ou None se desabilitado.
+    """
+    now = time.monotonic()
+    if now < _config_cache['expires']:
+        return _config_cache['value']
+    with _config_lock:
+        from wagtail.models import Site
+
+        value = None
+        site = Site.objects.filter(is_default_site=True).first()
+        if site is not None:
+            api = ApiSettings.for_site(site)
+            if api.api_habilitada and api.api_url:
+                value = {'url': api.api_url, 'token': api.api_token}
+        _config_cache.update(value=value, expires=now + settings.WEBHOOK_CONFIG_CACHE_TIMEOUT)
+    return value
+
+
+@receiver(post_save, sender=ApiSettings)
+def reset_webhook_config(**kwargs):
+    """Descarta a configuração memorizada quando ApiSettings é salvo."""
+    _config_cache.update(value=None, expires=0.0)
+
+
+def publish(event_type, data):
+    """
+    Grava um evento na fila de saída (na transação corrente).
+
+    Returns:
+        WebhookEvent | None: None quando a integração está desabilitada.
+    """
+    if webhook_config() is None:
+        return None
+    # Normaliza Decimal/datetime para tipos JSON já na gravação
+    payload = json.loads(json.dumps(data, cls=DjangoJSONEncoder))
+    return WebhookEvent.objects.create(event_type=event_type, payload=payload)
+
+
+def publish_many(events):
+    """
+    Grava vários eventos com um único INSERT (escritas em conjunto, que não
+    passam por ``save``).
+
+    Args:
+        events: Iterável de (tipo do evento, dados).
+
+    Returns:
+        list[WebhookEvent]: Vazia quando a integração está desabilitada.
+    """
+    if webhook_config() is None:
+        return []
+    return WebhookEvent.objects.bulk_create(
+        [
+            WebhookEvent(event_type=event_type, payload=json.loads(json.dumps(data, cls=DjangoJSONEncoder)))
+            for event_type, data in events
+        ],
+        batch_size=500,
+    )
+
+
+def sign(token, timestamp, body):
+    """Assinatura HMAC-SHA256 de ``"<timestamp>.<corpo>"`` com o token."""
+    message = f"{timestamp}.".encode() + body
+    return hmac.new(token.encode(), message, hashlib.sha256).hexdigest()
+
+
+def verify_signature(token, timestamp, body, signature, tolerance=300):
+    """Confere a assinatura de um POST recebido (para os receptores)."""
+    try:
+        if abs(time.time() - int(timestamp)) > tolerance:
+            return False
+    except (TypeError, ValueError):
+        return False
+    expected = f"sha256={sign(token, timestamp, body)}"
+    return hmac.compare_digest(expected, signature or '')
+
+
+def backoff_delay(attempts):
+    """Espera antes da próxima tentativa: exponencial com jitter, limitada."""
+    base = settings.WEBHOOK_BACKOFF_BASE_SECONDS * 2 ** (attempts - 1)
+    delay = min(base, settings.WEBHOOK_BACKOFF_MAX_SECONDS)
+    return timedelta(seconds=delay / 2 + random.uniform(0, delay / 2))
+
+
+class WebhookError(Exception):
+    """Falha na entrega de um lote (rede ou resposta não 2xx)."""
+
+
+class ConnectionPool:
+    """
+    Conexões HTTP persistentes por (esquema, host, porta).
+
+    Cada worker usa o próprio pool (http.client não é thread-safe).
+    """
+
+    def __init__(self, timeout=None):
+        self.timeout = timeout or settings.WEBHOOK_TIMEOUT
+        self._connections = {}
+
+    def _connection(self, parts):
+        key = (parts.scheme, parts.hostname, parts.port)
+        conn = self._connections.get(key)
+        if conn is None:
+            factory = (
+                http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+            )
+            conn = factory(parts.hostname, parts.port, timeout=self.timeout)
+            self._connections[key] = conn
+        return key, conn
+
+    def post(self, url, body, headers):
+        """
+        Envia um POST e devolve (status, corpo da resposta).
+
+        Uma conexão reaproveitada que o servidor já fechou é reaberta uma vez.
+        """
+        parts = urlsplit(url)
+        path = parts.path or '/'
+        if parts.query:
+            path = f"{path}?{parts.query}"
+        for retry in (False, True):
+            key, conn = self._connection(parts)
+            try:
+                conn.request('POST', path, body=body, headers=headers)
+                response = conn.getresponse()
+                return response.status, response.read()
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                conn.close()
+                del self._connections[key]
+                if retry:
+                    raise
+            except Exception:
+                conn.close()
+                del self._connections[key]
+                raise
+
+    def close(self):
+        for conn in self._connections.values():
+            conn.close()
+        self._connections.clear()
+
+
+def claim_batch(batch_size, now=None):
+    """
+    Reserva um lote de eventos vencidos para um worker.
+
+    A reserva adia ``next_attempt_at`` por WEBHOOK_LEASE_SECONDS: se o worker
+    morrer no meio do envio, o lote volta à fila depois disso.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        events = list(
+            WebhookEvent.objects.select_for_update(skip_locked=True)
+            .filter(status=StatusWebhook.PENDENTE, next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        if events:
+            WebhookEvent.objects.filter(pk__in=[event.pk for event in events]).update(
+                next_attempt_at=now + timedelta(seconds=settings.WEBHOOK_LEASE_SECONDS)
+            )
+    return events
+
+
+def deliver_batch(events, config, pool):
+    """
+    Envia um lote num único POST assinado.
+
+    Raises:
+        WebhookError: Falha de rede ou resposta diferente de 2xx.
+    """
+    body = json.dumps({
+        'events': [
+            {
+                'id': event.pk,
+                'type': event.event_type,
+                'created_at': event.created_at.isoformat(),
+                'data': event.payload,
+            }
+            for event in events
+        ],
+    }).encode()
+    timestamp = str(int(time.time()))
+    headers = {
+        'Content-Type': 'application/json',
+        'User-Agent': USER_AGENT,
+        TIMESTAMP_HEADER: timestamp,
+    }
+    if config['token']:
+        headers['Authorization'] = f"Bearer {config['token']}"
+        headers[SIGNATURE_HEADER] = f"sha256={sign(config['token'], timestamp, body)}"
+    try:
+        status, _ = pool.post(config['url'], body, headers)
+    except (OSError, http.client.HTTPException) as exc:
+        raise WebhookError(f"{type(exc).__name__}: {exc}") from exc
+    if not 200 <= status < 300:
+        raise WebhookError(f"HTTP {status}")
+
+
+def record_result(events, error=None, now=None):
+    """Marca o lote como entregue ou agenda nova tentativa / dead letter."""
+    now = now or timezone.now()
+    if error is None:
+        WebhookEvent.objects.filter(pk__in=[event.pk for event in events]).update(
+            status=StatusWebhook.ENTREGUE, delivered_at=now, last_error=''
+        )
+        return
+    for event in events:
+        event.attempts += 1
+        event.last_error = str(error)
+        if event.attempts >= settings.WEBHOOK_MAX_ATTEMPTS:
+            event.status = StatusWebhook.FALHOU
+        else:
+            event.next_attempt_at = now + backoff_delay(event.attempts)
+    WebhookEvent.objects.bulk_update(
+        events, ['attempts', 'last_error', 'status', 'next_attempt_at']
+    )
+
+
+def run_worker(config, batch_size=None):
+    """
+    Entrega lotes até esvaziar a fila de eventos vencidos.
+
+    Returns:
+        dict: {'delivered': eventos, 'failed': eventos, 'batches': lotes}
+    """
+    batch_size = batch_size or settings.WEBHOOK_BATCH_SIZE
+    counts = {'delivered': 0, 'failed': 0, 'batches': 0}
+    pool = ConnectionPool()
+    try:
+        while True:
+            events = claim_batch(batch_size)
+            if not events:
+                return counts
+            try:
+                deliver_batch(events, config, pool)
+            except WebhookError as exc:
+                record_result(events, error=exc)
+                counts['failed'] += len(events)
+                # Destino fora do ar: não insiste com os demais lotes agora
+                return counts
+            record_result(events)
+            counts['delivered'] += len(events)
+            counts['batches'] += 1
+    finally:
+        pool.close()
+
+
+def _threaded_worker(config, batch_size):
+    try:
+        return run_worker(config, batch_size)
+    finally:
+        connection.close()
+
+
+def deliver_pending(workers=None, batch_size=None):
+    """
+    Esvazia a fila de eventos vencidos com um pool de workers.
+
+    Returns:
+        dict: Soma das contagens dos workers (ver ``run_worker``).
+    """
+    config = webhook_config()
+    if config is None:
+        return {'delivered': 0, 'failed': 0, 'batches': 0}
+    workers = workers or settings.WEBHOOK_WORKERS
+    if not connection.features.has_select_for_update_skip_locked:
+        # Sem SKIP LOCKED (ex.: SQLite) workers paralelos reservariam o mesmo lote
+        workers = 1
+    if workers == 1:
+        return run_worker(config, batch_size)
+
+    totals = {'delivered': 0, 'failed': 0, 'batches': 0}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='webhook') as executor:
+        futures = [executor.submit(_threaded_worker, config, batch_size) for _ in range(workers)]
+        for future in futures:
+            for key, value in future.result().items():
+                totals[key] += value
+    return totals
+
+
+def requeue_dead_letters():
+    """Devolve os eventos FALHOU à fila (após corrigir o destino)."""
+    return WebhookEvent.objects.filter(status=StatusWebhook.FALHOU).update(
+        status=StatusWebhook.PENDENTE, attempts=0, next_attempt_at=timezone.now()
+    )
@@ -9,21 +9,27 @@ from django.db.models import Sum, F, Count, Q
 from django.views.decorators.cache import cache_page
 from decimal import Decimal
 from datetime import datetime, timedelta
+from core.profiling import query_budget
+from core.tiered_cache import reference_cache
 
 # Importar models dos apps (com fallback se não existirem)
 try:
-    from produtos.models import Product, Category
+    from produtos import reference
+    from produtos.models import Product
+    from produtos.expiry import get_expiry_summary
     PRODUCTS_AVAILABLE = True
 except ImportError:
     PRODUCTS_AVAILABLE = False
 
 try:
     from movimentacoes.models import InventoryMovement
+    from movimentacoes.warehouses import warehouse_summary
     MOVEMENTS_AVAILABLE = True
 except ImportError:
     MOVEMENTS_AVAILABLE = False
 
 
+@query_budget(18)
 @login_required
 @cache_page(60 * 2)  # Cache de 2 minutos (dashboard com dados relativamente estáticos)
 def index(request):
@@ -59,51 +65,34 @@ def index(request):
     
     # Estatísticas de produtos (se disponível)
     if PRODUCTS_AVAILABLE:
-        # Produtos básicos
-        total_products = Product.objects.filter(is_active=True).count()
-        total_categories = Category.objects.count()
-        
-        # Status de estoque
-        critical_stock = Product.objects.filter(
-            is_active=True,
-            current_stock=0
-        ).count()
-        
-        low_stock = Product.objects.filter(
-            is_active=True,
-            current_stock__gt=0,
-            current_stock__lte=F('min_stock')
-        ).count()
-        
+        # Produtos básicos, status de estoque e valor total (uma query)
+        totals = Product.objects.filter(is_active=True).aggregate(
+            total_products=Count('id'),
+            critical_stock=Count('id', filter=Q(stock_status=Product.STOCK_CRITICO)),
+            low_stock=Count('id', filter=Q(stock_status=Product.STOCK_BAIXO)),
+            total_stock_value=Sum(F('current_stock') * F('unit_price')),
+        )
+        total_products = totals['total_products']
+        total_categories = len(reference.categories(active_only=False))
+        critical_stock = totals['critical_stock']
+        low_stock = totals['low_stock']
         ok_stock = total_products - critical_stock - low_stock
-        
-        # Valor total do estoque
-        total_stock_value = Product.objects.filter(
-            is_active=True,
-            unit_price__isnull=False
-        ).aggregate(
-            total=Sum(F('current_stock') * F('unit_price'))
-        )['total'] or Decimal('0')
+        total_stock_value = totals['total_stock_value'] or Decimal('0')
         
         # Produtos críticos para exibir
         critical_products = Product.objects.filter(
             is_active=True,
-            current_stock=0
+            stock_status=Product.STOCK_CRITICO
         ).select_related('category', 'unit')[:5]
         
         # Produtos com estoque baixo ou crítico (inclui estoque = 0)
         low_stock_products = Product.objects.filter(
             is_active=True,
-            current_stock__lte=F('min_stock')
+            stock_status__in=[Product.STOCK_CRITICO, Product.STOCK_BAIXO]
         ).select_related('category', 'unit')[:5]
         
-        # Produtos próximos do vencimento (próximos 30 dias)
-        thirty_days_from_now = datetime.now().date() + timedelta(days=30)
-        expiring_products = Product.objects.filter(
-            is_active=True,
-            expiry_date__lte=thirty_days_from_now,
-            expiry_date__gt=datetime.now().date()
-        ).select_related('category', 'unit')[:5]
+        # Produtos próximos do vencimento (resumo diário em cache)
+        expiry_summary = get_expiry_summary()
         
         context.update({
             'products_stats': {
@@ -116,7 +105,8 @@ def index(request):
             },
             'critical_products': critical_products,
             'low_stock_products': low_stock_products,
-            'expiring_products': expiring_products,
+            'expiring_products': expiry_summary['upcoming'],
+            'expiry_stats': expiry_summary['stats'],
         })
     
     # Estatísticas de movimentações (se disponível)
@@ -130,7 +120,7 @@ def index(request):
         
         # Últimas movimentações
         recent_movements = InventoryMovement.objects.select_related(
-            'product', 'user'
+            'product', 'product__unit', 'user'
         ).order_by('-created_at')[:10]
         
         context.update({
@@ -138,6 +128,7 @@ def index(request):
                 'recent_movements_count': recent_movements_count,
             },
             'recent_movements': recent_movements,
+            'warehouse_stats': warehouse_summary(),
         })
     
     # Informações do sistema
@@ -156,37 +147,42 @@ def index(request):
     return render(request, 'dashboard/index.html', context)
 
 
+FILTER_USERS_KEY = 'dashboard:filter_users'
+FILTER_USERS_TIMEOUT = 60 * 5
+
+
+def _movement_users():
+    from django.contrib.auth import get_user_model
+    User = get_user_model()
+    users = User.objects.filter(
+        inventory_movements__isnull=False
+    ).distinct().values('id', 'username', 'first_name', 'last_name').order_by('username')
+    return [{
+        'id': u['id'],
+        'label': f"{u['first_name']} {u['last_name']}" if u['first_name'] else u['username']
+    } for u in users]
+
+
 @login_required
 def get_filter_options(request):
-    """Retorna opções para os filtros (produtos, categorias, usuários)."""
+    """Retorna opções para os filtros (categorias e usuários)."""
     from django.http import JsonResponse
     
     data = {}
     
-    # Produtos
+    # Categorias (cache de referência); produtos vêm do seletor com busca
     if PRODUCTS_AVAILABLE:
-        from produtos.models import Product
-        products = Product.objects.filter(is_active=True).values('id', 'sku', 'name').order_by('name')[:100]
-        data['products'] = [{'id': p['id'], 'label': f"{p['sku']} - {p['name']}"} for p in products]
-        
-        # Categorias
-        categories = Category.objects.all().values('id', 'name').order_by('name')
-        data['categories'] = [{'id': c['id'], 'label': c['name']} for c in categories]
+        data['categories'] = [
+            {'id': pk, 'label': name} for pk, name in reference.category_choices(active_only=False)
+        ]
     else:
-        data['products'] = []
         data['categories'] = []
     
-    # Usuários que fizeram movimentações
+    # Usuários que fizeram movimentações (sem invalidação: expira pelo TTL)
     if MOVEMENTS_AVAILABLE:
-        from django.contrib.auth import get_user_model
-        User = get_user_model()
-        users = User.objects.filter(
-            inventory_movements__isnull=False
-        ).distinct().values('id', 'username', 'first_name', 'last_name').order_by('username')
-        data['users'] = [{
-            'id': u['id'],
-            'label': f"{u['first_name']} {u['last_name']}" if u['first_name'] else u['username']
-        } for u in users]
+        data['users'] = reference_cache().get_or_set(
+            FILTER_USERS_KEY, _movement_users, timeout=FILTER_USERS_TIMEOUT
+        )
     else:
         data['users'] = []
     
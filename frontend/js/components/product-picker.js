@@ -0,0 +1,121 @@
+/**
+ * Seletor de Produto com Busca
+ * Sistema de Gestão de Estoque ARES
+ *
+ * Aprimora <select data-product-picker data-url="..."> (produtos/widgets.py):
+ * o select chega só com a opção vazia e a escolhida; um campo de busca
+ * acima dele carrega as opções da API paginada conforme o usuário digita.
+ */
+
+const DEBOUNCE_MS = 250;
+const MORE_VALUE = '__more__';
+
+function buildOption(value, text) {
+    const option = document.createElement('option');
+    option.value = value;
+    option.textContent = text;
+    return option;
+}
+
+function fetchProducts(url, params) {
+    const query = new URLSearchParams(params);
+    return fetch(`${url}?${query}`, { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+        .then(response => response.json());
+}
+
+function initPicker(select) {
+    if (select.dataset.pickerReady) return;
+    select.dataset.pickerReady = '1';
+
+    const url = select.dataset.url;
+    const emptyOption = select.querySelector('option[value=""]');
+    const state = { term: '', page: 1, loaded: false, timer: null };
+
+    const search = document.createElement('input');
+    search.type = 'search';
+    search.className = 'form-control form-control-sm mb-1';
+    search.placeholder = select.dataset.placeholder || 'Buscar...';
+    search.setAttribute('aria-label', search.placeholder);
+    select.parentNode.insertBefore(search, select);
+
+    // Reconstrói as opções mantendo a vazia e a escolhida
+    function render(results, more, append) {
+        const current = select.selectedOptions[0];
+        const keep = current && current.value && current.value !== MORE_VALUE ? current : null;
+        select.querySelectorAll(`option[value="${MORE_VALUE}"]`).forEach(option => option.remove());
+        if (!append) {
+            Array.from(select.options).forEach(option => {
+                if (option !== emptyOption && option !== keep) option.remove();
+            });
+        }
+        results.forEach(product => {
+            if (keep && String(product.id) === keep.value) return;
+            select.appendChild(buildOption(product.id, product.text));
+        });
+        if (more) {
+            const option = buildOption(MORE_VALUE, 'Carregar mais resultados...');
+            option.className = 'text-muted';
+            select.appendChild(option);
+        }
+        if (keep) keep.selected = true;
+    }
+
+    function load(append) {
+        fetchProducts(url, { q: state.term, page: state.page })
+            .then(data => {
+                state.loaded = true;
+                render(data.results || [], data.more, append);
+            })
+            .catch(error => console.error('Erro ao buscar produtos:', error));
+    }
+
+    search.addEventListener('input', function() {
+        clearTimeout(state.timer);
+        state.timer = setTimeout(() => {
+            state.term = search.value.trim();
+            state.page = 1;
+            load(false);
+        }, DEBOUNCE_MS);
+    });
+
+    // Primeira página só quando o usuário abre o select
+    select.addEventListener('focus', function() {
+        if (!state.loaded) load(false);
+    });
+
+    select.addEventListener('change', function(event) {
+        if (select.value !== MORE_VALUE) return;
+        // "Carregar mais" não é uma escolha: volta à anterior e busca a próxima página
+        event.stopImmediatePropagation();
+        select.value = select.dataset.previous || '';
+        state.page += 1;
+        load(true);
+    }, true);
+
+    select.addEventListener('change', function() {
+        select.dataset.previous = select.value;
+    });
+    select.dataset.previous = select.value;
+}
+
+function setValue(select, productId) {
+    const value = String(productId || '');
+    if (!value || select.querySelector(`option[value="${CSS.escape(value)}"]`)) {
+        select.value = value;
+        select.dispatchEvent(new Event('change'));
+        return Promise.resolve();
+    }
+    return fetchProducts(select.dataset.url, { id: value }).then(data => {
+        const product = (data.results || [])[0];
+        if (!product) return;
+        select.appendChild(buildOption(product.id, product.text));
+        select.value = String(product.id);
+        select.dispatchEvent(new Event('change'));
+    });
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('select[data-product-picker]').forEach(initPicker);
+});
+
+window.productPicker = { init: initPicker, setValue: setValue };
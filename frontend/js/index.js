@@ -21,6 +21,7 @@ import './search/search.js';
 import './components/menu-wrapper.js';
 import './components/table.js';
 import './components/form-layout.js';
+import './components/product-picker.js';
 import './blocks/carrosssel-init.js';
 import './dashboard/dashboard.js';
 import './produtos/produtos.js';
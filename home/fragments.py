@@ -0,0 +1,137 @@
+"""
+Cache de fragmentos da HomePage.
+
+Cada bloco dos StreamFields (banners, destaques, conteúdo e notícias) é
+renderizado uma vez por revisão publicada e guardado com a chave
+``home:fragment:<página>:<revisão>:<id do bloco>``; a URL da imagem de
+fundo do cabeçalho também. Uma requisição busca todos os fragmentos com um
+único ``get_many``. Nas faltas, as imagens dos blocos pendentes e suas
+renditions são carregadas de uma vez (``prefetch_renditions``) antes da
+renderização.
+
+Publicar a página gera uma revisão nova (chaves novas); o signal
+``page_published`` apaga as chaves da revisão anterior. Pré-visualizações
+não usam o cache.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.dispatch import receiver
+from django.utils.safestring import mark_safe
+from wagtail.images import get_image_model
+from wagtail.images.blocks import ImageChooserBlock
+from wagtail.signals import page_published
+
+
+FRAGMENT_STREAMS = ('banners', 'destaques', 'body', 'noticias')
+HERO = 'hero'
+HERO_FILTER = 'fill-1920x800'
+
+
+def fragment_key(page_id, revision_id, name):
+    return f"home:fragment:{page_id}:{revision_id}:{name}"
+
+
+def _index_key(page_id):
+    # Chaves gravadas da revisão corrente, apagadas na próxima publicação
+    return f"home:fragment-keys:{page_id}"
+
+
+def home_fragments(page, context):
+    """
+    HTML dos blocos e URL do cabeçalho da HomePage.
+
+    Args:
+        context: Contexto da página (repassado aos templates dos blocos)
+
+    Returns:
+        dict: 'hero' -> URL da imagem de fundo ('' sem imagem) e, para cada
+        StreamField, a lista com o HTML de cada bloco, em ordem
+    """
+    request = context.get('request')
+    revision_id = page.live_revision_id
+    use_cache = revision_id is not None and not getattr(request, 'is_preview', False)
+
+    slots = [(HERO, HERO)] + [
+        (stream, child['id'])
+        for stream in FRAGMENT_STREAMS
+        for child in getattr(page, stream).raw_data
+    ]
+    keys = {slot: fragment_key(page.pk, revision_id, slot[1]) for slot in slots}
+    found = cache.get_many(list(keys.values())) if use_cache else {}
+
+    missing = [slot for slot in slots if keys[slot] not in found]
+    if missing:
+        rendered = _render(page, missing, context)
+        found.update((keys[slot], value) for slot, value in rendered.items())
+        if use_cache:
+            timeout = settings.HOME_FRAGMENT_CACHE_TIMEOUT
+            cache.set_many({keys[slot]: value for slot, value in rendered.items()}, timeout)
+            cache.set(_index_key(page.pk), list(keys.values()), timeout)
+
+    fragments = {stream: [] for stream in FRAGMENT_STREAMS}
+    for slot in slots[1:]:
+        fragments[slot[0]].append(mark_safe(found[keys[slot]]))
+    fragments[HERO] = found[keys[(HERO, HERO)]]
+    return fragments
+
+
+def _render(page, missing, context):
+    """
+    Renderiza os slots pendentes com as imagens e renditions pré-carregadas.
+
+    Os blocos partem de ``raw_data``: iterar o StreamValue converteria cada
+    StreamField em separado, com uma query de imagens por campo.
+    """
+    wanted = set(missing)
+    pending = []  # (slot, bloco, valor bruto); os blocos da HomePage são StructBlocks
+    for stream in FRAGMENT_STREAMS:
+        stream_value = getattr(page, stream)
+        for child in stream_value.raw_data:
+            if (stream, child['id']) in wanted:
+                block = stream_value.stream_block.child_blocks[child['type']]
+                pending.append(((stream, child['id']), block, child['value']))
+
+    image_ids = {
+        raw[name]
+        for _, block, raw in pending
+        for name in _image_fields(block)
+        if raw.get(name)
+    }
+    if (HERO, HERO) in wanted and page.hero_image_id:
+        image_ids.add(page.hero_image_id)
+    images = {}
+    if image_ids:
+        images = {
+            image.pk: image
+            for image in get_image_model().objects.filter(pk__in=image_ids).prefetch_renditions()
+        }
+
+    rendered = {}
+    for slot, block, raw in pending:
+        image_fields = _image_fields(block)
+        value = block.normalize({
+            name: images.get(raw.get(name)) if name in image_fields
+            else child_block.to_python(raw[name]) if name in raw
+            else child_block.get_default()
+            for name, child_block in block.child_blocks.items()
+        })
+        rendered[slot] = str(block.render(value, context))
+    if (HERO, HERO) in wanted:
+        hero = images.get(page.hero_image_id)
+        rendered[(HERO, HERO)] = hero.get_rendition(HERO_FILTER).url if hero else ''
+    return rendered
+
+
+def _image_fields(block):
+    return [
+        name for name, child_block in block.child_blocks.items()
+        if isinstance(child_block, ImageChooserBlock)
+    ]
+
+
+@receiver(page_published)
+def drop_home_fragments(instance, **kwargs):
+    """Apaga os fragmentos da revisão anterior da página publicada."""
+    keys = cache.get(_index_key(instance.pk))
+    if keys:
+        cache.delete_many(keys + [_index_key(instance.pk)])
@@ -8,6 +8,8 @@ from wagtail.admin.panels import FieldPanel, MultiFieldPanel
 from wagtail.images.blocks import ImageChooserBlock
 from wagtail import blocks
 
+from .fragments import home_fragments
+
 
 # StreamField Blocks personalizados
 
@@ -208,6 +210,12 @@ class HomePage(Page):
         ], heading="Rodapé"),
     ]
     
+    def get_context(self, request, *args, **kwargs):
+        """Blocos dos StreamFields pré-renderizados e em cache (home/fragments.py)."""
+        context = super().get_context(request, *args, **kwargs)
+        context['fragments'] = home_fragments(self, context)
+        return context
+    
     class Meta:
         verbose_name = "Página Inicial"
         verbose_name_plural = "Páginas Iniciais"
@@ -1 +1,65 @@
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from wagtail.images.models import Image
+from wagtail.images.tests.utils import get_test_image_file
+from wagtail.models import Site
+
+from .fragments import fragment_key, home_fragments
+from .models import HomePage
+
+
+class HomeFragmentsTests(TestCase):
+    """Testes para o cache de fragmentos da HomePage (home/fragments.py)."""
+
+    def setUp(self):
+        import shutil
+        import tempfile
+        
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        
+        cache.clear()
+        self.image = Image.objects.create(title='Banner', file=get_test_image_file())
+        root = Site.objects.get(is_default_site=True).root_page
+        self.page = root.add_child(instance=HomePage(
+            title='Início',
+            slug='inicio',
+            hero_title='Bem-vindo',
+            hero_image=self.image,
+            banners=[('banner', {'title': 'Promoção', 'image': self.image})],
+            noticias=[('noticia', {'title': 'Novidade', 'image': self.image, 'summary': 'Resumo'})],
+        ))
+        self.page.save_revision().publish()
+        self.page = HomePage.objects.get(pk=self.page.pk)
+
+    def test_images_prefetched_and_fragments_cached(self):
+        """Testa as imagens carregadas de uma vez e a segunda renderização sem queries."""
+        home_fragments(self.page, {})  # gera as renditions
+        cache.clear()
+        page = HomePage.objects.get(pk=self.page.pk)
+
+        with self.assertNumQueries(2):  # imagens + renditions
+            fragments = home_fragments(page, {})
+        self.assertIn('Promoção', fragments['banners'][0])
+        self.assertIn('Novidade', fragments['noticias'][0])
+        self.assertIn('fill-1920x800', fragments['hero'])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(home_fragments(page, {}), fragments)
+
+    def test_publish_drops_previous_revision(self):
+        """Testa a troca de revisão ao publicar e a remoção das chaves antigas."""
+        home_fragments(self.page, {})
+        old_revision = self.page.live_revision_id
+        block_id = self.page.banners[0].id
+        self.assertIsNotNone(cache.get(fragment_key(self.page.pk, old_revision, block_id)))
+
+        self.page.banners = [('banner', {'title': 'Liquidação', 'image': self.image})]
+        self.page.save_revision().publish()
+        self.assertIsNone(cache.get(fragment_key(self.page.pk, old_revision, block_id)))
+
+        page = HomePage.objects.get(pk=self.page.pk)
+        self.assertIn('Liquidação', home_fragments(page, {})['banners'][0])
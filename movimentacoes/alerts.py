@@ -0,0 +1,257 @@
+"""
+Alertas de estoque baixo/crítico.
+
+Detecção: no caminho de escrita da movimentação, compara o status do
+estoque antes e depois (``stock_before``/``stock_after`` do total do
+produto contra o ``min_stock`` já em memória). Sem cruzamento não há
+nenhuma query extra; com cruzamento, um UPDATE (ou INSERT) em
+``StockAlert``.
+
+Agrupamento: um alerta por (produto, nível, janela de
+STOCK_ALERT_WINDOW_MINUTES). Cruzamentos repetidos na janela apenas
+incrementam ``occurrences`` e atualizam o saldo — inclusive depois de
+enviado, sem reenviar.
+
+Envio: ``dispatch_pending_alerts`` (manage.py dispatch_stock_alerts) lê
+os pendentes com mais de STOCK_ALERT_BATCH_DELAY_SECONDS e envia um
+único resumo por lote a cada backend de STOCK_ALERT_BACKENDS (console,
+arquivo, e-mail ou webhook). Milhares de movimentações por minuto viram
+poucos envios.
+"""
+import json
+import sys
+import urllib.request
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from core.webhooks import STOCK_ALERT, publish
+from produtos.models import Product
+
+from .models import StockAlert
+
+
+# Ordem de gravidade dos status (só pioras geram alerta)
+SEVERITY = {
+    Product.STOCK_OK: 0,
+    Product.STOCK_BAIXO: 1,
+    Product.STOCK_CRITICO: 2,
+}
+
+
+def window_start_for(moment, minutes=None):
+    """Início da janela de agrupamento que contém ``moment`` (UTC)."""
+    seconds = (minutes or settings.STOCK_ALERT_WINDOW_MINUTES) * 60
+    epoch = int(moment.timestamp())
+    return datetime.fromtimestamp(epoch - epoch % seconds, tz=dt_timezone.utc)
+
+
+def record_crossing(movement, stock_before, stock_after):
+    """
+    Registra/agrupa o alerta se a movimentação piorou o status do produto.
+
+    Returns:
+        str | None: Nível do alerta ('BAIXO'/'CRITICO') ou None sem cruzamento.
+    """
+    min_stock = movement.product.min_stock
+    before = Product.stock_status_for(stock_before, min_stock)
+    after = Product.stock_status_for(stock_after, min_stock)
+    if SEVERITY[after] <= SEVERITY[before]:
+        return None
+
+    now = timezone.now()
+    window = window_start_for(now)
+    alerts = StockAlert.objects.filter(
+        product_id=movement.product_id, level=after, window_start=window
+    )
+    changes = {
+        'occurrences': F('occurrences') + 1,
+        'stock_level': stock_after,
+        'min_stock': min_stock,
+        'movement': movement,
+        'updated_at': now,
+    }
+    if alerts.update(**changes):
+        return after
+    try:
+        with transaction.atomic():
+            alert = StockAlert.objects.create(
+                product_id=movement.product_id,
+                level=after,
+                window_start=window,
+                movement=movement,
+                stock_level=stock_after,
+                min_stock=min_stock,
+            )
+    except IntegrityError:
+        # Outra movimentação criou o alerta da janela em paralelo
+        alerts.update(**changes)
+        return after
+
+    # Um evento de webhook por alerta (não por cruzamento repetido)
+    publish(STOCK_ALERT, {
+        'id': alert.pk,
+        'product_id': movement.product_id,
+        'sku': movement.product.sku,
+        'level': after,
+        'stock': stock_after,
+        'min_stock': min_stock,
+        'movement_id': movement.pk,
+    })
+    return after
+
+
+def alert_payload(alert):
+    """Representação serializável de um alerta (para arquivo/webhook)."""
+    return {
+        'id': alert.pk,
+        'sku': alert.product.sku,
+        'product': alert.product.name,
+        'level': alert.level,
+        'stock': str(alert.stock_level),
+        'min_stock': str(alert.min_stock),
+        'occurrences': alert.occurrences,
+        'window_start': alert.window_start.isoformat(),
+        'first_seen': alert.created_at.isoformat(),
+        'last_seen': alert.updated_at.isoformat(),
+    }
+
+
+def format_digest(alerts):
+    """Resumo em texto: (assunto, corpo)."""
+    critical = sum(1 for alert in alerts if alert.level == Product.STOCK_CRITICO)
+    subject = f"[ARES] {len(alerts)} alerta(s) de estoque ({critical} crítico(s))"
+    lines = [
+        f"{alert.get_level_display():<8} {alert.product.sku} - {alert.product.name}: "
+        f"estoque {alert.stock_level} (mínimo {alert.min_stock})"
+        + (f" [{alert.occurrences}x na janela]" if alert.occurrences > 1 else "")
+        for alert in alerts
+    ]
+    return subject, "\n".join(lines)
+
+
+class BaseAlertBackend:
+    """Backend de envio: recebe um lote de alertas e envia um único resumo."""
+
+    def send(self, alerts):
+        raise NotImplementedError
+
+
+class ConsoleAlertBackend(BaseAlertBackend):
+    """Escreve o resumo na saída padrão (desenvolvimento)."""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def send(self, alerts):
+        subject, body = format_digest(alerts)
+        self.stream.write(f"{subject}\n{body}\n")
+        self.stream.flush()
+
+
+class FileAlertBackend(BaseAlertBackend):
+    """Acrescenta cada lote como uma linha JSON em STOCK_ALERT_FILE_PATH."""
+
+    def __init__(self, path=None):
+        self.path = path or settings.STOCK_ALERT_FILE_PATH
+
+    def send(self, alerts):
+        line = json.dumps({
+            'sent_at': timezone.now().isoformat(),
+            'alerts': [alert_payload(alert) for alert in alerts],
+        }, ensure_ascii=False)
+        with open(self.path, 'a', encoding='utf-8') as handle:
+            handle.write(line + "\n")
+
+
+class EmailAlertBackend(BaseAlertBackend):
+    """Um e-mail por lote para STOCK_ALERT_EMAILS (via EMAIL_BACKEND)."""
+
+    def send(self, alerts):
+        recipients = settings.STOCK_ALERT_EMAILS
+        if not recipients:
+            return
+        subject, body = format_digest(alerts)
+        send_mail(subject, body, None, recipients, fail_silently=False)
+
+
+class WebhookAlertBackend(BaseAlertBackend):
+    """POST JSON do lote para STOCK_ALERT_WEBHOOK_URL."""
+
+    def __init__(self, url=None, timeout=None):
+        self.url = url or settings.STOCK_ALERT_WEBHOOK_URL
+        self.timeout = timeout or settings.STOCK_ALERT_WEBHOOK_TIMEOUT
+
+    def send(self, alerts):
+        if not self.url:
+            return
+        data = json.dumps({
+            'event': 'stock.alerts',
+            'alerts': [alert_payload(alert) for alert in alerts],
+        }).encode()
+        request = urllib.request.Request(
+            self.url, data=data, method='POST',
+            headers={'Content-Type': 'application/json'},
+        )
+        # urlopen levanta HTTPError para respostas 4xx/5xx
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+def get_backends():
+    """Instancia os backends configurados em STOCK_ALERT_BACKENDS."""
+    return [import_string(path)() for path in settings.STOCK_ALERT_BACKENDS]
+
+
+def dispatch_pending_alerts(now=None, backends=None, batch_size=None):
+    """
+    Envia os alertas pendentes em lotes (um resumo por lote e backend).
+
+    Alertas mais novos que STOCK_ALERT_BATCH_DELAY_SECONDS esperam a próxima
+    execução para agrupar rajadas. Os lotes são travados com SKIP LOCKED
+    (quando suportado), permitindo mais de um despachante. Se algum backend
+    falhar o lote continua pendente e é reenviado na próxima execução.
+
+    Returns:
+        dict: {'sent': alertas enviados, 'failed': alertas com falha, 'batches': lotes}
+    """
+    now = now or timezone.now()
+    backends = get_backends() if backends is None else backends
+    batch_size = batch_size or settings.STOCK_ALERT_BATCH_SIZE
+    cutoff = now - timedelta(seconds=settings.STOCK_ALERT_BATCH_DELAY_SECONDS)
+    counts = {'sent': 0, 'failed': 0, 'batches': 0}
+    last_id = 0
+
+    while True:
+        with transaction.atomic():
+            batch = list(
+                StockAlert.objects.select_for_update(skip_locked=True, of=('self',))
+                .filter(dispatched_at__isnull=True, created_at__lte=cutoff, pk__gt=last_id)
+                .select_related('product')
+                .order_by('pk')[:batch_size]
+            )
+            if not batch:
+                return counts
+            last_id = batch[-1].pk
+            ids = [alert.pk for alert in batch]
+
+            errors = []
+            for backend in backends:
+                try:
+                    backend.send(batch)
+                except Exception as exc:
+                    errors.append(f"{type(backend).__name__}: {exc}")
+
+            pending = StockAlert.objects.filter(pk__in=ids)
+            if errors:
+                pending.update(attempts=F('attempts') + 1, last_error="\n".join(errors))
+                counts['failed'] += len(batch)
+            else:
+                pending.update(dispatched_at=now, last_error='')
+                counts['sent'] += len(batch)
+            counts['batches'] += 1
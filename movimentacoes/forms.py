@@ -7,8 +7,9 @@ from django import forms
 from django.core.exceptions import ValidationError
 from decimal import Decimal
 
-from .models import InventoryMovement
+from .models import InventoryMovement, StockBalance, Warehouse
 from produtos.models import Product
+from produtos.widgets import ProductChoiceField, ProductPickerWidget
 
 
 class InventoryMovementForm(forms.ModelForm):
@@ -17,20 +18,29 @@ class InventoryMovementForm(forms.ModelForm):
     Inclui validações de negócio e widgets responsivos.
     """
 
+    # Busca paginada: o select não carrega o catálogo; o pk enviado é
+    # validado no queryset (uma query)
+    product = ProductChoiceField(
+        queryset=Product.objects.filter(is_active=True).select_related('category', 'unit'),
+        widget=ProductPickerWidget(attrs={
+            'class': 'form-select',
+            'required': True,
+            'onchange': 'updateProductInfo(this.value)'
+        }),
+    )
+
     class Meta:
         model = InventoryMovement
-        fields = ['product', 'type', 'quantity', 'document', 'notes']
+        fields = ['product', 'type', 'warehouse', 'quantity', 'unit_cost', 'document', 'notes']
         widgets = {
-            'product': forms.Select(attrs={
-                'class': 'form-select',
-                'required': True,
-                'onchange': 'updateProductInfo(this.value)'
-            }),
             'type': forms.Select(attrs={
                 'class': 'form-select',
                 'required': True,
                 'onchange': 'updateFormBehavior(this.value)'
             }),
+            'warehouse': forms.Select(attrs={
+                'class': 'form-select',
+            }),
             'quantity': forms.NumberInput(attrs={
                 'class': 'form-control',
                 'step': '0.01',
@@ -38,6 +48,12 @@ class InventoryMovementForm(forms.ModelForm):
                 'required': True,
                 'placeholder': 'Ex: 10.50'
             }),
+            'unit_cost': forms.NumberInput(attrs={
+                'class': 'form-control',
+                'step': '0.0001',
+                'min': '0',
+                'placeholder': 'Ex: 12.3456'
+            }),
             'document': forms.TextInput(attrs={
                 'class': 'form-control',
                 'placeholder': 'Ex: NF-123456, CF-e 789',
@@ -53,23 +69,24 @@ class InventoryMovementForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         
-        # Customizar queryset de produtos (apenas ativos)
-        self.fields['product'].queryset = Product.objects.filter(
-            is_active=True
-        ).select_related('category', 'unit').order_by('name')
+        # Transferências são lançadas em pares pela API, não pelo form
+        self.fields['type'].choices = InventoryMovement.MANUAL_TYPE_CHOICES
         
-        # Adicionar empty_label
-        self.fields['product'].empty_label = "Selecione um produto..."
+        self.fields['warehouse'].queryset = Warehouse.objects.filter(is_active=True)
+        self.fields['warehouse'].empty_label = "Sem depósito (estoque geral)"
         
         # Labels personalizadas
         self.fields['product'].label = "Produto"
         self.fields['type'].label = "Tipo de Movimentação"
+        self.fields['warehouse'].label = "Depósito (opcional)"
         self.fields['quantity'].label = "Quantidade"
+        self.fields['unit_cost'].label = "Custo Unitário (opcional)"
         self.fields['document'].label = "Documento (opcional)"
         self.fields['notes'].label = "Observações (opcional)"
         
         # Help texts
         self.fields['quantity'].help_text = "Quantidade a ser movimentada"
+        self.fields['unit_cost'].help_text = "Apenas entradas: custo de aquisição (padrão: preço unitário do produto)"
         self.fields['document'].help_text = "Número da NF, CF-e ou outro documento de referência"
         self.fields['notes'].help_text = "Informações adicionais sobre esta movimentação"
 
@@ -78,15 +95,18 @@ class InventoryMovementForm(forms.ModelForm):
         quantity = self.cleaned_data.get('quantity')
         movement_type = self.cleaned_data.get('type')
         product = self.cleaned_data.get('product')
+        warehouse = self.cleaned_data.get('warehouse')
         
         if not quantity or quantity <= 0:
             raise ValidationError("A quantidade deve ser maior que zero.")
         
-        if movement_type == InventoryMovement.SAIDA and product:
+        # Saídas com depósito são conferidas com o saldo do depósito (clean)
+        if movement_type == InventoryMovement.SAIDA and product and not warehouse:
             # Verificar se há estoque suficiente para saída
-            if quantity > product.current_stock:
+            available = product.available_stock
+            if quantity > available:
                 raise ValidationError(
-                    f"Estoque insuficiente. Disponível: {product.current_stock} {product.unit.name}"
+                    f"Estoque insuficiente. Disponível: {available} {product.unit.name}"
                 )
         
         return quantity
@@ -101,6 +121,21 @@ class InventoryMovementForm(forms.ModelForm):
         if not all([movement_type, product, quantity]):
             return cleaned_data
         
+        if cleaned_data.get('unit_cost') is not None and movement_type != InventoryMovement.ENTRADA:
+            raise ValidationError({
+                'unit_cost': "O custo unitário só pode ser informado em entradas; saídas e ajustes usam o custo apurado."
+            })
+        
+        warehouse = cleaned_data.get('warehouse')
+        if warehouse and movement_type == InventoryMovement.SAIDA:
+            available = StockBalance.objects.filter(
+                product=product, warehouse=warehouse
+            ).values_list('quantity', flat=True).first() or Decimal('0.00')
+            if quantity > available:
+                raise ValidationError({
+                    'quantity': f"Estoque insuficiente no depósito {warehouse.name}. Disponível: {available}"
+                })
+        
         # Validações específicas por tipo
         if movement_type == InventoryMovement.AJUSTE:
             # Para ajustes, a quantidade não pode ser negativa
@@ -187,7 +222,7 @@ class BulkMovementForm(forms.Form):
     """
     
     type = forms.ChoiceField(
-        choices=InventoryMovement.TYPE_CHOICES,
+        choices=InventoryMovement.MANUAL_TYPE_CHOICES,
         widget=forms.Select(attrs={
             'class': 'form-select',
             'required': True
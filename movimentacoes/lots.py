@@ -0,0 +1,117 @@
+"""
+Rastreio de lotes e alocação FEFO (first expired, first out).
+
+Saídas são distribuídas entre os lotes do produto começando pelo que vence
+primeiro. Os lotes com saldo são lidos com uma única query travada
+(``SELECT ... FOR UPDATE``) que usa o índice parcial ``stock_lot_fefo_idx``;
+os saldos são gravados com um ``bulk_update`` e as alocações com um
+``bulk_create``.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from produtos.expiry import (
+    ATENCAO, CRITICO, FUTURO, VENCIDO, WARNING_DAYS, expiry_bucket_expression,
+)
+
+from .models import LotAllocation, StockLot
+
+
+# Lotes sem validade são consumidos por último; empate pela data de entrada
+FEFO_ORDERING = [F('expiry_date').asc(nulls_last=True), 'created_at', 'pk']
+
+
+def receive_into_lot(lot_id, quantity):
+    """Soma a quantidade recebida ao saldo do lote (UPDATE atômico)."""
+    StockLot.objects.filter(pk=lot_id).update(
+        quantity=F('quantity') + quantity,
+        updated_at=timezone.now(),
+    )
+
+
+def allocate_fefo(movement, quantity):
+    """
+    Consome ``quantity`` dos lotes do produto da movimentação em ordem FEFO.
+
+    Deve rodar dentro da transação da movimentação. Se os lotes não cobrem a
+    quantidade, o restante sai do estoque sem lote (o saldo do produto já
+    foi validado pela movimentação).
+
+    Returns:
+        list[LotAllocation]: Alocações criadas, na ordem de consumo.
+    """
+    lots = StockLot.objects.select_for_update().filter(
+        product_id=movement.product_id,
+        quantity__gt=0,
+    ).order_by(*FEFO_ORDERING)
+
+    remaining = Decimal(quantity)
+    now = timezone.now()
+    touched = []
+    allocations = []
+    for lot in lots:
+        if remaining <= 0:
+            break
+        taken = min(lot.quantity, remaining)
+        lot.quantity -= taken
+        lot.updated_at = now
+        remaining -= taken
+        touched.append(lot)
+        allocations.append(LotAllocation(movement=movement, lot=lot, quantity=taken))
+
+    if touched:
+        StockLot.objects.bulk_update(touched, ['quantity', 'updated_at'])
+        LotAllocation.objects.bulk_create(allocations)
+    return allocations
+
+
+def lot_balance(product):
+    """Soma dos saldos dos lotes do produto."""
+    total = StockLot.objects.filter(product=product, quantity__gt=0).aggregate(
+        total=Sum('quantity')
+    )['total']
+    return total or Decimal('0.00')
+
+
+def get_lot_expiry_calendar(days_ahead=WARNING_DAYS, include_expired=True, today=None):
+    """
+    Lotes com saldo que vencem até ``today + days_ahead``, por urgência.
+
+    Mesma estrutura de ``produtos.expiry.get_expiry_calendar``, mas em
+    granularidade de lote (usa o índice parcial ``stock_lot_expiry_idx``).
+    """
+    today = today or timezone.localdate()
+    queryset = StockLot.objects.filter(
+        quantity__gt=0,
+        expiry_date__lte=today + timedelta(days=days_ahead),
+        product__is_active=True,
+    ).select_related('product', 'product__unit')
+    if not include_expired:
+        queryset = queryset.filter(expiry_date__gte=today)
+
+    lots = list(
+        queryset.annotate(expiry_bucket=expiry_bucket_expression(today))
+        .order_by('expiry_date', 'product__name', 'lot_number')
+    )
+
+    buckets = {VENCIDO: [], CRITICO: [], ATENCAO: [], FUTURO: []}
+    for lot in lots:
+        buckets[lot.expiry_bucket].append(lot)
+    warning = buckets[ATENCAO] + buckets[FUTURO]
+
+    return {
+        'lots': lots,
+        'expired': buckets[VENCIDO],
+        'critical': buckets[CRITICO],
+        'warning': warning,
+        'stats': {
+            'total': len(lots),
+            'expired_count': len(buckets[VENCIDO]),
+            'critical_count': len(buckets[CRITICO]),
+            'warning_count': len(warning),
+            'quantity': sum((lot.quantity for lot in lots), Decimal('0.00')),
+        },
+    }
@@ -0,0 +1,51 @@
+"""
+Aplica as variações de estoque pendentes (ver movimentacoes/stock_journal.py).
+Uso: python manage.py apply_stock_deltas [--loop] [--interval 5] [--sku SKU ...]
+
+Sem --loop aplica uma vez (cron, ex: a cada minuto); com --loop roda como
+worker (processo "stock" do Procfile). As variações já são aplicadas após o
+commit de cada movimentação; o worker aplica as que ficarem para trás.
+Atualiza current_stock/stock_status e a valoração dos produtos com
+movimentações em depósito ou fragmentados.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from produtos.models import Product
+from movimentacoes.stock_journal import apply_all_pending
+
+
+class Command(BaseCommand):
+    help = 'Aplica as variações de estoque pendentes ao total e à valoração dos produtos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Roda continuamente (worker)'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Segundos entre execuções com --loop (padrão: 5)'
+        )
+        parser.add_argument(
+            '--sku',
+            nargs='+',
+            help='Restringe a produtos específicos'
+        )
+
+    def handle(self, *args, **options):
+        product_ids = None
+        if options['sku']:
+            product_ids = list(Product.objects.filter(sku__in=options['sku']).values_list('pk', flat=True))
+
+        while True:
+            count = apply_all_pending(product_ids)
+            if count or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(f"{count} produto(s) atualizado(s)."))
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,148 @@
+"""
+Benchmark de contenção: saídas concorrentes em um único SKU.
+
+Compara o contador único (lock na linha do produto) com o contador
+fragmentado, variando o número de escritores concorrentes.
+Uso: python manage.py benchmark_stock_contention --writers 1,2,4,8,16 --ops 400 --shards 16
+
+Os números só são representativos em PostgreSQL: o SQLite serializa todas as
+escritas no arquivo inteiro.
+"""
+import threading
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection
+
+from movimentacoes.models import InventoryMovement
+from produtos.models import Category, Product, Unit
+from produtos.stock_shards import disable_sharding, enable_sharding
+
+BENCH_SKU = 'BENCH-CONTENTION'
+
+
+class Command(BaseCommand):
+    help = 'Mede a vazão de saídas concorrentes em um SKU (contador único x fragmentado)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--writers',
+            default='1,2,4,8,16',
+            help='Quantidades de escritores concorrentes, separadas por vírgula (padrão: 1,2,4,8,16)'
+        )
+        parser.add_argument(
+            '--ops',
+            type=int,
+            default=400,
+            help='Saídas por rodada, divididas entre os escritores (padrão: 400)'
+        )
+        parser.add_argument(
+            '--shards',
+            type=int,
+            default=16,
+            help='Fragmentos no modo fragmentado (padrão: 16)'
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Mantém o produto e as movimentações do benchmark'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            writer_counts = [int(w) for w in options['writers'].split(',') if w.strip()]
+        except ValueError:
+            raise CommandError('--writers deve ser uma lista de inteiros (ex: 1,2,4,8).')
+        if connection.vendor != 'postgresql':
+            self.stdout.write(self.style.WARNING(
+                f'Banco {connection.vendor}: escritas serializadas, resultados não representativos.'
+            ))
+
+        product, user = self._setup()
+        ops = options['ops']
+        results = []
+        try:
+            for mode in ('single', 'sharded'):
+                for writers in writer_counts:
+                    self._reset(product, ops, options['shards'] if mode == 'sharded' else 0)
+                    elapsed, done, errors = self._run(product.pk, user, writers, ops)
+                    results.append((mode, writers, done, errors, elapsed))
+        finally:
+            if not options['keep']:
+                self._cleanup(product)
+
+        self.stdout.write(f"{'modo':<10}{'escritores':>11}{'saídas':>9}{'erros':>7}{'tempo (s)':>11}{'ops/s':>10}")
+        baseline = {}
+        for mode, writers, done, errors, elapsed in results:
+            rate = done / elapsed if elapsed else 0
+            baseline.setdefault(mode, rate)
+            scale = rate / baseline[mode] if baseline[mode] else 0
+            self.stdout.write(
+                f"{mode:<10}{writers:>11}{done:>9}{errors:>7}{elapsed:>11.2f}{rate:>10.1f}  (x{scale:.2f})"
+            )
+
+    def _setup(self):
+        User = get_user_model()
+        user = User.objects.filter(is_superuser=True).first()
+        if user is None:
+            user, _ = User.objects.get_or_create(username='benchmark')
+        category, _ = Category.objects.get_or_create(name='Benchmark')
+        unit, _ = Unit.objects.get_or_create(name='UN', defaults={'description': 'Unidade'})
+        product, _ = Product.objects.get_or_create(
+            sku=BENCH_SKU,
+            defaults={'name': 'Produto de benchmark', 'category': category, 'unit': unit},
+        )
+        return product, user
+
+    def _reset(self, product, ops, shards):
+        disable_sharding(product)
+        Product.objects.filter(pk=product.pk).update(current_stock=Decimal(ops))
+        product.current_stock = Decimal(ops)
+        if shards:
+            enable_sharding(product, shards)
+
+    def _run(self, product_id, user, writers, ops):
+        per_writer = [ops // writers + (1 if i < ops % writers else 0) for i in range(writers)]
+        counters = {'done': 0, 'errors': 0}
+        lock = threading.Lock()
+        barrier = threading.Barrier(writers + 1)
+
+        def worker(count):
+            done = errors = 0
+            try:
+                try:
+                    product = Product.objects.select_related('unit').get(pk=product_id)
+                except Exception:
+                    barrier.abort()
+                    raise
+                barrier.wait()
+                for _ in range(count):
+                    try:
+                        InventoryMovement.objects.create(
+                            product=product, type=InventoryMovement.SAIDA,
+                            quantity=Decimal('1'), user=user, document='BENCH',
+                        )
+                        done += 1
+                    except (DatabaseError, ValidationError):
+                        errors += 1
+            finally:
+                with lock:
+                    counters['done'] += done
+                    counters['errors'] += errors
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(count,)) for count in per_writer]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - start, counters['done'], counters['errors']
+
+    def _cleanup(self, product):
+        InventoryMovement.objects.filter(product=product).delete()
+        Product.objects.filter(pk=product.pk).delete()
@@ -0,0 +1,49 @@
+"""
+Envia os alertas de estoque baixo/crítico pendentes em lotes.
+Uso: python manage.py dispatch_stock_alerts [--loop] [--interval 30] [--batch-size 500]
+
+Sem --loop processa os pendentes uma vez (cron); com --loop roda como
+worker. Os backends vêm de settings.STOCK_ALERT_BACKENDS.
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from movimentacoes.alerts import dispatch_pending_alerts, get_backends
+
+
+class Command(BaseCommand):
+    help = 'Envia os alertas de estoque pendentes (um resumo por lote)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Roda continuamente (worker)'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=30,
+            help='Segundos entre execuções com --loop (padrão: 30)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.STOCK_ALERT_BATCH_SIZE,
+            help=f'Alertas por resumo (padrão: {settings.STOCK_ALERT_BATCH_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        backends = get_backends()
+        while True:
+            counts = dispatch_pending_alerts(backends=backends, batch_size=options['batch_size'])
+            if counts['batches'] or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(
+                    f"{counts['sent']} alerta(s) enviado(s) em {counts['batches']} lote(s)"
+                    + (f", {counts['failed']} com falha." if counts['failed'] else ".")
+                ))
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,144 @@
+"""
+Gera um volume grande de dados sintéticos para testes de carga.
+
+Catálogo (SYN-000001...), categorias e usuários são criados em lote; as
+movimentações são calculadas em memória por produto (cadeia de saldos
+consistente, em ordem de data) e gravadas sem passar por ``save`` (COPY no
+PostgreSQL). Mesma semente, mesmos dados.
+Uso: python manage.py generate_load_data --products 100000 --movements 5000000
+     [--categories 50] [--users 50] [--days 730] [--seed 42] [--workers 4] [--batch-size 10000]
+
+Com --workers > 1 cada processo grava uma faixa de produtos (só no
+PostgreSQL; no SQLite as escritas são serializadas). Uma faixa pode ser
+rodada à mão com --shard 2/4 (mesmos parâmetros e --until em todas).
+
+Não gera lotes, custos nem eventos/alertas; para a valoração rode depois
+``manage.py recompute_valuation``.
+"""
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from movimentacoes.models import InventoryMovement
+from movimentacoes.synthetic import (
+    LOAD_BATCH_SIZE, SKU_PREFIX, generate_movements, movement_counts, seed_catalog, seed_users,
+)
+from produtos.models import Product
+
+
+def _shard(value):
+    try:
+        index, total = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise CommandError('--shard deve ter o formato N/TOTAL (ex: 1/4).')
+    if not 1 <= index <= total:
+        raise CommandError('--shard fora do intervalo (1 <= N <= TOTAL).')
+    return index, total
+
+
+class Command(BaseCommand):
+    help = 'Gera catálogo, usuários e milhões de movimentações sintéticas em lote'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=10000, help='Produtos (padrão: 10000)')
+        parser.add_argument('--categories', type=int, default=50, help='Categorias (padrão: 50)')
+        parser.add_argument('--users', type=int, default=50, help='Usuários responsáveis (padrão: 50)')
+        parser.add_argument('--movements', type=int, default=1000000, help='Movimentações (padrão: 1000000)')
+        parser.add_argument('--days', type=int, default=730, help='Período em dias (padrão: 730)')
+        parser.add_argument('--seed', type=int, default=42, help='Semente (padrão: 42)')
+        parser.add_argument('--workers', type=int, default=1, help='Processos paralelos (padrão: 1)')
+        parser.add_argument('--batch-size', type=int, default=LOAD_BATCH_SIZE, help=f'Linhas por lote (padrão: {LOAD_BATCH_SIZE})')
+        parser.add_argument('--until', help='Fim do período em ISO 8601 (padrão: agora)')
+        parser.add_argument('--shard', type=_shard, help='Grava só a faixa N/TOTAL dos produtos (catálogo já criado)')
+
+    def handle(self, *args, **options):
+        until = self._until(options['until'])
+        start = time.monotonic()
+
+        if options['shard']:
+            index, total = options['shard']
+            written = self.generate(options, until, index, total)
+            self.stdout.write(f"Faixa {index}/{total}: {written} movimentações.")
+            return
+
+        if InventoryMovement.objects.filter(product__sku__startswith=f"{SKU_PREFIX}-").exists():
+            raise CommandError(
+                'Já existem movimentações para o catálogo sintético; use um banco limpo '
+                '(os saldos são calculados a partir de zero).'
+            )
+
+        seed_catalog(options['products'], options['categories'], random.Random(options['seed']))
+        seed_users(options['users'])
+        self.stdout.write(f"Catálogo: {options['products']} produtos, {options['users']} usuários.")
+
+        workers = options['workers']
+        if workers > 1 and connection.vendor == 'sqlite':
+            self.stdout.write(self.style.WARNING('SQLite serializa as escritas: usando 1 processo.'))
+            workers = 1
+
+        if workers == 1:
+            written = self.generate(options, until, 1, 1)
+        else:
+            written = self.run_workers(options, until, workers)
+
+        elapsed = time.monotonic() - start
+        rate = written / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"{written} movimentações em {elapsed:.1f}s ({rate:,.0f}/s)."
+        ))
+
+    def _until(self, value):
+        if not value:
+            return timezone.now()
+        try:
+            moment = datetime.fromisoformat(value)
+        except ValueError:
+            raise CommandError('--until deve estar em ISO 8601 (ex: 2026-01-31T23:59:59).')
+        return moment if timezone.is_aware(moment) else timezone.make_aware(moment)
+
+    def generate(self, options, until, index, total):
+        """Grava as movimentações da faixa ``index``/``total`` dos produtos."""
+        product_ids = list(
+            Product.objects.filter(sku__startswith=f"{SKU_PREFIX}-")
+            .order_by('pk').values_list('pk', flat=True)[:options['products']]
+        )
+        counts = movement_counts(len(product_ids), options['movements'], options['seed'])
+        user_ids = seed_users(options['users'])
+        size = len(product_ids)
+        first, last = size * (index - 1) // total, size * index // total
+        products = list(enumerate(product_ids))[first:last]
+
+        def progress(written):
+            if options['verbosity'] > 1:
+                self.stdout.write(f"  [{index}/{total}] {written} movimentações...")
+
+        return generate_movements(
+            products, counts, user_ids, options['days'], options['seed'], until=until,
+            batch_size=options['batch_size'], on_batch=progress,
+        )
+
+    def run_workers(self, options, until, workers):
+        """Uma chamada ``--shard i/N`` deste comando por processo."""
+        base = [
+            sys.executable, os.path.join(settings.BASE_DIR, 'manage.py'), 'generate_load_data',
+            '--until', until.isoformat(),
+            '--verbosity', str(options['verbosity']),
+        ]
+        for name in ('products', 'users', 'movements', 'days', 'seed', 'batch_size'):
+            base += [f"--{name.replace('_', '-')}", str(options[name])]
+        processes = [
+            subprocess.Popen(base + ['--shard', f"{index}/{workers}"])
+            for index in range(1, workers + 1)
+        ]
+        failed = [process.args[-1] for process in processes if process.wait() != 0]
+        if failed:
+            raise CommandError(f"Falha nas faixas: {', '.join(failed)}")
+        return InventoryMovement.objects.filter(product__sku__startswith=f"{SKU_PREFIX}-").count()
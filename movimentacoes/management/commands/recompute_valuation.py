@@ -0,0 +1,74 @@
+"""
+Reconstrói a valoração do estoque (custos das movimentações, camadas FIFO e
+custo corrente por produto) reprocessando o razão em streaming.
+Uso: python manage.py recompute_valuation [--method AVG|FIFO] [--sku SKU ...] [--batch-size 5000]
+
+Necessário ao trocar settings.STOCK_VALUATION_METHOD ou para valorar
+movimentações anteriores à valoração. Rode sem movimentações concorrentes.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from movimentacoes.valuation import (
+    AVERAGE, FIFO, RECOMPUTE_BATCH_SIZE, recompute_valuation, valuation_method,
+)
+from produtos.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Reprocessa o razão de movimentações e reconstrói a valoração a custo (médio/FIFO)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--method',
+            choices=[AVERAGE, FIFO],
+            help='Método de custeio (padrão: settings.STOCK_VALUATION_METHOD)'
+        )
+        parser.add_argument(
+            '--sku',
+            nargs='+',
+            help='Reprocessa apenas os produtos informados'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=RECOMPUTE_BATCH_SIZE,
+            help=f'Linhas por leitura/gravação (padrão: {RECOMPUTE_BATCH_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        method = options['method'] or valuation_method()
+        if method != valuation_method():
+            self.stdout.write(self.style.WARNING(
+                f"Método {method} difere de settings.STOCK_VALUATION_METHOD ({valuation_method()}); "
+                f"novas movimentações continuarão usando o método configurado."
+            ))
+
+        product_ids = None
+        if options['sku']:
+            found = dict(Product.objects.filter(sku__in=options['sku']).values_list('sku', 'pk'))
+            missing = sorted(set(options['sku']) - set(found))
+            if missing:
+                raise CommandError(f"Produto(s) não encontrado(s): {', '.join(missing)}")
+            product_ids = list(found.values())
+
+        start = time.monotonic()
+
+        def progress(processed):
+            if options['verbosity'] > 1:
+                self.stdout.write(f"  {processed} movimentações...")
+
+        counts = recompute_valuation(
+            method=method,
+            product_ids=product_ids,
+            batch_size=options['batch_size'],
+            progress=progress,
+        )
+        elapsed = time.monotonic() - start
+        rate = counts['movements'] / elapsed * 60 if elapsed else 0
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Valoração {method}: {counts['movements']} movimentações de {counts['products']} "
+            f"produto(s), {counts['layers']} camada(s) em {elapsed:.1f}s ({rate:,.0f}/min)."
+        ))
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:26
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movimentacoes', '0002_rename_movimentaco_product_9c525e_idx_inv_mov_prod_date_idx_and_more'),
+        ('produtos', '0003_product_active_expiry_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockLot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+                ('lot_number', models.CharField(max_length=50, verbose_name='Número do Lote')),
+                ('expiry_date', models.DateField(blank=True, null=True, verbose_name='Data de Validade')),
+                ('quantity', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=10, verbose_name='Saldo')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='lots', to='produtos.product', verbose_name='Produto')),
+            ],
+            options={
+                'verbose_name': 'Lote',
+                'verbose_name_plural': 'Lotes',
+                'ordering': ['product', 'expiry_date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='LotAllocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Quantidade')),
+                ('movement', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lot_allocations', to='movimentacoes.inventorymovement', verbose_name='Movimentação')),
+                ('lot', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='allocations', to='movimentacoes.stocklot', verbose_name='Lote')),
+            ],
+            options={
+                'verbose_name': 'Alocação de Lote',
+                'verbose_name_plural': 'Alocações de Lote',
+                'ordering': ['id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='inventorymovement',
+            name='lot',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='receipts', to='movimentacoes.stocklot', verbose_name='Lote'),
+        ),
+        migrations.AddIndex(
+            model_name='stocklot',
+            index=models.Index(condition=models.Q(('quantity__gt', 0)), fields=['product', 'expiry_date'], name='stock_lot_fefo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stocklot',
+            index=models.Index(condition=models.Q(('expiry_date__isnull', False), ('quantity__gt', 0)), fields=['expiry_date'], name='stock_lot_expiry_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='stocklot',
+            constraint=models.UniqueConstraint(fields=('product', 'lot_number'), name='stock_lot_product_number_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='stocklot',
+            constraint=models.CheckConstraint(condition=models.Q(('quantity__gte', 0)), name='stock_lot_quantity_gte_0'),
+        ),
+    ]
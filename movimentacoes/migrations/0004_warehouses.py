@@ -0,0 +1,81 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:29
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movimentacoes', '0003_stock_lots'),
+        ('produtos', '0003_product_active_expiry_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Warehouse',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+                ('code', models.CharField(max_length=20, unique=True, verbose_name='Código')),
+                ('name', models.CharField(max_length=100, verbose_name='Nome')),
+                ('address', models.CharField(blank=True, max_length=255, verbose_name='Endereço')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Ativo')),
+            ],
+            options={
+                'verbose_name': 'Depósito',
+                'verbose_name_plural': 'Depósitos',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='inventorymovement',
+            name='transfer_pair',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='movimentacoes.inventorymovement', verbose_name='Transferência Relacionada'),
+        ),
+        migrations.AlterField(
+            model_name='inventorymovement',
+            name='type',
+            field=models.CharField(choices=[('ENTRADA', 'Entrada'), ('SAIDA', 'Saída'), ('AJUSTE', 'Ajuste'), ('TRANSF_OUT', 'Transferência (saída)'), ('TRANSF_IN', 'Transferência (entrada)')], max_length=10, verbose_name='Tipo'),
+        ),
+        migrations.CreateModel(
+            name='StockBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=10, verbose_name='Saldo')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='balances', to='produtos.product', verbose_name='Produto')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='balances', to='movimentacoes.warehouse', verbose_name='Depósito')),
+            ],
+            options={
+                'verbose_name': 'Saldo por Depósito',
+                'verbose_name_plural': 'Saldos por Depósito',
+                'ordering': ['warehouse', 'product'],
+            },
+        ),
+        migrations.AddField(
+            model_name='inventorymovement',
+            name='warehouse',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='movements', to='movimentacoes.warehouse', verbose_name='Depósito'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorymovement',
+            index=models.Index(fields=['warehouse', '-created_at'], name='inv_mov_wh_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockbalance',
+            index=models.Index(fields=['warehouse', 'product'], name='stock_balance_wh_product_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='stockbalance',
+            constraint=models.UniqueConstraint(fields=('product', 'warehouse'), name='stock_balance_product_wh_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='stockbalance',
+            constraint=models.CheckConstraint(condition=models.Q(('quantity__gte', 0)), name='stock_balance_quantity_gte_0'),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:46
+
+import django.core.validators
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movimentacoes', '0004_warehouses'),
+        ('produtos', '0005_stock_forecast'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockValuation',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='valuation', serialize=False, to='produtos.product', verbose_name='Produto')),
+                ('quantity', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12, verbose_name='Quantidade Valorada')),
+                ('total_value', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16, verbose_name='Valor de Custo')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+            ],
+            options={
+                'verbose_name': 'Valoração de Estoque',
+                'verbose_name_plural': 'Valorações de Estoque',
+            },
+        ),
+        migrations.AddField(
+            model_name='inventorymovement',
+            name='total_cost',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=16, null=True, verbose_name='Custo Total'),
+        ),
+        migrations.AddField(
+            model_name='inventorymovement',
+            name='unit_cost',
+            field=models.DecimalField(blank=True, decimal_places=4, help_text='Entradas: custo de aquisição (padrão: preço unitário). Saídas: custo apurado.', max_digits=12, null=True, validators=[django.core.validators.MinValueValidator(Decimal('0.00'))], verbose_name='Custo Unitário'),
+        ),
+        migrations.AddField(
+            model_name='inventorymovement',
+            name='value_after',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=16, null=True, verbose_name='Valor do Estoque Posterior'),
+        ),
+        migrations.AddField(
+            model_name='inventorymovement',
+            name='value_before',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=16, null=True, verbose_name='Valor do Estoque Anterior'),
+        ),
+        migrations.CreateModel(
+            name='CostLayer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('received_at', models.DateTimeField(verbose_name='Recebido em')),
+                ('quantity', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='Quantidade')),
+                ('remaining', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='Saldo')),
+                ('unit_cost', models.DecimalField(decimal_places=4, max_digits=12, verbose_name='Custo Unitário')),
+                ('movement', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='cost_layers', to='movimentacoes.inventorymovement', verbose_name='Movimentação')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cost_layers', to='produtos.product', verbose_name='Produto')),
+            ],
+            options={
+                'verbose_name': 'Camada de Custo',
+                'verbose_name_plural': 'Camadas de Custo',
+                'ordering': ['product', 'received_at', 'id'],
+                'indexes': [models.Index(condition=models.Q(('remaining__gt', 0)), fields=['product', 'received_at', 'id'], name='cost_layer_fifo_idx')],
+                'constraints': [models.CheckConstraint(condition=models.Q(('remaining__gte', 0)), name='cost_layer_remaining_gte_0')],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movimentacoes', '0005_stock_valuation'),
+        ('produtos', '0005_stock_forecast'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+                ('level', models.CharField(choices=[('CRITICO', 'Crítico'), ('BAIXO', 'Baixo')], max_length=10, verbose_name='Nível')),
+                ('window_start', models.DateTimeField(verbose_name='Início da Janela')),
+                ('stock_level', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='Estoque no Alerta')),
+                ('min_stock', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='Estoque Mínimo')),
+                ('occurrences', models.PositiveIntegerField(default=1, verbose_name='Ocorrências')),
+                ('dispatched_at', models.DateTimeField(blank=True, null=True, verbose_name='Enviado em')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Tentativas')),
+                ('last_error', models.TextField(blank=True, verbose_name='Último Erro')),
+                ('movement', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_alerts', to='movimentacoes.inventorymovement', verbose_name='Movimentação')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_alerts', to='produtos.product', verbose_name='Produto')),
+            ],
+            options={
+                'verbose_name': 'Alerta de Estoque',
+                'verbose_name_plural': 'Alertas de Estoque',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(condition=models.Q(('dispatched_at__isnull', True)), fields=['created_at'], name='stock_alert_pending_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'level', 'window_start'), name='stock_alert_product_window_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movimentacoes', '0006_stock_alerts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScannerDevice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+                ('device_id', models.CharField(max_length=100, unique=True, verbose_name='Identificador do Coletor')),
+                ('last_seq', models.BigIntegerField(default=0, verbose_name='Última Sequência')),
+                ('cursor', models.BigIntegerField(default=0, verbose_name='Cursor de Sincronização')),
+                ('last_sync_at', models.DateTimeField(blank=True, null=True, verbose_name='Última Sincronização')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='scanner_devices', to=settings.AUTH_USER_MODEL, verbose_name='Último Usuário')),
+            ],
+            options={
+                'verbose_name': 'Coletor',
+                'verbose_name_plural': 'Coletores',
+                'ordering': ['device_id'],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movimentacoes', '0007_scanner_device'),
+        ('produtos', '0005_stock_forecast'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingStockDelta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delta', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='Variação')),
+                ('movement', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='pending_delta', to='movimentacoes.inventorymovement', verbose_name='Movimentação')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pending_deltas', to='produtos.product', verbose_name='Produto')),
+            ],
+            options={
+                'verbose_name': 'Variação de Estoque Pendente',
+                'verbose_name_plural': 'Variações de Estoque Pendentes',
+                'ordering': ['id'],
+            },
+        ),
+    ]
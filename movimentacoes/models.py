@@ -9,6 +9,7 @@ from django.db import transaction
 from decimal import Decimal
 from typing import Any
 
+from core.metrics import MOVEMENT_LOCK_WAIT, MOVEMENT_SAVE
 from core.models import TimeStampedModel
 
 
@@ -22,12 +23,20 @@ class InventoryMovement(TimeStampedModel):
     ENTRADA = 'ENTRADA'
     SAIDA = 'SAIDA'
     AJUSTE = 'AJUSTE'
+    TRANSF_SAIDA = 'TRANSF_OUT'
+    TRANSF_ENTRADA = 'TRANSF_IN'
     
-    TYPE_CHOICES = [
+    # Tipos lançados manualmente (transferências são geradas em pares)
+    MANUAL_TYPE_CHOICES = [
         (ENTRADA, 'Entrada'),
         (SAIDA, 'Saída'),
         (AJUSTE, 'Ajuste'),
     ]
+    TYPE_CHOICES = MANUAL_TYPE_CHOICES + [
+        (TRANSF_SAIDA, 'Transferência (saída)'),
+        (TRANSF_ENTRADA, 'Transferência (entrada)'),
+    ]
+    TRANSFER_TYPES = (TRANSF_SAIDA, TRANSF_ENTRADA)
     
     # Dados da movimentação
     product = models.ForeignKey(
@@ -48,6 +57,35 @@ class InventoryMovement(TimeStampedModel):
         verbose_name="Quantidade"
     )
     
+    # Depósito (vazio = estoque global, sem depósito)
+    warehouse = models.ForeignKey(
+        'movimentacoes.Warehouse',
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='movements',
+        verbose_name="Depósito"
+    )
+    # Perna oposta de uma transferência entre depósitos
+    transfer_pair = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Transferência Relacionada"
+    )
+    
+    # Lote recebido (entradas com rastreio de lote)
+    lot = models.ForeignKey(
+        'movimentacoes.StockLot',
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='receipts',
+        verbose_name="Lote"
+    )
+    
     # Documentação
     document = models.CharField(
         max_length=100,
@@ -81,6 +119,38 @@ class InventoryMovement(TimeStampedModel):
         default=Decimal('0.00'),
         verbose_name="Estoque Posterior"
     )
+    
+    # Valoração (custo médio ou FIFO, ver movimentacoes/valuation.py)
+    unit_cost = models.DecimalField(
+        max_digits=12,
+        decimal_places=4,
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(Decimal('0.00'))],
+        verbose_name="Custo Unitário",
+        help_text="Entradas: custo de aquisição (padrão: preço unitário). Saídas: custo apurado."
+    )
+    total_cost = models.DecimalField(
+        max_digits=16,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        verbose_name="Custo Total"
+    )
+    value_before = models.DecimalField(
+        max_digits=16,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        verbose_name="Valor do Estoque Anterior"
+    )
+    value_after = models.DecimalField(
+        max_digits=16,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        verbose_name="Valor do Estoque Posterior"
+    )
 
     class Meta:
         verbose_name = "Movimentação de Estoque"
@@ -94,6 +164,7 @@ class InventoryMovement(TimeStampedModel):
             models.Index(fields=['product', 'type', '-created_at'], name='inv_mov_prod_type_date_idx'),
             models.Index(fields=['document'], name='inv_mov_document_idx'),
             models.Index(fields=['created_at'], name='inv_mov_created_idx'),
+            models.Index(fields=['warehouse', '-created_at'], name='inv_mov_wh_date_idx'),
         ]
 
     def __str__(self) -> str:
@@ -150,22 +221,225 @@ class InventoryMovement(TimeStampedModel):
             >>> movement = InventoryMovement(product=prod, type='SAIDA', quantity=5)
             >>> movement.save()  # Estoque reduz em 5 unidades
         """
-        with transaction.atomic():
-            # Carrega o produto com lock para evitar race conditions
-            product = self._get_locked_product()
+        adding = self._state.adding
+        with MOVEMENT_SAVE.labels(self.type).time(), transaction.atomic():
+            pending_delta = None
+            if self.warehouse_id:
+                # Trava apenas o saldo (produto, depósito): o total do produto
+                # e a valoração são aplicados após o commit (stock_journal.py)
+                pending_delta = self._update_warehouse_balance()
+                if pending_delta and self.product.stock_shards:
+                    # Produto fragmentado: o total também passa pelos fragmentos
+                    self._update_shards(pending_delta)
+                product_stock = product_totals = None
+            elif self.product.stock_shards:
+                # Produto fragmentado: não trava a linha do produto
+                pending_delta = self._update_sharded_stock()
+                product_stock = product_totals = None
+            else:
+                # Carrega o produto com lock para evitar race conditions
+                with MOVEMENT_LOCK_WAIT.labels('produto').time():
+                    product = self._get_locked_product()
+                
+                # Variações pendentes entram antes (ordem da valoração)
+                if adding:
+                    self._apply_pending_deltas(product)
+                
+                # Registra estoque anterior para auditoria
+                self.stock_before = product.current_stock
+                
+                # Atualiza o estoque baseado no tipo de movimentação
+                self._update_product_stock(product)
+                
+                # Registra estoque posterior para auditoria
+                self.stock_after = product.current_stock
+                
+                # Salva o produto (só o saldo)
+                product.save(update_fields=['current_stock', 'updated_at'])
+                product_stock = product.current_stock
+                product_totals = (self.stock_before, self.stock_after)
             
-            # Registra estoque anterior para auditoria
-            self.stock_before = product.current_stock
-            
-            # Atualiza o estoque baseado no tipo de movimentação
-            self._update_product_stock(product)
-            
-            # Registra estoque posterior para auditoria
-            self.stock_after = product.current_stock
-            
-            # Salva o produto e a movimentação
-            product.save()
+            # Custo da movimentação e valor do estoque antes/depois
+            cost_layer = self._update_valuation() if adding and pending_delta is None else None
             super().save(*args, **kwargs)
+            
+            if adding:
+                if cost_layer is not None:
+                    cost_layer.movement = self
+                    cost_layer.save()
+                if pending_delta:
+                    product_stock = self._record_pending_delta(pending_delta)
+                    product_totals = (product_stock - pending_delta, product_stock)
+                # Reflete a movimentação nos lotes (entrada no lote / saída FEFO)
+                self._update_lots(product_stock)
+                # Alerta de estoque baixo/crítico ao cruzar o mínimo
+                if product_totals is not None:
+                    self._check_stock_alert(*product_totals)
+                # Evento de webhook na mesma transação (outbox)
+                self._publish_event()
+    
+    def _publish_event(self) -> None:
+        """Enfileira o evento movement.created para os webhooks (core/webhooks.py)."""
+        from core.webhooks import MOVEMENT_CREATED, publish
+        
+        publish(MOVEMENT_CREATED, {
+            'id': self.pk,
+            'product_id': self.product_id,
+            'sku': self.product.sku,
+            'type': self.type,
+            'quantity': self.quantity,
+            'stock_before': self.stock_before,
+            'stock_after': self.stock_after,
+            'warehouse_id': self.warehouse_id,
+            'document': self.document,
+            'created_at': self.created_at,
+        })
+    
+    def _check_stock_alert(self, total_before, total_after) -> None:
+        """
+        Registra um alerta se a movimentação piorou o status do estoque.
+        
+        A detecção usa apenas os saldos já calculados e o min_stock do
+        produto em memória; só o cruzamento gera escrita (ver alerts.py).
+        """
+        from .alerts import record_crossing
+        
+        record_crossing(self, total_before, total_after)
+    
+    def _update_valuation(self):
+        """
+        Aplica a movimentação ao custo do produto (ver valuation.py).
+        
+        Returns:
+            CostLayer | None: Camada FIFO da entrada, a gravar após a movimentação.
+        """
+        from .valuation import value_movement
+        
+        return value_movement(self)
+    
+    def _update_sharded_stock(self):
+        """
+        Aplica a movimentação a um produto com contador fragmentado.
+        
+        stock_after é a soma dos fragmentos logo após a alteração (sem lock,
+        pode incluir saídas concorrentes). current_stock do produto recebe a
+        variação pelo compactador (ver stock_journal.py).
+        
+        Returns:
+            Decimal: Variação do total do produto.
+        
+        Raises:
+            ValidationError: Quando a soma dos fragmentos é insuficiente
+        """
+        from produtos.stock_shards import add_stock, set_stock, shard_total, take_stock
+        
+        if self.type == self.ENTRADA:
+            add_stock(self.product, self.quantity)
+            delta = self.quantity
+        elif self.type == self.SAIDA:
+            take_stock(self.product, self.quantity)
+            delta = -self.quantity
+        elif self.type == self.AJUSTE:
+            delta = self.quantity - set_stock(self.product, self.quantity)
+        
+        self.stock_after = shard_total(self.product_id)
+        self.stock_before = self.stock_after - delta
+        return delta
+    
+    def _update_shards(self, delta):
+        """
+        Aplica ao contador fragmentado a variação de uma movimentação com depósito.
+        
+        Raises:
+            ValidationError: Quando a soma dos fragmentos é insuficiente
+        """
+        from produtos.stock_shards import add_stock, take_stock
+        
+        if delta > 0:
+            add_stock(self.product, delta)
+        else:
+            take_stock(self.product, -delta)
+    
+    def _update_warehouse_balance(self):
+        """
+        Aplica a movimentação ao saldo do depósito.
+        
+        stock_before/stock_after registram o saldo do depósito. A linha do
+        produto não é tocada: a variação do total vai para
+        ``PendingStockDelta`` (ver _record_pending_delta).
+        
+        Returns:
+            Decimal: Variação do total do produto (zero em transferências).
+        
+        Raises:
+            ValidationError: Quando o saldo do depósito é insuficiente
+        """
+        from django.core.exceptions import ValidationError
+        from .warehouses import locked_balance
+        
+        with MOVEMENT_LOCK_WAIT.labels('deposito').time():
+            balance = locked_balance(self.product_id, self.warehouse_id)
+        self.stock_before = balance.quantity
+        
+        if self.type in (self.ENTRADA, self.TRANSF_ENTRADA):
+            balance.quantity += self.quantity
+        elif self.type in (self.SAIDA, self.TRANSF_SAIDA):
+            if balance.quantity < self.quantity:
+                raise ValidationError(
+                    f"Estoque insuficiente no depósito {self.warehouse}. "
+                    f"Disponível: {balance.quantity}"
+                )
+            balance.quantity -= self.quantity
+        elif self.type == self.AJUSTE:
+            balance.quantity = self.quantity
+        
+        balance.save(update_fields=['quantity', 'updated_at'])
+        self.stock_after = balance.quantity
+        
+        if self.type in self.TRANSFER_TYPES:
+            return Decimal('0.00')
+        return self.stock_after - self.stock_before
+    
+    def _record_pending_delta(self, delta):
+        """
+        Registra a variação do total, aplicada após o commit (stock_journal.py).
+        
+        Returns:
+            Decimal: Total do produto com as variações pendentes.
+        """
+        from .stock_journal import apply_pending_on_commit, projected_stock
+        
+        PendingStockDelta.objects.create(movement=self, product_id=self.product_id, delta=delta)
+        apply_pending_on_commit(self.product_id)
+        return projected_stock(self.product_id)
+    
+    def _apply_pending_deltas(self, product):
+        """Aplica as variações pendentes do produto travado (ver stock_journal.py)."""
+        from .stock_journal import apply_locked
+        
+        apply_locked(product)
+    
+    def _update_lots(self, product_stock) -> None:
+        """
+        Atualiza o saldo dos lotes do produto.
+        
+        Notes:
+            - ENTRADA com lote: soma a quantidade ao lote
+            - SAIDA: consome os lotes em ordem FEFO (registra LotAllocation)
+            - AJUSTE: se o novo saldo ficou abaixo do total em lotes, consome
+              o excedente em ordem FEFO
+        """
+        from .lots import allocate_fefo, lot_balance, receive_into_lot
+        
+        if self.type == self.ENTRADA:
+            if self.lot_id:
+                receive_into_lot(self.lot_id, self.quantity)
+        elif self.type == self.SAIDA:
+            allocate_fefo(self, self.quantity)
+        elif self.type == self.AJUSTE and product_stock is not None:
+            excess = lot_balance(self.product_id) - product_stock
+            if excess > 0:
+                allocate_fefo(self, excess)
     
     def _get_locked_product(self):
         """
@@ -175,11 +449,14 @@ class InventoryMovement(TimeStampedModel):
             Product: Produto com lock SELECT FOR UPDATE
         
         Notes:
-            - Se a movimentação já existe (tem pk), recarrega do banco
-            - Se é nova, usa a instância já carregada
+            - O saldo é relido do banco com o lock (a instância em memória
+              pode estar defasada) e copiado para self.product
         """
-        if self.pk:
-            return type(self).objects.select_for_update().get(pk=self.product.pk)
+        from produtos.models import Product
+        
+        product = Product.objects.select_for_update().get(pk=self.product_id)
+        # Mantém a instância em memória coerente com o saldo travado
+        self.product.current_stock = product.current_stock
         return self.product
     
     def _update_product_stock(self, product) -> None:
@@ -256,3 +533,454 @@ class StockLocation(TimeStampedModel):
 
     def __str__(self):
         return self.name
+
+
+class StockLot(TimeStampedModel):
+    """
+    Lote de um produto, com validade e saldo próprios.
+    
+    A soma dos saldos dos lotes nunca excede Product.current_stock; a
+    diferença é o estoque sem lote (ex: saldo anterior ao rastreio).
+    """
+    product = models.ForeignKey(
+        'produtos.Product',
+        on_delete=models.PROTECT,
+        related_name='lots',
+        verbose_name="Produto"
+    )
+    lot_number = models.CharField(
+        max_length=50,
+        verbose_name="Número do Lote"
+    )
+    expiry_date = models.DateField(
+        null=True,
+        blank=True,
+        verbose_name="Data de Validade"
+    )
+    quantity = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name="Saldo"
+    )
+
+    class Meta:
+        verbose_name = "Lote"
+        verbose_name_plural = "Lotes"
+        ordering = ['product', 'expiry_date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['product', 'lot_number'],
+                name='stock_lot_product_number_uniq',
+            ),
+            models.CheckConstraint(
+                condition=models.Q(quantity__gte=0),
+                name='stock_lot_quantity_gte_0',
+            ),
+        ]
+        indexes = [
+            # Alocação FEFO: lotes com saldo de um produto, por validade
+            models.Index(
+                fields=['product', 'expiry_date'],
+                condition=models.Q(quantity__gt=0),
+                name='stock_lot_fefo_idx',
+            ),
+            # Calendário de validade por lote
+            models.Index(
+                fields=['expiry_date'],
+                condition=models.Q(quantity__gt=0, expiry_date__isnull=False),
+                name='stock_lot_expiry_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.product.sku} / {self.lot_number}"
+
+
+class LotAllocation(models.Model):
+    """Quantidade de uma movimentação de saída atendida por um lote."""
+    movement = models.ForeignKey(
+        InventoryMovement,
+        on_delete=models.CASCADE,
+        related_name='lot_allocations',
+        verbose_name="Movimentação"
+    )
+    lot = models.ForeignKey(
+        StockLot,
+        on_delete=models.PROTECT,
+        related_name='allocations',
+        verbose_name="Lote"
+    )
+    quantity = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        verbose_name="Quantidade"
+    )
+
+    class Meta:
+        verbose_name = "Alocação de Lote"
+        verbose_name_plural = "Alocações de Lote"
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.lot} — {self.quantity}"
+
+
+class Warehouse(TimeStampedModel):
+    """Depósito (unidade física com saldo próprio por produto)."""
+    code = models.CharField(
+        max_length=20,
+        unique=True,
+        verbose_name="Código"
+    )
+    name = models.CharField(
+        max_length=100,
+        verbose_name="Nome"
+    )
+    address = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name="Endereço"
+    )
+    is_active = models.BooleanField(
+        default=True,
+        verbose_name="Ativo"
+    )
+
+    class Meta:
+        verbose_name = "Depósito"
+        verbose_name_plural = "Depósitos"
+        ordering = ['name']
+
+    def __str__(self):
+        return f"{self.code} — {self.name}"
+
+
+class StockBalance(models.Model):
+    """
+    Saldo de um produto em um depósito.
+    
+    A soma dos saldos por depósito nunca excede o total do produto
+    (current_stock mais as variações pendentes); a diferença é o estoque
+    sem depósito (movimentações sem depósito).
+    """
+    product = models.ForeignKey(
+        'produtos.Product',
+        on_delete=models.PROTECT,
+        related_name='balances',
+        verbose_name="Produto"
+    )
+    warehouse = models.ForeignKey(
+        Warehouse,
+        on_delete=models.PROTECT,
+        related_name='balances',
+        verbose_name="Depósito"
+    )
+    quantity = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name="Saldo"
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Atualizado em"
+    )
+
+    class Meta:
+        verbose_name = "Saldo por Depósito"
+        verbose_name_plural = "Saldos por Depósito"
+        ordering = ['warehouse', 'product']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['product', 'warehouse'],
+                name='stock_balance_product_wh_uniq',
+            ),
+            models.CheckConstraint(
+                condition=models.Q(quantity__gte=0),
+                name='stock_balance_quantity_gte_0',
+            ),
+        ]
+        indexes = [
+            # Agregações por depósito (GROUP BY warehouse)
+            models.Index(fields=['warehouse', 'product'], name='stock_balance_wh_product_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.warehouse.code} / {self.product.sku}: {self.quantity}"
+
+
+class PendingStockDelta(models.Model):
+    """
+    Variação do total de um produto ainda não aplicada a current_stock.
+    
+    Gravada na transação das movimentações que não travam a linha do
+    produto (com depósito ou de produto fragmentado). Aplicada após o
+    commit (ou pelo worker), com a valoração das movimentações em ordem
+    (ver stock_journal.py).
+    """
+    movement = models.OneToOneField(
+        InventoryMovement,
+        on_delete=models.CASCADE,
+        related_name='pending_delta',
+        verbose_name="Movimentação"
+    )
+    product = models.ForeignKey(
+        'produtos.Product',
+        on_delete=models.CASCADE,
+        related_name='pending_deltas',
+        verbose_name="Produto"
+    )
+    delta = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        verbose_name="Variação"
+    )
+
+    class Meta:
+        verbose_name = "Variação de Estoque Pendente"
+        verbose_name_plural = "Variações de Estoque Pendentes"
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.product_id}: {self.delta:+}"
+
+
+class StockValuation(models.Model):
+    """
+    Custo corrente do estoque de um produto (quantidade e valor).
+    
+    Mantido incrementalmente a cada movimentação; o histórico fica nas
+    próprias movimentações (value_before/value_after).
+    """
+    product = models.OneToOneField(
+        'produtos.Product',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='valuation',
+        verbose_name="Produto"
+    )
+    quantity = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name="Quantidade Valorada"
+    )
+    total_value = models.DecimalField(
+        max_digits=16,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name="Valor de Custo"
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Atualizado em"
+    )
+
+    class Meta:
+        verbose_name = "Valoração de Estoque"
+        verbose_name_plural = "Valorações de Estoque"
+
+    def __str__(self):
+        return f"{self.product.sku}: R$ {self.total_value}"
+
+    @property
+    def average_cost(self):
+        """Custo médio unitário (None sem saldo)."""
+        if self.quantity > 0:
+            return (self.total_value / self.quantity).quantize(Decimal('0.0001'))
+        return None
+
+
+class CostLayer(models.Model):
+    """
+    Camada de custo FIFO: quantidade recebida a um custo unitário.
+    
+    Saídas consomem ``remaining`` das camadas mais antigas primeiro.
+    """
+    product = models.ForeignKey(
+        'produtos.Product',
+        on_delete=models.CASCADE,
+        related_name='cost_layers',
+        verbose_name="Produto"
+    )
+    # Vazio na camada de abertura (saldo anterior à valoração)
+    movement = models.ForeignKey(
+        InventoryMovement,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='cost_layers',
+        verbose_name="Movimentação"
+    )
+    received_at = models.DateTimeField(
+        verbose_name="Recebido em"
+    )
+    quantity = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        verbose_name="Quantidade"
+    )
+    remaining = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        verbose_name="Saldo"
+    )
+    unit_cost = models.DecimalField(
+        max_digits=12,
+        decimal_places=4,
+        verbose_name="Custo Unitário"
+    )
+
+    class Meta:
+        verbose_name = "Camada de Custo"
+        verbose_name_plural = "Camadas de Custo"
+        ordering = ['product', 'received_at', 'id']
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(remaining__gte=0),
+                name='cost_layer_remaining_gte_0',
+            ),
+        ]
+        indexes = [
+            # Consumo FIFO: camadas com saldo de um produto, por entrada
+            models.Index(
+                fields=['product', 'received_at', 'id'],
+                condition=models.Q(remaining__gt=0),
+                name='cost_layer_fifo_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.product.sku}: {self.remaining}/{self.quantity} @ {self.unit_cost}"
+
+
+class StockAlert(TimeStampedModel):
+    """
+    Alerta de estoque baixo/crítico, agrupado por produto, nível e janela.
+    
+    Funciona como fila (outbox): cruzamentos repetidos na mesma janela só
+    incrementam ``occurrences`` e o despachante envia os pendentes em lote
+    (ver alerts.py).
+    """
+    LEVEL_CHOICES = [
+        ('CRITICO', 'Crítico'),
+        ('BAIXO', 'Baixo'),
+    ]
+
+    product = models.ForeignKey(
+        'produtos.Product',
+        on_delete=models.CASCADE,
+        related_name='stock_alerts',
+        verbose_name="Produto"
+    )
+    level = models.CharField(
+        max_length=10,
+        choices=LEVEL_CHOICES,
+        verbose_name="Nível"
+    )
+    window_start = models.DateTimeField(
+        verbose_name="Início da Janela"
+    )
+    # Última movimentação que cruzou o limite na janela
+    movement = models.ForeignKey(
+        InventoryMovement,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='stock_alerts',
+        verbose_name="Movimentação"
+    )
+    stock_level = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        verbose_name="Estoque no Alerta"
+    )
+    min_stock = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        verbose_name="Estoque Mínimo"
+    )
+    occurrences = models.PositiveIntegerField(
+        default=1,
+        verbose_name="Ocorrências"
+    )
+    dispatched_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Enviado em"
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name="Tentativas"
+    )
+    last_error = models.TextField(
+        blank=True,
+        verbose_name="Último Erro"
+    )
+
+    class Meta:
+        verbose_name = "Alerta de Estoque"
+        verbose_name_plural = "Alertas de Estoque"
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['product', 'level', 'window_start'],
+                name='stock_alert_product_window_uniq',
+            ),
+        ]
+        indexes = [
+            # Fila do despachante: pendentes por ordem de criação
+            models.Index(
+                fields=['created_at'],
+                condition=models.Q(dispatched_at__isnull=True),
+                name='stock_alert_pending_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.product.sku}: {self.get_level_display()} ({self.stock_level})"
+
+
+class ScannerDevice(TimeStampedModel):
+    """
+    Coletor que sincroniza movimentações offline (ver sync.py).
+    
+    ``last_seq`` é o maior número de sequência do coletor já processado
+    (reenvios são ignorados) e ``cursor`` o último cursor de saldos
+    devolvido a ele (Product.updated_at em µs, ver sync.py).
+    """
+    device_id = models.CharField(
+        max_length=100,
+        unique=True,
+        verbose_name="Identificador do Coletor"
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='scanner_devices',
+        verbose_name="Último Usuário"
+    )
+    last_seq = models.BigIntegerField(
+        default=0,
+        verbose_name="Última Sequência"
+    )
+    cursor = models.BigIntegerField(
+        default=0,
+        verbose_name="Cursor de Sincronização"
+    )
+    last_sync_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Última Sincronização"
+    )
+
+    class Meta:
+        verbose_name = "Coletor"
+        verbose_name_plural = "Coletores"
+        ordering = ['device_id']
+
+    def __str__(self):
+        return self.device_id
@@ -5,17 +5,83 @@ from rest_framework import serializers
 from decimal import Decimal
 from django.db import transaction
 
-from .models import InventoryMovement
+from .models import InventoryMovement, LotAllocation, StockBalance, StockLot, Warehouse
+from core.serializers import SparseFieldsetMixin
 from produtos.serializers import ProductListSerializer
 
 
-class InventoryMovementListSerializer(serializers.ModelSerializer):
+class WarehouseSerializer(serializers.ModelSerializer):
+    """Serializer de depósitos."""
+    
+    class Meta:
+        model = Warehouse
+        fields = ['id', 'code', 'name', 'address', 'is_active', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'created_at', 'updated_at']
+
+
+class StockBalanceSerializer(serializers.ModelSerializer):
+    """Saldo de um produto em um depósito."""
+    
+    product_sku = serializers.CharField(source='product.sku', read_only=True)
+    product_name = serializers.CharField(source='product.name', read_only=True)
+    warehouse_code = serializers.CharField(source='warehouse.code', read_only=True)
+    
+    class Meta:
+        model = StockBalance
+        fields = [
+            'id',
+            'product',
+            'product_sku',
+            'product_name',
+            'warehouse',
+            'warehouse_code',
+            'quantity',
+            'updated_at',
+        ]
+        read_only_fields = fields
+
+
+class StockLotSerializer(serializers.ModelSerializer):
+    """Serializer de lotes (saldo e validade)."""
+    
+    product_sku = serializers.CharField(source='product.sku', read_only=True)
+    product_name = serializers.CharField(source='product.name', read_only=True)
+    
+    class Meta:
+        model = StockLot
+        fields = [
+            'id',
+            'product',
+            'product_sku',
+            'product_name',
+            'lot_number',
+            'expiry_date',
+            'quantity',
+            'created_at',
+        ]
+        read_only_fields = fields
+
+
+class LotAllocationSerializer(serializers.ModelSerializer):
+    """Parcela de uma saída atendida por um lote."""
+    
+    lot_number = serializers.CharField(source='lot.lot_number', read_only=True)
+    expiry_date = serializers.DateField(source='lot.expiry_date', read_only=True)
+    
+    class Meta:
+        model = LotAllocation
+        fields = ['lot', 'lot_number', 'expiry_date', 'quantity']
+        read_only_fields = fields
+
+
+class InventoryMovementListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer simplificado para listagem de movimentações."""
     
     product_name = serializers.CharField(source='product.name', read_only=True)
     product_sku = serializers.CharField(source='product.sku', read_only=True)
     unit_name = serializers.CharField(source='product.unit.name', read_only=True)
     type_display = serializers.CharField(source='get_type_display', read_only=True)
+    warehouse_code = serializers.CharField(source='warehouse.code', read_only=True)
     user_name = serializers.CharField(source='user.get_full_name', read_only=True)
     user_username = serializers.CharField(source='user.username', read_only=True)
     
@@ -27,6 +93,7 @@ class InventoryMovementListSerializer(serializers.ModelSerializer):
             'product_sku',
             'type',
             'type_display',
+            'warehouse_code',
             'quantity',
             'unit_name',
             'document',
@@ -38,7 +105,7 @@ class InventoryMovementListSerializer(serializers.ModelSerializer):
         ]
 
 
-class InventoryMovementDetailSerializer(serializers.ModelSerializer):
+class InventoryMovementDetailSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer completo para detalhes de movimentações."""
     
     product = ProductListSerializer(read_only=True)
@@ -48,6 +115,18 @@ class InventoryMovementDetailSerializer(serializers.ModelSerializer):
     user_name = serializers.CharField(source='user.get_full_name', read_only=True)
     user_username = serializers.CharField(source='user.username', read_only=True)
     
+    # Lote (entradas): criado se ainda não existir para o produto
+    lot_number = serializers.CharField(
+        write_only=True, required=False, allow_blank=True, max_length=50
+    )
+    lot_expiry_date = serializers.DateField(write_only=True, required=False, allow_null=True)
+    lot = StockLotSerializer(read_only=True)
+    lot_allocations = LotAllocationSerializer(many=True, read_only=True)
+    
+    warehouse_id = serializers.IntegerField(write_only=True, required=False, allow_null=True)
+    warehouse_code = serializers.CharField(source='warehouse.code', read_only=True)
+    transfer_pair = serializers.PrimaryKeyRelatedField(read_only=True)
+    
     class Meta:
         model = InventoryMovement
         fields = [
@@ -56,9 +135,20 @@ class InventoryMovementDetailSerializer(serializers.ModelSerializer):
             'product_id',
             'type',
             'type_display',
+            'warehouse_id',
+            'warehouse_code',
+            'transfer_pair',
             'quantity',
             'document',
             'notes',
+            'lot_number',
+            'lot_expiry_date',
+            'lot',
+            'lot_allocations',
+            'unit_cost',
+            'total_cost',
+            'value_before',
+            'value_after',
             'user_name',
             'user_username',
             'stock_before',
@@ -68,6 +158,9 @@ class InventoryMovementDetailSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = [
             'id',
+            'total_cost',
+            'value_before',
+            'value_after',
             'user_name',
             'user_username',
             'stock_before',
@@ -75,6 +168,7 @@ class InventoryMovementDetailSerializer(serializers.ModelSerializer):
             'created_at',
             'updated_at',
         ]
+        expandable_fields = ['product']
     
     def validate_product_id(self, value):
         """Valida que o produto existe e está ativo."""
@@ -107,27 +201,83 @@ class InventoryMovementDetailSerializer(serializers.ModelSerializer):
                 'product_id': 'Produto não encontrado ou foi removido.'
             })
         
-        # Para saídas, validar estoque suficiente
-        if movement_type == InventoryMovement.SAIDA:
-            if quantity > product.current_stock:
+        if movement_type in InventoryMovement.TRANSFER_TYPES:
+            raise serializers.ValidationError({
+                'type': 'Transferências devem ser criadas em /movements/transfer/.'
+            })
+        
+        warehouse_id = attrs.get('warehouse_id')
+        if warehouse_id is not None:
+            if not Warehouse.objects.filter(pk=warehouse_id, is_active=True).exists():
                 raise serializers.ValidationError({
-                    'quantity': f'Estoque insuficiente. Disponível: {product.current_stock} {product.unit.name}'
+                    'warehouse_id': 'Depósito não encontrado ou inativo.'
                 })
+            if movement_type == InventoryMovement.SAIDA:
+                available = StockBalance.objects.filter(
+                    product=product, warehouse_id=warehouse_id
+                ).values_list('quantity', flat=True).first() or Decimal('0.00')
+                if quantity > available:
+                    raise serializers.ValidationError({
+                        'quantity': f'Estoque insuficiente no depósito. Disponível: {available} {product.unit.name}'
+                    })
+        elif movement_type == InventoryMovement.SAIDA:
+            # Saída sem depósito: validar o total do produto
+            available = product.available_stock
+            if quantity > available:
+                raise serializers.ValidationError({
+                    'quantity': f'Estoque insuficiente. Disponível: {available} {product.unit.name}'
+                })
+        
+        if attrs.get('lot_number') and movement_type != InventoryMovement.ENTRADA:
+            raise serializers.ValidationError({
+                'lot_number': 'Lote só pode ser informado em entradas; saídas usam FEFO.'
+            })
+        
+        if attrs.get('unit_cost') is not None and movement_type != InventoryMovement.ENTRADA:
+            raise serializers.ValidationError({
+                'unit_cost': 'Custo unitário só pode ser informado em entradas; saídas e ajustes usam o custo apurado.'
+            })
         
         # Adicionar produto ao attrs para uso no create
         attrs['product'] = product
         
         return attrs
     
+    @staticmethod
+    def create_movement(validated_data, user):
+        """
+        Cria a movimentação, resolvendo o lote informado na entrada.
+        
+        Deve ser chamado dentro de uma transação.
+        """
+        lot_number = validated_data.pop('lot_number', '').strip()
+        lot_expiry_date = validated_data.pop('lot_expiry_date', None)
+        
+        if lot_number:
+            lot, created = StockLot.objects.get_or_create(
+                product=validated_data['product'],
+                lot_number=lot_number,
+                defaults={'expiry_date': lot_expiry_date},
+            )
+            if not created and lot_expiry_date and lot.expiry_date != lot_expiry_date:
+                if lot.expiry_date is not None:
+                    raise serializers.ValidationError({
+                        'lot_expiry_date': f'Lote {lot_number} já cadastrado com validade {lot.expiry_date:%d/%m/%Y}.'
+                    })
+                lot.expiry_date = lot_expiry_date
+                lot.save(update_fields=['expiry_date', 'updated_at'])
+            validated_data['lot'] = lot
+        
+        return InventoryMovement.objects.create(user=user, **validated_data)
+    
     def create(self, validated_data):
         """Cria movimentação e atualiza estoque automaticamente."""
         # Usuário vem do contexto (view adiciona)
         user = self.context['request'].user
-        validated_data['user'] = user
         
         # Criar movimentação com atualização de estoque
         with transaction.atomic():
-            movement = InventoryMovement.objects.create(**validated_data)
+            movement = self.create_movement(validated_data, user)
         
         return movement
 
@@ -150,13 +300,98 @@ class InventoryMovementBulkSerializer(serializers.Serializer):
         created_movements = []
         with transaction.atomic():
             for movement_data in movements_data:
-                movement_data['user'] = user
-                movement = InventoryMovement.objects.create(**movement_data)
+                movement = InventoryMovementDetailSerializer.create_movement(movement_data, user)
                 created_movements.append(movement)
         
         return {'movements': created_movements, 'count': len(created_movements)}
 
 
+class OfflineSyncSerializer(serializers.Serializer):
+    """Lote de movimentações coletadas offline (ver sync.py)."""
+    
+    device_id = serializers.CharField(max_length=100)
+    cursor = serializers.IntegerField(required=False, allow_null=True, min_value=0)
+    movements = serializers.ListField(
+        child=serializers.DictField(),
+        required=False,
+        default=list,
+        help_text="Movimentações com seq crescente por coletor"
+    )
+    
+    def validate_movements(self, value):
+        from django.conf import settings
+        
+        if len(value) > settings.OFFLINE_SYNC_MAX_LINES:
+            raise serializers.ValidationError(
+                f'Máximo de {settings.OFFLINE_SYNC_MAX_LINES} movimentações por sincronização.'
+            )
+        seen = set()
+        for line in value:
+            seq = line.get('seq')
+            if not isinstance(seq, int) or isinstance(seq, bool) or seq < 1:
+                raise serializers.ValidationError('Cada movimentação precisa de um seq inteiro positivo.')
+            if seq in seen:
+                raise serializers.ValidationError(f'seq {seq} repetido no lote.')
+            seen.add(seq)
+        return value
+
+
+class StockTransferSerializer(serializers.Serializer):
+    """Transferência de estoque entre depósitos (gera o par de movimentações)."""
+    
+    product_id = serializers.IntegerField()
+    from_warehouse_id = serializers.IntegerField()
+    to_warehouse_id = serializers.IntegerField()
+    quantity = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01'))
+    document = serializers.CharField(required=False, allow_blank=True, max_length=100)
+    notes = serializers.CharField(required=False, allow_blank=True)
+    
+    def validate(self, attrs):
+        from produtos.models import Product
+        
+        if attrs['from_warehouse_id'] == attrs['to_warehouse_id']:
+            raise serializers.ValidationError({
+                'to_warehouse_id': 'Origem e destino devem ser diferentes.'
+            })
+        try:
+            attrs['product'] = Product.objects.get(pk=attrs['product_id'], is_active=True)
+        except Product.DoesNotExist:
+            raise serializers.ValidationError({'product_id': 'Produto não encontrado ou inativo.'})
+        
+        warehouses = Warehouse.objects.in_bulk(
+            [attrs['from_warehouse_id'], attrs['to_warehouse_id']]
+        )
+        for key in ('from_warehouse_id', 'to_warehouse_id'):
+            warehouse = warehouses.get(attrs[key])
+            if warehouse is None or not warehouse.is_active:
+                raise serializers.ValidationError({key: 'Depósito não encontrado ou inativo.'})
+        attrs['source'] = warehouses[attrs['from_warehouse_id']]
+        attrs['destination'] = warehouses[attrs['to_warehouse_id']]
+        
+        available = StockBalance.objects.filter(
+            product=attrs['product'], warehouse=attrs['source']
+        ).values_list('quantity', flat=True).first() or Decimal('0.00')
+        if attrs['quantity'] > available:
+            raise serializers.ValidationError({
+                'quantity': f'Estoque insuficiente no depósito de origem. Disponível: {available}'
+            })
+        return attrs
+    
+    def create(self, validated_data):
+        from .warehouses import transfer_stock
+        
+        outgoing, incoming = transfer_stock(
+            validated_data['product'],
+            validated_data['source'],
+            validated_data['destination'],
+            validated_data['quantity'],
+            self.context['request'].user,
+            document=validated_data.get('document', ''),
+            notes=validated_data.get('notes', ''),
+        )
+        return {'outgoing': outgoing, 'incoming': incoming}
+
+
 class InventoryMovementStatsSerializer(serializers.Serializer):
     """Serializer para estatísticas de movimentações."""
     
@@ -0,0 +1,177 @@
+"""
+Variações de estoque pendentes (total do produto fora do caminho quente).
+
+Movimentações com depósito e de produtos fragmentados não travam a linha
+do produto nem o estado de valoração: gravam o saldo do depósito (ou dos
+fragmentos) e uma ``PendingStockDelta`` na mesma transação.
+
+Após o commit da movimentação as variações do produto são aplicadas em
+transação própria (``apply_pending_on_commit``); se a linha do produto
+estiver travada por outra aplicação, ela é pulada e o worker
+(``manage.py apply_stock_deltas --loop``, no Procfile) aplica o restante.
+A aplicação, por produto e com a linha do produto travada, grava:
+
+- a soma das variações a current_stock/stock_status, com ``updated_at``
+  (o delta dos coletores segue ``updated_at``, ver sync.py);
+- a valoração de cada movimentação, em ordem (ver valuation.py).
+
+As variações vêm do próprio razão (movimentações), então nada grava
+current_stock por cima: o que não passou por uma movimentação continua
+como está. No worker, em produtos fragmentados o resultado é conferido com
+a soma dos fragmentos e a divergência vai para o log.
+
+Movimentações sem depósito já travam o produto: antes da própria variação
+aplicam as pendentes dele, mantendo a ordem da valoração. Até a aplicação,
+as validações de saída usam ``projected_stock`` (total com as pendentes).
+"""
+import logging
+from decimal import Decimal
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from produtos.models import Product
+
+from .models import InventoryMovement, PendingStockDelta
+
+
+logger = logging.getLogger(__name__)
+
+ZERO = Decimal('0.00')
+VALUE_FIELDS = ['unit_cost', 'total_cost', 'value_before', 'value_after']
+
+
+def projected_stock(product_id):
+    """Total do produto com as variações pendentes (uma query, sem lock)."""
+    current, pending = (
+        Product.objects.filter(pk=product_id)
+        .values_list('current_stock')
+        .annotate(pending=Sum('pending_deltas__delta'))
+        .get()
+    )
+    return current + (pending or ZERO)
+
+
+def apply_locked(product):
+    """
+    Aplica as variações pendentes de um produto já travado.
+
+    Deve ser chamado dentro de uma transação, com a linha do produto
+    travada (select_for_update); ``product.current_stock`` é atualizado em
+    memória.
+
+    Returns:
+        int: Variações aplicadas.
+    """
+    from .valuation import value_movement
+
+    pending = list(
+        PendingStockDelta.objects.filter(product_id=product.pk)
+        .select_related('movement').order_by('pk')
+    )
+    if not pending:
+        return 0
+
+    stock = product.current_stock
+    movements = []
+    for row in pending:
+        movement = row.movement
+        movement.product = product
+        # Saldo total antes da movimentação (abertura da valoração)
+        layer = value_movement(movement, opening=stock)
+        if layer is not None:
+            layer.movement = movement
+            layer.save()
+        movements.append(movement)
+        stock += row.delta
+    InventoryMovement.objects.bulk_update(movements, VALUE_FIELDS)
+
+    if stock != product.current_stock:
+        products = Product.objects.filter(pk=product.pk)
+        products.update(
+            current_stock=F('current_stock') + (stock - product.current_stock),
+            updated_at=timezone.now(),
+        )
+        Product.refresh_stock_status(products)
+        product.current_stock = stock
+        product.stock_status = product.compute_stock_status()
+    PendingStockDelta.objects.filter(pk__in=[row.pk for row in pending]).delete()
+    return len(pending)
+
+
+def apply_pending(product):
+    """
+    Aplica as variações pendentes de um produto (transação própria).
+
+    Returns:
+        Decimal: current_stock após a aplicação.
+    """
+    with transaction.atomic():
+        locked = Product.objects.select_for_update().get(pk=product.pk)
+        apply_locked(locked)
+        if locked.stock_shards:
+            check_shards(locked)
+    product.current_stock = locked.current_stock
+    return locked.current_stock
+
+
+def apply_pending_on_commit(product_id):
+    """
+    Agenda a aplicação das variações do produto para depois do commit.
+
+    Sem efeito com STOCK_JOURNAL_APPLY_ON_COMMIT desligado (só o worker).
+    """
+    if settings.STOCK_JOURNAL_APPLY_ON_COMMIT:
+        transaction.on_commit(partial(_apply_if_unlocked, product_id), robust=True)
+
+
+def _apply_if_unlocked(product_id):
+    """
+    Aplica as variações pendentes sem esperar pelo lock do produto.
+
+    Se outra aplicação (ou uma movimentação sem depósito) estiver com a
+    linha travada, não espera: o que ela não pegar fica para o worker.
+    """
+    with transaction.atomic():
+        locked = Product.objects.select_for_update(skip_locked=True).filter(pk=product_id).first()
+        if locked is not None:
+            apply_locked(locked)
+
+
+def check_shards(product, total=None):
+    """
+    Confere current_stock com a soma dos fragmentos; divergências vão para o log.
+
+    O saldo não é corrigido: current_stock segue o razão.
+    """
+    from produtos.stock_shards import shard_total
+
+    if total is None:
+        total = shard_total(product.pk)
+    if total != product.current_stock:
+        logger.warning(
+            "Produto %s: fragmentos somam %s, current_stock (razão) é %s",
+            product.sku, total, product.current_stock,
+        )
+    return total
+
+
+def apply_all_pending(product_ids=None):
+    """
+    Aplica as variações pendentes de todos os produtos (uma transação por produto).
+
+    Returns:
+        int: Produtos atualizados.
+    """
+    pending = PendingStockDelta.objects.all()
+    if product_ids is not None:
+        pending = pending.filter(product_id__in=product_ids)
+    ids = pending.order_by('product_id').values_list('product_id', flat=True).distinct()
+    applied = 0
+    for product in Product.objects.filter(pk__in=list(ids)).only('pk', 'sku', 'current_stock'):
+        apply_pending(product)
+        applied += 1
+    return applied
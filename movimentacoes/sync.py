@@ -0,0 +1,191 @@
+"""
+Sincronização de coletores offline.
+
+O coletor acumula as leituras sem conexão, cada uma com um número de
+sequência crescente (``seq``), e envia tudo num único POST (opcionalmente
+com ``Content-Encoding: gzip``) para ``/api/v1/movements/sync/``.
+
+- As linhas são aplicadas em ordem de ``seq`` pelo mesmo caminho das
+  movimentações em lote (``InventoryMovementDetailSerializer``), cada uma
+  em sua própria transação: uma saída sem estoque é rejeitada na linha,
+  sem desfazer as demais.
+- ``ScannerDevice.last_seq`` avança a cada linha processada (aplicada ou
+  rejeitada), então reenviar o mesmo lote após uma queda de conexão não
+  duplica movimentações (as linhas voltam como ``duplicate``).
+- A resposta traz o delta de saldos: produtos com ``updated_at`` após o
+  cursor do coletor (ou todos os ativos na primeira sincronização) e o
+  novo cursor (ver ``stock_delta``).
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
+
+from produtos.models import Product
+
+from .models import ScannerDevice
+
+
+APPLIED = 'applied'
+REJECTED = 'rejected'
+DUPLICATE = 'duplicate'
+
+# Campos repassados da linha ao serializer de movimentação
+LINE_FIELDS = (
+    'product_id', 'type', 'quantity', 'warehouse_id', 'document', 'notes',
+    'lot_number', 'lot_expiry_date', 'unit_cost',
+)
+DELTA_FIELDS = ['id', 'sku', 'current_stock', 'stock_status']
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def _error_detail(exc):
+    if isinstance(exc, ValidationError):
+        return exc.detail
+    if hasattr(exc, 'message_dict'):
+        return exc.message_dict
+    return {'non_field_errors': exc.messages}
+
+
+def _line_data(line, sku_map, device_id):
+    data = {field: line[field] for field in LINE_FIELDS if field in line}
+    if 'product_id' not in data and line.get('sku'):
+        data['product_id'] = sku_map.get(line['sku'])
+    if line.get('scanned_at'):
+        stamp = f"Coletado offline em {line['scanned_at']} ({device_id})"
+        data['notes'] = f"{data['notes']}\n{stamp}" if data.get('notes') else stamp
+    return data
+
+
+def apply_lines(device, lines, request):
+    """
+    Aplica as linhas do coletor em ordem de ``seq``.
+
+    Returns:
+        list[dict]: Resultado por linha (seq, status e movement_id/stock_after
+        ou errors).
+    """
+    from .serializers import InventoryMovementDetailSerializer
+
+    skus = {line['sku'] for line in lines if 'product_id' not in line and line.get('sku')}
+    sku_map = dict(
+        Product.objects.filter(sku__in=skus, is_active=True).values_list('sku', 'pk')
+    ) if skus else {}
+
+    results = []
+    for line in sorted(lines, key=lambda item: item['seq']):
+        seq = line['seq']
+        data = _line_data(line, sku_map, device.device_id)
+        with transaction.atomic():
+            # Serializa sincronizações concorrentes do mesmo coletor
+            locked = ScannerDevice.objects.select_for_update().get(pk=device.pk)
+            if seq <= locked.last_seq:
+                results.append({'seq': seq, 'status': DUPLICATE})
+                continue
+
+            if data.get('product_id') is None:
+                result = {'seq': seq, 'status': REJECTED, 'errors': {'sku': ['Produto não encontrado ou inativo.']}}
+            else:
+                serializer = InventoryMovementDetailSerializer(data=data, context={'request': request})
+                try:
+                    serializer.is_valid(raise_exception=True)
+                    with transaction.atomic():
+                        movement = serializer.save()
+                    result = {
+                        'seq': seq,
+                        'status': APPLIED,
+                        'movement_id': movement.pk,
+                        'stock_after': movement.stock_after,
+                    }
+                except (ValidationError, DjangoValidationError) as exc:
+                    result = {'seq': seq, 'status': REJECTED, 'errors': _error_detail(exc)}
+
+            locked.last_seq = seq
+            locked.save(update_fields=['last_seq', 'updated_at'])
+        results.append(result)
+    return results
+
+
+def stock_delta(cursor):
+    """
+    Saldos alterados desde ``cursor`` (Product.updated_at, em µs desde 1970).
+
+    ``updated_at`` muda na mesma transação que altera o saldo (movimentação
+    sem depósito, compactador de variações pendentes, edição do produto),
+    mas o horário é o da escrita, não o do commit: uma transação ainda
+    aberta pode aparecer depois com horário anterior à leitura. Por isso o
+    novo cursor recua OFFLINE_SYNC_CURSOR_OVERLAP_SECONDS a partir do início
+    da leitura; as linhas dessa janela voltam na próxima sincronização
+    (saldos absolutos, repetir não altera nada).
+
+    Returns:
+        tuple[int, dict]: (novo cursor, {'full', 'fields', 'rows'})
+    """
+    read_at = timezone.now()
+    products = Product.objects.filter(is_active=True)
+    if cursor:
+        products = products.filter(updated_at__gt=EPOCH + cursor * MICROSECOND)
+    rows = list(products.order_by('pk').values_list(*DELTA_FIELDS))
+    overlap = timedelta(seconds=settings.OFFLINE_SYNC_CURSOR_OVERLAP_SECONDS)
+    new_cursor = max((read_at - overlap - EPOCH) // MICROSECOND, cursor or 0)
+    return new_cursor, {'full': not cursor, 'fields': DELTA_FIELDS, 'rows': rows}
+
+
+def sync_device(device_id, lines, request, cursor=None):
+    """
+    Processa uma sincronização completa (linhas + delta) de um coletor.
+
+    Args:
+        device_id: Identificador do coletor
+        lines: Movimentações coletadas (dicts com ``seq``)
+        request: Request da API (usuário e contexto do serializer)
+        cursor: Cursor informado pelo coletor; sem ele usa o último devolvido
+
+    Returns:
+        dict: device_id, last_seq, applied/rejected/duplicates, results,
+        cursor e delta
+    """
+    device, _ = ScannerDevice.objects.get_or_create(device_id=device_id)
+    results = apply_lines(device, lines, request) if lines else []
+
+    if cursor is None:
+        cursor = device.cursor
+    new_cursor, delta = stock_delta(cursor)
+    ScannerDevice.objects.filter(pk=device.pk).update(
+        user=request.user, cursor=new_cursor, last_sync_at=timezone.now(), updated_at=timezone.now()
+    )
+    device.refresh_from_db(fields=['last_seq'])
+
+    counts = {status: 0 for status in (APPLIED, REJECTED, DUPLICATE)}
+    for result in results:
+        counts[result['status']] += 1
+    return {
+        'device_id': device_id,
+        'last_seq': device.last_seq,
+        'applied': counts[APPLIED],
+        'rejected': counts[REJECTED],
+        'duplicates': counts[DUPLICATE],
+        'results': results,
+        'cursor': new_cursor,
+        'delta': delta,
+    }
+
+
+def render_response(request, data):
+    """Resposta JSON comprimida com gzip quando o coletor aceita."""
+    body = JSONRenderer().render(data)
+    response = HttpResponse(content_type='application/json')
+    if 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '') and len(body) > 200:
+        body = compress_string(body)
+        response['Content-Encoding'] = 'gzip'
+    response.content = body
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
@@ -0,0 +1,356 @@
+"""
+Dados sintéticos de estoque (catálogo e movimentações realistas).
+
+Usado por ``manage.py populate_movements`` e pelo benchmark
+(``manage.py benchmark``). Toda a aleatoriedade passa por um
+``random.Random`` recebido, então a mesma semente gera os mesmos dados.
+
+Carga em volume (``manage.py generate_load_data``): as movimentações não
+passam por ``save``. A cadeia ``stock_before``/``stock_after`` de cada
+produto é calculada em memória, em ordem de data, e gravada em lotes
+(COPY no PostgreSQL, INSERT em lote nos demais bancos). Cada produto usa
+seu próprio gerador (semente + índice), então o resultado não depende de
+como os produtos são divididos entre processos.
+"""
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import DEFAULT_DB_ALIAS, connections, models, transaction
+from django.utils import timezone
+
+from produtos.models import Category, Product, Unit
+
+from .models import InventoryMovement
+
+
+DOCUMENT_PREFIXES = ["NF", "NFe", "CF-e", "NFS-e", "REQ", "TRF"]
+NOTES_BY_TYPE = {
+    InventoryMovement.ENTRADA: [
+        "Entrada de fornecedor",
+        "Reposição de estoque",
+        "Compra regular",
+        "Entrada por transferência",
+        "Devolução de venda",
+    ],
+    InventoryMovement.SAIDA: [
+        "Venda balcão",
+        "Baixa por consumo interno",
+        "Transferência entre setores",
+        "Saída para cliente especial",
+    ],
+    InventoryMovement.AJUSTE: [
+        "Quebra identificada",
+        "Inventário – ajuste negativo",
+        "Inventário – ajuste positivo",
+        "Correção de estoque incorreto",
+        "Perda por validade vencida",
+        "Inventário físico geral",
+        "Inventário rotativo",
+        "Ajuste por contagem oficial",
+    ],
+}
+# Entradas e saídas predominam
+TYPE_WEIGHTS = {
+    InventoryMovement.ENTRADA: 40,
+    InventoryMovement.SAIDA: 40,
+    InventoryMovement.AJUSTE: 20,
+}
+
+SKU_PREFIX = 'SYN'
+CATEGORY_PREFIX = 'Sintética'
+
+
+def synthetic_sku(index):
+    return f"{SKU_PREFIX}-{index:06d}"
+
+
+def _decimal(value):
+    return Decimal(str(round(value, 2)))
+
+
+def _draw_type(rng):
+    return rng.choices(list(TYPE_WEIGHTS), weights=list(TYPE_WEIGHTS.values()), k=1)[0]
+
+
+def _draw_quantity(rng, movement_type, stock):
+    if movement_type == InventoryMovement.ENTRADA:
+        return _decimal(rng.uniform(3, 80))
+    if movement_type == InventoryMovement.SAIDA:
+        return _decimal(rng.uniform(1, max(1, float(stock) / 2)))
+    # Ajuste define o novo saldo (contagem física)
+    return _decimal(rng.uniform(0.1, 150))
+
+
+def _draw_texts(rng, movement_type):
+    """Documento (80% possuem) e nota (70% possuem)."""
+    document = ""
+    if rng.random() < 0.8:
+        document = f"{rng.choice(DOCUMENT_PREFIXES)}-{rng.randint(10000, 999999)}"
+    notes = rng.choice(NOTES_BY_TYPE[movement_type]) if rng.random() < 0.7 else ""
+    return document, notes
+
+
+def random_movement(product, user, days_back=120, rng=random):
+    """
+    Monta (sem salvar) uma movimentação realista para o produto.
+
+    Returns:
+        InventoryMovement | None: None quando sorteia uma saída sem estoque.
+    """
+    movement_type = _draw_type(rng)
+    if movement_type == InventoryMovement.SAIDA and product.current_stock < 1:
+        return None
+    quantity = _draw_quantity(rng, movement_type, product.current_stock)
+    document, notes = _draw_texts(rng, movement_type)
+
+    created_at = timezone.now() - timedelta(
+        days=rng.randint(0, days_back),
+        hours=rng.randint(0, 23),
+        minutes=rng.randint(0, 59),
+    )
+    return InventoryMovement(
+        product=product,
+        type=movement_type,
+        quantity=quantity,
+        document=document,
+        notes=notes,
+        user=user,
+        created_at=created_at,
+    )
+
+
+def seed_catalog(products, categories=10, rng=random):
+    """
+    Garante um catálogo sintético (SKUs SYN-000001...) com ``products`` itens.
+
+    Categorias e produtos já existentes são reaproveitados; os que faltam
+    são criados com ``bulk_create``.
+
+    Returns:
+        list[Product]: Produtos sintéticos ativos, em ordem de criação.
+    """
+    unit, _ = Unit.objects.get_or_create(name='UN', defaults={'description': 'Unidade'})
+    category_list = [
+        Category.objects.get_or_create(name=f"{CATEGORY_PREFIX} {index:02d}")[0]
+        for index in range(1, categories + 1)
+    ]
+
+    synthetic = Product.objects.filter(sku__startswith=f"{SKU_PREFIX}-")
+    existing = set(synthetic.values_list('sku', flat=True))
+    new_products = []
+    for index in range(1, products + 1):
+        sku = synthetic_sku(index)
+        if sku in existing:
+            continue
+        min_stock = _decimal(rng.uniform(0, 30))
+        new_products.append(Product(
+            sku=sku,
+            name=f"Produto sintético {index:06d}",
+            category=category_list[index % len(category_list)],
+            unit=unit,
+            min_stock=min_stock,
+            stock_status=Product.stock_status_for(Decimal('0'), min_stock),
+            unit_price=_decimal(rng.uniform(1, 500)),
+        ))
+    Product.objects.bulk_create(new_products, batch_size=1000)
+    return list(synthetic.filter(is_active=True).order_by('pk')[:products])
+
+
+def seed_movements(products, users, count, days_back=120, rng=random, on_progress=None):
+    """
+    Cria ``count`` movimentações pelo caminho normal (``save``).
+
+    Returns:
+        int: Movimentações criadas (saídas sem estoque são puladas).
+    """
+    created = 0
+    for _ in range(count):
+        movement = random_movement(rng.choice(products), rng.choice(users), days_back, rng)
+        if movement is None:
+            continue
+        movement.save()
+        created += 1
+        if on_progress is not None:
+            on_progress(created)
+    return created
+
+
+# Carga em volume -------------------------------------------------------------
+
+LOAD_USER_PREFIX = 'carga'
+LOAD_BATCH_SIZE = 10000
+
+
+def seed_users(count):
+    """
+    Garante ``count`` usuários de carga (carga-0001...), sem senha utilizável.
+
+    Returns:
+        list[int]: Ids dos usuários, em ordem de nome.
+    """
+    User = get_user_model()
+    usernames = [f"{LOAD_USER_PREFIX}-{index:04d}" for index in range(1, count + 1)]
+    existing = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+    password = make_password(None)
+    User.objects.bulk_create(
+        [User(username=name, password=password) for name in usernames if name not in existing],
+        batch_size=1000,
+    )
+    return list(
+        User.objects.filter(username__in=usernames).order_by('username').values_list('pk', flat=True)
+    )
+
+
+def movement_counts(product_count, total, seed):
+    """
+    Quantidade de movimentações de cada produto (soma exata = ``total``).
+
+    A popularidade segue uma lognormal (poucos produtos concentram o giro)
+    e só depende da semente e do índice do produto.
+    """
+    weights = [random.Random(f"{seed}:peso:{index}").lognormvariate(0, 1) for index in range(product_count)]
+    scale = total / sum(weights) if weights else 0
+    counts = [int(weight * scale) for weight in weights]
+    # Distribui o resto pelas maiores frações
+    by_fraction = sorted(
+        range(product_count), key=lambda index: weights[index] * scale - counts[index], reverse=True
+    )
+    for index in by_fraction[:total - sum(counts)]:
+        counts[index] += 1
+    return counts
+
+
+def product_chain(product_id, count, user_ids, start, until, seed, index):
+    """
+    Movimentações de um produto em ordem de data, com a cadeia de saldos.
+
+    Saídas nunca deixam o saldo negativo: sem estoque, a saída sorteada vira
+    entrada (o total de movimentações é mantido).
+
+    Returns:
+        tuple[list[dict], Decimal]: (linhas, saldo final)
+    """
+    rng = random.Random(f"{seed}:mov:{index}")
+    span = (until - start).total_seconds()
+    moments = sorted(start + timedelta(seconds=rng.random() * span) for _ in range(count))
+    stock = Decimal('0')
+    rows = []
+    for moment in moments:
+        movement_type = _draw_type(rng)
+        if movement_type == InventoryMovement.SAIDA and stock < 1:
+            movement_type = InventoryMovement.ENTRADA
+        quantity = _draw_quantity(rng, movement_type, stock)
+        before = stock
+        if movement_type == InventoryMovement.ENTRADA:
+            stock += quantity
+        elif movement_type == InventoryMovement.SAIDA:
+            stock -= quantity
+        else:
+            stock = quantity
+        document, notes = _draw_texts(rng, movement_type)
+        rows.append({
+            'product_id': product_id,
+            'type': movement_type,
+            'quantity': quantity,
+            'document': document,
+            'notes': notes,
+            'user_id': rng.choice(user_ids),
+            'stock_before': before,
+            'stock_after': stock,
+            'created_at': moment,
+            'updated_at': moment,
+        })
+    return rows, stock
+
+
+def write_movements(rows):
+    """
+    Grava as linhas sem passar por ``save`` (sem alertas, webhooks ou lotes).
+
+    PostgreSQL usa COPY; os demais bancos, um INSERT com ``executemany``.
+    ``created_at`` é preservado (``auto_now_add`` o sobrescreveria no
+    ``bulk_create``). Só as datas precisam de adaptação ao banco: os demais
+    valores (str, int, Decimal, None) são aceitos pelos drivers.
+    """
+    if not rows:
+        return
+    db = connections[DEFAULT_DB_ALIAS]
+    fields = [field for field in InventoryMovement._meta.concrete_fields if not field.primary_key]
+    dates = {field.attname for field in fields if isinstance(field, models.DateTimeField)}
+    adapt = db.ops.adapt_datetimefield_value
+    values = [
+        tuple(
+            adapt(row.get(field.attname)) if field.attname in dates else row.get(field.attname)
+            for field in fields
+        )
+        for row in rows
+    ]
+    table = db.ops.quote_name(InventoryMovement._meta.db_table)
+    columns = ', '.join(db.ops.quote_name(field.column) for field in fields)
+    with transaction.atomic(using=db.alias), db.cursor() as cursor:
+        if db.vendor == 'postgresql':
+            with cursor.cursor.copy(f"COPY {table} ({columns}) FROM STDIN") as copy:
+                for value in values:
+                    copy.write_row(value)
+        else:
+            placeholders = ', '.join(['%s'] * len(fields))
+            cursor.executemany(f"INSERT INTO {table} ({columns}) VALUES ({placeholders})", values)
+
+
+def generate_movements(products, counts, user_ids, days, seed, until=None,
+                       batch_size=LOAD_BATCH_SIZE, on_batch=None):
+    """
+    Gera e grava as movimentações de ``products`` (fatia do catálogo).
+
+    Args:
+        products: Lista de (índice no catálogo, id do produto)
+        counts: Quantidades por índice (``movement_counts``)
+        user_ids: Usuários sorteados como responsáveis
+        days: Período, em dias, até ``until``
+        seed: Semente do conjunto
+        until: Fim do período (padrão: agora); igual em todos os processos
+        on_batch: Chamado com o total gravado após cada lote
+
+    Returns:
+        int: Movimentações gravadas. Os saldos finais são aplicados aos
+        produtos (current_stock e stock_status).
+    """
+    until = until or timezone.now()
+    start = until - timedelta(days=days)
+    written = 0
+    pending, balances = [], {}
+
+    def flush():
+        nonlocal written, pending
+        write_movements(pending)
+        written += len(pending)
+        pending = []
+        if on_batch is not None:
+            on_batch(written)
+
+    for index, product_id in products:
+        rows, balances[product_id] = product_chain(
+            product_id, counts[index], user_ids, start, until, seed, index
+        )
+        pending.extend(rows)
+        if len(pending) >= batch_size:
+            flush()
+    if pending:
+        flush()
+
+    _apply_balances(balances)
+    return written
+
+
+def _apply_balances(balances, batch_size=1000):
+    """Grava os saldos finais e recalcula o status do estoque."""
+    items = list(balances.items())
+    for offset in range(0, len(items), batch_size):
+        chunk = items[offset:offset + batch_size]
+        products = [Product(pk=pk, current_stock=stock) for pk, stock in chunk]
+        with transaction.atomic():
+            Product.objects.bulk_update(products, ['current_stock'])
+            Product.refresh_stock_status(Product.objects.filter(pk__in=[pk for pk, _ in chunk]))
@@ -0,0 +1,505 @@
+"""
+Valoração do estoque a custo (custo médio ponderado ou FIFO).
+
+Cada movimentação grava o próprio custo (``unit_cost``/``total_cost``) e o
+valor do estoque do produto antes e depois dela (``value_before``/
+``value_after``). O estado corrente fica em ``StockValuation`` (uma linha
+por produto) e, no método FIFO, o saldo por custo de entrada fica em
+``CostLayer``.
+
+O estado só é travado por quem já trava a linha do produto: a
+movimentação sem depósito, na própria transação, e o compactador
+(stock_journal.py), que valora em ordem as movimentações com depósito e
+de produtos fragmentados. Essas não disputam lock por SKU; até a
+compactação ficam com os campos de custo vazios.
+
+Com isso o valor do estoque em qualquer data é lido diretamente do
+razão: para cada produto, ``value_after`` da última movimentação até a
+data (ou ``value_before`` da primeira posterior) — sem reprocessar o
+histórico. ``recompute_valuation`` reconstrói tudo em lote quando o
+método muda ou para dados anteriores à valoração.
+
+O método vem de settings.STOCK_VALUATION_METHOD ('AVG' ou 'FIFO').
+"""
+from collections import deque
+from datetime import datetime, time
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import (
+    Case, DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value, When,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import CostLayer, InventoryMovement, StockValuation
+
+
+AVERAGE = 'AVG'
+FIFO = 'FIFO'
+METHOD_CHOICES = [
+    (AVERAGE, 'Custo médio ponderado'),
+    (FIFO, 'PEPS (FIFO)'),
+]
+
+ZERO = Decimal('0.00')
+CENT = Decimal('0.01')
+COST_PLACES = Decimal('0.0001')
+
+RECOMPUTE_BATCH_SIZE = 5000
+
+
+def valuation_method():
+    """Método configurado (AVG por padrão)."""
+    method = getattr(settings, 'STOCK_VALUATION_METHOD', AVERAGE)
+    return method if method in (AVERAGE, FIFO) else AVERAGE
+
+
+def _money(value):
+    return Decimal(value).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def _unit(value):
+    # Aceita int/str (instâncias em memória antes de recarregadas do banco)
+    return Decimal(value).quantize(COST_PLACES, rounding=ROUND_HALF_UP)
+
+
+class CostState:
+    """
+    Quantidade, valor e camadas FIFO de um produto.
+
+    Usado tanto na movimentação individual (estado lido do banco) quanto no
+    recálculo em lote (estado mantido em memória por produto).
+    """
+
+    def __init__(self, method, quantity=ZERO, value=ZERO, layers=()):
+        self.method = method
+        self.quantity = quantity
+        self.value = value
+        self.layers = deque(layers)
+        self.touched = []
+
+    @property
+    def average_cost(self):
+        if self.quantity > 0:
+            return self.value / self.quantity
+        return None
+
+    def receive(self, quantity, unit_cost, **layer_fields):
+        """
+        Entrada de ``quantity`` a ``unit_cost``.
+
+        Returns:
+            tuple[Decimal, CostLayer | None]: (custo total, camada FIFO não salva)
+        """
+        total = _money(quantity * unit_cost)
+        self.quantity += quantity
+        self.value += total
+        layer = None
+        if self.method == FIFO:
+            layer = CostLayer(quantity=quantity, remaining=quantity, unit_cost=unit_cost, **layer_fields)
+            self.layers.append(layer)
+        return total, layer
+
+    def issue(self, quantity, fallback_cost=ZERO):
+        """
+        Saída de ``quantity``; retorna o custo apurado.
+
+        No FIFO consome as camadas mais antigas (as alteradas ficam em
+        ``touched``). Sem camadas suficientes, o excedente usa o custo médio
+        ou ``fallback_cost``.
+        """
+        fallback = self.average_cost if self.average_cost is not None else fallback_cost
+        if self.method == FIFO and self.layers:
+            pending = quantity
+            cost = ZERO
+            while pending > 0 and self.layers:
+                layer = self.layers[0]
+                taken = min(pending, layer.remaining)
+                cost += taken * layer.unit_cost
+                layer.remaining -= taken
+                pending -= taken
+                self.touched.append(layer)
+                if layer.remaining <= 0:
+                    self.layers.popleft()
+            cost = _money(cost + pending * fallback)
+        else:
+            cost = _money(quantity * fallback)
+
+        self.quantity -= quantity
+        if self.quantity <= 0:
+            # Estoque zerado: o valor restante (arredondamentos) sai junto
+            cost = self.value if self.quantity == 0 else max(cost, self.value)
+            self.value = ZERO
+        else:
+            cost = min(cost, self.value)
+            self.value -= cost
+        return cost
+
+
+def movement_delta(movement):
+    """Variação do saldo total do produto causada pela movimentação."""
+    if movement.type == InventoryMovement.ENTRADA:
+        return movement.quantity
+    if movement.type == InventoryMovement.SAIDA:
+        return -movement.quantity
+    if movement.type == InventoryMovement.AJUSTE:
+        return movement.stock_after - movement.stock_before
+    return ZERO  # transferências não alteram o total
+
+
+def locked_valuation(movement, method, opening=None):
+    """
+    Estado de valoração do produto com lock de linha.
+
+    Na primeira movimentação valorada, o saldo anterior (``opening`` ou
+    stock_before) entra como abertura ao preço unitário do produto (e vira
+    a primeira camada FIFO).
+    """
+    rows = StockValuation.objects.select_for_update()
+    valuation = rows.filter(product_id=movement.product_id).first()
+    if valuation is not None:
+        return valuation
+
+    product = movement.product
+    opening = max(movement.stock_before if opening is None else opening, ZERO)
+    price = product.unit_price or ZERO
+    valuation, created = rows.get_or_create(
+        product_id=movement.product_id,
+        defaults={'quantity': opening, 'total_value': _money(opening * price)},
+    )
+    if created and method == FIFO and opening > 0:
+        CostLayer.objects.create(
+            product_id=movement.product_id,
+            received_at=product.created_at or timezone.now(),
+            quantity=opening,
+            remaining=opening,
+            unit_cost=_unit(price),
+        )
+    return valuation
+
+
+def _inbound_cost(movement_type, price, state):
+    """Custo unitário de uma entrada sem custo informado."""
+    if movement_type == InventoryMovement.AJUSTE and state.average_cost is not None:
+        # Sobra de inventário: entra pelo custo médio atual
+        return _unit(state.average_cost)
+    if price is not None:
+        return _unit(price)
+    return _unit(state.average_cost or ZERO)
+
+
+def value_movement(movement, opening=None):
+    """
+    Calcula o custo da movimentação e atualiza o estado do produto.
+
+    Preenche unit_cost, total_cost, value_before e value_after da
+    movimentação. Chamado com a linha do produto travada: na transação da
+    movimentação sem depósito (ainda não salva) ou pelo compactador, para
+    as movimentações pendentes (ver stock_journal.py).
+
+    Args:
+        opening: Saldo total do produto antes da movimentação (padrão:
+            stock_before), usado só na primeira valoração.
+
+    Returns:
+        CostLayer | None: Camada FIFO da entrada (gravar após a movimentação).
+    """
+    method = valuation_method()
+    delta = movement_delta(movement)
+    valuation = locked_valuation(movement, method, opening)
+
+    layers = ()
+    if method == FIFO and delta < 0:
+        layers = CostLayer.objects.select_for_update().filter(
+            product_id=movement.product_id, remaining__gt=0
+        ).order_by('received_at', 'id')
+    state = CostState(method, valuation.quantity, valuation.total_value, layers)
+    movement.value_before = valuation.total_value
+
+    layer = None
+    if delta > 0:
+        if movement.type == InventoryMovement.ENTRADA and movement.unit_cost is not None:
+            unit_cost = movement.unit_cost
+        else:
+            unit_cost = _inbound_cost(movement.type, movement.product.unit_price, state)
+        movement.unit_cost = _unit(unit_cost)
+        movement.total_cost, layer = state.receive(
+            delta, movement.unit_cost,
+            product_id=movement.product_id, received_at=movement.created_at or timezone.now(),
+        )
+    elif delta < 0:
+        cost = state.issue(-delta, movement.product.unit_price or ZERO)
+        movement.total_cost = cost
+        movement.unit_cost = _unit(cost / -delta)
+        if state.touched:
+            touched = {item.pk: item for item in state.touched}
+            CostLayer.objects.bulk_update(list(touched.values()), ['remaining'])
+    movement.value_after = state.value
+
+    if delta:
+        valuation.quantity = state.quantity
+        valuation.total_value = state.value
+        valuation.save(update_fields=['quantity', 'total_value', 'updated_at'])
+    return layer
+
+
+def _end_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.max))
+
+
+def valuation_as_of(moment=None, queryset=None):
+    """
+    Produtos anotados com ``stock_value``: valor de custo do estoque em ``moment``.
+
+    Lido do razão já valorado (índice produto + data), sem reprocessar o
+    histórico. Sem ``moment``, usa o estado corrente. Produtos nunca
+    movimentados usam o saldo atual ao preço unitário.
+
+    Args:
+        moment: datetime ou date (fim do dia).
+        queryset: Produtos a valorar (padrão: ativos).
+    """
+    from produtos.models import Product
+
+    if queryset is None:
+        queryset = Product.objects.filter(is_active=True)
+    money = DecimalField(max_digits=16, decimal_places=2)
+    never_moved = ExpressionWrapper(
+        F('current_stock') * Coalesce(F('unit_price'), Value(ZERO, output_field=money)),
+        output_field=money,
+    )
+
+    if moment is None:
+        return queryset.annotate(
+            stock_value=Coalesce(F('valuation__total_value'), never_moved, output_field=money)
+        )
+
+    if not isinstance(moment, datetime):
+        moment = _end_of_day(moment)
+    valued = InventoryMovement.objects.filter(product=OuterRef('pk'), value_after__isnull=False)
+    last_before = valued.filter(created_at__lte=moment).order_by('-created_at', '-pk')
+    first_after = valued.filter(created_at__gt=moment).order_by('created_at', 'pk')
+    return queryset.filter(created_at__lte=moment).annotate(
+        stock_value=Coalesce(
+            Subquery(last_before.values('value_after')[:1]),
+            Subquery(first_after.values('value_before')[:1]),
+            never_moved,
+            output_field=money,
+        )
+    )
+
+
+def _ledger_deltas(product_ids=None):
+    """Soma das variações do razão por produto (uma query agrupada)."""
+    money = DecimalField(max_digits=16, decimal_places=2)
+    movements = InventoryMovement.objects.all()
+    if product_ids is not None:
+        movements = movements.filter(product_id__in=product_ids)
+    return dict(
+        movements.values_list('product_id')
+        .annotate(delta=Sum(Case(
+            When(type=InventoryMovement.ENTRADA, then=F('quantity')),
+            When(type=InventoryMovement.SAIDA, then=-F('quantity')),
+            When(type=InventoryMovement.AJUSTE, then=F('stock_after') - F('stock_before')),
+            default=Value(ZERO),
+            output_field=money,
+        )))
+        .order_by()
+    )
+
+
+def recompute_valuation(method=None, product_ids=None, batch_size=RECOMPUTE_BATCH_SIZE, progress=None):
+    """
+    Reconstrói a valoração reprocessando o razão inteiro em streaming.
+
+    As movimentações são lidas em ordem (produto, data) por um cursor em
+    blocos, sem instanciar models; o estado de cada produto fica em memória
+    só enquanto suas movimentações passam. Custos, camadas FIFO e o estado
+    corrente são regravados em lotes (COPY + UPDATE no PostgreSQL).
+
+    O saldo de abertura de cada produto é o saldo atual menos a soma do
+    razão, valorado ao preço unitário; as variações pendentes são aplicadas
+    antes, para current_stock incluir todo o razão.
+
+    Args:
+        method: AVG ou FIFO (padrão: settings.STOCK_VALUATION_METHOD).
+        product_ids: Restringe a produtos específicos.
+        batch_size: Linhas por leitura e por gravação.
+        progress: Callback ``(movimentações processadas)`` a cada lote.
+
+    Returns:
+        dict: products, movements, layers
+    """
+    from produtos.models import Product
+    from .stock_journal import apply_all_pending
+
+    method = method or valuation_method()
+    apply_all_pending(product_ids)
+    products = Product.objects.all()
+    if product_ids is not None:
+        products = products.filter(pk__in=product_ids)
+    info = {
+        pk: (stock, price, created)
+        for pk, stock, price, created in products.values_list(
+            'pk', 'current_stock', 'unit_price', 'created_at'
+        ).iterator(chunk_size=batch_size)
+    }
+    deltas = _ledger_deltas(product_ids)
+
+    movements = InventoryMovement.objects.all()
+    if product_ids is not None:
+        movements = movements.filter(product_id__in=product_ids)
+    stream = movements.order_by('product_id', 'created_at', 'id').values_list(
+        'id', 'product_id', 'type', 'quantity', 'stock_before', 'stock_after', 'unit_cost', 'created_at',
+    ).iterator(chunk_size=batch_size)
+
+    writer = _ValuationWriter(batch_size)
+    counts = {'products': 0, 'movements': 0, 'layers': 0}
+
+    with transaction.atomic():
+        layers = CostLayer.objects.all()
+        valuations = StockValuation.objects.all()
+        if product_ids is not None:
+            layers = layers.filter(product_id__in=product_ids)
+            valuations = valuations.filter(product_id__in=product_ids)
+        layers.delete()
+        valuations.delete()
+
+        current_id = None
+        state = None
+        for movement_id, product_id, movement_type, quantity, before, after, unit_cost, created_at in stream:
+            if product_id != current_id:
+                if state is not None:
+                    writer.add_state(current_id, state)
+                    counts['products'] += 1
+                current_id = product_id
+                stock, price, product_created = info.get(product_id, (ZERO, None, created_at))
+                state = CostState(method)
+                opening = max(stock - deltas.get(product_id, ZERO), ZERO)
+                if opening > 0:
+                    state.receive(
+                        opening, _unit(price or ZERO),
+                        product_id=product_id, received_at=product_created or created_at,
+                    )
+
+            value_before = state.value
+            if movement_type == InventoryMovement.ENTRADA:
+                delta = quantity
+            elif movement_type == InventoryMovement.SAIDA:
+                delta = -quantity
+            elif movement_type == InventoryMovement.AJUSTE:
+                delta = after - before
+            else:
+                delta = ZERO
+
+            total_cost = None
+            if delta > 0:
+                price = info.get(product_id, (None, None))[1]
+                if movement_type != InventoryMovement.ENTRADA or unit_cost is None:
+                    unit_cost = _inbound_cost(movement_type, price, state)
+                total_cost, _ = state.receive(
+                    delta, unit_cost,
+                    product_id=product_id, movement_id=movement_id, received_at=created_at,
+                )
+            elif delta < 0:
+                total_cost = state.issue(-delta, info.get(product_id, (None, None))[1] or ZERO)
+                unit_cost = _unit(total_cost / -delta)
+            else:
+                unit_cost = None
+
+            writer.add_movement(movement_id, unit_cost, total_cost, value_before, state.value)
+            counts['movements'] += 1
+            if progress and counts['movements'] % batch_size == 0:
+                progress(counts['movements'])
+
+        if state is not None:
+            writer.add_state(current_id, state)
+            counts['products'] += 1
+        writer.flush()
+    counts['layers'] = writer.layer_count
+    return counts
+
+
+class _ValuationWriter:
+    """Acumula o resultado do recálculo e grava em lotes."""
+
+    fields = ['unit_cost', 'total_cost', 'value_before', 'value_after']
+
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.use_copy = connection.vendor == 'postgresql'
+        self.movements = []
+        self.layers = []
+        self.states = []
+        self.layer_count = 0
+
+    def add_movement(self, movement_id, unit_cost, total_cost, value_before, value_after):
+        self.movements.append((movement_id, unit_cost, total_cost, value_before, value_after))
+        if len(self.movements) >= self.batch_size:
+            self._write_movements()
+
+    def add_state(self, product_id, state):
+        self.states.append(StockValuation(
+            product_id=product_id, quantity=state.quantity, total_value=state.value,
+        ))
+        if state.method == FIFO:
+            # Camadas consumidas (histórico) + ainda na fila (com saldo)
+            self.layers.extend(state.touched)
+            self.layers.extend(state.layers)
+        if len(self.states) >= self.batch_size:
+            self._write_states()
+        if len(self.layers) >= self.batch_size:
+            self._write_layers()
+
+    def flush(self):
+        self._write_movements()
+        self._write_states()
+        self._write_layers()
+
+    def _write_states(self):
+        StockValuation.objects.bulk_create(self.states, batch_size=self.batch_size)
+        self.states = []
+
+    def _write_layers(self):
+        unique = list({id(layer): layer for layer in self.layers}.values())
+        CostLayer.objects.bulk_create(unique, batch_size=self.batch_size)
+        self.layer_count += len(unique)
+        self.layers = []
+
+    def _write_movements(self):
+        if not self.movements:
+            return
+        if self.use_copy:
+            self._copy_movements()
+        else:
+            # UPDATE parametrizado via executemany: bulk_update monta um CASE
+            # por campo e custa mais que o próprio cálculo
+            table = InventoryMovement._meta.db_table
+            assignments = ', '.join(f"{c} = %s" for c in self.fields)
+            with connection.cursor() as cursor:
+                cursor.executemany(
+                    f"UPDATE {table} SET {assignments} WHERE id = %s",
+                    [(*values, pk) for pk, *values in self.movements],
+                )
+        self.movements = []
+
+    def _copy_movements(self):
+        """PostgreSQL: COPY para tabela temporária + UPDATE ... FROM."""
+        table = InventoryMovement._meta.db_table
+        columns = ', '.join(self.fields)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS valuation_stage "
+                f"ON COMMIT DROP AS SELECT id, {columns} FROM {table} WITH NO DATA"
+            )
+            with cursor.copy(f"COPY valuation_stage (id, {columns}) FROM STDIN") as copy:
+                for row in self.movements:
+                    copy.write_row(row)
+            cursor.execute(
+                f"UPDATE {table} AS m SET "
+                + ', '.join(f"{c} = s.{c}" for c in self.fields)
+                + " FROM valuation_stage AS s WHERE m.id = s.id"
+            )
+            cursor.execute("TRUNCATE valuation_stage")
@@ -15,11 +15,14 @@ from django.core.exceptions import ValidationError
 from django.utils import timezone
 from datetime import datetime, timedelta
 
+from core.profiling import query_budget
 from .models import InventoryMovement
 from produtos.models import Product
+from produtos.forms import ProductFilterForm
 from .forms import InventoryMovementForm
 
 
+@query_budget(15)
 class MovementListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
     """Lista paginada de movimentações com filtros avançados."""
     
@@ -82,17 +85,19 @@ class MovementListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Estatísticas do período filtrado
-        movements = self.get_queryset()
+        # Estatísticas do período filtrado (uma única agregação)
+        stats = self.object_list.order_by().aggregate(
+            total_movements=Count('id'),
+            entradas=Count('id', filter=Q(type=InventoryMovement.ENTRADA)),
+            saidas=Count('id', filter=Q(type=InventoryMovement.SAIDA)),
+            ajustes=Count('id', filter=Q(type=InventoryMovement.AJUSTE)),
+        )
         
         context.update({
-            'total_movements': movements.count(),
-            'entradas': movements.filter(type=InventoryMovement.ENTRADA).count(),
-            'saidas': movements.filter(type=InventoryMovement.SAIDA).count(),
-            'ajustes': movements.filter(type=InventoryMovement.AJUSTE).count(),
+            **stats,
             
             # Para os filtros
-            'products': Product.objects.filter(is_active=True).order_by('name'),
+            'product_filter': ProductFilterForm(self.request.GET),
             'movement_types': InventoryMovement.TYPE_CHOICES,
             
             # Manter valores dos filtros
@@ -139,7 +144,6 @@ class MovementCreateView(LoginRequiredMixin, PermissionRequiredMixin, CreateView
         context = super().get_context_data(**kwargs)
         context.update({
             'title': 'Nova Movimentação',
-            'products': Product.objects.filter(is_active=True).order_by('name'),
             'submit_button_text': 'Salvar Movimentação',
             'cancel_url': reverse_lazy('movimentacoes:list'),
         })
@@ -201,7 +205,7 @@ def get_product_stock(request, product_id):
         product = Product.objects.get(pk=product_id, is_active=True)
         return JsonResponse({
             'success': True,
-            'current_stock': float(product.current_stock),
+            'current_stock': float(product.available_stock),
             'unit': product.unit.name,
             'min_stock': float(product.min_stock),
             'status': product.stock_status,
@@ -8,14 +8,23 @@ from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend, FilterSet, CharFilter, NumberFilter, DateFilter
 from django.db.models import Sum, Count
 
-from .models import InventoryMovement
+from .lots import get_lot_expiry_calendar
+from .models import InventoryMovement, StockBalance, StockLot, Warehouse
 from .serializers import (
+    WarehouseSerializer,
+    StockBalanceSerializer,
+    StockLotSerializer,
+    StockTransferSerializer,
     InventoryMovementListSerializer,
     InventoryMovementDetailSerializer,
     InventoryMovementBulkSerializer,
     InventoryMovementStatsSerializer,
+    OfflineSyncSerializer,
 )
+from core.idempotency import idempotent
+from core.parsers import CompressedJSONParser
 from core.permissions import IsStaffUser
+from core.viewsets import SparseFieldsetViewSetMixin
 
 
 class InventoryMovementFilter(FilterSet):
@@ -24,6 +33,7 @@ class InventoryMovementFilter(FilterSet):
     product_name = CharFilter(field_name='product__name', lookup_expr='icontains')
     product_sku = CharFilter(field_name='product__sku', lookup_expr='icontains')
     type = CharFilter(field_name='type')
+    warehouse = NumberFilter(field_name='warehouse_id')
     user = NumberFilter(field_name='user__id')
     date_from = DateFilter(field_name='created_at', lookup_expr='gte')
     date_to = DateFilter(field_name='created_at', lookup_expr='lte')
@@ -34,21 +44,31 @@ class InventoryMovementFilter(FilterSet):
         fields = ['product', 'type', 'user']
 
 
-class InventoryMovementViewSet(viewsets.ModelViewSet):
+class InventoryMovementViewSet(SparseFieldsetViewSetMixin, viewsets.ModelViewSet):
     """
     ViewSet completo para gerenciamento de movimentações de estoque.
     
+    Parâmetros de leitura:
+    - fields: campos a retornar (ex: ?fields=id,quantity,stock_after)
+    - expand: objetos aninhados a embutir no detalhe (ex: ?expand=product)
+    
     list: Listar todas as movimentações
     retrieve: Obter detalhes de uma movimentação
     create: Criar nova movimentação (atualiza estoque automaticamente)
     
+    create, bulk_create e transfer aceitam o cabeçalho Idempotency-Key:
+    repetições com a mesma chave devolvem a resposta original sem gravar
+    outra movimentação (ver core/idempotency.py).
+    
     Actions adicionais:
     - bulk_create: Criar múltiplas movimentações em lote
+    - transfer: Transferir estoque entre depósitos (par saída/entrada)
+    - sync: Sincronização de coletores offline (lote + delta de saldos)
     - stats: Estatísticas de movimentações
     - by_product: Movimentações de um produto específico
     - by_type: Movimentações por tipo
     """
-    queryset = InventoryMovement.objects.all().select_related('product', 'product__unit', 'user')
+    queryset = InventoryMovement.objects.all().select_related('product', 'product__unit', 'user', 'warehouse')
     permission_classes = [IsAuthenticated, IsStaffUser]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_class = InventoryMovementFilter
@@ -58,6 +78,7 @@ class InventoryMovementViewSet(viewsets.ModelViewSet):
     
     # Movimentações não podem ser editadas ou deletadas (auditoria)
     http_method_names = ['get', 'post', 'head', 'options']
+    sparse_fieldset_actions = ('list', 'retrieve', 'by_product', 'by_type')
     
     def get_serializer_class(self):
         """Retorna serializer apropriado para a action."""
@@ -65,9 +86,18 @@ class InventoryMovementViewSet(viewsets.ModelViewSet):
             return InventoryMovementListSerializer
         elif self.action == 'bulk_create':
             return InventoryMovementBulkSerializer
+        elif self.action == 'transfer':
+            return StockTransferSerializer
+        elif self.action == 'sync':
+            return OfflineSyncSerializer
         return InventoryMovementDetailSerializer
     
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+    
     @action(detail=False, methods=['post'])
+    @idempotent
     def bulk_create(self, request):
         """
         Cria múltiplas movimentações em lote (máximo 100).
@@ -90,6 +120,54 @@ class InventoryMovementViewSet(viewsets.ModelViewSet):
             'movements': InventoryMovementListSerializer(result['movements'], many=True).data
         }, status=status.HTTP_201_CREATED)
     
+    @action(detail=False, methods=['post'])
+    @idempotent
+    def transfer(self, request):
+        """
+        Transfere estoque entre depósitos.
+        
+        Exemplo de body:
+        {"product_id": 1, "from_warehouse_id": 1, "to_warehouse_id": 2, "quantity": 5}
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        result = serializer.save()
+        
+        return Response({
+            'outgoing': InventoryMovementListSerializer(result['outgoing']).data,
+            'incoming': InventoryMovementListSerializer(result['incoming']).data,
+        }, status=status.HTTP_201_CREATED)
+    
+    @action(detail=False, methods=['post'], parser_classes=[CompressedJSONParser])
+    def sync(self, request):
+        """
+        Sincroniza um coletor offline numa única requisição (ver sync.py).
+        
+        Aceita corpo com Content-Encoding: gzip e responde comprimido se o
+        cliente enviar Accept-Encoding: gzip.
+        
+        Exemplo de body:
+        {
+            "device_id": "coletor-07",
+            "cursor": 1760000000000000,
+            "movements": [
+                {"seq": 41, "sku": "ABC-1", "type": "SAIDA", "quantity": 2, "scanned_at": "2025-03-01T10:15:00"},
+                {"seq": 42, "product_id": 7, "type": "ENTRADA", "quantity": 10}
+            ]
+        }
+        """
+        from .sync import render_response, sync_device
+        
+        serializer = OfflineSyncSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        result = sync_device(
+            serializer.validated_data['device_id'],
+            serializer.validated_data['movements'],
+            request,
+            cursor=serializer.validated_data.get('cursor'),
+        )
+        return render_response(request, result)
+    
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """Retorna estatísticas de movimentações."""
@@ -186,3 +264,88 @@ class InventoryMovementViewSet(viewsets.ModelViewSet):
         
         serializer = self.get_serializer(movements, many=True)
         return Response(serializer.data)
+
+
+class WarehouseViewSet(viewsets.ModelViewSet):
+    """
+    Cadastro de depósitos.
+    
+    Actions adicionais:
+    - balances: saldos por produto de um depósito (?with_stock=true)
+    - summary: totais por depósito (uma query agrupada)
+    """
+    queryset = Warehouse.objects.all()
+    serializer_class = WarehouseSerializer
+    permission_classes = [IsAuthenticated, IsStaffUser]
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filterset_fields = ['is_active']
+    search_fields = ['code', 'name']
+    ordering_fields = ['code', 'name']
+    ordering = ['name']
+    # Depósitos com movimentações não podem ser removidos (auditoria)
+    http_method_names = ['get', 'post', 'put', 'patch', 'head', 'options']
+    
+    @action(detail=True, methods=['get'])
+    def balances(self, request, pk=None):
+        """Saldos dos produtos no depósito."""
+        balances = StockBalance.objects.filter(
+            warehouse=self.get_object()
+        ).select_related('product', 'warehouse').order_by('product__name')
+        if request.query_params.get('with_stock') == 'true':
+            balances = balances.filter(quantity__gt=0)
+        
+        page = self.paginate_queryset(balances)
+        if page is not None:
+            serializer = StockBalanceSerializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        return Response(StockBalanceSerializer(balances, many=True).data)
+    
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        """Totais de estoque por depósito ativo."""
+        from .warehouses import warehouse_summary
+        return Response(warehouse_summary())
+
+
+class StockLotViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Consulta de lotes e saldos por lote.
+    
+    Filtros: product, lot_number, with_stock=true (apenas lotes com saldo).
+    
+    Actions adicionais:
+    - expiry: calendário de validade por lote (?days=30&expired=true)
+    """
+    queryset = StockLot.objects.select_related('product')
+    serializer_class = StockLotSerializer
+    permission_classes = [IsAuthenticated, IsStaffUser]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['product', 'lot_number']
+    ordering_fields = ['expiry_date', 'quantity', 'created_at']
+    ordering = ['product', 'expiry_date']
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.query_params.get('with_stock') == 'true':
+            queryset = queryset.filter(quantity__gt=0)
+        return queryset
+    
+    @action(detail=False, methods=['get'])
+    def expiry(self, request):
+        """Lotes com saldo vencidos ou a vencer, agrupados por urgência."""
+        try:
+            days_ahead = int(request.query_params.get('days', 30))
+        except ValueError:
+            return Response(
+                {'error': 'days deve ser um número inteiro.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        include_expired = request.query_params.get('expired', 'true') == 'true'
+        
+        calendar = get_lot_expiry_calendar(days_ahead, include_expired)
+        return Response({
+            'stats': calendar['stats'],
+            'expired': StockLotSerializer(calendar['expired'], many=True).data,
+            'critical': StockLotSerializer(calendar['critical'], many=True).data,
+            'warning': StockLotSerializer(calendar['warning'], many=True).data,
+        })
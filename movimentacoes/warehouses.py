@@ -0,0 +1,99 @@
+"""
+Saldos por depósito e transferências.
+
+Movimentações com depósito travam apenas a linha (produto, depósito) de
+``StockBalance``; a linha do produto não é tocada e a variação do total
+fica pendente para o compactador (ver stock_journal.py). As agregações por
+depósito usam o índice ``stock_balance_wh_product_idx``.
+"""
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+
+from produtos.models import Product
+
+from .models import InventoryMovement, StockBalance, Warehouse
+
+
+def locked_balance(product_id, warehouse_id):
+    """Saldo (produto, depósito) com lock de linha; cria a linha se não existir."""
+    balances = StockBalance.objects.select_for_update()
+    balance = balances.filter(product_id=product_id, warehouse_id=warehouse_id).first()
+    if balance is None:
+        balance, _ = balances.get_or_create(product_id=product_id, warehouse_id=warehouse_id)
+    return balance
+
+
+def transfer_stock(product, source, destination, quantity, user, document='', notes=''):
+    """
+    Transfere estoque entre depósitos gerando o par de movimentações.
+
+    Os dois saldos são travados em ordem de depósito antes das
+    movimentações, evitando deadlock entre transferências opostas.
+
+    Returns:
+        tuple[InventoryMovement, InventoryMovement]: (saída, entrada)
+
+    Raises:
+        ValidationError: Depósitos iguais ou saldo insuficiente na origem
+    """
+    if source.pk == destination.pk:
+        raise ValidationError("Origem e destino da transferência devem ser diferentes.")
+
+    common = {
+        'product': product,
+        'quantity': Decimal(quantity),
+        'user': user,
+        'document': document,
+        'notes': notes,
+    }
+    with transaction.atomic():
+        for warehouse_id in sorted((source.pk, destination.pk)):
+            locked_balance(product.pk, warehouse_id)
+
+        outgoing = InventoryMovement.objects.create(
+            type=InventoryMovement.TRANSF_SAIDA, warehouse=source, **common
+        )
+        incoming = InventoryMovement.objects.create(
+            type=InventoryMovement.TRANSF_ENTRADA, warehouse=destination,
+            transfer_pair=outgoing, **common
+        )
+        InventoryMovement.objects.filter(pk=outgoing.pk).update(transfer_pair=incoming)
+        outgoing.transfer_pair = incoming
+    return outgoing, incoming
+
+
+def warehouse_summary(warehouses=None):
+    """
+    Totais por depósito em uma única query agrupada.
+
+    Returns:
+        list[dict]: id, code, name, product_count (com saldo), quantity,
+        total_value, low_count (produtos em alerta com saldo no depósito)
+    """
+    if warehouses is None:
+        warehouses = Warehouse.objects.filter(is_active=True)
+    with_stock = Q(balances__quantity__gt=0)
+    value = ExpressionWrapper(
+        F('balances__quantity') * F('balances__product__unit_price'),
+        output_field=DecimalField(max_digits=18, decimal_places=2),
+    )
+    rows = warehouses.order_by('name').values('id', 'code', 'name').annotate(
+        product_count=Count('balances', filter=with_stock),
+        quantity=Sum('balances__quantity'),
+        total_value=Sum(value),
+        low_count=Count(
+            'balances',
+            filter=with_stock & ~Q(balances__product__stock_status=Product.STOCK_OK),
+        ),
+    )
+    return [
+        {
+            **row,
+            'quantity': row['quantity'] or Decimal('0.00'),
+            'total_value': float(row['total_value'] or 0),
+        }
+        for row in rows
+    ]
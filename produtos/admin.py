@@ -3,7 +3,9 @@ Admin interface para o app produtos.
 Configurações personalizadas para gerenciamento de produtos, categorias e unidades.
 """
 
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.db import transaction
+from django.utils import timezone
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
@@ -138,7 +140,7 @@ class ProductAdmin(admin.ModelAdmin):
             obj.stock_status_display
         )
     stock_status_colored.short_description = 'Status Estoque'
-    stock_status_colored.admin_order_field = 'current_stock'
+    stock_status_colored.admin_order_field = 'stock_status'
     
     def total_value_display(self, obj):
         """Exibe o valor total formatado."""
@@ -179,18 +181,37 @@ class ProductAdmin(admin.ModelAdmin):
     
     def activate_products(self, request, queryset):
         """Ativa os produtos selecionados."""
-        updated = queryset.update(is_active=True)
+        updated = self._bulk_update(queryset, is_active=True)
         self.message_user(request, f'{updated} produto(s) ativado(s) com sucesso.')
     activate_products.short_description = 'Ativar produtos selecionados'
     
     def deactivate_products(self, request, queryset):
         """Desativa os produtos selecionados."""
-        updated = queryset.update(is_active=False)
+        updated = self._bulk_update(queryset, is_active=False)
         self.message_user(request, f'{updated} produto(s) desativado(s) com sucesso.')
     deactivate_products.short_description = 'Desativar produtos selecionados'
     
+    def _bulk_update(self, queryset, **values):
+        """UPDATE em conjunto com updated_at e eventos product.updated (não passa por save)."""
+        with transaction.atomic():
+            # Por pk: o filtro da listagem (ex: ativos) pode deixar de casar após o UPDATE
+            products = Product.objects.filter(pk__in=list(queryset.values_list('pk', flat=True)))
+            updated = products.update(updated_at=timezone.now(), **values)
+            Product.publish_bulk_events(products)
+        return updated
+    
     def reset_stock(self, request, queryset):
-        """Zera o estoque dos produtos selecionados."""
-        updated = queryset.update(current_stock=0)
+        """Zera o estoque dos produtos selecionados (exceto fragmentados)."""
+        # Saldo fragmentado só muda por movimentações (ver stock_shards.py)
+        sharded = queryset.filter(stock_shards__gt=0).count()
+        updated = self._bulk_update(
+            queryset.filter(stock_shards=0), current_stock=0, stock_status=Product.STOCK_CRITICO
+        )
         self.message_user(request, f'Estoque zerado para {updated} produto(s).')
+        if sharded:
+            self.message_user(
+                request,
+                f'{sharded} produto(s) com estoque fragmentado ignorado(s): use um ajuste.',
+                level=messages.WARNING,
+            )
     reset_stock.short_description = 'Zerar estoque dos produtos selecionados'
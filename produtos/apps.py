@@ -5,3 +5,7 @@ class ProdutosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'produtos'
     verbose_name = 'Produtos'
+
+    def ready(self):
+        """Registra a invalidação dos dados de referência em cache."""
+        import produtos.reference  # noqa
@@ -0,0 +1,161 @@
+"""
+Calendário de validade dos produtos.
+
+Classifica os produtos ativos com validade em faixas de urgência com uma
+única query (a faixa é calculada no banco via CASE e usa o índice parcial
+``product_active_expiry_idx``). Também mantém um resumo diário em cache
+para o dashboard.
+"""
+from datetime import datetime, time, timedelta
+
+from django.core.cache import cache
+from django.db.models import Case, CharField, Count, Value, When
+from django.utils import timezone
+
+from .models import Product
+
+
+# Faixas de urgência
+VENCIDO = 'VENCIDO'
+CRITICO = 'CRITICO'
+ATENCAO = 'ATENCAO'
+FUTURO = 'FUTURO'
+
+# Dias até o vencimento que delimitam as faixas
+CRITICAL_DAYS = 7
+WARNING_DAYS = 30
+
+SUMMARY_CACHE_KEY = 'produtos:expiry_summary:{date}'
+SUMMARY_PREVIEW_SIZE = 5
+
+
+def expiry_bucket_expression(today):
+    """Expressão CASE que classifica expiry_date na faixa de urgência."""
+    return Case(
+        When(expiry_date__lt=today, then=Value(VENCIDO)),
+        When(expiry_date__lte=today + timedelta(days=CRITICAL_DAYS), then=Value(CRITICO)),
+        When(expiry_date__lte=today + timedelta(days=WARNING_DAYS), then=Value(ATENCAO)),
+        default=Value(FUTURO),
+        output_field=CharField(),
+    )
+
+
+def get_expiry_calendar(days_ahead=WARNING_DAYS, include_expired=True, today=None, queryset=None):
+    """
+    Produtos que vencem até ``today + days_ahead``, agrupados por urgência.
+
+    Executa uma única query ordenada por validade; contagens e listas de
+    cada faixa são montadas na mesma passada.
+
+    Returns:
+        dict: products, expired, critical, warning (listas) e stats
+              (total, expired_count, critical_count, warning_count)
+    """
+    today = today or timezone.localdate()
+    future_date = today + timedelta(days=days_ahead)
+
+    if queryset is None:
+        queryset = Product.objects.select_related('category', 'unit')
+    queryset = queryset.filter(is_active=True, expiry_date__lte=future_date)
+    if not include_expired:
+        queryset = queryset.filter(expiry_date__gte=today)
+
+    products = list(
+        queryset.annotate(expiry_bucket=expiry_bucket_expression(today)).order_by('expiry_date', 'name')
+    )
+
+    buckets = {VENCIDO: [], CRITICO: [], ATENCAO: [], FUTURO: []}
+    for product in products:
+        buckets[product.expiry_bucket].append(product)
+    # Além de 30 dias ainda é "atenção" quando o período pedido é maior
+    warning = buckets[ATENCAO] + buckets[FUTURO]
+
+    return {
+        'products': products,
+        'expired': buckets[VENCIDO],
+        'critical': buckets[CRITICO],
+        'warning': warning,
+        'stats': {
+            'total': len(products),
+            'expired_count': len(buckets[VENCIDO]),
+            'critical_count': len(buckets[CRITICO]),
+            'warning_count': len(warning),
+        },
+    }
+
+
+def get_expiry_summary(today=None):
+    """
+    Resumo do dia para o dashboard (contagens por faixa e próximos a vencer).
+
+    As contagens e os ids dos próximos a vencer ficam em cache até o fim do
+    dia; edições de produto invalidam a entrada via
+    ``invalidate_expiry_summary``. Nome e saldo dos próximos a vencer são
+    lidos a cada chamada (uma query por chave primária): movimentações
+    alteram o saldo sem invalidar o resumo.
+    """
+    today = today or timezone.localdate()
+    key = SUMMARY_CACHE_KEY.format(date=today.isoformat())
+    cached = cache.get(key)
+    if cached is None:
+        cached = _build_expiry_summary(today)
+        midnight = timezone.make_aware(datetime.combine(today + timedelta(days=1), time.min))
+        timeout = max(int((midnight - timezone.now()).total_seconds()), 60)
+        cache.set(key, cached, timeout)
+
+    upcoming = []
+    if cached['upcoming_ids']:
+        upcoming = (
+            Product.objects.filter(pk__in=cached['upcoming_ids'], is_active=True)
+            .select_related('unit')
+            .only('name', 'expiry_date', 'current_stock', 'unit__name')
+            .order_by('expiry_date', 'name')
+        )
+    return {
+        'date': cached['date'],
+        'stats': cached['stats'],
+        'upcoming': [
+            {
+                'id': p.pk,
+                'name': p.name,
+                'expiry_date': p.expiry_date,
+                'current_stock': p.current_stock,
+                'unit': {'name': p.unit.name},
+            }
+            for p in upcoming
+        ],
+    }
+
+
+def _build_expiry_summary(today):
+    """Contagens por faixa e ids dos próximos a vencer (o que vai para o cache)."""
+    window = Product.objects.filter(
+        is_active=True,
+        expiry_date__lte=today + timedelta(days=WARNING_DAYS),
+    )
+    counts = dict(
+        window.annotate(bucket=expiry_bucket_expression(today))
+        .values_list('bucket')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    upcoming_ids = list(
+        window.filter(expiry_date__gte=today)
+        .order_by('expiry_date', 'name')
+        .values_list('pk', flat=True)[:SUMMARY_PREVIEW_SIZE]
+    )
+    return {
+        'date': today,
+        'stats': {
+            'total': sum(counts.values()),
+            'expired_count': counts.get(VENCIDO, 0),
+            'critical_count': counts.get(CRITICO, 0),
+            'warning_count': counts.get(ATENCAO, 0),
+        },
+        'upcoming_ids': upcoming_ids,
+    }
+
+
+def invalidate_expiry_summary():
+    """Descarta o resumo do dia (chamado quando validade/ativo mudam)."""
+    cache.delete(SUMMARY_CACHE_KEY.format(date=timezone.localdate().isoformat()))
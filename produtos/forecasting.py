@@ -0,0 +1,176 @@
+"""
+Previsão de demanda e ponto de pedido (estoque mínimo sugerido).
+
+O histórico de saídas é lido com uma única query agregada por
+(produto, dia) e processado em NumPy de uma vez para o catálogo inteiro:
+
+- demanda média diária  d = soma / n
+- desvio padrão diário  s = sqrt((soma² - soma²/n) / (n - 1))
+- estoque de segurança  SS = z · s · √L
+- ponto de pedido       ROP = d · L + SS
+
+onde ``n`` são os dias de histórico do produto (limitados à data de
+cadastro), ``L`` o prazo de reposição e ``z`` o quantil normal do nível de
+serviço. Dias sem saída entram como demanda zero sem precisar de uma matriz
+produto × dia: bastam a soma e a soma dos quadrados por produto.
+
+Depende de NumPy (importado sob demanda).
+"""
+from datetime import timedelta
+from decimal import Decimal
+from statistics import NormalDist
+
+from django.conf import settings
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Product, StockForecast
+
+
+FORECAST_BATCH_SIZE = 5000
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError as exc:  # pragma: no cover - dependência opcional
+        raise ImportError("A previsão de reposição requer NumPy (pip install numpy).") from exc
+    return numpy
+
+
+def load_daily_demand(start, end):
+    """
+    Saídas diárias por produto no período, em uma única query.
+
+    Returns:
+        tuple[ndarray, ndarray]: (product_ids, quantidades) — uma posição
+        por par (produto, dia) com saída.
+    """
+    from movimentacoes.models import InventoryMovement
+
+    np = _numpy()
+    rows = (
+        InventoryMovement.objects
+        .filter(type=InventoryMovement.SAIDA, created_at__gte=start, created_at__lt=end)
+        .annotate(day=TruncDate('created_at'))
+        .values_list('product_id', 'day')
+        .annotate(total=Sum('quantity'))
+        .order_by()
+        .values_list('product_id', 'total')
+    )
+    data = list(rows)
+    if not data:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    product_ids, totals = zip(*data)
+    return np.fromiter(product_ids, dtype=np.int64), np.array(totals, dtype=np.float64)
+
+
+def compute_forecasts(history_days=None, lead_time_days=None, service_level=None, now=None):
+    """
+    Calcula a previsão de todos os produtos ativos com saídas no período.
+
+    Returns:
+        list[StockForecast]: Instâncias não salvas.
+    """
+    np = _numpy()
+    history_days = history_days or settings.STOCK_FORECAST_HISTORY_DAYS
+    default_lead_time = lead_time_days or settings.STOCK_FORECAST_LEAD_TIME_DAYS
+    service_level = service_level or settings.STOCK_FORECAST_SERVICE_LEVEL
+    z = NormalDist().inv_cdf(service_level)
+
+    now = now or timezone.now()
+    end = timezone.localtime(now).replace(hour=0, minute=0, second=0, microsecond=0)
+    start = end - timedelta(days=history_days)
+
+    product_ids, quantities = load_daily_demand(start, end)
+    if not product_ids.size:
+        return []
+
+    unique_ids, index = np.unique(product_ids, return_inverse=True)
+    total = np.bincount(index, weights=quantities)
+    total_sq = np.bincount(index, weights=quantities ** 2)
+
+    # Dias de histórico por produto (produtos novos não contam dias antes do cadastro)
+    meta = dict(
+        (pk, (created, lead))
+        for pk, created, lead in Product.objects.filter(
+            pk__in=unique_ids.tolist(), is_active=True
+        ).values_list('pk', 'created_at', 'lead_time_days')
+    )
+    active = np.array([pk in meta for pk in unique_ids.tolist()])
+    days = np.array([
+        min(history_days, max((end - meta[pk][0]).days, 1)) if pk in meta else history_days
+        for pk in unique_ids.tolist()
+    ], dtype=np.float64)
+    lead = np.array([
+        (meta[pk][1] or default_lead_time) if pk in meta else default_lead_time
+        for pk in unique_ids.tolist()
+    ], dtype=np.float64)
+
+    mean = total / days
+    variance = np.where(days > 1, (total_sq - total ** 2 / days) / np.maximum(days - 1, 1), 0.0)
+    std = np.sqrt(np.clip(variance, 0.0, None))
+    safety = z * std * np.sqrt(lead)
+    reorder = np.ceil((mean * lead + safety) * 100) / 100
+    safety = np.ceil(safety * 100) / 100
+
+    forecasts = []
+    for i in np.flatnonzero(active).tolist():
+        forecasts.append(StockForecast(
+            product_id=int(unique_ids[i]),
+            daily_demand=Decimal(f'{mean[i]:.3f}'),
+            demand_std=Decimal(f'{std[i]:.3f}'),
+            lead_time_days=int(lead[i]),
+            safety_stock=Decimal(f'{safety[i]:.2f}'),
+            reorder_point=Decimal(f'{reorder[i]:.2f}'),
+            history_days=int(days[i]),
+            computed_at=now,
+        ))
+    return forecasts
+
+
+def save_forecasts(forecasts):
+    """Grava as previsões com upsert em lotes e remove as que não foram recalculadas."""
+    StockForecast.objects.bulk_create(
+        forecasts,
+        batch_size=FORECAST_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['product'],
+        update_fields=[
+            'daily_demand', 'demand_std', 'lead_time_days', 'safety_stock',
+            'reorder_point', 'history_days', 'computed_at',
+        ],
+    )
+    if forecasts:
+        StockForecast.objects.exclude(computed_at=forecasts[0].computed_at).delete()
+    else:
+        StockForecast.objects.all().delete()
+    return len(forecasts)
+
+
+def apply_suggestions(user=None, request=None):
+    """
+    Copia o ponto de pedido sugerido para min_stock (com auditoria em lote).
+
+    Returns:
+        int: Produtos alterados.
+    """
+    from core.bulk_audit import audited_bulk_update
+
+    suggested = StockForecast.objects.filter(product=OuterRef('pk')).values('reorder_point')[:1]
+    queryset = Product.objects.filter(is_active=True, forecast__isnull=False).exclude(
+        min_stock=Subquery(suggested)
+    )
+    changed = audited_bulk_update(
+        queryset,
+        {'min_stock': Subquery(suggested)},
+        user=user,
+        request=request,
+        description='Estoque mínimo atualizado pela previsão de reposição',
+        describe=lambda row: f"{row['sku']} — {row['name']}",
+        describe_fields=('sku', 'name'),
+    )
+    if changed:
+        Product.refresh_stock_status(Product.objects.filter(forecast__isnull=False))
+    return changed
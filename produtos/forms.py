@@ -9,6 +9,8 @@ from django.utils import timezone
 from decimal import Decimal
 import re
 from .models import Product, Category, Unit
+from .reference import category_choices, unit_choices, use_cached_choices
+from .widgets import ProductChoiceField, ProductPickerWidget
 
 # Constante para evitar duplicação
 DESCRICAO_LABEL = 'Descrição'
@@ -146,6 +148,8 @@ class ProductForm(forms.ModelForm):
         # Adicionar opção vazia para selects obrigatórios
         self.fields['category'].empty_label = "Selecione uma categoria"
         self.fields['unit'].empty_label = "Selecione uma unidade"
+        use_cached_choices(self.fields['category'], category_choices(active_only=False))
+        use_cached_choices(self.fields['unit'], unit_choices())
         
         # Marcar campos obrigatórios com asterisco
         for field_name, field in self.fields.items():
@@ -289,6 +293,22 @@ class ProductSearchForm(forms.Form):
         }),
         label='Status'
     )
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        use_cached_choices(self.fields['category'], category_choices(active_only=False))
+        use_cached_choices(self.fields['unit'], unit_choices())
+
+
+class ProductFilterForm(forms.Form):
+    """Filtro por produto (seletor com busca) das barras de filtro."""
+    
+    product = ProductChoiceField(
+        required=False,
+        empty_label='Todos os produtos',
+        widget=ProductPickerWidget(attrs={'class': 'form-select'}),
+        label='Produto'
+    )
 
 
 class ProductBulkActionForm(forms.Form):
@@ -299,6 +319,7 @@ class ProductBulkActionForm(forms.Form):
         ('activate', 'Ativar produtos'),
         ('deactivate', 'Desativar produtos'),
         ('update_min_stock', 'Atualizar estoque mínimo'),
+        ('update_unit_price', 'Atualizar preço unitário'),
     ]
     
     action = forms.ChoiceField(
@@ -321,6 +342,19 @@ class ProductBulkActionForm(forms.Form):
         label='Novo Estoque Mínimo'
     )
     
+    new_unit_price = forms.DecimalField(
+        required=False,
+        min_value=0,
+        max_digits=10,
+        decimal_places=2,
+        widget=forms.NumberInput(attrs={
+            'class': 'form-control',
+            'placeholder': 'Novo preço unitário',
+            'step': '0.01'
+        }),
+        label='Novo Preço Unitário'
+    )
+    
     selected_products = forms.CharField(
         widget=forms.HiddenInput(),
         required=True
@@ -334,4 +368,7 @@ class ProductBulkActionForm(forms.Form):
         if action == 'update_min_stock' and new_min_stock is None:
             raise ValidationError('Novo estoque mínimo é obrigatório para esta ação.')
         
+        if action == 'update_unit_price' and cleaned_data.get('new_unit_price') is None:
+            raise ValidationError('Novo preço unitário é obrigatório para esta ação.')
+        
         return cleaned_data
\ No newline at end of file
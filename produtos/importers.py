@@ -0,0 +1,393 @@
+"""
+Importação em massa de produtos a partir de CSV/XLSX.
+
+O arquivo é lido em streaming e processado em lotes: cada lote é validado
+(SKU, categoria/unidade resolvidas por dicionários pré-carregados, números e
+datas) e gravado com um único upsert. Linhas inválidas não interrompem a
+importação; os erros são devolvidos com o número da linha. Linhas cujo SKU
+pertence a um produto removido (inativo) são rejeitadas, a menos que a
+reativação seja pedida explicitamente (``reactivate``).
+
+No PostgreSQL o lote pode ser carregado via COPY em uma tabela temporária
+seguida de INSERT ... ON CONFLICT; nos demais bancos usa-se
+``bulk_create(update_conflicts=True)``.
+"""
+import csv
+import io
+import os
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .expiry import invalidate_expiry_summary
+from .models import Category, Product, Unit
+
+
+# Cabeçalhos aceitos -> campo do modelo (inclui os nomes de export_products)
+COLUMN_ALIASES = {
+    'sku': 'sku',
+    'codigo': 'sku',
+    'código': 'sku',
+    'código/sku': 'sku',
+    'name': 'name',
+    'nome': 'name',
+    'description': 'description',
+    'descricao': 'description',
+    'descrição': 'description',
+    'category': 'category',
+    'categoria': 'category',
+    'unit': 'unit',
+    'unidade': 'unit',
+    'current_stock': 'current_stock',
+    'estoque atual': 'current_stock',
+    'min_stock': 'min_stock',
+    'estoque mínimo': 'min_stock',
+    'estoque minimo': 'min_stock',
+    'unit_price': 'unit_price',
+    'preço unitário': 'unit_price',
+    'preco unitario': 'unit_price',
+    'expiry_date': 'expiry_date',
+    'validade': 'expiry_date',
+    'ncm': 'ncm',
+}
+
+REQUIRED_COLUMNS = ('sku', 'name', 'category', 'unit')
+
+# Colunas atualizadas quando o SKU já existe. O estoque atual só é gravado
+# em produtos novos: alterações de saldo devem passar por movimentações.
+UPDATE_FIELDS = [
+    'name', 'description', 'category', 'unit', 'min_stock',
+    'unit_price', 'expiry_date', 'ncm', 'is_active', 'updated_at',
+]
+
+
+class ProductImportError(Exception):
+    """Erro que impede a importação do arquivo inteiro (ex: cabeçalho inválido)."""
+
+
+class ImportResult:
+    """Resumo de uma importação."""
+
+    def __init__(self, max_errors=1000):
+        self.total_rows = 0
+        self.created = 0
+        self.updated = 0
+        self.error_count = 0
+        self.errors = []
+        self.max_errors = max_errors
+
+    def add_error(self, row_number, sku, messages):
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'row': row_number, 'sku': sku, 'errors': messages})
+
+    @property
+    def imported(self):
+        return self.created + self.updated
+
+    def as_dict(self):
+        return {
+            'total_rows': self.total_rows,
+            'created': self.created,
+            'updated': self.updated,
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'errors_truncated': self.error_count > len(self.errors),
+        }
+
+
+def _normalize_header(value):
+    return COLUMN_ALIASES.get(str(value or '').strip().lower())
+
+
+def iter_csv_rows(fileobj, encoding='utf-8-sig'):
+    """Gera (número da linha, dict) de um CSV (separador detectado: ',' ou ';')."""
+    if isinstance(fileobj, (bytes, bytearray)):
+        fileobj = io.BytesIO(fileobj)
+    text = fileobj if isinstance(fileobj, io.TextIOBase) else io.TextIOWrapper(fileobj, encoding=encoding, newline='')
+
+    sample = text.readline()
+    delimiter = ';' if sample.count(';') > sample.count(',') else ','
+    header_row = next(csv.reader([sample], delimiter=delimiter), [])
+    headers = [_normalize_header(h) for h in header_row]
+    _check_headers(headers)
+
+    for row_number, values in enumerate(csv.reader(text, delimiter=delimiter), start=2):
+        if not any(v.strip() for v in values):
+            continue
+        yield row_number, {h: v for h, v in zip(headers, values) if h}
+
+
+def iter_xlsx_rows(fileobj):
+    """Gera (número da linha, dict) da primeira planilha de um XLSX (modo streaming)."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        headers = [_normalize_header(h) for h in next(rows, ())]
+        _check_headers(headers)
+
+        for row_number, values in enumerate(rows, start=2):
+            if not any(v not in (None, '') for v in values):
+                continue
+            yield row_number, {h: v for h, v in zip(headers, values) if h}
+    finally:
+        workbook.close()
+
+
+def _check_headers(headers):
+    missing = [c for c in REQUIRED_COLUMNS if c not in headers]
+    if missing:
+        raise ProductImportError(f"Colunas obrigatórias ausentes: {', '.join(missing)}")
+
+
+def iter_rows(fileobj, filename):
+    """Escolhe o leitor pelo nome do arquivo (.csv ou .xlsx)."""
+    ext = os.path.splitext(filename or '')[1].lower()
+    if ext == '.xlsx':
+        return iter_xlsx_rows(fileobj)
+    if ext in ('.csv', '.txt', ''):
+        return iter_csv_rows(fileobj)
+    raise ProductImportError(f"Formato não suportado: {ext}. Use CSV ou XLSX.")
+
+
+def _parse_decimal(value, field_label, errors, required=False, field=None):
+    """
+    Converte um número da planilha (aceita ``1.234,56``).
+
+    Args:
+        field: Campo de Product cujo ``max_digits``/``decimal_places`` limitam o valor
+    """
+    if value in (None, ''):
+        if required:
+            errors.append(f"{field_label} é obrigatório.")
+        return None
+    if isinstance(value, (int, float, Decimal)):
+        number = Decimal(str(value))
+    else:
+        text = str(value).strip().replace(' ', '')
+        if ',' in text:
+            # Formato brasileiro: 1.234,56
+            text = text.replace('.', '').replace(',', '.')
+        try:
+            number = Decimal(text)
+        except InvalidOperation:
+            errors.append(f"{field_label} inválido: {value}")
+            return None
+    if not number.is_finite():
+        errors.append(f"{field_label} inválido: {value}")
+        return None
+    if number < 0:
+        errors.append(f"{field_label} não pode ser negativo.")
+        return None
+    if field is not None:
+        model_field = Product._meta.get_field(field)
+        limit = Decimal(10) ** (model_field.max_digits - model_field.decimal_places)
+        # Antes do quantize (valores enormes estouram a precisão) e depois (arredondamento)
+        if number >= limit or number.quantize(Decimal('0.01')) >= limit:
+            errors.append(f"{field_label} excede o máximo permitido ({limit - Decimal('0.01')}).")
+            return None
+    return number.quantize(Decimal('0.01'))
+
+
+def _parse_date(value, errors):
+    if value in (None, ''):
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value).strip()
+    for fmt in ('%Y-%m-%d', '%d/%m/%Y'):
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    errors.append(f"Validade inválida: {value}")
+    return None
+
+
+class ProductImporter:
+    """
+    Importa produtos em lotes.
+
+    Args:
+        chunk_size: Linhas por lote (validação + upsert).
+        create_missing: Cria categorias/unidades inexistentes em vez de
+            rejeitar a linha.
+        dry_run: Apenas valida, sem gravar.
+        use_copy: No PostgreSQL, carrega o lote via COPY (padrão: automático).
+        reactivate: Atualiza e reativa produtos removidos (inativos) com o
+            mesmo SKU; sem a opção essas linhas são rejeitadas.
+    """
+
+    def __init__(self, chunk_size=2000, create_missing=False, dry_run=False,
+                 use_copy=None, max_errors=1000, reactivate=False):
+        self.chunk_size = chunk_size
+        self.create_missing = create_missing
+        self.dry_run = dry_run
+        self.reactivate = reactivate
+        self.use_copy = connection.vendor == 'postgresql' if use_copy is None else use_copy
+        self.result = ImportResult(max_errors=max_errors)
+        self._seen_skus = {}  # SKU (minúsculo) -> número da linha
+        self._categories = {
+            name.lower(): pk for pk, name in Category.objects.values_list('pk', 'name')
+        }
+        self._units = {
+            name.lower(): pk for pk, name in Unit.objects.values_list('pk', 'name')
+        }
+
+    def run(self, fileobj, filename):
+        """Processa o arquivo inteiro e retorna o ImportResult."""
+        chunk = []
+        for row_number, row in iter_rows(fileobj, filename):
+            self.result.total_rows += 1
+            product = self.validate_row(row_number, row)
+            if product is not None:
+                chunk.append(product)
+            if len(chunk) >= self.chunk_size:
+                self.load_chunk(chunk)
+                chunk = []
+        if chunk:
+            self.load_chunk(chunk)
+        return self.result
+
+    def validate_row(self, row_number, row):
+        """Valida e converte uma linha em Product (não salvo), ou registra os erros."""
+        errors = []
+        sku = str(row.get('sku') or '').strip()
+        name = str(row.get('name') or '').strip()
+
+        if not sku:
+            errors.append("SKU é obrigatório.")
+        elif len(sku) > 64:
+            errors.append("SKU excede 64 caracteres.")
+        elif sku.lower() in self._seen_skus:
+            errors.append("SKU duplicado no arquivo.")
+        if not name:
+            errors.append("Nome é obrigatório.")
+
+        category_id = self._resolve(row.get('category'), self._categories, Category, 'Categoria', errors)
+        unit_id = self._resolve(row.get('unit'), self._units, Unit, 'Unidade', errors)
+        current_stock = _parse_decimal(row.get('current_stock'), 'Estoque atual', errors, field='current_stock')
+        min_stock = _parse_decimal(row.get('min_stock'), 'Estoque mínimo', errors, field='min_stock')
+        unit_price = _parse_decimal(row.get('unit_price'), 'Preço unitário', errors, field='unit_price')
+        expiry_date = _parse_date(row.get('expiry_date'), errors)
+
+        if errors:
+            self.result.add_error(row_number, sku, errors)
+            return None
+
+        self._seen_skus[sku.lower()] = row_number
+        product = Product(
+            sku=sku,
+            name=name[:255],
+            description=str(row.get('description') or ''),
+            category_id=category_id,
+            unit_id=unit_id,
+            current_stock=current_stock or Decimal('0.00'),
+            min_stock=min_stock or Decimal('0.00'),
+            unit_price=unit_price,
+            expiry_date=expiry_date,
+            ncm=str(row.get('ncm') or '')[:20],
+            is_active=True,
+        )
+        product.stock_status = product.compute_stock_status()
+        return product
+
+    def _resolve(self, value, lookup, model, label, errors):
+        name = str(value or '').strip()
+        if not name:
+            errors.append(f"{label} é obrigatória.")
+            return None
+        pk = lookup.get(name.lower())
+        if pk is None and self.create_missing and not self.dry_run:
+            pk = model.objects.get_or_create(name=name)[0].pk
+            lookup[name.lower()] = pk
+        elif pk is None and self.create_missing:
+            # Em dry-run a criação é apenas simulada
+            pk = lookup[name.lower()] = -1
+        if pk is None:
+            errors.append(f"{label} não encontrada: {name}")
+        return pk
+
+    def load_chunk(self, products):
+        """Grava um lote validado com um único upsert."""
+        existing = dict(
+            Product.objects.filter(sku__in=[p.sku for p in products]).values_list('sku', 'is_active')
+        )
+        if not self.reactivate:
+            # Produto removido não volta ao catálogo sem a opção de reativação
+            removed = {sku for sku, is_active in existing.items() if not is_active}
+            for product in products:
+                if product.sku in removed:
+                    self.result.add_error(
+                        self._seen_skus[product.sku.lower()], product.sku,
+                        ["Produto removido (inativo) com este SKU; use a opção de reativação para atualizá-lo."],
+                    )
+            if removed:
+                products = [p for p in products if p.sku not in removed]
+                for sku in removed:
+                    del existing[sku]
+                if not products:
+                    return
+        self.result.updated += len(existing)
+        self.result.created += len(products) - len(existing)
+        if self.dry_run:
+            return
+
+        with transaction.atomic():
+            if self.use_copy:
+                self._copy_chunk(products)
+            else:
+                Product.objects.bulk_create(
+                    products,
+                    update_conflicts=True,
+                    unique_fields=['sku'],
+                    update_fields=UPDATE_FIELDS,
+                )
+            # Produtos existentes mantêm o saldo: recalcula o status no banco
+            chunk = Product.objects.filter(sku__in=[p.sku for p in products])
+            Product.refresh_stock_status(chunk)
+            # O upsert não passa por Product.save: eventos de webhook do lote
+            Product.publish_bulk_events(
+                chunk, created_skus={p.sku for p in products} - set(existing)
+            )
+        # O upsert grava validade/ativo sem passar por Product.save
+        invalidate_expiry_summary()
+
+    def _copy_chunk(self, products):
+        """PostgreSQL: COPY para tabela temporária + INSERT ... ON CONFLICT."""
+        table = Product._meta.db_table
+        columns = [
+            'sku', 'name', 'description', 'category_id', 'unit_id', 'current_stock',
+            'min_stock', 'unit_price', 'expiry_date', 'ncm', 'stock_status',
+        ]
+        now = timezone.now()
+        update_columns = [Product._meta.get_field(f).column for f in UPDATE_FIELDS]
+        cols = ', '.join(columns)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TEMP TABLE IF NOT EXISTS product_import_stage "
+                f"ON COMMIT DELETE ROWS AS SELECT {cols} FROM {table} WITH NO DATA"
+            )
+            with cursor.copy(f"COPY product_import_stage ({cols}) FROM STDIN") as copy:
+                for p in products:
+                    copy.write_row([
+                        p.sku, p.name, p.description, p.category_id, p.unit_id,
+                        p.current_stock, p.min_stock, p.unit_price, p.expiry_date, p.ncm,
+                        p.stock_status,
+                    ])
+            cursor.execute(
+                f"INSERT INTO {table} ({cols}, is_active, created_at, updated_at) "
+                f"SELECT {cols}, TRUE, %s, %s FROM product_import_stage "
+                f"ON CONFLICT (sku) DO UPDATE SET "
+                + ', '.join(
+                    f"{c} = EXCLUDED.{c}" for c in update_columns
+                ),
+                [now, now],
+            )
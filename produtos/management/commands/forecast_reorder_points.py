@@ -0,0 +1,63 @@
+"""
+Recalcula a previsão de demanda e o ponto de pedido de todo o catálogo.
+Uso (noturno, via cron): python manage.py forecast_reorder_points [--apply]
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from produtos.forecasting import apply_suggestions, compute_forecasts, save_forecasts
+
+
+class Command(BaseCommand):
+    help = 'Calcula demanda, estoque de segurança e estoque mínimo sugerido a partir das saídas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.STOCK_FORECAST_HISTORY_DAYS,
+            help=f'Dias de histórico (padrão: {settings.STOCK_FORECAST_HISTORY_DAYS})'
+        )
+        parser.add_argument(
+            '--lead-time',
+            type=int,
+            default=settings.STOCK_FORECAST_LEAD_TIME_DAYS,
+            help='Prazo de reposição padrão em dias (produtos podem definir o próprio)'
+        )
+        parser.add_argument(
+            '--service-level',
+            type=float,
+            default=settings.STOCK_FORECAST_SERVICE_LEVEL,
+            help=f'Nível de serviço entre 0 e 1 (padrão: {settings.STOCK_FORECAST_SERVICE_LEVEL})'
+        )
+        parser.add_argument(
+            '--apply',
+            action='store_true',
+            help='Grava o ponto de pedido sugerido em min_stock'
+        )
+
+    def handle(self, *args, **options):
+        if not 0 < options['service_level'] < 1:
+            raise CommandError('--service-level deve estar entre 0 e 1.')
+
+        start = time.monotonic()
+        try:
+            forecasts = compute_forecasts(
+                history_days=options['days'],
+                lead_time_days=options['lead_time'],
+                service_level=options['service_level'],
+            )
+        except ImportError as exc:
+            raise CommandError(str(exc))
+        computed = time.monotonic()
+        saved = save_forecasts(forecasts)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{saved} previsão(ões) em {time.monotonic() - start:.1f}s "
+            f"(cálculo {computed - start:.1f}s)."
+        ))
+        if options['apply']:
+            changed = apply_suggestions()
+            self.stdout.write(self.style.SUCCESS(f"{changed} estoque(s) mínimo(s) atualizado(s)."))
@@ -0,0 +1,73 @@
+"""
+Importa produtos em massa a partir de um arquivo CSV ou XLSX.
+Uso: python manage.py import_products catalogo.xlsx [--create-missing] [--reactivate] [--dry-run]
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from produtos.importers import ProductImporter, ProductImportError
+
+
+class Command(BaseCommand):
+    help = 'Importa produtos em massa (CSV/XLSX) com validação por linha e upsert em lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Arquivo .csv ou .xlsx')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Linhas por lote (padrão: 2000)'
+        )
+        parser.add_argument(
+            '--create-missing',
+            action='store_true',
+            help='Cria categorias e unidades inexistentes'
+        )
+        parser.add_argument(
+            '--reactivate',
+            action='store_true',
+            help='Atualiza e reativa produtos removidos com o mesmo SKU'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Apenas valida o arquivo, sem gravar'
+        )
+        parser.add_argument(
+            '--no-copy',
+            action='store_true',
+            help='Não usar COPY no PostgreSQL (usa bulk_create)'
+        )
+
+    def handle(self, *args, **options):
+        importer = ProductImporter(
+            chunk_size=options['chunk_size'],
+            create_missing=options['create_missing'],
+            dry_run=options['dry_run'],
+            reactivate=options['reactivate'],
+            use_copy=False if options['no_copy'] else None,
+        )
+
+        start = time.monotonic()
+        try:
+            with open(options['path'], 'rb') as fileobj:
+                result = importer.run(fileobj, options['path'])
+        except (OSError, ProductImportError) as exc:
+            raise CommandError(str(exc))
+        elapsed = time.monotonic() - start
+
+        for error in result.errors:
+            self.stdout.write(
+                self.style.WARNING(f"Linha {error['row']} ({error['sku']}): {'; '.join(error['errors'])}")
+            )
+        if result.error_count > len(result.errors):
+            self.stdout.write(f"... e mais {result.error_count - len(result.errors)} erro(s).")
+
+        prefix = '[dry-run] ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}{result.total_rows} linha(s) em {elapsed:.1f}s: "
+            f"{result.created} criado(s), {result.updated} atualizado(s), "
+            f"{result.error_count} com erro."
+        ))
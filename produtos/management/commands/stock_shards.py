@@ -0,0 +1,56 @@
+"""
+Gerencia o contador de estoque fragmentado.
+Uso:
+    python manage.py stock_shards enable SKU [--shards 8]
+    python manage.py stock_shards disable SKU
+    python manage.py stock_shards compact [SKU]   # agendar no cron (ex: a cada minuto)
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from produtos.models import Product
+from produtos.stock_shards import DEFAULT_SHARDS, compact, compact_all, disable_sharding, enable_sharding
+
+
+class Command(BaseCommand):
+    help = 'Ativa, desativa ou compacta o estoque fragmentado de produtos de alta concorrência'
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['enable', 'disable', 'compact'])
+        parser.add_argument('sku', nargs='?', help='SKU do produto (obrigatório em enable/disable)')
+        parser.add_argument(
+            '--shards',
+            type=int,
+            default=DEFAULT_SHARDS,
+            help=f'Quantidade de fragmentos (padrão: {DEFAULT_SHARDS})'
+        )
+
+    def handle(self, *args, **options):
+        action = options['action']
+        product = None
+        if options['sku']:
+            try:
+                product = Product.objects.get(sku=options['sku'])
+            except Product.DoesNotExist:
+                raise CommandError(f"Produto não encontrado: {options['sku']}")
+        elif action != 'compact':
+            raise CommandError('Informe o SKU do produto.')
+
+        if action == 'enable':
+            try:
+                enable_sharding(product, options['shards'])
+            except ValueError as exc:
+                raise CommandError(str(exc))
+            self.stdout.write(self.style.SUCCESS(
+                f"{product.sku}: saldo {product.current_stock} dividido em {product.stock_shards} fragmento(s)."
+            ))
+        elif action == 'disable':
+            disable_sharding(product)
+            self.stdout.write(self.style.SUCCESS(
+                f"{product.sku}: fragmentos consolidados (saldo {product.current_stock})."
+            ))
+        elif product is not None:
+            total = compact(product)
+            self.stdout.write(self.style.SUCCESS(f"{product.sku}: compactado (saldo {total})."))
+        else:
+            count = compact_all()
+            self.stdout.write(self.style.SUCCESS(f"{count} produto(s) fragmentado(s) compactado(s)."))
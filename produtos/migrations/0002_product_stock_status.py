@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:20
+
+from django.db import migrations, models
+from django.db.models import Case, F, Value, When
+
+
+def backfill_stock_status(apps, schema_editor):
+    """Preenche stock_status dos produtos existentes com um único UPDATE."""
+    Product = apps.get_model('produtos', 'Product')
+    Product.objects.update(stock_status=Case(
+        When(current_stock=0, then=Value('CRITICO')),
+        When(current_stock__lte=F('min_stock'), then=Value('BAIXO')),
+        default=Value('OK'),
+        output_field=models.CharField(),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produtos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='stock_status',
+            field=models.CharField(choices=[('CRITICO', 'Crítico'), ('BAIXO', 'Baixo'), ('OK', 'OK')], default='CRITICO', editable=False, max_length=10, verbose_name='Status do Estoque'),
+        ),
+        migrations.RunPython(backfill_stock_status, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['stock_status', 'name'], name='product_active_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('stock_status', 'OK'), _negated=True), fields=['is_active', 'stock_status'], name='product_alert_status_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produtos', '0002_product_stock_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('expiry_date__isnull', False), ('is_active', True)), fields=['expiry_date'], name='product_active_expiry_idx'),
+        ),
+    ]
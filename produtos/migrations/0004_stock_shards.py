@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:33
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produtos', '0003_product_active_expiry_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='stock_shards',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, help_text='Quantidade de linhas em que o saldo é dividido (0 = desativado)', verbose_name='Fragmentos de Estoque'),
+        ),
+        migrations.CreateModel(
+            name='ProductStockShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField(verbose_name='Fragmento')),
+                ('quantity', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=10, verbose_name='Saldo')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shards', to='produtos.product', verbose_name='Produto')),
+            ],
+            options={
+                'verbose_name': 'Fragmento de Estoque',
+                'verbose_name_plural': 'Fragmentos de Estoque',
+                'ordering': ['product', 'shard'],
+                'constraints': [models.UniqueConstraint(fields=('product', 'shard'), name='product_stock_shard_uniq'), models.CheckConstraint(condition=models.Q(('quantity__gte', 0)), name='product_stock_shard_quantity_gte_0')],
+            },
+        ),
+    ]
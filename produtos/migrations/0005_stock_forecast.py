@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produtos', '0004_stock_shards'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockForecast',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='forecast', serialize=False, to='produtos.product', verbose_name='Produto')),
+                ('daily_demand', models.DecimalField(decimal_places=3, max_digits=12, verbose_name='Demanda Diária Média')),
+                ('demand_std', models.DecimalField(decimal_places=3, max_digits=12, verbose_name='Desvio Padrão Diário')),
+                ('lead_time_days', models.PositiveSmallIntegerField(verbose_name='Prazo de Reposição (dias)')),
+                ('safety_stock', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Estoque de Segurança')),
+                ('reorder_point', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Ponto de Pedido (estoque mínimo sugerido)')),
+                ('history_days', models.PositiveSmallIntegerField(verbose_name='Dias de Histórico')),
+                ('computed_at', models.DateTimeField(verbose_name='Calculado em')),
+            ],
+            options={
+                'verbose_name': 'Previsão de Reposição',
+                'verbose_name_plural': 'Previsões de Reposição',
+            },
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='lead_time_days',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Vazio = prazo padrão (settings.STOCK_FORECAST_LEAD_TIME_DAYS)', null=True, verbose_name='Prazo de Reposição (dias)'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produtos', '0006_product_updated_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='product',
+            name='stock_shards',
+            field=models.PositiveSmallIntegerField(db_default=0, default=0, editable=False, help_text='Quantidade de linhas em que o saldo é dividido (0 = desativado)', verbose_name='Fragmentos de Estoque'),
+        ),
+    ]
@@ -1,7 +1,9 @@
 """
 Models para gerenciamento de produtos.
 """
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
 from django.utils import timezone
 from django.urls import reverse
@@ -75,9 +77,41 @@ class Unit(TimeStampedModel):
         return self.name
 
 
+def stock_status_expression():
+    """
+    Expressão SQL equivalente a Product.compute_stock_status().
+
+    Usada para recalcular o status em atualizações por conjunto
+    (ex: ``Product.objects.filter(...).update(stock_status=stock_status_expression())``).
+    """
+    return Case(
+        When(current_stock=0, then=Value(Product.STOCK_CRITICO)),
+        When(current_stock__lte=F('min_stock'), then=Value(Product.STOCK_BAIXO)),
+        default=Value(Product.STOCK_OK),
+        output_field=models.CharField(),
+    )
+
+
 class Product(TimeStampedModel, SoftDeleteModel):
     """Produto do estoque."""
     
+    # Status do estoque
+    STOCK_CRITICO = 'CRITICO'
+    STOCK_BAIXO = 'BAIXO'
+    STOCK_OK = 'OK'
+    
+    STOCK_STATUS_CHOICES = [
+        (STOCK_CRITICO, 'Crítico'),
+        (STOCK_BAIXO, 'Baixo'),
+        (STOCK_OK, 'OK'),
+    ]
+    
+    # Campos enviados em product.created/product.updated (core/webhooks.py)
+    WEBHOOK_FIELDS = (
+        'id', 'sku', 'name', 'current_stock', 'min_stock', 'stock_status',
+        'unit_price', 'is_active', 'updated_at',
+    )
+    
     # Identificação
     sku = models.CharField(
         max_length=64,
@@ -124,6 +158,32 @@ class Product(TimeStampedModel, SoftDeleteModel):
         verbose_name="Estoque Mínimo",
         help_text="Nível mínimo de estoque antes de alerta"
     )
+    # Reposição: prazo do fornecedor usado na previsão do ponto de pedido
+    lead_time_days = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        verbose_name="Prazo de Reposição (dias)",
+        help_text="Vazio = prazo padrão (settings.STOCK_FORECAST_LEAD_TIME_DAYS)"
+    )
+    # Contador fragmentado para produtos de alta concorrência (0 = desativado).
+    # Gerenciado por produtos.stock_shards; com fragmentos, current_stock
+    # recebe as variações após o commit (movimentacoes/stock_journal.py).
+    # db_default: o COPY do importador grava sem passar pelo ORM.
+    stock_shards = models.PositiveSmallIntegerField(
+        default=0,
+        db_default=0,
+        editable=False,
+        verbose_name="Fragmentos de Estoque",
+        help_text="Quantidade de linhas em que o saldo é dividido (0 = desativado)"
+    )
+    # Materializado a partir de current_stock/min_stock para filtros indexados
+    stock_status = models.CharField(
+        max_length=10,
+        choices=STOCK_STATUS_CHOICES,
+        default=STOCK_CRITICO,
+        editable=False,
+        verbose_name="Status do Estoque"
+    )
     
     # Financeiro
     unit_price = models.DecimalField(
@@ -158,11 +218,87 @@ class Product(TimeStampedModel, SoftDeleteModel):
             models.Index(fields=['sku']),
             models.Index(fields=['category', 'name']),
             models.Index(fields=['is_active']),
+            # Listagens de produtos ativos por status (ordenadas por nome)
+            models.Index(
+                fields=['stock_status', 'name'],
+                condition=Q(is_active=True),
+                name='product_active_status_idx',
+            ),
+            # Alertas (CRITICO/BAIXO): índice pequeno, só com as linhas em alerta
+            models.Index(
+                fields=['is_active', 'stock_status'],
+                condition=~Q(stock_status='OK'),
+                name='product_alert_status_idx',
+            ),
+            # Delta de saldos dos coletores (movimentacoes/sync.py)
+            models.Index(fields=['updated_at'], name='product_updated_idx'),
+            # Calendário de validade: só produtos ativos com validade definida
+            models.Index(
+                fields=['expiry_date'],
+                condition=Q(is_active=True, expiry_date__isnull=False),
+                name='product_active_expiry_idx',
+            ),
         ]
 
     def __str__(self):
         return f"{self.sku} — {self.name}"
 
+    def clean(self):
+        """Recusa alteração direta do saldo de produtos fragmentados."""
+        super().clean()
+        if self.pk and self.stock_shards:
+            stored = Product.objects.filter(pk=self.pk).values_list('current_stock', flat=True).first()
+            if stored is not None and stored != self.current_stock:
+                raise ValidationError({
+                    'current_stock': 'Produto com estoque fragmentado: o saldo só muda por movimentações.'
+                })
+
+    def save(self, *args, **kwargs):
+        """Mantém stock_status consistente com current_stock/min_stock."""
+        self.stock_status = self.compute_stock_status()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'current_stock', 'min_stock'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'stock_status'}
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            # Saldo alterado por movimentação já sai no evento movement.created
+            if update_fields is None or set(update_fields) - {'current_stock', 'updated_at'}:
+                self._publish_event(adding)
+
+        if update_fields is None or {'expiry_date', 'is_active'} & set(update_fields):
+            from .expiry import invalidate_expiry_summary
+            invalidate_expiry_summary()
+
+    def _publish_event(self, created) -> None:
+        """Enfileira product.created/product.updated para os webhooks."""
+        from core.webhooks import PRODUCT_CREATED, PRODUCT_UPDATED, publish
+
+        publish(
+            PRODUCT_CREATED if created else PRODUCT_UPDATED,
+            {field: getattr(self, field) for field in self.WEBHOOK_FIELDS},
+        )
+
+    @classmethod
+    def publish_bulk_events(cls, queryset, created_skus=frozenset()):
+        """
+        Enfileira product.updated (ou product.created, para ``created_skus``)
+        para escritas em conjunto que não passam por save (importação, ações
+        em lote). Deve ser chamado na transação da escrita.
+
+        Returns:
+            int: Eventos gravados.
+        """
+        from core.webhooks import PRODUCT_CREATED, PRODUCT_UPDATED, publish_many, webhook_config
+
+        if webhook_config() is None:
+            return 0
+        rows = queryset.order_by('pk').values(*cls.WEBHOOK_FIELDS)
+        return len(publish_many(
+            (PRODUCT_CREATED if row['sku'] in created_skus else PRODUCT_UPDATED, row)
+            for row in rows
+        ))
+
     def get_absolute_url(self):
         """Retorna a URL de detalhes do produto."""
         return reverse('produtos:detail', kwargs={'pk': self.pk})
@@ -189,16 +325,47 @@ class Product(TimeStampedModel, SoftDeleteModel):
         return " | ".join(desc_parts)
 
     @property
-    def stock_status(self) -> str:
+    def available_stock(self) -> Decimal:
+        """
+        Saldo disponível agora. Em produtos fragmentados soma os fragmentos;
+        nos demais, current_stock mais as variações ainda não aplicadas das
+        movimentações com depósito (ver movimentacoes/stock_journal.py).
         """
-        Retorna o status do estoque.
+        if self.stock_shards:
+            from .stock_shards import shard_total
+            return shard_total(self.pk)
+        from movimentacoes.stock_journal import projected_stock
+        return projected_stock(self.pk)
+
+    def compute_stock_status(self) -> str:
+        """
+        Calcula o status do estoque a partir dos valores atuais.
         Retorna: 'CRITICO', 'BAIXO', 'OK'
         """
-        if self.current_stock == 0:
-            return "CRITICO"
-        elif self.current_stock <= self.min_stock:
-            return "BAIXO"
-        return "OK"
+        return self.stock_status_for(self.current_stock, self.min_stock)
+
+    @classmethod
+    def stock_status_for(cls, current_stock, min_stock) -> str:
+        """Status do estoque para um saldo e um mínimo quaisquer."""
+        if current_stock == 0:
+            return cls.STOCK_CRITICO
+        elif current_stock <= min_stock:
+            return cls.STOCK_BAIXO
+        return cls.STOCK_OK
+
+    @classmethod
+    def refresh_stock_status(cls, queryset=None) -> int:
+        """
+        Recalcula stock_status em massa (após update()/bulk_create que
+        alterem current_stock ou min_stock sem passar por save()).
+        """
+        if queryset is None:
+            queryset = cls.objects.all()
+        expression = stock_status_expression()
+        # updated_at acompanha: o delta dos coletores segue esse campo
+        return queryset.exclude(stock_status=expression).update(
+            stock_status=expression, updated_at=timezone.now()
+        )
 
     @property
     def stock_status_display(self) -> str:
@@ -208,7 +375,7 @@ class Product(TimeStampedModel, SoftDeleteModel):
             'BAIXO': '🟡 Baixo',
             'OK': '🟢 OK'
         }
-        return status_map.get(self.stock_status, 'OK')
+        return status_map.get(self.compute_stock_status(), 'OK')
 
     @property
     def expiry_status(self) -> Optional[str]:
@@ -237,7 +404,7 @@ class Product(TimeStampedModel, SoftDeleteModel):
 
     def has_low_stock(self) -> bool:
         """Verifica se o estoque está baixo ou crítico."""
-        return self.stock_status in ['BAIXO', 'CRITICO']
+        return self.compute_stock_status() in [self.STOCK_BAIXO, self.STOCK_CRITICO]
 
     def is_expired(self) -> bool:
         """Verifica se o produto está vencido."""
@@ -246,3 +413,97 @@ class Product(TimeStampedModel, SoftDeleteModel):
     def is_near_expiry(self) -> bool:
         """Verifica se o produto está próximo do vencimento."""
         return self.expiry_status == 'PROXIMO'
+
+
+class ProductStockShard(models.Model):
+    """
+    Fragmento do saldo de um produto fragmentado.
+
+    Saídas concorrentes decrementam fragmentos diferentes, em vez de
+    disputarem a linha do produto; o saldo real é a soma dos fragmentos.
+    """
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='shards',
+        verbose_name="Produto"
+    )
+    shard = models.PositiveSmallIntegerField(
+        verbose_name="Fragmento"
+    )
+    quantity = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name="Saldo"
+    )
+
+    class Meta:
+        verbose_name = "Fragmento de Estoque"
+        verbose_name_plural = "Fragmentos de Estoque"
+        ordering = ['product', 'shard']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['product', 'shard'],
+                name='product_stock_shard_uniq',
+            ),
+            models.CheckConstraint(
+                condition=Q(quantity__gte=0),
+                name='product_stock_shard_quantity_gte_0',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.product.sku} #{self.shard}: {self.quantity}"
+
+
+class StockForecast(models.Model):
+    """
+    Previsão de demanda e ponto de pedido sugerido de um produto.
+
+    Gerada em lote por ``produtos.forecasting`` (comando noturno
+    ``forecast_reorder_points``); ``reorder_point`` é o estoque mínimo sugerido.
+    """
+    product = models.OneToOneField(
+        Product,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='forecast',
+        verbose_name="Produto"
+    )
+    daily_demand = models.DecimalField(
+        max_digits=12,
+        decimal_places=3,
+        verbose_name="Demanda Diária Média"
+    )
+    demand_std = models.DecimalField(
+        max_digits=12,
+        decimal_places=3,
+        verbose_name="Desvio Padrão Diário"
+    )
+    lead_time_days = models.PositiveSmallIntegerField(
+        verbose_name="Prazo de Reposição (dias)"
+    )
+    safety_stock = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        verbose_name="Estoque de Segurança"
+    )
+    reorder_point = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        verbose_name="Ponto de Pedido (estoque mínimo sugerido)"
+    )
+    history_days = models.PositiveSmallIntegerField(
+        verbose_name="Dias de Histórico"
+    )
+    computed_at = models.DateTimeField(
+        verbose_name="Calculado em"
+    )
+
+    class Meta:
+        verbose_name = "Previsão de Reposição"
+        verbose_name_plural = "Previsões de Reposição"
+
+    def __str__(self):
+        return f"{self.product_id}: ponto de pedido {self.reorder_point}"
@@ -0,0 +1,76 @@
+"""
+Dados de referência do catálogo em cache de dois níveis (core/tiered_cache.py).
+
+Categorias e unidades mudam pouco e aparecem em quase toda página (selects
+de formulários, filtros, dashboard). Os valores são listas de tuplas/dicts,
+nunca instâncias de modelo, e são invalidados pelos signals abaixo.
+Produtos não entram aqui: o catálogo é grande demais para um select; use o
+seletor com busca (produtos/widgets.py).
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.tiered_cache import reference_cache
+
+from .models import Category, Unit
+
+
+CATEGORIES_KEY = 'produtos:categories'
+UNITS_KEY = 'produtos:units'
+
+
+def _load_categories():
+    return [
+        {'id': pk, 'name': name, 'is_active': is_active}
+        for pk, name, is_active in Category.objects.order_by('name').values_list('pk', 'name', 'is_active')
+    ]
+
+
+def categories(active_only=True):
+    """
+    Categorias em ordem de nome.
+
+    Returns:
+        list[dict]: id, name e is_active (servem aos templates como ``cat.id``)
+    """
+    rows = reference_cache().get_or_set(CATEGORIES_KEY, _load_categories)
+    return [row for row in rows if row['is_active']] if active_only else rows
+
+
+def category_choices(active_only=True):
+    return [(row['id'], row['name']) for row in categories(active_only)]
+
+
+def unit_choices():
+    return reference_cache().get_or_set(
+        UNITS_KEY, lambda: list(Unit.objects.order_by('name').values_list('pk', 'name'))
+    )
+
+
+def use_cached_choices(field, choices):
+    """
+    Troca as opções de um ModelChoiceField pelas do cache.
+
+    Só a renderização deixa de consultar o banco; a validação do valor
+    enviado continua no ``queryset`` do campo (uma query por pk).
+    """
+    empty = [('', field.empty_label)] if field.empty_label is not None else []
+    field.choices = empty + list(choices)
+
+
+def invalidate_categories():
+    reference_cache().invalidate(CATEGORIES_KEY)
+
+
+def invalidate_units():
+    reference_cache().invalidate(UNITS_KEY)
+
+
+@receiver([post_save, post_delete], sender=Category)
+def category_changed(**kwargs):
+    invalidate_categories()
+
+
+@receiver([post_save, post_delete], sender=Unit)
+def unit_changed(**kwargs):
+    invalidate_units()
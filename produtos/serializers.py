@@ -3,9 +3,31 @@ Serializers para API REST de produtos.
 """
 from rest_framework import serializers
 from decimal import Decimal
+from django.db.models import Count
 from django.utils import timezone
 
-from .models import Category, Unit, Product
+from core.serializers import SparseFieldsetMixin
+from .models import Category, Unit, Product, StockForecast
+
+
+def active_products_count(serializer, obj, related_field):
+    """
+    Retorna a quantidade de produtos ativos de uma categoria/unidade.
+
+    As contagens são calculadas em uma única query agrupada e guardadas no
+    contexto do serializer raiz, evitando um COUNT por objeto serializado.
+    """
+    cache_key = f'_active_products_count_{related_field}'
+    counts = serializer.context.get(cache_key)
+    if counts is None:
+        counts = dict(
+            Product.objects.filter(is_active=True)
+            .values_list(related_field)
+            .annotate(total=Count('id'))
+            .order_by()
+        )
+        serializer.context[cache_key] = counts
+    return counts.get(obj.pk, 0)
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -24,10 +46,11 @@ class CategorySerializer(serializers.ModelSerializer):
             'updated_at',
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
+        sparse_field_sources = {'products_count': ()}
     
     def get_products_count(self, obj):
         """Retorna quantidade de produtos na categoria."""
-        return obj.products.filter(is_active=True).count()
+        return active_products_count(self, obj, 'category')
     
     def validate_name(self, value):
         """Valida que o nome não está vazio."""
@@ -52,10 +75,11 @@ class UnitSerializer(serializers.ModelSerializer):
             'updated_at',
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
+        sparse_field_sources = {'products_count': ()}
     
     def get_products_count(self, obj):
         """Retorna quantidade de produtos na unidade."""
-        return obj.products.filter(is_active=True).count()
+        return active_products_count(self, obj, 'unit')
     
     def validate_name(self, value):
         """Valida que o nome não está vazio."""
@@ -64,7 +88,7 @@ class UnitSerializer(serializers.ModelSerializer):
         return value.strip().upper()
 
 
-class ProductListSerializer(serializers.ModelSerializer):
+class ProductListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer simplificado para listagem de produtos."""
     
     category_name = serializers.CharField(source='category.name', read_only=True)
@@ -84,19 +108,25 @@ class ProductListSerializer(serializers.ModelSerializer):
             'current_stock',
             'min_stock',
             'unit_price',
+            'stock_status',
             'is_low_stock',
             'is_expired',
             'total_value',
             'expiry_date',
         ]
+        sparse_field_sources = {
+            'is_low_stock': ('current_stock', 'min_stock'),
+            'is_expired': ('expiry_date',),
+            'total_value': ('current_stock', 'unit_price'),
+        }
     
     def get_is_low_stock(self, obj):
         """Verifica se produto está com estoque baixo."""
-        return obj.is_low_stock
+        return obj.has_low_stock()
     
     def get_is_expired(self, obj):
         """Verifica se produto está vencido."""
-        return obj.is_expired
+        return obj.is_expired()
     
     def get_total_value(self, obj):
         """Calcula valor total em estoque."""
@@ -105,7 +135,7 @@ class ProductListSerializer(serializers.ModelSerializer):
         return 0.0
 
 
-class ProductDetailSerializer(serializers.ModelSerializer):
+class ProductDetailSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer completo para detalhes de produtos."""
     
     category = CategorySerializer(read_only=True)
@@ -141,9 +171,11 @@ class ProductDetailSerializer(serializers.ModelSerializer):
             'unit_id',
             'current_stock',
             'min_stock',
+            'lead_time_days',
             'unit_price',
             'expiry_date',
             'ncm',
+            'stock_status',
             'is_low_stock',
             'is_expired',
             'total_value',
@@ -158,14 +190,22 @@ class ProductDetailSerializer(serializers.ModelSerializer):
             'created_at',
             'updated_at',
         ]
+        expandable_fields = ['category', 'unit']
+        sparse_field_sources = {
+            'is_low_stock': ('current_stock', 'min_stock'),
+            'is_expired': ('expiry_date',),
+            'total_value': ('current_stock', 'unit_price'),
+            'movements_count': (),
+            'last_movement_date': (),
+        }
     
     def get_is_low_stock(self, obj):
         """Verifica se produto está com estoque baixo."""
-        return obj.is_low_stock
+        return obj.has_low_stock()
     
     def get_is_expired(self, obj):
         """Verifica se produto está vencido."""
-        return obj.is_expired
+        return obj.is_expired()
     
     def get_total_value(self, obj):
         """Calcula valor total em estoque."""
@@ -241,3 +281,38 @@ class ProductCreateSerializer(ProductDetailSerializer):
     
     class Meta(ProductDetailSerializer.Meta):
         read_only_fields = ['id', 'created_at', 'updated_at']
+
+
+class ReorderSuggestionSerializer(serializers.ModelSerializer):
+    """Estoque mínimo sugerido pela previsão de reposição."""
+    
+    id = serializers.IntegerField(source='product.id', read_only=True)
+    sku = serializers.CharField(source='product.sku', read_only=True)
+    name = serializers.CharField(source='product.name', read_only=True)
+    current_stock = serializers.DecimalField(
+        source='product.current_stock', max_digits=10, decimal_places=2, read_only=True
+    )
+    min_stock = serializers.DecimalField(
+        source='product.min_stock', max_digits=10, decimal_places=2, read_only=True
+    )
+    suggested_min_stock = serializers.DecimalField(
+        source='reorder_point', max_digits=10, decimal_places=2, read_only=True
+    )
+    
+    class Meta:
+        model = StockForecast
+        fields = [
+            'id',
+            'sku',
+            'name',
+            'current_stock',
+            'min_stock',
+            'suggested_min_stock',
+            'daily_demand',
+            'demand_std',
+            'safety_stock',
+            'lead_time_days',
+            'history_days',
+            'computed_at',
+        ]
+        read_only_fields = fields
@@ -0,0 +1,190 @@
+"""
+Contador de estoque fragmentado para produtos de alta concorrência.
+
+Em produtos com ``stock_shards > 0`` o saldo fica dividido em N linhas de
+``ProductStockShard``. Cada saída tenta um fragmento sorteado com um UPDATE
+condicional (``quantity >= q``), sem ler nem travar a linha do produto;
+escritores concorrentes se espalham entre os fragmentos. Só quando nenhum
+fragmento cobre a saída sozinho todos são travados (em ordem) e consumidos
+em sequência.
+
+Toda movimentação do produto passa pelos fragmentos (inclusive as com
+depósito) e registra a variação do total em ``PendingStockDelta``.
+``Product.current_stock`` e ``stock_status`` recebem essas variações logo
+após o commit de cada movimentação (ou pelo worker ``apply_stock_deltas``,
+ver movimentacoes/stock_journal.py); o compactador (``manage.py
+stock_shards compact``, agendado no cron) redistribui o saldo entre os
+fragmentos. current_stock nunca é sobrescrito pela soma dos fragmentos:
+divergências vão para o log. Alterações diretas de current_stock são
+recusadas (``Product.clean``).
+"""
+import random
+from decimal import ROUND_DOWN, Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F, Sum
+
+from .models import Product, ProductStockShard
+
+
+DEFAULT_SHARDS = 8
+MAX_SHARDS = 64
+
+
+def split_quantity(total, shards):
+    """Divide ``total`` em ``shards`` partes iguais (centavos restantes nas primeiras)."""
+    total = Decimal(total)
+    base = (total / shards).quantize(Decimal('0.01'), rounding=ROUND_DOWN)
+    parts = [base] * shards
+    cents = int((total - base * shards) * 100)
+    for i in range(cents):
+        parts[i] += Decimal('0.01')
+    return parts
+
+
+def shard_total(product_id):
+    """Saldo real de um produto fragmentado (soma dos fragmentos, sem lock)."""
+    total = ProductStockShard.objects.filter(product_id=product_id).aggregate(
+        total=Sum('quantity')
+    )['total']
+    return total or Decimal('0.00')
+
+
+def _locked_shards(product_id):
+    return list(
+        ProductStockShard.objects.select_for_update()
+        .filter(product_id=product_id).order_by('shard')
+    )
+
+
+def enable_sharding(product, shards=DEFAULT_SHARDS):
+    """Divide o saldo do produto em ``shards`` fragmentos."""
+    from movimentacoes.stock_journal import apply_locked
+
+    if not 1 <= shards <= MAX_SHARDS:
+        raise ValueError(f"shards deve estar entre 1 e {MAX_SHARDS}.")
+
+    with transaction.atomic():
+        locked = Product.objects.select_for_update().get(pk=product.pk)
+        # Variações pendentes entram antes: os fragmentos partem do total real
+        apply_locked(locked)
+        if locked.stock_shards:
+            total = sum((s.quantity for s in _locked_shards(locked.pk)), Decimal('0.00'))
+        else:
+            total = locked.current_stock
+        ProductStockShard.objects.filter(product=locked).delete()
+        ProductStockShard.objects.bulk_create([
+            ProductStockShard(product=locked, shard=i, quantity=quantity)
+            for i, quantity in enumerate(split_quantity(total, shards))
+        ])
+        Product.objects.filter(pk=locked.pk).update(stock_shards=shards)
+    product.stock_shards = shards
+    product.current_stock = locked.current_stock
+
+
+def disable_sharding(product):
+    """Aplica as variações pendentes e volta ao contador único."""
+    from movimentacoes.stock_journal import apply_locked, check_shards
+
+    with transaction.atomic():
+        locked = Product.objects.select_for_update().get(pk=product.pk)
+        if not locked.stock_shards:
+            return
+        apply_locked(locked)
+        total = sum((s.quantity for s in _locked_shards(locked.pk)), Decimal('0.00'))
+        check_shards(locked, total)
+        locked.stock_shards = 0
+        locked.save(update_fields=['stock_shards', 'updated_at'])
+        ProductStockShard.objects.filter(product=locked).delete()
+    product.stock_shards = 0
+    product.current_stock = locked.current_stock
+
+
+def add_stock(product, quantity):
+    """Soma ``quantity`` a um fragmento sorteado."""
+    ProductStockShard.objects.filter(
+        product_id=product.pk, shard=random.randrange(product.stock_shards)
+    ).update(quantity=F('quantity') + quantity)
+
+
+def take_stock(product, quantity):
+    """
+    Retira ``quantity`` do saldo fragmentado.
+
+    Raises:
+        ValidationError: Quando a soma dos fragmentos é insuficiente
+    """
+    shards = ProductStockShard.objects.filter(product_id=product.pk)
+    for shard in random.sample(range(product.stock_shards), product.stock_shards):
+        if shards.filter(shard=shard, quantity__gte=quantity).update(
+            quantity=F('quantity') - quantity
+        ):
+            return
+
+    # Nenhum fragmento cobre a saída sozinho: consome vários, travados em ordem
+    locked = list(shards.select_for_update().order_by('shard'))
+    available = sum((s.quantity for s in locked), Decimal('0.00'))
+    if available < quantity:
+        raise ValidationError(
+            f"Estoque insuficiente. Disponível: {available} {product.unit}"
+        )
+    remaining = Decimal(quantity)
+    for s in locked:
+        taken = min(s.quantity, remaining)
+        s.quantity -= taken
+        remaining -= taken
+        if not remaining:
+            break
+    ProductStockShard.objects.bulk_update(locked, ['quantity'])
+
+
+def set_stock(product, quantity):
+    """
+    Define o saldo absoluto (ajuste), redistribuindo entre os fragmentos.
+
+    Returns:
+        Decimal: Saldo anterior (soma dos fragmentos).
+    """
+    locked = _locked_shards(product.pk)
+    previous = sum((s.quantity for s in locked), Decimal('0.00'))
+    for s, part in zip(locked, split_quantity(quantity, len(locked))):
+        s.quantity = part
+    ProductStockShard.objects.bulk_update(locked, ['quantity'])
+    return previous
+
+
+def compact(product):
+    """
+    Aplica as variações pendentes e redistribui o saldo entre os fragmentos.
+
+    current_stock recebe apenas as variações do razão; se a soma dos
+    fragmentos divergir, a diferença vai para o log (ver stock_journal.py).
+
+    Returns:
+        Decimal: current_stock após a aplicação.
+    """
+    from movimentacoes.stock_journal import apply_locked, check_shards
+
+    with transaction.atomic():
+        # Produto antes dos fragmentos: mesma ordem de enable/disable
+        locked = Product.objects.select_for_update().get(pk=product.pk)
+        apply_locked(locked)
+        shards = _locked_shards(locked.pk)
+        if shards:
+            total = sum((s.quantity for s in shards), Decimal('0.00'))
+            for s, part in zip(shards, split_quantity(total, len(shards))):
+                s.quantity = part
+            ProductStockShard.objects.bulk_update(shards, ['quantity'])
+            check_shards(locked, total)
+    product.current_stock = locked.current_stock
+    return locked.current_stock
+
+
+def compact_all():
+    """Compacta todos os produtos fragmentados (uma transação por produto)."""
+    compacted = 0
+    for product in Product.objects.filter(stock_shards__gt=0).only('pk', 'current_stock'):
+        compact(product)
+        compacted += 1
+    return compacted
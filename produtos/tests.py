@@ -6,8 +6,10 @@ from django.test import TestCase, Client
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Permission
 from django.urls import reverse
+from django.utils import timezone
 from decimal import Decimal
 from datetime import datetime, timedelta
+import json
 
 from produtos.models import Product, Category, Unit
 from produtos.forms import ProductForm, CategoryForm, UnitForm
@@ -513,3 +515,739 @@ class ProductCreateViewTestCase(TestCase):
         
         # Verificar que o produto foi criado
         self.assertTrue(Product.objects.filter(sku='CREATE-001').exists())
+
+
+class ProductSparseFieldsetAPITestCase(TestCase):
+    """Testes para ?fields= e ?expand= na API de produtos."""
+    
+    def setUp(self):
+        """Configuração inicial."""
+        from rest_framework.test import APIClient
+        
+        self.user = User.objects.create_user(
+            username='apiuser',
+            password='testpass123',
+            is_staff=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        
+        self.category = Category.objects.create(name='Categoria API')
+        self.unit = Unit.objects.create(name='UN', description='Unidade')
+        self.product = Product.objects.create(
+            sku='SPARSE-001',
+            name='Produto Sparse',
+            category=self.category,
+            unit=self.unit,
+            current_stock=3,
+            min_stock=5,
+            unit_price=Decimal('10.00')
+        )
+    
+    def _results(self, response):
+        data = response.json()
+        return data['results'] if isinstance(data, dict) and 'results' in data else data
+    
+    def test_list_without_params_keeps_all_fields(self):
+        """Sem parâmetros o payload não muda."""
+        response = self.client.get('/api/v1/products/')
+        self.assertEqual(response.status_code, 200)
+        item = self._results(response)[0]
+        self.assertIn('category_name', item)
+        self.assertIn('is_low_stock', item)
+    
+    def test_actions_keep_detail_shape(self):
+        """Testa que low_stock continua com o serializer de detalhe."""
+        response = self.client.get('/api/v1/products/low_stock/')
+        self.assertEqual(response.status_code, 200)
+        item = self._results(response)[0]
+        self.assertIn('description', item)
+        self.assertIsInstance(item['category'], dict)
+    
+    def test_list_with_fields_returns_only_requested(self):
+        """Testa que ?fields= restringe as chaves retornadas."""
+        response = self.client.get('/api/v1/products/?fields=sku,current_stock,is_low_stock')
+        self.assertEqual(response.status_code, 200)
+        item = self._results(response)[0]
+        self.assertEqual(set(item), {'sku', 'current_stock', 'is_low_stock'})
+        self.assertTrue(item['is_low_stock'])
+    
+    def test_list_with_fields_narrows_sql(self):
+        """Testa que colunas não pedidas não são selecionadas."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/api/v1/products/?fields=sku')
+        product_sql = [
+            q['sql'] for q in ctx.captured_queries
+            if 'FROM "produtos_product"' in q['sql'] and 'COUNT(' not in q['sql']
+        ]
+        self.assertTrue(product_sql)
+        self.assertNotIn('"description"', product_sql[-1])
+        self.assertNotIn('produtos_category', product_sql[-1])
+    
+    def test_retrieve_expand_controls_nesting(self):
+        """Testa que ?expand= embute apenas os relacionamentos pedidos."""
+        url = f'/api/v1/products/{self.product.pk}/?expand=category'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['category']['name'], 'Categoria API')
+        self.assertEqual(data['unit'], self.unit.pk)
+
+
+class ProductImportTestCase(TestCase):
+    """Testes para a importação em massa de produtos."""
+    
+    def setUp(self):
+        """Configuração inicial."""
+        self.category = Category.objects.create(name='Bebidas')
+        self.unit = Unit.objects.create(name='UN', description='Unidade')
+        Product.objects.create(
+            sku='IMP-001',
+            name='Nome Antigo',
+            category=self.category,
+            unit=self.unit,
+            current_stock=Decimal('7.00'),
+        )
+    
+    def _csv(self, text):
+        import io
+        return io.BytesIO(text.encode('utf-8'))
+    
+    def test_csv_import_creates_updates_and_reports_errors(self):
+        """Testa upsert por SKU e erros por linha."""
+        from produtos.importers import ProductImporter
+        
+        content = (
+            'SKU;Nome;Categoria;Unidade;Estoque Atual;Estoque Mínimo;Preço Unitário;Validade\n'
+            'IMP-001;Nome Novo;Bebidas;UN;99;2;1,50;31/12/2030\n'
+            'IMP-002;Suco;bebidas;un;10;5;3.20;2030-01-01\n'
+            'IMP-002;Duplicado;Bebidas;UN;1;1;1;\n'
+            'IMP-003;Sem Categoria;Inexistente;UN;1;1;1;\n'
+            'IMP-004;Negativo;Bebidas;UN;-1;1;1;\n'
+        )
+        result = ProductImporter(chunk_size=2).run(self._csv(content), 'produtos.csv')
+        
+        self.assertEqual(result.total_rows, 5)
+        self.assertEqual(result.created, 1)
+        self.assertEqual(result.updated, 1)
+        self.assertEqual([e['row'] for e in result.errors], [4, 5, 6])
+        
+        updated = Product.objects.get(sku='IMP-001')
+        self.assertEqual(updated.name, 'Nome Novo')
+        self.assertEqual(updated.unit_price, Decimal('1.50'))
+        # Saldo de produto existente não é alterado pela importação
+        self.assertEqual(updated.current_stock, Decimal('7.00'))
+        
+        created = Product.objects.get(sku='IMP-002')
+        self.assertEqual(created.category, self.category)
+        self.assertEqual(created.current_stock, Decimal('10.00'))
+    
+    def test_csv_import_rejects_non_finite_and_oversized_numbers(self):
+        """Testa NaN, Infinity e valores além de max_digits como erros da linha."""
+        from produtos.importers import ProductImporter
+        
+        content = (
+            'SKU;Nome;Categoria;Unidade;Estoque Atual;Estoque Mínimo;Preço Unitário;Validade\n'
+            'NUM-001;NaN;Bebidas;UN;nan;1;1;\n'
+            'NUM-002;Infinito;Bebidas;UN;1;Infinity;1;\n'
+            'NUM-003;Grande;Bebidas;UN;1;1;1e12;\n'
+            'NUM-004;Arredonda;Bebidas;UN;99999999,999;1;1;\n'
+            'NUM-005;Limite;Bebidas;UN;99999999,99;1;1;\n'
+        )
+        result = ProductImporter().run(self._csv(content), 'produtos.csv')
+        
+        self.assertEqual([e['row'] for e in result.errors], [2, 3, 4, 5])
+        self.assertEqual(result.created, 1)
+        self.assertEqual(Product.objects.get(sku='NUM-005').current_stock, Decimal('99999999.99'))
+    
+    def test_raw_insert_without_stock_shards_uses_db_default(self):
+        """Testa o INSERT sem stock_shards (mesmas colunas do caminho COPY)."""
+        from django.db import connection
+        
+        now = timezone.now()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {Product._meta.db_table} "
+                "(sku, name, description, category_id, unit_id, current_stock, min_stock, "
+                "unit_price, expiry_date, ncm, stock_status, is_active, created_at, updated_at) "
+                "VALUES (%s, %s, '', %s, %s, 1, 0, NULL, NULL, '', %s, TRUE, %s, %s)",
+                ['IMP-COPY', 'Via COPY', self.category.pk, self.unit.pk, Product.STOCK_OK, now, now],
+            )
+        self.assertEqual(Product.objects.get(sku='IMP-COPY').stock_shards, 0)
+    
+    def test_removed_product_requires_reactivate(self):
+        """Testa que SKU de produto removido é rejeitado sem a opção de reativação."""
+        from produtos.importers import ProductImporter
+        
+        Product.objects.filter(sku='IMP-001').update(is_active=False)
+        content = 'sku,name,category,unit\nIMP-001,Reimportado,Bebidas,UN\nIMP-030,Novo,Bebidas,UN\n'
+        
+        result = ProductImporter().run(self._csv(content), 'p.csv')
+        self.assertEqual(result.errors[0]['row'], 2)
+        self.assertEqual((result.created, result.updated), (1, 0))
+        removed = Product.objects.get(sku='IMP-001')
+        self.assertFalse(removed.is_active)
+        self.assertEqual(removed.name, 'Nome Antigo')
+        
+        result = ProductImporter(reactivate=True).run(self._csv(content), 'p.csv')
+        self.assertEqual(result.error_count, 0)
+        removed.refresh_from_db()
+        self.assertTrue(removed.is_active)
+        self.assertEqual(removed.name, 'Reimportado')
+    
+    def test_dry_run_does_not_write(self):
+        """Testa que dry-run apenas valida."""
+        from produtos.importers import ProductImporter
+        
+        content = 'sku,name,category,unit\nIMP-010,Novo,Nova Categoria,UN\n'
+        result = ProductImporter(dry_run=True, create_missing=True).run(self._csv(content), 'p.csv')
+        
+        self.assertEqual(result.created, 1)
+        self.assertFalse(Product.objects.filter(sku='IMP-010').exists())
+        self.assertFalse(Category.objects.filter(name='Nova Categoria').exists())
+    
+    def test_xlsx_import(self):
+        """Testa leitura de planilha XLSX."""
+        import io
+        from openpyxl import Workbook
+        from produtos.importers import ProductImporter
+        
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(['SKU', 'Nome', 'Categoria', 'Unidade', 'Estoque Atual'])
+        sheet.append(['IMP-020', 'Planilha', 'Bebidas', 'UN', 4])
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+        buffer.seek(0)
+        
+        result = ProductImporter().run(buffer, 'catalogo.xlsx')
+        
+        self.assertEqual(result.error_count, 0)
+        self.assertEqual(Product.objects.get(sku='IMP-020').current_stock, Decimal('4.00'))
+    
+    def test_api_import_endpoint(self):
+        """Testa o endpoint de importação da API."""
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from rest_framework.test import APIClient
+        
+        user = User.objects.create_user(username='importer', password='x', is_staff=True)
+        client = APIClient()
+        client.force_authenticate(user=user)
+        upload = SimpleUploadedFile(
+            'produtos.csv',
+            b'sku,name,category,unit\nIMP-030,Via API,Bebidas,UN\n',
+            content_type='text/csv'
+        )
+        response = client.post('/api/v1/products/import/', {'file': upload}, format='multipart')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['created'], 1)
+        self.assertTrue(Product.objects.filter(sku='IMP-030').exists())
+
+
+class ProductBulkActionAuditTestCase(TestCase):
+    """Testes para ações em lote auditadas."""
+    
+    def setUp(self):
+        """Configuração inicial."""
+        self.client = Client()
+        self.user = User.objects.create_user(username='bulkuser', password='testpass123')
+        self.user.user_permissions.add(Permission.objects.get(codename='change_product'))
+        self.client.login(username='bulkuser', password='testpass123')
+        
+        category = Category.objects.create(name='Lote')
+        unit = Unit.objects.create(name='UN', description='Unidade')
+        self.products = [
+            Product.objects.create(
+                sku=f'BULK-{i}', name=f'Produto {i}', category=category, unit=unit,
+                min_stock=Decimal('5.00'), unit_price=Decimal('10.00'),
+                is_active=(i != 0)
+            )
+            for i in range(3)
+        ]
+    
+    def _post(self, **data):
+        ids = json.dumps([p.pk for p in self.products])
+        return self.client.post(
+            reverse('produtos:bulk_action'),
+            {'selected_products': ids, **data}
+        ).json()
+    
+    def test_activate_logs_only_changed_rows(self):
+        """Testa que apenas produtos alterados geram auditoria."""
+        from core.models import AuditLog
+        
+        response = self._post(action='activate')
+        
+        self.assertTrue(response['success'])
+        self.assertEqual(response['count'], 1)
+        log = AuditLog.objects.get(action='UPDATE')
+        self.assertEqual(log.object_id, self.products[0].pk)
+        self.assertEqual(log.object_repr, 'BULK-0 — Produto 0')
+        self.assertEqual(log.changes, {'is_active': {'old': 'False', 'new': 'True'}})
+        self.assertEqual(log.user, self.user)
+    
+    def test_deactivate_invalidates_expiry_summary(self):
+        """Testa que desativar em lote atualiza o resumo de validade do dashboard."""
+        from django.core.cache import cache
+        from produtos.expiry import get_expiry_summary
+        
+        cache.clear()
+        Product.objects.filter(pk=self.products[1].pk).update(
+            expiry_date=timezone.localdate() + timedelta(days=2)
+        )
+        self.assertEqual(get_expiry_summary()['stats']['critical_count'], 1)
+        
+        self._post(action='deactivate')
+        self.assertEqual(get_expiry_summary()['stats']['total'], 0)
+    
+    def test_update_min_stock_uses_batched_audit(self):
+        """Testa UPDATE em conjunto com auditoria em um único INSERT."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from core.models import AuditLog
+        
+        with CaptureQueriesContext(connection) as ctx:
+            response = self._post(action='update_min_stock', new_min_stock='8')
+        
+        self.assertEqual(response['count'], 3)
+        self.assertEqual(AuditLog.objects.filter(action='UPDATE').count(), 3)
+        audit_inserts = [q for q in ctx.captured_queries if 'INSERT INTO "core_auditlog"' in q['sql']]
+        self.assertEqual(len(audit_inserts), 1)
+        self.assertEqual(
+            set(Product.objects.values_list('min_stock', flat=True)), {Decimal('8.00')}
+        )
+    
+    def test_expression_update_reads_new_values(self):
+        """Testa atualização por expressão (ex: reajuste de preço)."""
+        from django.db.models import F
+        from core.bulk_audit import audited_bulk_update
+        from core.models import AuditLog
+        
+        count = audited_bulk_update(
+            Product.objects.filter(sku='BULK-1'),
+            {'unit_price': F('unit_price') * 2},
+            user=self.user,
+        )
+        
+        self.assertEqual(count, 1)
+        self.assertEqual(AuditLog.objects.get(action='UPDATE').changes['unit_price']['new'], '20.00')
+
+
+class ProductStockStatusTestCase(TestCase):
+    """Testes para o status de estoque materializado."""
+    
+    def setUp(self):
+        """Configuração inicial."""
+        self.category = Category.objects.create(name='Status')
+        self.unit = Unit.objects.create(name='UN', description='Unidade')
+        self.user = User.objects.create_user(
+            username='statususer', password='testpass123', is_staff=True, is_superuser=True
+        )
+    
+    def _product(self, sku, current_stock, min_stock):
+        return Product.objects.create(
+            sku=sku, name=f'Produto {sku}', category=self.category, unit=self.unit,
+            current_stock=current_stock, min_stock=min_stock, unit_price=Decimal('2.00')
+        )
+    
+    def test_status_persisted_on_save(self):
+        """Testa que save() mantém stock_status atualizado."""
+        product = self._product('ST-1', 0, 5)
+        self.assertEqual(product.stock_status, Product.STOCK_CRITICO)
+        
+        product.current_stock = 3
+        product.save(update_fields=['current_stock'])
+        product.refresh_from_db()
+        self.assertEqual(product.stock_status, Product.STOCK_BAIXO)
+        
+        product.min_stock = 1
+        product.save()
+        product.refresh_from_db()
+        self.assertEqual(product.stock_status, Product.STOCK_OK)
+    
+    def test_status_updated_by_movement(self):
+        """Testa que movimentações atualizam o status."""
+        from movimentacoes.models import InventoryMovement
+        
+        product = self._product('ST-2', 0, 5)
+        InventoryMovement.objects.create(
+            product=product, type=InventoryMovement.ENTRADA, quantity=10, user=self.user
+        )
+        product.refresh_from_db()
+        self.assertEqual(product.stock_status, Product.STOCK_OK)
+    
+    def test_refresh_stock_status_after_queryset_update(self):
+        """Testa recálculo em massa após update()."""
+        product = self._product('ST-3', 10, 5)
+        Product.objects.filter(pk=product.pk).update(min_stock=20)
+        
+        self.assertEqual(Product.refresh_stock_status(), 1)
+        product.refresh_from_db()
+        self.assertEqual(product.stock_status, Product.STOCK_BAIXO)
+    
+    def test_list_view_filters_and_aggregates_stats(self):
+        """Testa filtro por status e estatísticas na listagem."""
+        self._product('ST-4', 0, 5)
+        self._product('ST-5', 2, 5)
+        self._product('ST-6', 9, 5)
+        self.client.login(username='statususer', password='testpass123')
+        
+        response = self.client.get(reverse('produtos:list'), {'stock_status': 'BAIXO'})
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([p.sku for p in response.context['products']], ['ST-5'])
+        stats = response.context['stats']
+        self.assertEqual(stats['total_products'], 1)
+        self.assertEqual(stats['low_stock'], 1)
+        self.assertEqual(stats['critical_stock'], 0)
+
+
+class ProductExpiryCalendarTestCase(TestCase):
+    """Testes para o calendário de validade."""
+    
+    def setUp(self):
+        """Configuração inicial."""
+        from django.core.cache import cache
+        cache.clear()
+        self.category = Category.objects.create(name='Validade')
+        self.unit = Unit.objects.create(name='CX', description='Caixa')
+        self.today = timezone.localdate()
+    
+    def _product(self, sku, days, **kwargs):
+        return Product.objects.create(
+            sku=sku, name=f'Produto {sku}', category=self.category, unit=self.unit,
+            current_stock=Decimal('5.00'), min_stock=Decimal('1.00'),
+            expiry_date=self.today + timedelta(days=days), **kwargs
+        )
+    
+    def test_calendar_buckets_in_single_query(self):
+        """Testa a classificação por urgência com uma única query."""
+        from produtos.expiry import get_expiry_calendar
+        
+        self._product('EXP-1', -2)
+        self._product('EXP-2', 3)
+        self._product('EXP-3', 20)
+        self._product('EXP-4', 45)
+        self._product('EXP-5', 60)
+        self._product('EXP-6', -1, is_active=False)
+        
+        with self.assertNumQueries(1):
+            calendar = get_expiry_calendar(days_ahead=50)
+        
+        self.assertEqual([p.sku for p in calendar['products']], ['EXP-1', 'EXP-2', 'EXP-3', 'EXP-4'])
+        self.assertEqual([p.sku for p in calendar['expired']], ['EXP-1'])
+        self.assertEqual([p.sku for p in calendar['critical']], ['EXP-2'])
+        self.assertEqual([p.sku for p in calendar['warning']], ['EXP-3', 'EXP-4'])
+        self.assertEqual(calendar['stats']['total'], 4)
+        
+        calendar = get_expiry_calendar(days_ahead=50, include_expired=False)
+        self.assertEqual(calendar['stats']['expired_count'], 0)
+        self.assertEqual(calendar['stats']['total'], 3)
+    
+    def test_summary_cached_and_invalidated_on_product_change(self):
+        """Testa o cache do resumo diário e sua invalidação."""
+        from produtos.expiry import get_expiry_summary
+        
+        product = self._product('EXP-7', 2)
+        summary = get_expiry_summary()
+        self.assertEqual(summary['stats']['critical_count'], 1)
+        self.assertEqual(summary['upcoming'][0]['name'], 'Produto EXP-7')
+        
+        # Em cache: só a leitura dos próximos a vencer, com o saldo atual
+        Product.objects.filter(pk=product.pk).update(current_stock=Decimal('3.00'))
+        with self.assertNumQueries(1):
+            summary = get_expiry_summary()
+        self.assertEqual(summary['upcoming'][0]['current_stock'], Decimal('3.00'))
+        
+        product.expiry_date = self.today + timedelta(days=90)
+        product.save()
+        summary = get_expiry_summary()
+        self.assertEqual(summary['stats']['total'], 0)
+        self.assertEqual(summary['upcoming'], [])
+    
+    def test_summary_invalidated_by_import_upsert(self):
+        """Testa a invalidação quando o importador altera a validade em lote."""
+        import io
+        from produtos.expiry import get_expiry_summary
+        from produtos.importers import ProductImporter
+        
+        product = self._product('EXP-8', 2)
+        self.assertEqual(get_expiry_summary()['stats']['critical_count'], 1)
+        
+        content = (
+            'SKU;Nome;Categoria;Unidade;Estoque Atual;Estoque Mínimo;Preço Unitário;Validade\n'
+            f'EXP-8;Produto EXP-8;{product.category.name};{product.unit.name};1;1;1;'
+            f'{(self.today + timedelta(days=90)).isoformat()}\n'
+        )
+        ProductImporter().run(io.BytesIO(content.encode()), 'produtos.csv')
+        self.assertEqual(get_expiry_summary()['stats']['total'], 0)
+
+
+class ProductStockShardTestCase(TestCase):
+    """Testes para o contador de estoque fragmentado."""
+    
+    def setUp(self):
+        """Configuração inicial."""
+        self.category = Category.objects.create(name='Fragmentos')
+        self.unit = Unit.objects.create(name='UN', description='Unidade')
+        self.user = User.objects.create_user(username='sharduser', password='testpass123')
+        self.product = Product.objects.create(
+            sku='HOT-1', name='Produto quente', category=self.category, unit=self.unit,
+            current_stock=Decimal('10.00'), min_stock=Decimal('3.00')
+        )
+    
+    def _exit(self, quantity):
+        from movimentacoes.models import InventoryMovement
+        return InventoryMovement.objects.create(
+            product=self.product, type=InventoryMovement.SAIDA, quantity=quantity, user=self.user
+        )
+    
+    def test_enable_splits_stock_evenly(self):
+        """Testa a divisão do saldo entre os fragmentos."""
+        from produtos.stock_shards import enable_sharding
+        
+        enable_sharding(self.product, 3)
+        
+        quantities = list(self.product.shards.values_list('quantity', flat=True))
+        self.assertEqual(quantities, [Decimal('3.34'), Decimal('3.33'), Decimal('3.33')])
+        self.assertEqual(self.product.available_stock, Decimal('10.00'))
+    
+    def test_sharded_total_applied_on_commit(self):
+        """Testa que current_stock/stock_status acompanham as saídas após o commit."""
+        from produtos.stock_shards import enable_sharding
+        
+        enable_sharding(self.product, 4)
+        with self.captureOnCommitCallbacks(execute=True):
+            self._exit(Decimal('8.00'))
+        
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.current_stock, Decimal('2.00'))
+        self.assertEqual(self.product.stock_status, Product.STOCK_BAIXO)
+        self.assertFalse(self.product.pending_deltas.exists())
+    
+    def test_exits_use_shards_without_touching_product_row(self):
+        """Testa saídas fragmentadas, inclusive acima do saldo de um fragmento."""
+        from django.core.exceptions import ValidationError
+        from produtos.stock_shards import enable_sharding
+        
+        enable_sharding(self.product, 4)
+        self._exit(Decimal('2.00'))
+        movement = self._exit(Decimal('6.00'))
+        
+        self.assertEqual(movement.stock_after, Decimal('2.00'))
+        self.assertEqual(movement.stock_before, Decimal('8.00'))
+        self.assertEqual(self.product.available_stock, Decimal('2.00'))
+        # current_stock só muda na compactação
+        self.assertEqual(
+            Product.objects.values_list('current_stock', flat=True).get(pk=self.product.pk),
+            Decimal('10.00')
+        )
+        with self.assertRaises(ValidationError):
+            self._exit(Decimal('5.00'))
+    
+    def test_compact_and_disable_consolidate_stock(self):
+        """Testa compactação (saldo/status) e desativação."""
+        from produtos.stock_shards import compact, disable_sharding, enable_sharding
+        
+        enable_sharding(self.product, 2)
+        self._exit(Decimal('8.00'))
+        
+        self.assertEqual(compact(self.product), Decimal('2.00'))
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.current_stock, Decimal('2.00'))
+        self.assertEqual(self.product.stock_status, Product.STOCK_BAIXO)
+        self.assertEqual(
+            list(self.product.shards.values_list('quantity', flat=True)),
+            [Decimal('1.00'), Decimal('1.00')]
+        )
+        
+        disable_sharding(self.product)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_shards, 0)
+        self.assertEqual(self.product.current_stock, Decimal('2.00'))
+        self.assertFalse(self.product.shards.exists())
+    
+    def test_compact_keeps_writes_outside_sharded_exits(self):
+        """Testa que entradas em depósito passam pelos fragmentos e a compactação não as perde."""
+        from movimentacoes.models import InventoryMovement, StockValuation, Warehouse
+        from produtos.stock_shards import compact, enable_sharding
+        
+        Product.objects.filter(pk=self.product.pk).update(current_stock=Decimal('100.00'))
+        self.product.refresh_from_db()
+        enable_sharding(self.product, 4)
+        warehouse = Warehouse.objects.create(code='D1', name='Depósito 1')
+        InventoryMovement.objects.create(
+            product=self.product, type=InventoryMovement.ENTRADA, quantity=Decimal('50.00'),
+            warehouse=warehouse, user=self.user
+        )
+        self._exit(Decimal('30.00'))
+        self.assertEqual(self.product.available_stock, Decimal('120.00'))
+        
+        self.assertEqual(compact(self.product), Decimal('120.00'))
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.current_stock, Decimal('120.00'))
+        self.assertEqual(sum(self.product.shards.values_list('quantity', flat=True)), Decimal('120.00'))
+        self.assertEqual(StockValuation.objects.get(product=self.product).quantity, Decimal('120.00'))
+    
+    def test_compact_does_not_overwrite_current_stock(self):
+        """Testa que a soma dos fragmentos não sobrescreve o saldo do razão."""
+        from produtos.stock_shards import compact, enable_sharding
+        
+        enable_sharding(self.product, 2)
+        self.product.shards.filter(shard=0).update(quantity=Decimal('99.00'))
+        with self.assertLogs('movimentacoes.stock_journal', level='WARNING'):
+            self.assertEqual(compact(self.product), Decimal('10.00'))
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.current_stock, Decimal('10.00'))
+    
+    def test_direct_stock_edit_rejected_when_sharded(self):
+        """Testa a recusa de alteração direta do saldo de produto fragmentado."""
+        from django.core.exceptions import ValidationError
+        from produtos.stock_shards import enable_sharding
+        
+        enable_sharding(self.product, 2)
+        self.product.current_stock = Decimal('50.00')
+        with self.assertRaises(ValidationError) as ctx:
+            self.product.full_clean()
+        self.assertIn('current_stock', ctx.exception.message_dict)
+        
+        self.product.current_stock = Decimal('10.00')
+        self.product.min_stock = Decimal('4.00')
+        self.product.full_clean()
+
+
+class ReorderForecastTestCase(TestCase):
+    """Testes para a previsão de reposição."""
+    
+    def setUp(self):
+        """Configuração inicial."""
+        from movimentacoes.models import InventoryMovement
+        
+        self.category = Category.objects.create(name='Previsão')
+        self.unit = Unit.objects.create(name='UN', description='Unidade')
+        self.user = User.objects.create_user(
+            username='forecastuser', password='testpass123', is_staff=True
+        )
+        self.product = Product.objects.create(
+            sku='FC-1', name='Produto giro', category=self.category, unit=self.unit,
+            current_stock=Decimal('1000.00'), min_stock=Decimal('1.00'), lead_time_days=4
+        )
+        self.idle = Product.objects.create(
+            sku='FC-2', name='Produto parado', category=self.category, unit=self.unit,
+            current_stock=Decimal('10.00'), min_stock=Decimal('5.00')
+        )
+        Product.objects.filter(pk__in=[self.product.pk, self.idle.pk]).update(
+            created_at=timezone.now() - timedelta(days=200)
+        )
+        # Saídas alternando 10 e 20 por dia nos últimos 10 dias
+        self.now = timezone.now()
+        today = timezone.localtime(self.now).replace(hour=12, minute=0, second=0, microsecond=0)
+        for day in range(1, 11):
+            movement = InventoryMovement.objects.create(
+                product=self.product, type=InventoryMovement.SAIDA,
+                quantity=Decimal('10.00') if day % 2 else Decimal('20.00'), user=self.user
+            )
+            InventoryMovement.objects.filter(pk=movement.pk).update(
+                created_at=today - timedelta(days=day)
+            )
+    
+    def test_compute_forecasts_vectorized(self):
+        """Testa demanda média, desvio e ponto de pedido."""
+        from produtos.forecasting import compute_forecasts
+        
+        forecasts = compute_forecasts(history_days=10, service_level=0.95, now=self.now)
+        
+        self.assertEqual(len(forecasts), 1)
+        forecast = forecasts[0]
+        self.assertEqual(forecast.product_id, self.product.pk)
+        self.assertEqual(forecast.daily_demand, Decimal('15.000'))
+        self.assertEqual(forecast.demand_std, Decimal('5.270'))
+        self.assertEqual(forecast.lead_time_days, 4)
+        # 15 * 4 + 1.645 * 5.27 * 2
+        self.assertEqual(forecast.reorder_point, Decimal('77.34'))
+    
+    def test_save_apply_and_api_suggestions(self):
+        """Testa gravação, endpoint de sugestões e aplicação em min_stock."""
+        from rest_framework.test import APIClient
+        from core.models import AuditLog
+        from produtos.forecasting import apply_suggestions, compute_forecasts, save_forecasts
+        
+        save_forecasts(compute_forecasts(history_days=10, now=self.now))
+        
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        response = client.get('/api/v1/products/reorder_suggestions/')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        results = data['results'] if 'results' in data else data
+        self.assertEqual([r['sku'] for r in results], ['FC-1'])
+        self.assertEqual(results[0]['suggested_min_stock'], '77.34')
+        
+        self.assertEqual(apply_suggestions(user=self.user), 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.min_stock, Decimal('77.34'))
+        self.assertTrue(AuditLog.objects.filter(object_id=self.product.pk, action='UPDATE').exists())
+        self.idle.refresh_from_db()
+        self.assertEqual(self.idle.min_stock, Decimal('5.00'))
+
+
+class ProductPickerTestCase(TestCase):
+    """Testes para o seletor de produto com busca (produtos/widgets.py)."""
+    
+    def setUp(self):
+        """Configuração inicial."""
+        self.user = User.objects.create_user(username='picker', password='testpass123')
+        self.client.force_login(self.user)
+        category = Category.objects.create(name='Seletor')
+        unit = Unit.objects.create(name='UN')
+        self.products = [
+            Product.objects.create(
+                sku=f'PCK-{i:03d}', name=f'Item {i:03d}', category=category, unit=unit, min_stock=0,
+            )
+            for i in range(25)
+        ]
+        self.products[0].soft_delete()
+    
+    def test_endpoint_paginates_and_searches(self):
+        """Testa páginas, busca por SKU/nome e consulta por id."""
+        url = reverse('produtos:picker')
+        
+        first = self.client.get(url).json()
+        self.assertEqual(len(first['results']), 20)
+        self.assertTrue(first['more'])
+        self.assertEqual(first['results'][0], {
+            'id': self.products[1].pk, 'text': 'PCK-001 — Item 001', 'sku': 'PCK-001', 'unit': 'UN',
+        })
+        second = self.client.get(url, {'page': 2}).json()
+        self.assertEqual(len(second['results']), 4)
+        self.assertFalse(second['more'])
+        
+        found = self.client.get(url, {'q': 'pck-01'}).json()['results']
+        self.assertEqual([r['sku'] for r in found], [f'PCK-{i:03d}' for i in range(10, 20)])
+        self.assertEqual(self.client.get(url, {'q': 'item 024'}).json()['results'][0]['sku'], 'PCK-024')
+        
+        by_id = self.client.get(url, {'id': self.products[5].pk}).json()['results']
+        self.assertEqual([r['id'] for r in by_id], [self.products[5].pk])
+        # Inativos não aparecem
+        self.assertEqual(self.client.get(url, {'id': self.products[0].pk}).json()['results'], [])
+    
+    def test_form_renders_only_selected_option(self):
+        """Testa que o form não carrega o catálogo e valida o pk enviado."""
+        from movimentacoes.forms import InventoryMovementForm
+        
+        product = self.products[3]
+        form = InventoryMovementForm(initial={'product': product.pk})
+        with self.assertNumQueries(1):
+            html = str(form['product'])
+        self.assertEqual(html.count('<option'), 2)
+        self.assertIn(f'value="{product.pk}" selected', html)
+        self.assertIn('data-product-picker', html)
+        
+        data = {'product': product.pk, 'type': 'ENTRADA', 'quantity': '2'}
+        self.assertTrue(InventoryMovementForm(data=data).is_valid())
+        data['product'] = self.products[0].pk
+        self.assertIn('product', InventoryMovementForm(data=data).errors)
@@ -31,6 +31,7 @@ urlpatterns = [
     # APIs/AJAX
     path('api/bulk-action/', views.ProductBulkActionView.as_view(), name='bulk_action'),
     path('api/autocomplete/', views.product_autocomplete, name='autocomplete'),
+    path('api/picker/', views.product_picker, name='picker'),
     path('api/dashboard/', views.dashboard_products, name='dashboard_api'),
     
     # Exportação
@@ -20,7 +20,10 @@ from decimal import Decimal
 import json
 import csv
 
+from core.bulk_audit import audited_bulk_update
+from .expiry import invalidate_expiry_summary
 from .models import Product, Category, Unit
+from .widgets import PICKER_MAX_PAGE, search_products
 from .forms import (
     ProductForm, CategoryForm, UnitForm, 
     ProductSearchForm, ProductBulkActionForm
@@ -69,6 +72,7 @@ class ProductListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
             - Usa select_related para otimizar queries de categoria e unidade
             - Busca textual é case-insensitive (icontains)
             - Estoque CRITICO = 0, BAIXO = > 0 e <= min_stock, OK = > min_stock
+              (persistido em Product.stock_status)
         """
         queryset = Product.objects.select_related('category', 'unit').all()
         
@@ -91,17 +95,10 @@ class ProductListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
         if unit:
             queryset = queryset.filter(unit_id=unit)
         
-        # Filtro por status do estoque
+        # Filtro por status do estoque (coluna materializada e indexada)
         stock_status = self.request.GET.get('stock_status')
-        if stock_status == 'CRITICO':
-            queryset = queryset.filter(current_stock=0)
-        elif stock_status == 'BAIXO':
-            queryset = queryset.filter(
-                current_stock__gt=0,
-                current_stock__lte=F('min_stock')
-            )
-        elif stock_status == 'OK':
-            queryset = queryset.filter(current_stock__gt=F('min_stock'))
+        if stock_status in dict(Product.STOCK_STATUS_CHOICES):
+            queryset = queryset.filter(stock_status=stock_status)
         
         # Filtro por status ativo/inativo
         active = self.request.GET.get('active')
@@ -137,7 +134,8 @@ class ProductListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
             dict: Contexto atualizado com formulário e estatísticas
         
         Notes:
-            - Estatísticas são calculadas sobre o queryset filtrado atual
+            - Estatísticas são calculadas sobre o queryset filtrado atual,
+              em uma única query agregada
             - total_stock_value = soma de (current_stock * unit_price)
             - critical_stock = produtos com estoque zerado
             - low_stock = produtos com estoque > 0 mas <= min_stock
@@ -148,20 +146,14 @@ class ProductListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
         context['search_form'] = ProductSearchForm(self.request.GET)
         
         # Estatísticas da busca atual
-        total_products = self.get_queryset().count()
-        total_stock_value = self.get_queryset().aggregate(
-            total_value=Sum(F('current_stock') * F('unit_price'))
-        )['total_value'] or Decimal('0')
-        
-        context['stats'] = {
-            'total_products': total_products,
-            'total_stock_value': total_stock_value,
-            'critical_stock': self.get_queryset().filter(current_stock=0).count(),
-            'low_stock': self.get_queryset().filter(
-                current_stock__gt=0,
-                current_stock__lte=F('min_stock')
-            ).count(),
-        }
+        stats = self.object_list.order_by().aggregate(
+            total_products=Count('id'),
+            total_stock_value=Sum(F('current_stock') * F('unit_price')),
+            critical_stock=Count('id', filter=Q(stock_status=Product.STOCK_CRITICO)),
+            low_stock=Count('id', filter=Q(stock_status=Product.STOCK_BAIXO)),
+        )
+        stats['total_stock_value'] = stats['total_stock_value'] or Decimal('0')
+        context['stats'] = stats
         
         # Parâmetros de ordenação para o template
         context['current_order'] = self.request.GET.get('order_by', 'name')
@@ -400,27 +392,53 @@ class ProductBulkActionView(View):
                 'message': 'Você não tem permissão para esta ação.'
             })
         
+        bulk_actions = {
+            'activate': (
+                {'is_active': True},
+                '{count} produto(s) ativado(s) com sucesso.',
+            ),
+            'deactivate': (
+                {'is_active': False},
+                '{count} produto(s) desativado(s) com sucesso.',
+            ),
+            'update_min_stock': (
+                {'min_stock': form.cleaned_data['new_min_stock']},
+                'Estoque mínimo atualizado para {count} produto(s).',
+            ),
+            'update_unit_price': (
+                {'unit_price': form.cleaned_data['new_unit_price']},
+                'Preço unitário atualizado para {count} produto(s).',
+            ),
+        }
+        
+        if action not in bulk_actions:
+            return JsonResponse({
+                'success': False,
+                'message': 'Ação inválida.'
+            })
+        
+        def after_update(pks):
+            # UPDATE em conjunto não passa por Product.save
+            products = Product.objects.filter(pk__in=pks)
+            if action == 'update_min_stock':
+                Product.refresh_stock_status(products)
+            Product.publish_bulk_events(products)
+        
         try:
-            products = Product.objects.filter(id__in=product_ids)
-            
-            if action == 'activate':
-                count = products.update(is_active=True)
-                message = f'{count} produto(s) ativado(s) com sucesso.'
-                
-            elif action == 'deactivate':
-                count = products.update(is_active=False)
-                message = f'{count} produto(s) desativado(s) com sucesso.'
-                
-            elif action == 'update_min_stock':
-                new_min_stock = form.cleaned_data['new_min_stock']
-                count = products.update(min_stock=new_min_stock)
-                message = f'Estoque mínimo atualizado para {count} produto(s).'
-            
-            else:
-                return JsonResponse({
-                    'success': False,
-                    'message': 'Ação inválida.'
-                })
+            values, message = bulk_actions[action]
+            count = audited_bulk_update(
+                Product.objects.filter(id__in=product_ids),
+                values,
+                user=request.user,
+                request=request,
+                description=f'Ação em lote: {dict(form.fields["action"].choices)[action]}',
+                describe=lambda row: f"{row['sku']} — {row['name']}",
+                describe_fields=('sku', 'name'),
+                on_update=after_update,
+            )
+            if {'is_active', 'expiry_date'} & set(values):
+                invalidate_expiry_summary()
+            message = message.format(count=count)
             
             return JsonResponse({
                 'success': True,
@@ -462,37 +480,53 @@ def product_autocomplete(request):
     return JsonResponse(results, safe=False)
 
 
+@login_required
+def product_picker(request):
+    """
+    Busca paginada do seletor de produtos (produtos/widgets.py).
+    
+    GET ?q=<termo>&page=<n> -> {"results": [{id, text, sku, unit}], "more": bool}
+    GET ?id=<pk>            -> só o produto indicado (restaurar um filtro salvo)
+    """
+    product_id = request.GET.get('id', '')
+    if product_id:
+        if not product_id.isdigit():
+            return JsonResponse({'results': [], 'more': False})
+        results, _ = search_products(queryset=Product.objects.filter(is_active=True, pk=product_id))
+        return JsonResponse({'results': results, 'more': False})
+    
+    try:
+        page = min(max(int(request.GET.get('page', 1)), 1), PICKER_MAX_PAGE)
+    except ValueError:
+        page = 1
+    results, more = search_products(request.GET.get('q', '')[:100], page)
+    return JsonResponse({'results': results, 'more': more and page < PICKER_MAX_PAGE})
+
+
 @login_required
 def dashboard_products(request):
     """Dados de produtos para o dashboard (AJAX)."""
-    # Estatísticas gerais
-    total_products = Product.objects.filter(is_active=True).count()
-    critical_stock = Product.objects.filter(
-        is_active=True, 
-        current_stock=0
-    ).count()
-    low_stock = Product.objects.filter(
-        is_active=True,
-        current_stock__gt=0,
-        current_stock__lte=F('min_stock')
-    ).count()
-    
-    # Valor total do estoque
-    total_stock_value = Product.objects.filter(is_active=True).aggregate(
-        total=Sum(F('current_stock') * F('unit_price'))
-    )['total'] or Decimal('0')
+    # Estatísticas gerais e valor total do estoque (uma query)
+    active = Product.objects.filter(is_active=True)
+    totals = active.aggregate(
+        total_products=Count('id'),
+        critical_stock=Count('id', filter=Q(stock_status=Product.STOCK_CRITICO)),
+        low_stock=Count('id', filter=Q(stock_status=Product.STOCK_BAIXO)),
+        total=Sum(F('current_stock') * F('unit_price')),
+    )
+    total_products = totals['total_products']
+    critical_stock = totals['critical_stock']
+    low_stock = totals['low_stock']
+    total_stock_value = totals['total'] or Decimal('0')
     
     # Produtos com estoque crítico
-    critical_products = Product.objects.filter(
-        is_active=True,
-        current_stock=0
+    critical_products = active.filter(
+        stock_status=Product.STOCK_CRITICO
     ).values('sku', 'name')[:10]
     
     # Produtos com estoque baixo
-    low_stock_products = Product.objects.filter(
-        is_active=True,
-        current_stock__gt=0,
-        current_stock__lte=F('min_stock')
+    low_stock_products = active.filter(
+        stock_status=Product.STOCK_BAIXO
     ).values('sku', 'name', 'current_stock', 'min_stock')[:10]
     
     return JsonResponse({
@@ -531,12 +565,8 @@ def export_products(request):
         if category:
             queryset = queryset.filter(category=category)
         
-        if stock_status == 'critical':
-            queryset = queryset.filter(current_stock=0)
-        elif stock_status == 'low':
-            queryset = queryset.filter(current_stock__gt=0, current_stock__lte=F('min_stock'))
-        elif stock_status == 'ok':
-            queryset = queryset.filter(current_stock__gt=F('min_stock'))
+        if stock_status:
+            queryset = queryset.filter(stock_status=stock_status)
     
     # Criar resposta CSV
     response = HttpResponse(content_type='text/csv; charset=utf-8')
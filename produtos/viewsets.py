@@ -1,22 +1,29 @@
 """
 ViewSets para API REST de produtos.
 """
-from rest_framework import viewsets, filters
+from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django_filters.rest_framework import DjangoFilterBackend, FilterSet, CharFilter, NumberFilter, BooleanFilter
-from django.db.models import Count, F
+from django_filters.rest_framework import DjangoFilterBackend, FilterSet, CharFilter, NumberFilter, BooleanFilter, ChoiceFilter
+from django.db.models import Count, F, Q, Sum
 
-from .models import Category, Unit, Product
+from .models import Category, Unit, Product, StockForecast
 from .serializers import (
     CategorySerializer,
     UnitSerializer,
     ProductListSerializer,
     ProductDetailSerializer,
     ProductCreateSerializer,
+    ReorderSuggestionSerializer,
 )
-from core.permissions import IsAdminOrReadOnly, IsStaffUser
+from core.permissions import IsAdminOrReadOnly, IsStaffUser, CanManageProducts
+from core.viewsets import SparseFieldsetViewSetMixin
+
+
+# Status considerados "estoque baixo" (current_stock <= min_stock)
+LOW_STOCK_STATUSES = [Product.STOCK_CRITICO, Product.STOCK_BAIXO]
 
 
 class CategoryFilter(FilterSet):
@@ -100,16 +107,18 @@ class ProductFilter(FilterSet):
     min_stock_level = NumberFilter(field_name='current_stock', lookup_expr='lte', 
                                     label='Estoque <= min_stock (low stock)')
     low_stock = BooleanFilter(method='filter_low_stock', label='Estoque baixo')
+    stock_status = ChoiceFilter(choices=Product.STOCK_STATUS_CHOICES, label='Status do estoque')
     expired = BooleanFilter(method='filter_expired', label='Produto vencido')
+    warehouse = NumberFilter(method='filter_warehouse', label='Com saldo no depósito')
     
     class Meta:
         model = Product
-        fields = ['name', 'sku', 'category', 'unit']
+        fields = ['name', 'sku', 'category', 'unit', 'stock_status']
     
     def filter_low_stock(self, queryset, name, value):
-        """Filtra produtos com estoque baixo."""
+        """Filtra produtos com estoque baixo (inclui crítico)."""
         if value:
-            return queryset.filter(current_stock__lte=F('min_stock'))
+            return queryset.filter(stock_status__in=LOW_STOCK_STATUSES)
         return queryset
     
     def filter_expired(self, queryset, name, value):
@@ -118,12 +127,20 @@ class ProductFilter(FilterSet):
         if value:
             return queryset.filter(expiry_date__lt=timezone.now().date())
         return queryset
+    
+    def filter_warehouse(self, queryset, name, value):
+        """Filtra produtos com saldo no depósito."""
+        return queryset.filter(balances__warehouse_id=value, balances__quantity__gt=0)
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(SparseFieldsetViewSetMixin, viewsets.ModelViewSet):
     """
     ViewSet completo para gerenciamento de produtos.
     
+    Parâmetros de leitura:
+    - fields: campos a retornar (ex: ?fields=sku,current_stock)
+    - expand: objetos aninhados a embutir (ex: ?expand=category)
+    
     list: Listar todos os produtos
     retrieve: Obter detalhes de um produto
     create: Criar novo produto
@@ -135,6 +152,8 @@ class ProductViewSet(viewsets.ModelViewSet):
     - low_stock: Produtos com estoque baixo
     - expired: Produtos vencidos
     - stats: Estatísticas gerais de produtos
+    - import_products: Importação em massa (CSV/XLSX)
+    - reorder_suggestions: Estoque mínimo sugerido pela previsão de demanda
     """
     queryset = Product.objects.filter(is_active=True).select_related('category', 'unit')
     permission_classes = [IsAuthenticated, IsStaffUser]
@@ -143,6 +162,7 @@ class ProductViewSet(viewsets.ModelViewSet):
     search_fields = ['name', 'sku', 'description', 'ncm']
     ordering_fields = ['name', 'sku', 'current_stock', 'min_stock', 'unit_price', 'created_at']
     ordering = ['name']
+    sparse_fieldset_actions = ('list', 'retrieve', 'low_stock', 'expired')
     
     def get_serializer_class(self):
         """Retorna serializer apropriado para a action."""
@@ -159,7 +179,7 @@ class ProductViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def low_stock(self, request):
         """Lista produtos com estoque abaixo do mínimo."""
-        products = self.get_queryset().filter(current_stock__lte=F('min_stock'))
+        products = self.get_queryset().filter(stock_status__in=LOW_STOCK_STATUSES)
         
         page = self.paginate_queryset(products)
         if page is not None:
@@ -183,18 +203,44 @@ class ProductViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(products, many=True)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'])
+    def reorder_suggestions(self, request):
+        """
+        Estoque mínimo sugerido (ponto de pedido) calculado pela previsão.
+        
+        Por padrão lista só os produtos cujo min_stock difere da sugestão;
+        use ?all=true para listar todos, ?below=true para os que já estão
+        abaixo do ponto de pedido.
+        """
+        forecasts = StockForecast.objects.filter(
+            product__is_active=True
+        ).select_related('product').order_by('-daily_demand')
+        if request.query_params.get('all') != 'true':
+            forecasts = forecasts.exclude(product__min_stock=F('reorder_point'))
+        if request.query_params.get('below') == 'true':
+            forecasts = forecasts.filter(product__current_stock__lte=F('reorder_point'))
+        
+        page = self.paginate_queryset(forecasts)
+        if page is not None:
+            serializer = ReorderSuggestionSerializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        return Response(ReorderSuggestionSerializer(forecasts, many=True).data)
+    
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """Retorna estatísticas gerais de produtos."""
         queryset = self.get_queryset()
         
-        total_products = queryset.count()
-        total_categories = queryset.values('category').distinct().count()
-        total_stock_value = sum(
-            (p.current_stock * p.unit_price) for p in queryset if p.unit_price
+        totals = queryset.order_by().aggregate(
+            total_products=Count('id'),
+            total_categories=Count('category', distinct=True),
+            total_stock_value=Sum(F('current_stock') * F('unit_price')),
+            low_stock_count=Count('id', filter=Q(stock_status__in=LOW_STOCK_STATUSES)),
         )
-        
-        low_stock_count = queryset.filter(current_stock__lte=F('min_stock')).count()
+        total_products = totals['total_products']
+        total_categories = totals['total_categories']
+        total_stock_value = totals['total_stock_value'] or 0
+        low_stock_count = totals['low_stock_count']
         
         from django.utils import timezone
         expired_count = queryset.filter(expiry_date__lt=timezone.now().date()).count()
@@ -214,6 +260,47 @@ class ProductViewSet(viewsets.ModelViewSet):
         
         return Response(stats)
     
+    @action(
+        detail=False,
+        methods=['post'],
+        url_path='import',
+        parser_classes=[MultiPartParser, FormParser],
+        permission_classes=[IsAuthenticated, IsStaffUser, CanManageProducts],
+    )
+    def import_products(self, request):
+        """
+        Importa produtos em massa a partir de CSV/XLSX.
+        
+        Campos (multipart):
+        - file: arquivo .csv ou .xlsx
+        - create_missing: cria categorias/unidades inexistentes (true/false)
+        - reactivate: atualiza e reativa produtos removidos com o mesmo SKU (true/false)
+        - dry_run: apenas valida (true/false)
+        """
+        from .importers import ProductImporter, ProductImportError
+        
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response(
+                {'error': 'Envie o arquivo no campo "file".'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        def flag(name):
+            return str(request.data.get(name, '')).lower() in ('1', 'true', 'on', 'yes')
+        
+        importer = ProductImporter(
+            create_missing=flag('create_missing'),
+            dry_run=flag('dry_run'),
+            reactivate=flag('reactivate'),
+        )
+        try:
+            result = importer.run(upload.file, upload.name)
+        except ProductImportError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(result.as_dict())
+    
     @action(detail=True, methods=['get'])
     def movements(self, request, pk=None):
         """Lista movimentações de um produto."""
@@ -0,0 +1,94 @@
+"""
+Seletor de produto com busca paginada (sem carregar o catálogo).
+
+O ``<select>`` é renderizado só com a opção escolhida; o script
+``frontend/js/components/product-picker.js`` busca as demais em
+``produtos:picker`` conforme o usuário digita. A validação continua no
+``queryset`` do campo: uma query pelo pk enviado.
+"""
+from django import forms
+from django.db.models import Q
+from django.urls import reverse_lazy
+
+from .models import Product
+
+
+PICKER_PAGE_SIZE = 20
+PICKER_MAX_PAGE = 50  # além disso, refine a busca (OFFSET alto custa caro)
+
+
+def product_label(sku, name):
+    return f"{sku} — {name}"
+
+
+def search_products(term='', page=1, page_size=PICKER_PAGE_SIZE, queryset=None):
+    """
+    Página de produtos ativos para o seletor, em ordem de nome.
+
+    Busca pelo início do SKU ou por parte do nome; sem COUNT (lê uma linha
+    a mais para saber se há próxima página).
+
+    Returns:
+        tuple[list[dict], bool]: (id, text, sku, unit), há mais páginas
+    """
+    if queryset is None:
+        queryset = Product.objects.filter(is_active=True)
+    term = term.strip()
+    if term:
+        queryset = queryset.filter(Q(sku__istartswith=term) | Q(name__icontains=term))
+    offset = (page - 1) * page_size
+    rows = list(
+        queryset.order_by('name', 'pk')
+        .values('pk', 'sku', 'name', 'unit__name')[offset:offset + page_size + 1]
+    )
+    results = [
+        {'id': row['pk'], 'text': product_label(row['sku'], row['name']),
+         'sku': row['sku'], 'unit': row['unit__name']}
+        for row in rows[:page_size]
+    ]
+    return results, len(rows) > page_size
+
+
+class ProductPickerWidget(forms.Select):
+    """Select que renderiza só a opção escolhida (as demais vêm por AJAX)."""
+
+    def __init__(self, attrs=None, url=reverse_lazy('produtos:picker'), placeholder='Buscar por SKU ou nome...'):
+        super().__init__(attrs)
+        self.url = url
+        self.placeholder = placeholder
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['attrs'].update({
+            'data-product-picker': '',
+            'data-url': str(self.url),
+            'data-placeholder': self.placeholder,
+        })
+        return context
+
+    def optgroups(self, name, value, attrs=None):
+        # Não itera self.choices (o queryset inteiro): só a opção vazia e a escolhida
+        selected = [str(v) for v in value if v not in (None, '')]
+        options = [('', getattr(self, 'empty_label', None) or '')]
+        if selected:
+            labels = {
+                str(row['pk']): product_label(row['sku'], row['name'])
+                for row in Product.objects.filter(pk__in=[v for v in selected if v.isdigit()])
+                .values('pk', 'sku', 'name')
+            }
+            options += [(pk, labels[pk]) for pk in selected if pk in labels]
+        return [
+            (None, [self.create_option(name, pk, label, pk in selected, index)], index)
+            for index, (pk, label) in enumerate(options)
+        ]
+
+
+class ProductChoiceField(forms.ModelChoiceField):
+    """ModelChoiceField de produtos ativos com o ``ProductPickerWidget``."""
+
+    widget = ProductPickerWidget
+
+    def __init__(self, queryset=None, **kwargs):
+        kwargs.setdefault('empty_label', 'Selecione um produto...')
+        super().__init__(Product.objects.filter(is_active=True) if queryset is None else queryset, **kwargs)
+        self.widget.empty_label = self.empty_label
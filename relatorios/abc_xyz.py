@@ -0,0 +1,265 @@
+"""
+Classificação ABC/XYZ do estoque.
+
+- ABC: participação acumulada no valor do estoque (``current_stock *
+  unit_price``), do maior para o menor. Até 80% do valor é A, até 95% é B,
+  o restante é C.
+- XYZ: variabilidade da demanda, pelo coeficiente de variação (desvio
+  padrão / média) das saídas semanais na janela. CV até 0,5 é X (estável),
+  até 1,0 é Y e acima disso (ou sem saídas) é Z.
+
+Valor e demanda vêm de uma única query agregada: cada produto é unido às
+saídas da janela por um ``FilteredRelation`` e as semanas viram colunas via
+``Sum(..., filter=...)``. A matriz produto × semana é classificada em NumPy
+de uma vez (ordenação, soma acumulada e CV vetorizados).
+
+O resultado fica em cache por versão dos dados (contagem e última alteração
+dos produtos, última movimentação e data), então qualquer movimentação ou
+edição de produto gera uma nova entrada sem invalidação explícita.
+
+Depende de NumPy (importado sob demanda).
+"""
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import (
+    Count, DecimalField, ExpressionWrapper, F, FilteredRelation, Max, Q, Sum, Value,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from produtos.models import Product
+
+
+ABC_CLASSES = ('A', 'B', 'C')
+XYZ_CLASSES = ('X', 'Y', 'Z')
+
+CACHE_KEY = 'relatorios:abc_xyz:{version}'
+
+CSV_HEADER = [
+    'SKU', 'Produto', 'Categoria', 'Valor em Estoque', '% do Valor', '% Acumulado',
+    'Demanda (janela)', 'Demanda Semanal Média', 'CV', 'ABC', 'XYZ', 'Classe',
+]
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError as exc:  # pragma: no cover - dependência opcional
+        raise ImportError("A classificação ABC/XYZ requer NumPy (pip install numpy).") from exc
+    return numpy
+
+
+def data_version(category_id=None):
+    """
+    Identificador barato do estado dos dados usados no relatório.
+
+    Muda quando um produto é criado/editado/removido ou quando há uma nova
+    movimentação (que também altera o saldo).
+    """
+    from movimentacoes.models import InventoryMovement
+
+    products = Product.objects.filter(is_active=True)
+    if category_id:
+        products = products.filter(category_id=category_id)
+    state = products.aggregate(count=Count('id'), changed=Max('updated_at'))
+    last_movement = InventoryMovement.objects.aggregate(last=Max('id'))['last']
+    return f"{state['count']}:{state['changed']}:{last_movement}"
+
+
+def _period_bounds(weeks, now):
+    end = timezone.localtime(now).replace(hour=0, minute=0, second=0, microsecond=0)
+    start = end - timedelta(days=7 * weeks)
+    return start, end
+
+
+def load_value_and_demand(weeks, now=None, category_id=None):
+    """
+    Valor em estoque e saídas semanais de cada produto ativo (uma query).
+
+    Returns:
+        list[tuple]: (pk, sku, name, category, value, semana_0, ..., semana_n-1)
+    """
+    from movimentacoes.models import InventoryMovement
+
+    start, end = _period_bounds(weeks, now or timezone.now())
+    decimal = DecimalField(max_digits=20, decimal_places=2)
+    zero = Value(0, output_field=decimal)
+
+    week_columns = {}
+    for i in range(weeks):
+        week_start = start + timedelta(days=7 * i)
+        week_columns[f'week_{i}'] = Coalesce(
+            Sum(
+                'window_out__quantity',
+                filter=Q(
+                    window_out__created_at__gte=week_start,
+                    window_out__created_at__lt=week_start + timedelta(days=7),
+                ),
+            ),
+            zero,
+            output_field=decimal,
+        )
+
+    queryset = Product.objects.filter(is_active=True)
+    if category_id:
+        queryset = queryset.filter(category_id=category_id)
+    return list(
+        queryset.annotate(
+            window_out=FilteredRelation(
+                'movements',
+                condition=Q(
+                    movements__type=InventoryMovement.SAIDA,
+                    movements__created_at__gte=start,
+                    movements__created_at__lt=end,
+                ),
+            ),
+            stock_value=ExpressionWrapper(
+                F('current_stock') * Coalesce(F('unit_price'), zero), output_field=decimal
+            ),
+        )
+        .values('pk', 'sku', 'name', 'category__name', 'stock_value')
+        .annotate(**week_columns)
+        .order_by()
+        .values_list('pk', 'sku', 'name', 'category__name', 'stock_value', *week_columns)
+    )
+
+
+def classify(rows, weeks, abc_limits=None, xyz_limits=None):
+    """
+    Classifica as linhas de ``load_value_and_demand``.
+
+    Returns:
+        list[dict]: Uma linha por produto, do maior para o menor valor.
+    """
+    np = _numpy()
+    a_limit, b_limit = abc_limits or settings.ABC_CLASS_LIMITS
+    x_limit, y_limit = xyz_limits or settings.XYZ_CV_LIMITS
+    if not rows:
+        return []
+
+    value = np.array([float(r[4] or 0) for r in rows], dtype=np.float64)
+    demand = np.array([r[5:] for r in rows], dtype=np.float64).reshape(len(rows), weeks)
+
+    # ABC: participação acumulada antes do item (o item que cruza 80% ainda é A)
+    order = np.argsort(-value, kind='stable')
+    sorted_value = value[order]
+    total = sorted_value.sum()
+    cumulative = np.cumsum(sorted_value)
+    if total > 0:
+        share = sorted_value / total
+        share_before = (cumulative - sorted_value) / total
+        cumulative_share = cumulative / total
+    else:
+        share = share_before = cumulative_share = np.zeros_like(sorted_value)
+    abc = np.where(share_before < a_limit, 'A', np.where(share_before < b_limit, 'B', 'C'))
+    abc[sorted_value <= 0] = 'C'
+
+    # XYZ: coeficiente de variação das saídas semanais
+    demand = demand[order]
+    mean = demand.mean(axis=1)
+    std = demand.std(axis=1, ddof=1) if weeks > 1 else np.zeros_like(mean)
+    cv = np.divide(std, mean, out=np.full_like(mean, np.inf), where=mean > 0)
+    xyz = np.where(cv <= x_limit, 'X', np.where(cv <= y_limit, 'Y', 'Z'))
+
+    result = []
+    for position, index in enumerate(order.tolist()):
+        pk, sku, name, category = rows[index][:4]
+        result.append({
+            'id': pk,
+            'sku': sku,
+            'name': name,
+            'category': category,
+            'value': round(float(sorted_value[position]), 2),
+            'share': round(float(share[position]) * 100, 2),
+            'cumulative_share': round(float(cumulative_share[position]) * 100, 2),
+            'demand': round(float(demand[position].sum()), 2),
+            'weekly_mean': round(float(mean[position]), 3),
+            'cv': None if np.isinf(cv[position]) else round(float(cv[position]), 3),
+            'abc': str(abc[position]),
+            'xyz': str(xyz[position]),
+            'class': f'{abc[position]}{xyz[position]}',
+        })
+    return result
+
+
+def summarize(rows):
+    """Contagens e valores por classe e a matriz 3x3 (ABC × XYZ)."""
+    matrix = {a: {x: 0 for x in XYZ_CLASSES} for a in ABC_CLASSES}
+    by_abc = {a: {'count': 0, 'value': 0.0} for a in ABC_CLASSES}
+    by_xyz = {x: 0 for x in XYZ_CLASSES}
+    total_value = 0.0
+    for row in rows:
+        matrix[row['abc']][row['xyz']] += 1
+        by_abc[row['abc']]['count'] += 1
+        by_abc[row['abc']]['value'] += row['value']
+        by_xyz[row['xyz']] += 1
+        total_value += row['value']
+    return {
+        'total_products': len(rows),
+        'total_value': round(total_value, 2),
+        'by_abc': {a: {**v, 'value': round(v['value'], 2)} for a, v in by_abc.items()},
+        'by_xyz': by_xyz,
+        'matrix': [
+            {'abc': a, 'cells': [{'xyz': x, 'count': matrix[a][x]} for x in XYZ_CLASSES]}
+            for a in ABC_CLASSES
+        ],
+    }
+
+
+def get_abc_xyz_report(weeks=None, category_id=None, now=None, use_cache=True):
+    """
+    Relatório ABC/XYZ completo (linhas classificadas + resumo).
+
+    Returns:
+        dict: rows, stats, weeks, period_start, period_end, version
+    """
+    weeks = weeks or settings.ABC_XYZ_WEEKS
+    now = now or timezone.now()
+    start, end = _period_bounds(weeks, now)
+
+    version = data_version(category_id)
+    digest = hashlib.md5(
+        f'{version}|{start.date()}|{weeks}|{category_id}|'
+        f'{settings.ABC_CLASS_LIMITS}|{settings.XYZ_CV_LIMITS}'.encode()
+    ).hexdigest()
+    key = CACHE_KEY.format(version=digest)
+
+    if use_cache:
+        report = cache.get(key)
+        if report is not None:
+            return report
+
+    rows = classify(load_value_and_demand(weeks, now, category_id), weeks)
+    report = {
+        'rows': rows,
+        'stats': summarize(rows),
+        'weeks': weeks,
+        'period_start': start.date(),
+        'period_end': (end - timedelta(days=1)).date(),
+        'version': digest,
+    }
+    if use_cache:
+        cache.set(key, report, settings.ABC_XYZ_CACHE_TIMEOUT)
+    return report
+
+
+def csv_rows(rows):
+    """Linhas para exportação em CSV (mesma ordem de CSV_HEADER)."""
+    for row in rows:
+        yield [
+            row['sku'],
+            row['name'],
+            row['category'],
+            f"{row['value']:.2f}",
+            f"{row['share']:.2f}",
+            f"{row['cumulative_share']:.2f}",
+            f"{row['demand']:.2f}",
+            f"{row['weekly_mean']:.3f}",
+            '' if row['cv'] is None else f"{row['cv']:.3f}",
+            row['abc'],
+            row['xyz'],
+            row['class'],
+        ]
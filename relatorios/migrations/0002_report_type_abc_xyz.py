@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('relatorios', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reporttype',
+            name='code',
+            field=models.CharField(choices=[('estoque', 'Relatório de Estoque'), ('movimentacoes', 'Relatório de Movimentações'), ('vencimentos', 'Relatório de Vencimentos'), ('baixo_estoque', 'Relatório de Baixo Estoque'), ('auditoria', 'Relatório de Auditoria'), ('abc_xyz', 'Relatório ABC/XYZ')], max_length=20, unique=True, verbose_name='Código'),
+        ),
+    ]
@@ -26,6 +26,7 @@ class ReportType(models.Model):
     VENCIMENTOS = 'vencimentos'
     BAIXO_ESTOQUE = 'baixo_estoque'
     AUDITORIA = 'auditoria'
+    ABC_XYZ = 'abc_xyz'
     
     TYPE_CHOICES = [
         (ESTOQUE, 'Relatório de Estoque'),
@@ -33,6 +34,7 @@ class ReportType(models.Model):
         (VENCIMENTOS, 'Relatório de Vencimentos'),
         (BAIXO_ESTOQUE, 'Relatório de Baixo Estoque'),
         (AUDITORIA, 'Relatório de Auditoria'),
+        (ABC_XYZ, 'Relatório ABC/XYZ'),
     ]
     
     code = models.CharField(
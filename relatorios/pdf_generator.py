@@ -18,6 +18,8 @@ except (ImportError, OSError):
 import os
 from datetime import datetime
 
+from core.metrics import PDF_RENDER
+
 
 class PDFGenerator:
     """Gerador de PDFs com templates customizáveis."""
@@ -53,17 +55,18 @@ class PDFGenerator:
         if not WEASYPRINT_AVAILABLE:
             raise RuntimeError("WeasyPrint não está disponível. A geração de PDF não é suportada neste ambiente.")
         
-        # Renderizar HTML
-        html_string = render_to_string(template_name, context)
-        
-        # Criar PDF
-        html = HTML(string=html_string, base_url=settings.BASE_DIR)
-        
-        # CSS customizado para PDF
-        css = CSS(string=self._get_pdf_styles(), font_config=self.font_config)
-        
-        # Gerar PDF
-        pdf_bytes = html.write_pdf(stylesheets=[css], font_config=self.font_config)
+        with PDF_RENDER.labels(template_name).time():
+            # Renderizar HTML
+            html_string = render_to_string(template_name, context)
+            
+            # Criar PDF
+            html = HTML(string=html_string, base_url=settings.BASE_DIR)
+            
+            # CSS customizado para PDF
+            css = CSS(string=self._get_pdf_styles(), font_config=self.font_config)
+            
+            # Gerar PDF
+            pdf_bytes = html.write_pdf(stylesheets=[css], font_config=self.font_config)
         
         # Salvar em arquivo se especificado
         if output_path:
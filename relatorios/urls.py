@@ -22,12 +22,15 @@ urlpatterns = [
     path('movimentacoes/', views.relatorio_movimentacoes, name='movimentacoes'),
     path('vencimentos/', views.relatorio_vencimentos, name='vencimentos'),
     path('financeiro/', views.relatorio_financeiro, name='financeiro'),
+    path('abc-xyz/', views.relatorio_abc_xyz, name='abc_xyz'),
     
     # Downloads PDF
     path('download/estoque/', views.download_estoque_pdf, name='download_estoque_pdf'),
     path('download/movimentacoes/', views.download_movimentacoes_pdf, name='download_movimentacoes_pdf'),
     path('download/vencimentos/', views.download_vencimentos_pdf, name='download_vencimentos_pdf'),
     path('download/financeiro/', views.download_financeiro_pdf, name='download_financeiro_pdf'),
+    path('download/abc-xyz/', views.download_abc_xyz_pdf, name='download_abc_xyz_pdf'),
+    path('download/abc-xyz/csv/', views.download_abc_xyz_csv, name='download_abc_xyz_csv'),
     
     # URLs legadas para compatibilidade
     path('stock/', views.relatorio_estoque, name='stock'),
@@ -10,14 +10,23 @@ from django.contrib import messages
 from django.views.generic import ListView, CreateView, DetailView
 from django.http import JsonResponse, HttpResponse, Http404
 from django.db.models import Q, Count, Sum, Avg, F
+from django.conf import settings
 from django.utils import timezone
 from datetime import datetime, timedelta
 from django.core.paginator import Paginator
+import csv
 import json
 
+from core.profiling import query_budget
 from .models import ReportGeneration, ReportType, ReportTemplate
-from produtos.models import Product, Category
-from movimentacoes.models import InventoryMovement
+from produtos import reference
+from produtos.forms import ProductFilterForm
+from produtos.models import Product
+from produtos.expiry import get_expiry_calendar
+from movimentacoes.models import InventoryMovement, Warehouse
+from movimentacoes.valuation import valuation_as_of
+from movimentacoes.warehouses import warehouse_summary
+from .abc_xyz import CSV_HEADER, csv_rows, get_abc_xyz_report
 from .forms import ReportFilterForm, ReportGenerationForm
 from .pdf_generator import PDFGenerator, ReportExporter
 
@@ -45,7 +54,7 @@ class ReportIndexView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
             'total_products': Product.objects.filter(is_active=True).count(),
             'low_stock_products': Product.objects.filter(
                 is_active=True,
-                current_stock__lte=F('min_stock')
+                stock_status__in=[Product.STOCK_CRITICO, Product.STOCK_BAIXO]
             ).count(),
             'recent_movements': InventoryMovement.objects.count(),
             'report_types': ReportType.objects.filter(is_active=True),
@@ -120,12 +129,18 @@ def generate_report(request):
             'description': 'Valor total do estoque por categoria',
             'icon': 'currency-dollar'
         },
+        {
+            'id': 'abc_xyz',
+            'name': 'Relatório ABC/XYZ',
+            'description': 'Classificação por valor em estoque e variabilidade da demanda',
+            'icon': 'grid-3x3'
+        },
     ]
     
     context = {
         'form': form,
         'report_types': report_types_data,
-        'categories': Category.objects.filter(is_active=True),
+        'categories': reference.categories(),
     }
     return render(request, 'relatorios/generate.html', context)
 
@@ -167,6 +182,27 @@ def download_report(request, pk):
         return redirect('relatorios:detail', pk=pk)
 
 
+def stock_report_stats(products, quantity='current_stock'):
+    """
+    Totais do relatório de estoque em uma única query.
+    
+    Args:
+        quantity: Campo/anotação com a quantidade valorada (saldo do
+            depósito no relatório filtrado por depósito)
+    
+    Returns:
+        dict: total_products, total_value (float), critical_count, low_count
+    """
+    stats = products.order_by().aggregate(
+        total_products=Count('id'),
+        total_value=Sum(F(quantity) * F('unit_price')),
+        critical_count=Count('id', filter=Q(stock_status=Product.STOCK_CRITICO)),
+        low_count=Count('id', filter=Q(stock_status=Product.STOCK_BAIXO)),
+    )
+    stats['total_value'] = float(stats['total_value'] or 0)
+    return stats
+
+
 # Relatórios específicos por tipo
 @login_required
 @permission_required('relatorios.view_report', raise_exception=True)
@@ -177,6 +213,7 @@ def relatorio_estoque(request):
     search = request.GET.get('search', '')
     category_id = request.GET.get('category')
     status = request.GET.get('status')
+    warehouse_id = request.GET.get('warehouse')
     
     # Queryset base
     products = Product.objects.filter(is_active=True).select_related('category', 'unit')
@@ -191,32 +228,18 @@ def relatorio_estoque(request):
         products = products.filter(category_id=category_id)
     
     if status:
-        if status == 'critico':
-            products = products.filter(current_stock=0)
-        elif status == 'baixo':
-            products = products.filter(
-                current_stock__gt=0,
-                current_stock__lte=F('min_stock')
-            )
-        elif status == 'ok':
-            products = products.filter(current_stock__gt=F('min_stock'))
+        products = products.filter(stock_status=status.upper())
     
-    # Estatísticas
-    # Calcular valor total (current_stock * unit_price)
-    total_value = 0
-    for p in products:
-        unit_price = getattr(p, 'unit_price', None) or 0
-        total_value += float(p.current_stock) * float(unit_price)
+    if warehouse_id:
+        # Mesmo filter(): a anotação reaproveita o JOIN com o saldo do depósito
+        products = products.filter(
+            balances__warehouse_id=warehouse_id,
+            balances__quantity__gt=0,
+        ).annotate(warehouse_stock=F('balances__quantity'))
     
-    stats = {
-        'total_products': products.count(),
-        'total_value': total_value,
-        'critical_count': products.filter(current_stock=0).count(),
-        'low_count': products.filter(
-            current_stock__gt=0,
-            current_stock__lte=F('min_stock')
-        ).count(),
-    }
+    # Estatísticas (uma única query agregada); filtrado por depósito,
+    # o valor é o do saldo no depósito
+    stats = stock_report_stats(products, 'warehouse_stock' if warehouse_id else 'current_stock')
     
     # Paginação
     paginator = Paginator(products.order_by('name'), 50)
@@ -225,12 +248,15 @@ def relatorio_estoque(request):
     
     context = {
         'products': page_obj,
-        'categories': Category.objects.filter(is_active=True),
+        'categories': reference.categories(),
+        'warehouses': Warehouse.objects.filter(is_active=True),
+        'warehouse_summary': warehouse_summary(),
         'stats': stats,
         'current_filters': {
             'search': search,
             'category': category_id,
             'status': status,
+            'warehouse': warehouse_id,
         },
     }
     return render(request, 'relatorios/estoque.html', context)
@@ -287,7 +313,7 @@ def relatorio_movimentacoes(request):
         'movements': page_obj,
         'stats': stats,
         'movement_types': InventoryMovement.TYPE_CHOICES,
-        'products': Product.objects.filter(is_active=True).order_by('name'),
+        'product_filter': ProductFilterForm(request.GET, auto_id='%s'),
         'current_filters': {
             'date_from': date_from.strftime('%Y-%m-%d'),
             'date_to': date_to.strftime('%Y-%m-%d'),
@@ -307,105 +333,144 @@ def relatorio_vencimentos(request):
     days_ahead = int(request.GET.get('days', 30))
     include_expired = request.GET.get('expired', 'true') == 'true'
     
-    today = timezone.now().date()
-    future_date = today + timedelta(days=days_ahead)
-    
-    # Produtos com data de vencimento
-    products = Product.objects.filter(
-        is_active=True,
-        expiry_date__isnull=False
-    ).select_related('category', 'unit')
-    
-    # Filtrar por período
-    if include_expired:
-        products = products.filter(expiry_date__lte=future_date)
-    else:
-        products = products.filter(
-            expiry_date__gte=today,
-            expiry_date__lte=future_date
-        )
-    
-    # Categorizar por urgência
-    expired = products.filter(expiry_date__lt=today)
-    critical = products.filter(expiry_date__range=[today, today + timedelta(days=7)])
-    warning = products.filter(expiry_date__range=[today + timedelta(days=8), today + timedelta(days=30)])
+    calendar = get_expiry_calendar(days_ahead, include_expired)
     
     context = {
-        'products': products.order_by('expiry_date'),
-        'expired': expired,
-        'critical': critical,
-        'warning': warning,
+        'products': calendar['products'],
+        'expired': calendar['expired'],
+        'critical': calendar['critical'],
+        'warning': calendar['warning'],
         'days_ahead': days_ahead,
         'include_expired': include_expired,
-        'stats': {
-            'total': products.count(),
-            'expired_count': expired.count(),
-            'critical_count': critical.count(),
-            'warning_count': warning.count(),
-        }
+        'stats': calendar['stats'],
     }
     return render(request, 'relatorios/vencimentos.html', context)
 
 
-@login_required
-@permission_required('relatorios.view_report', raise_exception=True)
-def relatorio_financeiro(request):
-    """Relatório financeiro - valor do estoque por categoria."""
-    
-    # Filtros
-    category_id = request.GET.get('category')
+def financial_report_data(category_id=None, as_of=None):
+    """
+    Valor de custo do estoque por categoria.
     
-    # Buscar produtos ativos
-    products = Product.objects.filter(is_active=True).select_related('category', 'unit')
+    Usa a valoração do razão (custo médio/FIFO): ``as_of`` (date) consulta a
+    posição naquela data sem reprocessar o histórico; sem data, a atual.
     
+    Returns:
+        tuple: (categories_data, stats)
+    """
+    products = valuation_as_of(
+        as_of,
+        Product.objects.filter(is_active=True, category__is_active=True).select_related('category', 'unit'),
+    )
     if category_id:
         products = products.filter(category_id=category_id)
     
-    # Agrupar por categoria e calcular totais
-    categories_data = []
-    categories = Category.objects.filter(is_active=True)
+    groups = {}
+    for product in products.order_by('category__name', 'name'):
+        data = groups.setdefault(product.category_id, {
+            'category': product.category,
+            'products_count': 0,
+            'total_value': 0,
+            'products': [],
+        })
+        data['products'].append(product)
+        data['products_count'] += 1
+        data['total_value'] += float(product.stock_value or 0)
     
-    total_general = 0
-    total_products = 0
+    # Ordenar por valor total (maior primeiro)
+    categories_data = sorted(groups.values(), key=lambda x: x['total_value'], reverse=True)
+    stats = {
+        'total_value': sum(d['total_value'] for d in categories_data),
+        'total_products': sum(d['products_count'] for d in categories_data),
+        'total_categories': len(categories_data),
+    }
+    return categories_data, stats
+
+
+def _parse_as_of(value):
+    """Data da posição (?date=AAAA-MM-DD); None para a posição atual."""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+
+@query_budget(12)
+@login_required
+@permission_required('relatorios.view_report', raise_exception=True)
+def relatorio_financeiro(request):
+    """Relatório financeiro - valor de custo do estoque por categoria."""
     
-    for category in categories:
-        category_products = products.filter(category=category)
-        category_total = 0
-        
-        for product in category_products:
-            unit_price = getattr(product, 'unit_price', None) or 0
-            product_total = float(product.current_stock) * float(unit_price)
-            category_total += product_total
-        
-        if category_products.exists():
-            categories_data.append({
-                'category': category,
-                'products_count': category_products.count(),
-                'total_value': category_total,
-                'products': category_products
-            })
-            
-            total_general += category_total
-            total_products += category_products.count()
+    # Filtros
+    category_id = request.GET.get('category')
+    as_of = _parse_as_of(request.GET.get('date'))
     
-    # Ordenar por valor total (maior primeiro)
-    categories_data.sort(key=lambda x: x['total_value'], reverse=True)
+    categories_data, stats = financial_report_data(category_id, as_of)
     
     context = {
         'categories_data': categories_data,
-        'categories': categories,
-        'stats': {
-            'total_value': total_general,
-            'total_products': total_products,
-            'total_categories': len(categories_data),
-        },
+        'categories': reference.categories(),
+        'stats': stats,
+        'as_of': as_of,
         'current_filters': {
             'category': category_id,
+            'date': as_of.strftime('%Y-%m-%d') if as_of else '',
         }
     }
     return render(request, 'relatorios/financeiro.html', context)
 
 
+def _abc_xyz_params(request):
+    """Parâmetros comuns da tela e das exportações ABC/XYZ."""
+    try:
+        weeks = min(max(int(request.GET.get('weeks', settings.ABC_XYZ_WEEKS)), 2), 104)
+    except ValueError:
+        weeks = settings.ABC_XYZ_WEEKS
+    return {
+        'weeks': weeks,
+        'category_id': request.GET.get('category') or None,
+        'abc': request.GET.get('abc', '').upper(),
+        'xyz': request.GET.get('xyz', '').upper(),
+    }
+
+
+def _filter_abc_xyz_rows(rows, params):
+    if params['abc']:
+        rows = [r for r in rows if r['abc'] == params['abc']]
+    if params['xyz']:
+        rows = [r for r in rows if r['xyz'] == params['xyz']]
+    return rows
+
+
+@login_required
+@permission_required('relatorios.view_report', raise_exception=True)
+def relatorio_abc_xyz(request):
+    """Relatório ABC/XYZ - classificação por valor e variabilidade da demanda."""
+    params = _abc_xyz_params(request)
+    report = get_abc_xyz_report(weeks=params['weeks'], category_id=params['category_id'])
+    rows = _filter_abc_xyz_rows(report['rows'], params)
+    
+    paginator = Paginator(rows, 100)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    
+    context = {
+        'page_obj': page_obj,
+        'rows': page_obj.object_list,
+        'stats': report['stats'],
+        'report': report,
+        'filtered_count': len(rows),
+        'categories': reference.categories(),
+        'current_filters': {
+            'category': params['category_id'],
+            'weeks': params['weeks'],
+            'abc': params['abc'],
+            'xyz': params['xyz'],
+        },
+    }
+    return render(request, 'relatorios/abc_xyz.html', context)
+
+
 @login_required
 @permission_required('relatorios.add_reportgeneration', raise_exception=True)
 def generate_custom_report(request):
@@ -456,6 +521,11 @@ def generate_custom_report(request):
             if query_string:
                 return redirect(f'/relatorios/financeiro/?{query_string}')
             return redirect('relatorios:financeiro')
+        elif report_type == 'abc_xyz':
+            messages.success(request, f'Gerando relatório ABC/XYZ: {title}')
+            if query_string:
+                return redirect(f'/relatorios/abc-xyz/?{query_string}')
+            return redirect('relatorios:abc_xyz')
         else:
             messages.warning(request, 'Tipo de relatório não selecionado')
             return redirect('relatorios:generate')
@@ -482,18 +552,14 @@ def download_estoque_pdf(request):
         if category_id:
             products = products.filter(category_id=category_id)
         if status:
-            if status == 'critico':
-                products = products.filter(current_stock=0)
-            elif status == 'baixo':
-                products = products.filter(current_stock__gt=0, current_stock__lte=F('min_stock'))
-            elif status == 'ok':
-                products = products.filter(current_stock__gt=F('min_stock'))
+            products = products.filter(stock_status=status.upper())
         
         # Estatísticas
-        total_value = sum(float(p.current_stock) * float(getattr(p, 'unit_price', 0) or 0) for p in products)
-        total_products = products.count()
-        critical_count = products.filter(current_stock=0).count()
-        low_count = products.filter(current_stock__gt=0, current_stock__lte=F('min_stock')).count()
+        totals = stock_report_stats(products)
+        total_value = totals['total_value']
+        total_products = totals['total_products']
+        critical_count = totals['critical_count']
+        low_count = totals['low_count']
         ok_count = total_products - critical_count - low_count
         
         stats = {
@@ -597,22 +663,7 @@ def download_vencimentos_pdf(request):
     days_ahead = int(request.GET.get('days', 30))
     include_expired = request.GET.get('expired', 'true') == 'true'
     
-    today = timezone.now().date()
-    future_date = today + timedelta(days=days_ahead)
-    
-    # Query base - produtos com data de validade
-    products_base = Product.objects.filter(is_active=True, expiry_date__isnull=False).select_related('category', 'unit')
-    
-    # Aplicar filtro de período
-    if include_expired:
-        products = products_base.filter(expiry_date__lte=future_date)
-    else:
-        products = products_base.filter(expiry_date__gte=today, expiry_date__lte=future_date)
-    
-    # Calcular estatísticas baseadas nos produtos filtrados
-    expired = products.filter(expiry_date__lt=today)
-    critical = products.filter(expiry_date__range=[today, today + timedelta(days=7)])
-    warning = products.filter(expiry_date__range=[today + timedelta(days=8), future_date])
+    calendar = get_expiry_calendar(days_ahead, include_expired)
     
     pdf_gen = PDFGenerator(
         title="Relatório de Vencimentos",
@@ -621,16 +672,11 @@ def download_vencimentos_pdf(request):
     )
     
     context = {
-        'expiring_products': products.order_by('expiry_date'),
-        'expired': expired,
-        'critical': critical,
-        'warning': warning,
-        'stats': {
-            'total': products.count(),
-            'expired_count': expired.count(),
-            'critical_count': critical.count(),
-            'warning_count': warning.count(),
-        }
+        'expiring_products': calendar['products'],
+        'expired': calendar['expired'],
+        'critical': calendar['critical'],
+        'warning': calendar['warning'],
+        'stats': calendar['stats'],
     }
     
     pdf_bytes = pdf_gen.generate_pdf('relatorios/pdf/vencimentos.html', context)
@@ -645,48 +691,23 @@ def download_vencimentos_pdf(request):
 def download_financeiro_pdf(request):
     """Download do relatório financeiro em PDF."""
     category_id = request.GET.get('category')
+    as_of = _parse_as_of(request.GET.get('date'))
     
-    products = Product.objects.filter(is_active=True).select_related('category', 'unit')
-    if category_id:
-        products = products.filter(category_id=category_id)
-    
-    categories_data = []
-    categories = Category.objects.filter(is_active=True)
-    total_general = 0
-    total_products = 0
-    
-    for category in categories:
-        category_products = products.filter(category=category)
-        category_total = sum(
-            float(p.current_stock) * float(getattr(p, 'unit_price', 0) or 0)
-            for p in category_products
-        )
-        
-        if category_products.exists():
-            categories_data.append({
-                'category': category,
-                'products_count': category_products.count(),
-                'total_value': category_total,
-                'products': category_products
-            })
-            total_general += category_total
-            total_products += category_products.count()
-    
-    categories_data.sort(key=lambda x: x['total_value'], reverse=True)
+    categories_data, stats = financial_report_data(category_id, as_of)
     
     pdf_gen = PDFGenerator(
         title="Relatório Financeiro",
-        subtitle="Valor do estoque por categoria",
+        subtitle=(
+            f"Valor de custo do estoque por categoria em {as_of.strftime('%d/%m/%Y')}"
+            if as_of else "Valor de custo do estoque por categoria"
+        ),
         author=request.user.get_full_name() or request.user.username
     )
     
     context = {
         'categories_data': categories_data,
-        'stats': {
-            'total_value': total_general,
-            'total_products': total_products,
-            'total_categories': len(categories_data),
-        }
+        'stats': stats,
+        'as_of': as_of,
     }
     
     pdf_bytes = pdf_gen.generate_pdf('relatorios/pdf/financeiro.html', context)
@@ -696,6 +717,54 @@ def download_financeiro_pdf(request):
     return response
 
 
+@login_required
+@permission_required('relatorios.view_report', raise_exception=True)
+def download_abc_xyz_pdf(request):
+    """Download do relatório ABC/XYZ em PDF."""
+    params = _abc_xyz_params(request)
+    report = get_abc_xyz_report(weeks=params['weeks'], category_id=params['category_id'])
+    rows = _filter_abc_xyz_rows(report['rows'], params)
+    
+    pdf_gen = PDFGenerator(
+        title="Relatório ABC/XYZ",
+        subtitle=(
+            f"Saídas de {report['period_start'].strftime('%d/%m/%Y')} "
+            f"a {report['period_end'].strftime('%d/%m/%Y')} ({report['weeks']} semanas)"
+        ),
+        author=request.user.get_full_name() or request.user.username
+    )
+    
+    context = {
+        'rows': rows[:500],
+        'total_rows': len(rows),
+        'stats': report['stats'],
+    }
+    
+    pdf_bytes = pdf_gen.generate_pdf('relatorios/pdf/abc_xyz.html', context)
+    
+    response = HttpResponse(pdf_bytes, content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="relatorio_abc_xyz_{timezone.now().strftime("%Y%m%d_%H%M%S")}.pdf"'
+    return response
+
+
+@login_required
+@permission_required('relatorios.view_report', raise_exception=True)
+def download_abc_xyz_csv(request):
+    """Download do relatório ABC/XYZ em CSV (todas as linhas)."""
+    params = _abc_xyz_params(request)
+    report = get_abc_xyz_report(weeks=params['weeks'], category_id=params['category_id'])
+    rows = _filter_abc_xyz_rows(report['rows'], params)
+    
+    response = HttpResponse(content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="relatorio_abc_xyz_{timezone.now().strftime("%Y%m%d_%H%M%S")}.csv"'
+    response.write('\ufeff')  # BOM para Excel reconhecer UTF-8
+    
+    writer = csv.writer(response)
+    writer.writerow(CSV_HEADER)
+    writer.writerows(csv_rows(rows))
+    return response
+
+
 # Função auxiliar para processamento de relatórios
 def process_report(report):
     """
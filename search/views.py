@@ -9,6 +9,8 @@ from wagtail.models import Page
 from django.db import models
 from django.db.models import Q
 
+from core.profiling import query_budget
+
 # Models do sistema de gestão de estoque
 from produtos.models import Product, Category
 from movimentacoes.models import InventoryMovement
@@ -35,6 +37,17 @@ def formatar_tipos(tipos):
         for nome in tipos
     ]
 
+# Tipos disponíveis no sistema (fixos: montados uma vez por processo)
+AVAILABLE_TYPES = [
+    "product",
+    "inventorymovement",
+    "category",
+    "page",
+]
+TIPOS_FORMATADOS = formatar_tipos(AVAILABLE_TYPES)
+
+
+@query_budget(22)
 def search(request):
     # Redirecionamento para padronizar parâmetros (q -> query)
     if 'q' in request.GET and 'query' not in request.GET:
@@ -74,7 +87,7 @@ def search(request):
         
         # Busca em Produtos
         if not selected_types or "product" in selected_types:
-            produtos_query = Product.objects.filter(is_active=True)
+            produtos_query = Product.objects.filter(is_active=True).select_related('category', 'unit')
             for term in search_terms:
                 produtos_query = produtos_query.filter(
                     Q(name__icontains=term) |
@@ -86,7 +99,7 @@ def search(request):
         
         # Busca em Movimentações
         if not selected_types or "inventorymovement" in selected_types:
-            movimentacoes_query = InventoryMovement.objects.all()
+            movimentacoes_query = InventoryMovement.objects.select_related('product__category', 'product__unit')
             for term in search_terms:
                 movimentacoes_query = movimentacoes_query.filter(
                     Q(product__name__icontains=term) |
@@ -146,16 +159,6 @@ def search(request):
     else:
         paginated_results = []
     
-    # Obter tipos disponíveis no sistema
-    available_types = [
-        "product",
-        "inventorymovement",
-        "category",
-        "page",
-    ]
-
-    tipos_formatados = formatar_tipos(available_types)
-
     # Montar query_params sem parâmetros de paginação
     query_params_dict = request.GET.copy()
     query_params_dict.pop('page', None)
@@ -174,6 +177,6 @@ def search(request):
             ],
             "query_params": query_params,
             "get_result_type": get_result_type,
-            "tipos_disponiveis": tipos_formatados,
+            "tipos_disponiveis": TIPOS_FORMATADOS,
         },
     )
\ No newline at end of file
@@ -6,7 +6,7 @@ Registra todos os viewsets e define as rotas da API.
 from rest_framework.routers import DefaultRouter
 
 from produtos.viewsets import CategoryViewSet, UnitViewSet, ProductViewSet
-from movimentacoes.viewsets import InventoryMovementViewSet
+from movimentacoes.viewsets import InventoryMovementViewSet, StockLotViewSet, WarehouseViewSet
 from core.viewsets import UserViewSet, PerfilUsuarioViewSet, AuditLogViewSet
 
 # Router principal
@@ -19,6 +19,8 @@ router.register(r'products', ProductViewSet, basename='product')
 
 # Movimentações
 router.register(r'movements', InventoryMovementViewSet, basename='movement')
+router.register(r'lots', StockLotViewSet, basename='lot')
+router.register(r'warehouses', WarehouseViewSet, basename='warehouse')
 
 # Core (usuários, perfis, auditoria)
 router.register(r'users', UserViewSet, basename='user')
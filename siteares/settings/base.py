@@ -115,6 +115,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.profiling.SQLProfilingMiddleware",  # inativo sem SQL_PROFILING_ENABLED
+    "core.metrics.MetricsMiddleware",  # inativo sem METRICS_ENABLED
     'corsheaders.middleware.CorsMiddleware',
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -187,7 +189,7 @@ else:
 if "REDIS_URL" in os.environ:
     CACHES = {
         "default": {
-            "BACKEND": "django_redis.cache.RedisCache",
+            "BACKEND": "core.cache_backends.MeteredRedisCache",  # RedisCache + métricas de hit/miss
             "LOCATION": os.environ.get("REDIS_URL", "redis://127.0.0.1:6379/1"),
             "OPTIONS": {
                 "CLIENT_CLASS": "django_redis.client.DefaultClient",
@@ -212,7 +214,7 @@ else:
     # Fallback para cache em memória local (desenvolvimento)
     CACHES = {
         "default": {
-            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "BACKEND": "core.cache_backends.MeteredLocMemCache",  # LocMemCache + métricas de hit/miss
             "LOCATION": "unique-snowflake",
             "TIMEOUT": 300,
             "OPTIONS": {
@@ -513,8 +515,8 @@ REST_FRAMEWORK = {
     'DEFAULT_VERSION': 'v1',
     'ALLOWED_VERSIONS': ['v1'],
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle',
+        'core.throttling.WeightedAnonRateThrottle',
+        'core.throttling.WeightedUserRateThrottle',
     ],
     'DEFAULT_THROTTLE_RATES': {
         'anon': '100/hour',
@@ -529,6 +531,18 @@ REST_FRAMEWORK = {
     'TIME_FORMAT': '%H:%M:%S',
 }
 
+# Custo de cada action no throttling (requests comuns custam 1).
+# Viewsets podem sobrescrever com o atributo `throttle_costs`.
+API_THROTTLE_COSTS = {
+    'bulk_create': 10,
+    'stats': 5,
+    'export': 20,
+    'import_products': 50,
+}
+
+# Store do throttling: 'redis' ou 'memory' (padrão: redis se o cache for django_redis)
+# API_THROTTLE_STORE = 'redis'
+
 # JWT Configuration
 from datetime import timedelta
 
@@ -573,6 +587,7 @@ CORS_ALLOW_HEADERS = [
     'authorization',
     'content-type',
     'dnt',
+    'idempotency-key',
     'origin',
     'user-agent',
     'x-csrftoken',
@@ -598,3 +613,110 @@ SWAGGER_SETTINGS = {
     'SHOW_EXTENSIONS': True,
     'DEFAULT_MODEL_RENDERING': 'example',
 }
+
+# Previsão de reposição (manage.py forecast_reorder_points)
+STOCK_FORECAST_HISTORY_DAYS = 90  # janela de histórico de saídas
+STOCK_FORECAST_LEAD_TIME_DAYS = 7  # prazo padrão quando o produto não define
+STOCK_FORECAST_SERVICE_LEVEL = 0.95  # probabilidade de não faltar no prazo
+
+# Relatório ABC/XYZ (relatorios/abc_xyz.py)
+ABC_XYZ_WEEKS = 13  # janela de saídas analisada (semanas)
+ABC_CLASS_LIMITS = (0.80, 0.95)  # participação acumulada no valor: A até 80%, B até 95%
+XYZ_CV_LIMITS = (0.5, 1.0)  # coeficiente de variação semanal: X até 0,5, Y até 1,0
+ABC_XYZ_CACHE_TIMEOUT = 60 * 60 * 6  # a chave muda com os dados; o TTL só limita o acúmulo
+
+# Valoração do estoque a custo (movimentacoes/valuation.py)
+# 'AVG' = custo médio ponderado, 'FIFO' = PEPS. Após trocar, rode
+# manage.py recompute_valuation para reconstruir custos e camadas.
+STOCK_VALUATION_METHOD = 'AVG'
+
+# Variações de estoque pendentes (movimentacoes/stock_journal.py): aplicadas
+# ao total do produto logo após o commit de cada movimentação com depósito ou
+# de produto fragmentado. O worker (manage.py apply_stock_deltas --loop, no
+# Procfile) aplica as que ficarem para trás (produto travado, processo morto).
+STOCK_JOURNAL_APPLY_ON_COMMIT = True
+
+# Alertas de estoque baixo/crítico (movimentacoes/alerts.py)
+# Envio: manage.py dispatch_stock_alerts --loop (worker)
+STOCK_ALERT_WINDOW_MINUTES = 60  # um alerta por produto/nível a cada janela
+STOCK_ALERT_BATCH_DELAY_SECONDS = 60  # espera antes de enviar, para agrupar rajadas
+STOCK_ALERT_BATCH_SIZE = 500  # alertas por resumo enviado
+STOCK_ALERT_BACKENDS = [
+    'movimentacoes.alerts.ConsoleAlertBackend',
+    # 'movimentacoes.alerts.FileAlertBackend',
+    # 'movimentacoes.alerts.EmailAlertBackend',
+    # 'movimentacoes.alerts.WebhookAlertBackend',
+]
+STOCK_ALERT_FILE_PATH = os.path.join(BASE_DIR, 'stock_alerts.jsonl')
+STOCK_ALERT_EMAILS = [
+    email.strip() for email in os.getenv('STOCK_ALERT_EMAILS', '').split(',') if email.strip()
+]
+STOCK_ALERT_WEBHOOK_URL = os.getenv('STOCK_ALERT_WEBHOOK_URL', '')
+STOCK_ALERT_WEBHOOK_TIMEOUT = 10  # segundos
+
+# Webhooks de saída (core/webhooks.py), habilitados em Configurações de API
+# Entrega: manage.py deliver_webhooks --loop (worker)
+WEBHOOK_WORKERS = 4  # workers paralelos, cada um com suas conexões HTTP
+WEBHOOK_BATCH_SIZE = 100  # eventos por POST
+WEBHOOK_TIMEOUT = 10  # segundos por requisição
+WEBHOOK_LEASE_SECONDS = 60  # reserva do lote; expirada, o lote volta à fila
+WEBHOOK_MAX_ATTEMPTS = 8  # depois disso o evento vira dead letter (FALHOU)
+WEBHOOK_BACKOFF_BASE_SECONDS = 30  # 30s, 1min, 2min, ... (com jitter)
+WEBHOOK_BACKOFF_MAX_SECONDS = 60 * 60 * 6
+WEBHOOK_CONFIG_CACHE_TIMEOUT = 30  # releitura de ApiSettings por processo
+
+# Idempotency-Key na API (core/idempotency.py)
+# Limpeza: manage.py purge_idempotency_keys (cron diário)
+IDEMPOTENCY_KEY_TTL_HOURS = 24  # janela em que repetições devolvem a resposta original
+
+# Sincronização de coletores offline (movimentacoes/sync.py)
+OFFLINE_SYNC_MAX_LINES = 2000  # movimentações por requisição de sincronização
+OFFLINE_SYNC_CURSOR_OVERLAP_SECONDS = 120  # janela reenviada a cada delta (commits atrasados)
+API_MAX_DECOMPRESSED_BODY = 10 * 1024 * 1024  # limite de corpos gzip/deflate (bytes)
+
+# Perfil de SQL por requisição (core/profiling.py): Server-Timing + log JSON
+# em "siteares.sql". Desabilitado, o middleware sai da cadeia (custo zero).
+SQL_PROFILING_ENABLED = os.getenv('SQL_PROFILING', 'False').lower() in ('true', '1', 'yes')
+SQL_PROFILING_SLOWEST = 5  # queries mais lentas no resumo
+SQL_QUERY_BUDGET_STRICT = False  # True: exceder @query_budget levanta exceção (testes)
+
+# Métricas Prometheus em /metrics (core/metrics.py). Com uWSGI, defina
+# PROMETHEUS_MULTIPROC_DIR (etc/uwsgi.ini) para somar todos os workers.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() in ('true', '1', 'yes')
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')  # Bearer do scraper; sem ele, só staff
+
+# Cache de dois níveis para dados de referência (core/tiered_cache.py):
+# L1 em memória por processo + L2 em CACHES['default']; invalidação
+# publicada no canal Redis (sem Redis, canal local ao processo)
+TIERED_CACHE_L1_MAX_ENTRIES = 256  # chaves por processo (LRU)
+TIERED_CACHE_L1_TIMEOUT = 60  # segundos; limita a defasagem se uma invalidação se perder
+TIERED_CACHE_TIMEOUT = 60 * 60  # TTL padrão no L2
+TIERED_CACHE_CHANNEL = 'ares:tiered-cache:invalidate'
+
+# Fragmentos da HomePage (home/fragments.py): HTML de cada bloco por revisão
+# publicada; publicar a página apaga os da revisão anterior
+HOME_FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Imagens processadas em segundo plano (core/renditions.py): o upload só grava
+# a tarefa; o worker (manage.py generate_renditions) gera tudo num pool de
+# processos. Especificações dos templates, na sintaxe do {% picture %}
+IMAGE_RENDITIONS = {
+    'thumbnail': 'max-165x165',  # listagens e choosers do admin
+    'card': 'fill-400x300 format-{avif,webp}',  # destaques
+    'noticia': 'fill-400x250 format-{avif,webp}',
+    'conteudo': 'fill-600x400 format-{avif,webp}',  # texto com imagem
+    'banner': 'fill-1920x600',  # carrossel (fundo CSS)
+    'hero': 'fill-1920x800',  # cabeçalho da HomePage (fundo CSS)
+    'cabecalho': 'fill-1200x400',  # páginas internas
+    'galeria': 'fill-100x75',
+    'grade': 'fill-350x200',
+    'solucao': 'width-400',
+    'original': 'original',
+}
+IMAGE_UPLOAD_VARIANTS = {'thumbnail': 150, 'card': 400, 'hero': 1920}  # lado maior (px)
+IMAGE_UPLOAD_FORMATS = ('webp', 'avif')  # além do formato original do arquivo
+RENDITION_WORKERS = max(1, (os.cpu_count() or 2) - 1)  # processos do pool
+RENDITION_BATCH_SIZE = 20  # tarefas reservadas por vez
+RENDITION_LEASE_SECONDS = 600  # reserva do lote; expirada, as tarefas voltam à fila
+RENDITION_MAX_ATTEMPTS = 5
+RENDITION_RETRY_SECONDS = 60  # 1min, 2min, 4min, ...
@@ -68,7 +68,7 @@ if REDIS_URL:
 
     CACHES = {
         "default": {
-            "BACKEND": "django_redis.cache.RedisCache",
+            "BACKEND": "core.cache_backends.MeteredRedisCache",
             "LOCATION": REDIS_URL + "/0",
             "OPTIONS": redis_options,
         },
@@ -82,7 +82,7 @@ if REDIS_URL:
 else:
     CACHES = {
         "default": {
-            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "BACKEND": "core.cache_backends.MeteredLocMemCache",
             "LOCATION": "siteares",
         }
     }
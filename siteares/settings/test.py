@@ -75,3 +75,7 @@ REST_FRAMEWORK = {
 
 # Desabilita whitenoise em testes
 MIDDLEWARE = [m for m in MIDDLEWARE if "whitenoise" not in m.lower()]
+
+# Perfil de SQL ligado: views acima do @query_budget falham os testes
+SQL_PROFILING_ENABLED = True
+SQL_QUERY_BUDGET_STRICT = True
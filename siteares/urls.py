@@ -9,6 +9,7 @@ from wagtail.images.views.serve import ServeView
 from django.views.generic import RedirectView
 
 from django.shortcuts import render
+from core.metrics import metrics_view
 from . import views
 
 handler403 = 'core.handlers.permission_denied_handler'
@@ -49,6 +50,7 @@ urlpatterns = [
     path("api/v1/", include("siteares.api_urls", namespace="api-v1")),
     
     # Utilidades
+    path("metrics", metrics_view, name="metrics"),
     path("__reload__/", include("django_browser_reload.urls")),
     path("favicon.ico", RedirectView.as_view(url=settings.STATIC_URL + "img/favicon.ico")),
     